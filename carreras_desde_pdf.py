@@ -7,1138 +7,7453 @@ Formato esperado en el PDF: "1ª - Premio NOMBRE - 14:05 hs."
 Requiere: pip install pypdf
 """
 
+import hashlib
+import io
+import json
+import os
 import re
-
-# Patrón para el título de carrera: "1ª - Premio FLOWING RYE 2013 - 14:05 hs."
-# Acepta ª, º o 'a' (por si el PDF devuelve mal el carácter)
-_PATRON_CARRERA_PDF = re.compile(
-    r"(\d+)\s*[ªºa]\s*[-–]\s*(.+?)\s*[-–]\s*\d{1,2}\s*:\s*\d{2}\s*hs\.?",
-    re.IGNORECASE | re.DOTALL,
+import struct
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+
+# Versión de la herramienta. Cambiarla invalida las comparaciones guardadas en caché.
+__version__ = "1.1.0"
+
+# Directorio de caché local (textos de página ya extraídos, índices, etc.).
+# Se puede redefinir con la variable de entorno CARRERAS_CACHE_DIR.
+_DIRECTORIO_CACHE = os.environ.get("CARRERAS_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".carreras_desde_pdf"
 )
 
+# Textos de página ya extraídos en este proceso: {clave_pagina: texto}, los
+# últimos _MAX_TEXTOS_EN_MEMORIA usados (el menú, la ventana y el backfill
+# corren mucho tiempo). En disco se guardan hasta _MAX_PAGINAS_EN_DISCO; al
+# pasarse se borran los menos usados (por fecha de modificación) hasta el 90 %,
+# para no reordenar la carpeta después de cada PDF.
+_TEXTOS_EN_MEMORIA = OrderedDict()
+_MAX_TEXTOS_EN_MEMORIA = 4096
+_MAX_PAGINAS_EN_DISCO = 20000
+_MAX_ARCHIVOS_EN_DISCO = 2000
 
-def obtener_carreras_por_pagina(ruta_pdf):
-    """
-    Lee el PDF y retorna, por cada página, el número de carrera y el nombre
-    de la carrera (si la página contiene el encabezado de una carrera).
+# Avisos ya mostrados de valores de configuración inválidos (uno por mensaje)
+_AVISOS_CONFIGURACION = set()
 
-    Formato esperado en el PDF: "1ª - Premio NOMBRE - 14:05 hs."
 
-    Parámetros
-    ----------
-    ruta_pdf : str
-        Ruta al archivo PDF.
+def _avisar_configuracion(mensaje):
+    """Avisa por stderr, una sola vez, que un valor de configuración es inválido y se ignora."""
+    import sys
 
-    Retorna
-    -------
-    list[dict]
-        Lista de diccionarios, uno por cada página del PDF. Cada elemento tiene:
-        - "pagina": int (número de página, 1-based)
-        - "numero_carrera": int o None (número de la carrera si la página la contiene)
-        - "nombre_carrera": str o None (nombre de la carrera si la página la contiene)
+    if mensaje not in _AVISOS_CONFIGURACION:
+        _AVISOS_CONFIGURACION.add(mensaje)
+        print(f"Aviso: {mensaje}", file=sys.stderr)
 
-    Raises
-    ------
-    ImportError
-        Si no está instalada la librería pypdf.
+
+# Valor de configuración que todavía sale de su variable de entorno: se lee al
+# usarlo (ver _numero_entorno), así un valor mal escrito no impide importar el
+# módulo ni abrir el menú.
+_DEL_ENTORNO = object()
+
+
+def _numero_entorno(variable, tipo=float, defecto=None):
     """
+    Valor numérico positivo de la variable de entorno, o `defecto` si no está
+    definida. Un valor inválido se avisa (_avisar_configuracion) y se ignora.
+    """
+    valor = os.environ.get(variable)
+    if not valor:
+        return defecto
+    try:
+        numero = tipo(valor)
+    except ValueError:
+        numero = None
+    if numero is None or not numero > 0:
+        _avisar_configuracion(f"{variable}={valor!r} no es un número mayor que cero; se ignora")
+        return defecto
+    return numero
+
+
+def _importar_pypdf():
+    """Importa pypdf o lanza ImportError con el mensaje de instalación."""
     try:
         import pypdf
     except ImportError:
         raise ImportError("Se necesita la librería pypdf. Instalar con: pip install pypdf")
+    return pypdf
 
-    reader = pypdf.PdfReader(ruta_pdf)
-    resultado = []
 
-    for num_pagina in range(len(reader.pages)):
-        pagina_actual = num_pagina + 1  # 1-based
-        texto = reader.pages[num_pagina].extract_text() or ""
+def _ruta_cache(subdirectorio, clave, extension=".json"):
+    return os.path.join(_DIRECTORIO_CACHE, subdirectorio, f"{clave}{extension}")
 
-        numero_carrera = None
-        nombre_carrera = None
 
-        m = _PATRON_CARRERA_PDF.search(texto)
-        if m:
-            numero_carrera = int(m.group(1))
-            nombre_carrera = m.group(2).strip()
-            nombre_carrera = " ".join(nombre_carrera.split())
+def _leer_cache_json(subdirectorio, clave):
+    """Devuelve el contenido JSON guardado en caché, o None si no existe o está dañado."""
+    try:
+        with open(_ruta_cache(subdirectorio, clave), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-        resultado.append({
-            "pagina": pagina_actual,
-            "numero_carrera": numero_carrera,
-            "nombre_carrera": nombre_carrera,
-        })
 
-    return resultado
+def _podar_cache(subdirectorio, maximo, hasta=None):
+    """
+    Si la carpeta de la caché tiene más de `maximo` entradas, borra las usadas
+    hace más tiempo (por fecha de modificación) hasta dejar `hasta` (por
+    defecto, `maximo`). Otro proceso puede estar podando a la vez: lo que ya
+    no está se saltea.
+    """
+    directorio = os.path.join(_DIRECTORIO_CACHE, subdirectorio)
+    try:
+        archivos = [os.path.join(directorio, n) for n in os.listdir(directorio) if n.endswith(".json")]
+    except OSError:
+        return
+    if len(archivos) <= maximo:
+        return
+    fechas = {}
+    for ruta in archivos:
+        try:
+            fechas[ruta] = os.path.getmtime(ruta)
+        except OSError:
+            pass
+    viejos = sorted(fechas, key=fechas.get)
+    for ruta in viejos[:max(0, len(viejos) - (maximo if hasta is None else hasta))]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
 
 
-# Patrón para cada apuesta: "Nombre Apuesta $ valor" (valor con dígitos, punto o coma)
-_PATRON_APUESTA_VALOR = re.compile(
-    r"(.+?)\s*\$\s*([\d.,]+)",
-    re.IGNORECASE,
-)
+def _escribir_cache_json(subdirectorio, clave, datos):
+    """
+    Guarda datos en la caché en disco. Escribe a un temporal y lo renombra para no
+    dejar archivos a medio escribir. Si no se puede escribir (disco de solo
+    lectura, permisos), la caché simplemente no se usa.
+    """
+    ruta = _ruta_cache(subdirectorio, clave)
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+    except OSError:
+        pass
+
+
+# Métricas en formato de texto de Prometheus, para seguir las corridas
+# desatendidas. Se acumulan en memoria con operaciones de diccionario (costo
+# despreciable frente a parsear una página) y se exponen con un endpoint local
+# /metrics (CARRERAS_METRICAS_PUERTO) o escribiendo un archivo para el
+# textfile collector de node_exporter al terminar cada corrida
+# (CARRERAS_METRICAS_ARCHIVO, con extensión .prom).
+_DEFINICION_METRICAS = {
+    "carreras_pdfs_total": ("counter", "Programas PDF parseados", ("formato",)),
+    "carreras_parseo_pdf_segundos": ("histogram", "Segundos de parseo de un programa PDF", ("formato",)),
+    "carreras_paginas_total": ("counter", "Páginas de PDF leídas, según de dónde salió el texto", ("origen",)),
+    "carreras_extraccion_pagina_segundos": ("histogram", "Segundos de extracción de texto por página", ("motor",)),
+    "carreras_parseo_reporte_segundos": ("histogram", "Segundos de lectura y parseo de un reporte", ("formato",)),
+    "carreras_comparaciones_total": ("counter", "Comparaciones de programa contra reporte", ("hipodromo",)),
+    "carreras_diferencias_total": ("counter", "Diferencias encontradas", ("hipodromo", "tipo", "apuesta")),
+    "carreras_cache_total": ("counter", "Consultas a las cachés", ("cache", "resultado")),
+    "carreras_planes_total": ("counter", "Estrategias elegidas por el planificador", ("tarea", "estrategia")),
+    "carreras_compuertas_total": ("counter", "Verificaciones go/no-go, según el resultado", ("resultado",)),
+}
+_LIMITES_HISTOGRAMA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
 
-# Apuestas a excluir: desde 2do pase en adelante (2do, 3er, 4to, 5to, Ultimo pase, Final)
-# Nota: "Final 1er.Pase" (ej. "Cuaterna Final 1er.Pase") debe INCLUIRSE.
-_PATRON_EXCLUIR_PASE_SIN_FINAL = re.compile(
-    r"2do\.?\s*pase|3er\.?\s*pase|4to\.?\s*pase|5to\.?\s*pase|ultimo\s*pase",
-    re.IGNORECASE,
-)
-_PATRON_FINAL = re.compile(r"\bfinal\b|final\s*pase", re.IGNORECASE)
-_PATRON_PRIMER_PASE = re.compile(r"\b1er\.?\s*pase\b|\b1re\.?\s*pase\b", re.IGNORECASE)
+# {(nombre, (valores de etiquetas...)): número (counter) o [cubetas..., suma, cuenta] (histogram)}
+_VALORES_METRICAS = {}
+_METRICAS_ARCHIVO = os.environ.get("CARRERAS_METRICAS_ARCHIVO") or None
+_SERVIDOR_METRICAS = {}
 
 
-def es_apuesta_excluida(nombre):
+def _contar(nombre, *etiquetas, cantidad=1):
+    clave = (nombre, etiquetas)
+    _VALORES_METRICAS[clave] = _VALORES_METRICAS.get(clave, 0) + cantidad
+
+
+def _observar(nombre, valor, *etiquetas):
+    clave = (nombre, etiquetas)
+    estado = _VALORES_METRICAS.get(clave)
+    if estado is None:
+        estado = _VALORES_METRICAS[clave] = [0] * (len(_LIMITES_HISTOGRAMA) + 1) + [0.0, 0]
+    estado[bisect_left(_LIMITES_HISTOGRAMA, valor)] += 1
+    estado[-2] += valor
+    estado[-1] += 1
+
+
+def _tomar_metricas():
+    """Devuelve lo acumulado y vacía el registro (para enviarlo desde un proceso worker)."""
+    valores = dict(_VALORES_METRICAS)
+    _VALORES_METRICAS.clear()
+    return valores
+
+
+def _sumar_metricas(valores):
+    """Suma al registro lo acumulado en otro proceso (ver _tomar_metricas)."""
+    for clave, valor in valores.items():
+        actual = _VALORES_METRICAS.get(clave)
+        if actual is None:
+            _VALORES_METRICAS[clave] = list(valor) if isinstance(valor, list) else valor
+        elif isinstance(valor, list):
+            for i, v in enumerate(valor):
+                actual[i] += v
+        else:
+            _VALORES_METRICAS[clave] = actual + valor
+
+
+def _con_metricas(funcion, argumento):
     """
-    Devuelve True si la apuesta debe excluirse (2do pase en adelante, último pase, etc.).
-    Regla especial: si contiene 'Final' pero también '1er.Pase' (o '1re.Pase'), NO se excluye.
-    'Doble Final Plus' y variantes de Doble se consideran DOB y no se excluyen.
+    Tarea de un pool de procesos: ejecuta funcion(argumento) y devuelve
+    (resultado, métricas de esa tarea) para sumarlas en el proceso principal.
+    Se vacía el registro al empezar porque, con fork, el worker hereda el del padre.
     """
-    if not nombre:
-        return False
-    # Doble Final Plus, Doble Plus, etc. son DOB y no deben excluirse
-    if nombre.strip().lower().startswith("doble"):
-        return False
-    if _PATRON_EXCLUIR_PASE_SIN_FINAL.search(nombre):
-        return True
-    if _PATRON_FINAL.search(nombre):
-        # Permitir "Final 1er.Pase"
-        if _PATRON_PRIMER_PASE.search(nombre):
-            return False
-        return True
-    return False
+    _VALORES_METRICAS.clear()
+    resultado = funcion(argumento)
+    return resultado, _tomar_metricas()
 
 
-# Mapeo de abreviaturas (debe estar antes de normalizar_nombre_apuesta para que pueda usarlo)
-_MAPEO_ABREVIATURAS = {
-    "ganador": "GAN",
-    "segundo": "SEG",
-    "tercero": "TER",
-    "exacta": "EXA",
-    "trifecta": "TRI",
-    "imperfecta": "IMP",
-    "cuatrifecta": "CUA",
-    "doble": "DOB",
-    "triplo": "TPL",
-    "cuaterna": "QTN",
-    "quintuplo": "QTP",
-    "cadena": "CAD",
-}
+def _con_tiempo(funcion, argumento):
+    """Tarea de un pool de procesos: (funcion(argumento), segundos que tardó), para el planificador."""
+    import time
 
+    inicio = time.perf_counter()
+    resultado = funcion(argumento)
+    return resultado, time.perf_counter() - inicio
 
-def normalizar_nombre_apuesta(nombre):
+
+def _resultados_con_metricas(pares):
+    """Resultados de tareas _con_metricas, sumando sus métricas a medida que llegan."""
+    for resultado, metricas in pares:
+        _sumar_metricas(metricas)
+        yield resultado
+
+
+def _etiquetas_prometheus(nombres, valores, extra=""):
+    partes = []
+    for nombre, valor in zip(nombres, valores):
+        valor = "" if valor is None else str(valor)
+        valor = valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{nombre}="{valor}"')
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def metricas_prometheus():
+    """Métricas acumuladas en este proceso, en formato de texto de Prometheus (0.0.4)."""
+    valores = sorted(
+        ((nombre, tuple("" if e is None else str(e) for e in etiquetas)), valor)
+        for (nombre, etiquetas), valor in list(_VALORES_METRICAS.items())
+    )
+    lineas = []
+    for nombre, (tipo, ayuda, etiquetas) in _DEFINICION_METRICAS.items():
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for (nombre_valor, valores_etiquetas), valor in valores:
+            if nombre_valor != nombre:
+                continue
+            if tipo == "counter":
+                lineas.append(f"{nombre}{_etiquetas_prometheus(etiquetas, valores_etiquetas)} {valor}")
+                continue
+            acumulado = 0
+            for limite, cantidad in zip(_LIMITES_HISTOGRAMA + ("+Inf",), valor):
+                acumulado += cantidad
+                le = f'le="{limite}"'
+                lineas.append(f"{nombre}_bucket{_etiquetas_prometheus(etiquetas, valores_etiquetas, le)} {acumulado}")
+            lineas.append(f"{nombre}_sum{_etiquetas_prometheus(etiquetas, valores_etiquetas)} {valor[-2]}")
+            lineas.append(f"{nombre}_count{_etiquetas_prometheus(etiquetas, valores_etiquetas)} {valor[-1]}")
+    return "\n".join(lineas) + "\n"
+
+
+def escribir_metricas(ruta=None):
     """
-    Simplifica el nombre de la apuesta extrayendo solo la primera palabra
-    cuando contiene 'Pase' o cuando la primera palabra está en el diccionario de abreviaturas.
-    
-    Ejemplos:
-    - 'Cadena Con Jackpot 1er.Pase (Única Base)' → 'Cadena'
-    - 'Cuaterna 1er.Pase' → 'Cuaterna'
-    - 'Quintuplo 1er.Pase' → 'Quintuplo'
-    - 'Triplo 1er.Pase' → 'Triplo'
-    - 'Doble Plus' → 'Doble'
-    - 'Imperfecta Extra' → 'Imperfecta'
-    - 'Imperfecta' → 'Imperfecta' (sin cambios)
+    Escribe las métricas en `ruta` (por defecto CARRERAS_METRICAS_ARCHIVO) de
+    forma atómica, como pide el textfile collector de node_exporter. Sin ruta
+    configurada no hace nada.
     """
-    nombre = nombre.strip()
-    if not nombre:
-        return nombre
-    
-    palabras = nombre.split()
-    if not palabras:
-        return nombre
-    
-    primera_palabra = palabras[0]
-    
-    # Si contiene "Pase" o la primera palabra está en el diccionario de abreviaturas,
-    # tomar solo la primera palabra
-    if "pase" in nombre.lower() or primera_palabra.lower() in _MAPEO_ABREVIATURAS:
-        return primera_palabra
-    
-    return nombre
+    ruta = ruta or _METRICAS_ARCHIVO
+    if not ruta:
+        return
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(metricas_prometheus())
+    os.replace(temporal, ruta)
 
 
-def abreviar_apuesta(nombre):
+def servir_metricas(puerto, direccion="127.0.0.1"):
     """
-    Convierte el nombre de la apuesta a su abreviatura (case-insensitive).
-    Si no hay mapeo, devuelve el nombre tal cual.
+    Expone las métricas en http://direccion:puerto/metrics desde un hilo en
+    segundo plano (termina con el proceso). Devuelve el servidor.
     """
-    nombre = (nombre or "").strip()
-    if not nombre:
-        return nombre
-    return _MAPEO_ABREVIATURAS.get(nombre.lower(), nombre)
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            cuerpo = metricas_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato, *args):
+            pass
 
+    servidor = ThreadingHTTPServer((direccion, puerto), _Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    _SERVIDOR_METRICAS["servidor"] = servidor
+    return servidor
 
-def obtener_caballos_por_carrera(ruta_pdf):
+
+def configurar_metricas(archivo=None, puerto=None, direccion="127.0.0.1"):
     """
-    Extrae del PDF la cantidad de caballos por cada carrera.
-    
-    Retorna
-    -------
-    dict[int, int]
-        Diccionario {num_carrera: cantidad_caballos}
+    Ajusta la exposición de métricas (equivalente a las variables de entorno):
+    archivo para escribir al terminar cada corrida y/o puerto del endpoint /metrics.
     """
-    try:
-        import pypdf
-    except ImportError:
-        raise ImportError("Se necesita la librería pypdf. Instalar con: pip install pypdf")
+    global _METRICAS_ARCHIVO
+    _METRICAS_ARCHIVO = archivo
+    if puerto is not None and "servidor" not in _SERVIDOR_METRICAS:
+        servir_metricas(puerto, direccion)
+
+
+# Archivos comprimidos: los programas y reportes se pueden leer directamente desde
+# un .zip ("semana.zip::reporte_0103.txt") o un .gz ("programa.pdf.gz", también
+# dentro de un zip). Se descomprimen en memoria, nunca a disco; los últimos
+# miembros leídos se guardan (hasta _MAX_BYTES_MIEMBROS) porque el mismo archivo
+# se lee varias veces (hash, firma de paquete, extracción). La precarga lee desde
+# varios hilos: el diccionario solo se toca con _CANDADO_MIEMBROS tomado.
+_SEPARADOR_MIEMBRO = "::"
+_MIEMBROS_EN_MEMORIA = OrderedDict()  # {(contenedor, mtime_ns, tamaño, miembro): bytes}
+_MAX_BYTES_MIEMBROS = 64 * 2**20
+_CANDADO_MIEMBROS = threading.Lock()
+
+
+def _partes_miembro(ruta):
+    """(contenedor, miembro) si la ruta apunta dentro de un .zip o a un .gz; si no, None."""
+    if not isinstance(ruta, str):
+        return None
+    if _SEPARADOR_MIEMBRO in ruta:
+        contenedor, miembro = ruta.split(_SEPARADOR_MIEMBRO, 1)
+        return contenedor, miembro
+    if ruta.lower().endswith(".gz"):
+        return ruta, None
+    return None
 
-    reader = pypdf.PdfReader(ruta_pdf)
-    resultado = {}
 
-    # Patrón para números de caballo: "01 NOMBRE", "02 NOMBRE", etc.
-    patron_caballo = re.compile(r"^(\d{2})\s+[A-Z]", re.MULTILINE | re.IGNORECASE)
+def _clave_miembro(contenedor, miembro):
+    info = os.stat(contenedor)
+    return (os.path.abspath(contenedor), info.st_mtime_ns, info.st_size, miembro)
 
-    for num_pagina in range(len(reader.pages)):
-        texto = reader.pages[num_pagina].extract_text() or ""
 
-        # Número de carrera de esta página
-        m_carrera = _PATRON_CARRERA_PDF.search(texto)
-        if not m_carrera:
-            continue
-        num_carrera = int(m_carrera.group(1))
+def _descomprimir_miembro(contenedor, miembro):
+    """Contenido descomprimido de un miembro de .zip o de un .gz, sin pasar por la caché."""
+    import gzip
 
-        # Buscar todos los números de caballo (01, 02, ..., 15, 16, etc.)
-        numeros_caballos = set()
-        for m in patron_caballo.finditer(texto):
-            num = int(m.group(1))
-            if 1 <= num <= 24:  # Rango razonable de caballos
-                numeros_caballos.add(num)
+    if miembro is None:
+        with gzip.open(contenedor, "rb") as f:
+            return f.read()
+    import zipfile
 
-        # La cantidad es el número más alto encontrado (o el total de números únicos)
-        cantidad = max(numeros_caballos) if numeros_caballos else 0
-        resultado[num_carrera] = cantidad
+    with zipfile.ZipFile(contenedor) as z:
+        datos = z.read(miembro)
+    if miembro.lower().endswith(".gz"):
+        datos = gzip.decompress(datos)
+    return datos
+
+
+def _guardar_miembro(clave, datos):
+    """Agrega un miembro a la caché y descarta los más viejos si se pasa de _MAX_BYTES_MIEMBROS."""
+    with _CANDADO_MIEMBROS:
+        _MIEMBROS_EN_MEMORIA[clave] = datos
+        _MIEMBROS_EN_MEMORIA.move_to_end(clave)
+        total = sum(len(d) for d in _MIEMBROS_EN_MEMORIA.values())
+        while total > _MAX_BYTES_MIEMBROS and len(_MIEMBROS_EN_MEMORIA) > 1:
+            _, descartado = _MIEMBROS_EN_MEMORIA.popitem(last=False)
+            total -= len(descartado)
 
-    return resultado
 
+def _leer_miembro(contenedor, miembro):
+    """Contenido descomprimido (en memoria) de un miembro de .zip o de un .gz."""
+    clave = _clave_miembro(contenedor, miembro)
+    with _CANDADO_MIEMBROS:
+        datos = _MIEMBROS_EN_MEMORIA.get(clave)
+        if datos is not None:
+            _MIEMBROS_EN_MEMORIA.move_to_end(clave)
+            return datos
+    datos = _descomprimir_miembro(contenedor, miembro)
+    _guardar_miembro(clave, datos)
+    return datos
 
-def obtener_apuestas_por_carrera(ruta_pdf):
+
+def _precargar_miembros(rutas, max_hilos=None):
     """
-    Extrae del PDF, por cada carrera, todas las apuestas indicadas en la línea
-    APUESTAS (y la línea siguiente si existe), con su valor sin el signo $.
-    No se incluyen apuestas desde 2do pase en adelante (2do.Pase, 3er.Pase,
-    4to.Pase, 5to.Pase, Ultimo Pase, Cuaterna Final, Triplo Final, etc.).
-    Sí se incluyen Cadena 1er.Pase y Quintuplo 1er.Pase cuando vienen en la
-    misma línea que otras de 2do pase (se toma solo el segmento que lleva el valor).
+    Descomprime en paralelo (hilos: zlib libera el GIL) los miembros de archivos
+    comprimidos de `rutas`, para que las lecturas siguientes salgan de memoria.
+    Las rutas comunes se ignoran.
+
+    Se precargan en orden y solo mientras entran en _MAX_BYTES_MIEMBROS: pasado
+    ese tope, seguir descartaría los primeros (los que se van a leer antes) para
+    guardar los últimos, y habría que volver a descomprimirlos. Los que no
+    entran se descomprimen cuando se leen.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    partes = [p for p in (_partes_miembro(r) for r in rutas) if p is not None]
+    if len(partes) < 2:
+        return
+    usados = 0
+    pendientes = []
+    with _CANDADO_MIEMBROS:
+        for p in partes:
+            clave = _clave_miembro(*p)
+            datos = _MIEMBROS_EN_MEMORIA.get(clave)
+            if datos is None:
+                pendientes.append((clave, p))
+            else:
+                _MIEMBROS_EN_MEMORIA.move_to_end(clave)
+                usados += len(datos)
+    if not pendientes:
+        return
+
+    hilos = max_hilos or min(8, len(pendientes))
+    cola = iter(pendientes)
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        # Pocos miembros en vuelo a la vez, así el tope se respeta también en memoria
+        en_vuelo = deque()
+
+        def _lanzar():
+            siguiente = next(cola, None)
+            if siguiente is not None:
+                clave, p = siguiente
+                en_vuelo.append((clave, pool.submit(_descomprimir_miembro, *p)))
+
+        for _ in range(hilos):
+            _lanzar()
+        while en_vuelo:
+            clave, futuro = en_vuelo.popleft()
+            datos = futuro.result()
+            if usados + len(datos) > _MAX_BYTES_MIEMBROS:
+                for _, resto in en_vuelo:
+                    resto.cancel()
+                break
+            usados += len(datos)
+            _guardar_miembro(clave, datos)
+            _lanzar()
 
-    Retorna
-    -------
-    list[list]
-        Lista de tuplas [num_carrera, cantidad_caballos, apuesta, valor]. Ejemplo:
-        [[1, 15, "GAN", ""],
-         [1, 15, "IMP", "1000"],
-         [1, 15, "TRI", "1000"],
-         [1, 15, "QTN", "2000"],
-         [1, 15, "DOB", "1000"], ...]
 
-    Raises
-    ------
-    ImportError
-        Si no está instalada la librería pypdf.
+def miembros_archivo(ruta_archivo, extensiones=None):
+    """
+    Rutas ("archivo.zip::miembro") de los miembros de un .zip cuya extensión
+    (sin contar un .gz final) esté en `extensiones`. Para un .gz devuelve la
+    ruta misma si corresponde.
     """
+    if ruta_archivo.lower().endswith(".gz"):
+        return [ruta_archivo] if extensiones is None or extension_logica(ruta_archivo) in extensiones else []
+    import zipfile
+
+    with zipfile.ZipFile(ruta_archivo) as z:
+        nombres = [i.filename for i in z.infolist() if not i.is_dir()]
+    rutas = [f"{ruta_archivo}{_SEPARADOR_MIEMBRO}{n}" for n in sorted(nombres)]
+    if extensiones is not None:
+        rutas = [r for r in rutas if extension_logica(r) in extensiones]
+    return rutas
+
+
+def extension_logica(ruta):
+    """Extensión del archivo que se va a leer: 'x.zip::a.PDF' -> '.pdf', 'b.txt.gz' -> '.txt'."""
+    nombre = ruta.split(_SEPARADOR_MIEMBRO, 1)[-1].lower()
+    if nombre.endswith(".gz"):
+        nombre = nombre[:-3]
+    return os.path.splitext(nombre)[1]
+
+
+def existe_origen(ruta):
+    """True si la ruta es un archivo existente o un miembro existente de un .zip/.gz."""
+    partes = _partes_miembro(ruta)
+    if partes is None:
+        return os.path.isfile(ruta)
+    contenedor, miembro = partes
+    if not os.path.isfile(contenedor):
+        return False
+    if miembro is None:
+        return True
+    import zipfile
+
     try:
-        import pypdf
-    except ImportError:
-        raise ImportError("Se necesita la librería pypdf. Instalar con: pip install pypdf")
+        with zipfile.ZipFile(contenedor) as z:
+            z.getinfo(miembro)
+        return True
+    except (KeyError, zipfile.BadZipFile):
+        return False
 
-    reader = pypdf.PdfReader(ruta_pdf)
-    resultado = []
-    
-    # Obtener cantidad de caballos por carrera
-    caballos_por_carrera = obtener_caballos_por_carrera(ruta_pdf)
 
-    for num_pagina in range(len(reader.pages)):
-        texto = reader.pages[num_pagina].extract_text() or ""
+def _leer_bytes(origen):
+    """Lee el contenido completo de una ruta, de un miembro de .zip/.gz o de un objeto tipo archivo."""
+    if hasattr(origen, "read"):
+        return origen.read()
+    partes = _partes_miembro(origen)
+    if partes is not None:
+        return _leer_miembro(*partes)
+    with open(origen, "rb") as f:
+        return f.read()
 
-        # Número de carrera de esta página
-        m_carrera = _PATRON_CARRERA_PDF.search(texto)
-        if not m_carrera:
-            continue
-        num_carrera = int(m_carrera.group(1))
-        cantidad_caballos = caballos_por_carrera.get(num_carrera, 0)
 
-        # Bloque de APUESTAS: la línea que contiene "APUESTAS:" y la siguiente
-        lineas = texto.split("\n")
-        bloque_apuestas = []
-        for i, lin in enumerate(lineas):
-            if "APUESTAS:" in lin.upper():
-                # Quitar el prefijo "APUESTAS:" y tomar esta línea
-                idx = lin.upper().index("APUESTAS:")
-                bloque_apuestas.append(lin[idx + len("APUESTAS:"):].strip())
-                # Incluir la siguiente línea (suele tener más apuestas)
-                if i + 1 < len(lineas):
-                    bloque_apuestas.append(lineas[i + 1].strip())
-                break
+# Hash de archivos ya leídos: {(ruta, mtime_ns, tamaño[, miembro]): sha256}
+_HASHES_ARCHIVOS = {}
 
-        texto_apuestas = " ".join(bloque_apuestas)
-        if not texto_apuestas:
-            continue
 
-        # Buscar todos "algo $ número"; excluir apuestas desde 2do pase en adelante.
-        # Si hay varias apuestas separadas por coma (ej. "Cuaterna 2do.Pase, Cadena 1er.Pase $200"),
-        # el valor corresponde a la última; usamos solo esa para no excluir Cadena/Quintuplo 1er.Pase.
-        # Caso especial: "Ganador, Segundo, Tercero $ 2" → queremos ver las tres apuestas.
-        for m in _PATRON_APUESTA_VALOR.finditer(texto_apuestas):
-            apuesta_bruta = m.group(1).strip().rstrip(",")
-            valor = m.group(2).strip()
-            if not apuesta_bruta or not valor:
-                continue
+def _hash_archivo(ruta):
+    """
+    sha256 del contenido de un archivo. Se memoriza por ruta, fecha de
+    modificación y tamaño, para no volver a leer archivos que no cambiaron.
+    Para miembros de .zip/.gz es el hash del contenido descomprimido.
+    """
+    partes = _partes_miembro(ruta)
+    if partes is not None:
+        info = os.stat(partes[0])
+        clave = (os.path.abspath(partes[0]), info.st_mtime_ns, info.st_size, partes[1])
+    else:
+        info = os.stat(ruta)
+        clave = (os.path.abspath(ruta), info.st_mtime_ns, info.st_size)
+    if clave not in _HASHES_ARCHIVOS:
+        _HASHES_ARCHIVOS[clave] = hashlib.sha256(_leer_bytes(ruta)).hexdigest()
+    return _HASHES_ARCHIVOS[clave]
 
-            # Caso especial: bloque que contiene Ganador / Segundo / Tercero
-            # Solo nos interesa saber que existen estas apuestas; el monto no es crítico.
-            if "Ganador" in apuesta_bruta:
-                partes = [p.strip() for p in apuesta_bruta.split(",") if p.strip()]
-                for p in partes:
-                    # Para Ganador / Segundo / Tercero no forzamos ningún filtro de pases,
-                    # y podemos ignorar el valor (lo dejamos vacío).
-                    p_norm = normalizar_nombre_apuesta(p)
-                    p_cod = abreviar_apuesta(p_norm)
-                    resultado.append([num_carrera, cantidad_caballos, p_cod, ""])
+
+def _resumir_objeto_pdf(obj, memo, en_curso):
+    """
+    Resumen (sha1) de un objeto PDF recorriendo diccionarios, arrays y streams.
+    Los objetos indirectos se memorizan por (idnum, generación) para que recursos
+    compartidos entre páginas (fuentes, imágenes) se resuman una sola vez.
+    """
+    from pypdf.generic import IndirectObject, StreamObject
+
+    if isinstance(obj, IndirectObject):
+        clave = (obj.idnum, obj.generation)
+        if clave in memo:
+            return memo[clave]
+        if clave in en_curso:
+            return b"ciclo"
+        en_curso.add(clave)
+        resumen = _resumir_objeto_pdf(obj.get_object(), memo, en_curso)
+        en_curso.discard(clave)
+        memo[clave] = resumen
+        return resumen
+
+    h = hashlib.sha1()
+    if isinstance(obj, StreamObject):
+        # Datos crudos (sin decodificar): alcanza para detectar cambios y es más barato
+        datos = getattr(obj, "_data", None)
+        if datos is None:
+            datos = obj.get_data()
+        h.update(b"S")
+        h.update(datos if isinstance(datos, bytes) else str(datos).encode("utf-8"))
+    if isinstance(obj, dict):
+        h.update(b"D")
+        for k in sorted(obj.keys()):
+            if k == "/Parent":
                 continue
+            h.update(str(k).encode("utf-8"))
+            h.update(_resumir_objeto_pdf(dict.__getitem__(obj, k), memo, en_curso))
+    elif isinstance(obj, list):
+        h.update(b"A")
+        for item in obj:
+            h.update(_resumir_objeto_pdf(item, memo, en_curso))
+    elif not isinstance(obj, StreamObject):
+        h.update(repr(obj).encode("utf-8"))
+    return h.digest()
+
+
+def huella_pagina_pdf(pagina, memo=None):
+    """
+    Calcula la huella de una página de pypdf: hash de su stream de contenido,
+    sus recursos (fuentes, XObjects) y su geometría. Dos páginas con la misma
+    huella producen el mismo texto, así que no hace falta volver a extraerlo.
 
-            # Lógica genérica para el resto de apuestas
-            apuesta = apuesta_bruta
-            if "," in apuesta:
-                # En bloques mixtos, quedarnos solo con el último tramo (el que lleva el valor)
-                apuesta = apuesta.rsplit(",", 1)[-1].strip()
+    Parámetros
+    ----------
+    pagina : pypdf.PageObject
+    memo : dict, optional
+        Memo compartido entre páginas del mismo PDF (ver _resumir_objeto_pdf).
 
-            # Excluir desde 2do pase en adelante (permitiendo "Final 1er.Pase")
-            if not es_apuesta_excluida(apuesta):
-                # Normalizar el nombre (ej. "Cadena Con Jackpot 1er.Pase" → "Cadena")
-                apuesta_normalizada = normalizar_nombre_apuesta(apuesta)
-                apuesta_cod = abreviar_apuesta(apuesta_normalizada)
-                resultado.append([num_carrera, cantidad_caballos, apuesta_cod, valor])
+    Retorna
+    -------
+    str
+        Huella hexadecimal (sha256).
+    """
+    if memo is None:
+        memo = {}
+    h = hashlib.sha256()
+    for clave in ("/Contents", "/Resources", "/MediaBox", "/CropBox", "/Rotate"):
+        if clave not in pagina:
+            continue
+        h.update(clave.encode("utf-8"))
+        h.update(_resumir_objeto_pdf(dict.__getitem__(pagina, clave), memo, set()))
+    return h.hexdigest()
+
+
+# Motores de extracción de texto. Cada motor es un dict de funciones:
+#   "disponible"() -> bool        si sus dependencias están instaladas
+#   "version"() -> str            entra en la clave de caché de los textos
+#   "abrir"(contenido, reader)    documento del motor (los de pypdf reusan `reader`)
+#   "paginas"(documento) -> int   cantidad de páginas
+#   "texto"(documento, n) -> str  texto de la página n (1-based)
+# La huella de página (huella_pagina_pdf) es estructural y la calcula siempre
+# pypdf, así la caché por huella sirve para cualquier motor. El motor por
+# defecto sale de CARRERAS_MOTOR_EXTRACCION, de la elección guardada por
+# `benchmark-motores --guardar` o, si no hay ninguna, es "pypdf".
+def _version_paquete(nombre):
+    from importlib import metadata
 
-    return resultado
+    try:
+        return metadata.version(nombre)
+    except metadata.PackageNotFoundError:
+        return "?"
 
 
-def _parsear_monto_str(valor_str):
-    """
-    Convierte un string de monto a float, aceptando:
-    - Punto como separador de miles: "5.000" -> 5000.0
-    - Coma como decimal europeo: "1000,50" -> 1000.5
-    - Formato mixto: "1.000,50" -> 1000.5
-    Retorna None si no se puede parsear.
-    """
-    if not valor_str or not isinstance(valor_str, str):
-        return None
-    s = valor_str.strip()
-    if not s:
-        return None
-    # Formato europeo con coma decimal: 1.000,50 -> quitar puntos, coma a punto
-    if "," in s:
-        s = s.replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except ValueError:
-            return None
-    # Solo punto(s): "5.000" = 5000 (miles), "5.5" = 5.5 (decimal)
-    if "." in s:
-        partes = s.split(".")
-        # Si la parte tras el último punto tiene exactamente 3 dígitos y todo son dígitos -> miles
-        if len(partes) >= 2 and all(p.isdigit() for p in partes) and len(partes[-1]) == 3:
-            try:
-                return float(s.replace(".", ""))
-            except ValueError:
-                pass
+def _modulo_disponible(nombre):
+    import importlib.util
+
+    try:
+        return importlib.util.find_spec(nombre) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _pypdf_con_layout():
+    import inspect
+
+    if not _modulo_disponible("pypdf"):
+        return False
+    return "extraction_mode" in inspect.signature(_importar_pypdf().PageObject.extract_text).parameters
+
+
+def _abrir_pypdf(contenido, reader=None):
+    return reader if reader is not None else _importar_pypdf().PdfReader(io.BytesIO(contenido))
+
+
+def _abrir_pdfium(contenido, reader=None):
+    import pypdfium2
+
+    return pypdfium2.PdfDocument(contenido)
+
+
+def _texto_pdfium(documento, num_pagina):
+    pagina = documento[num_pagina - 1]
+    try:
+        pagina_texto = pagina.get_textpage()
         try:
-            return float(s)
-        except ValueError:
-            return None
+            texto = pagina_texto.get_text_range()
+        finally:
+            pagina_texto.close()
+    finally:
+        pagina.close()
+    return texto.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _abrir_pdfminer(contenido, reader=None):
+    from pdfminer.pdfpage import PDFPage
+
+    flujo = io.BytesIO(contenido)
+    return {"flujo": flujo, "paginas": list(PDFPage.get_pages(flujo))}
+
+
+def _texto_pdfminer(documento, num_pagina):
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+    salida = io.StringIO()
+    recursos = PDFResourceManager()
+    dispositivo = TextConverter(recursos, salida, laparams=LAParams())
     try:
-        return float(s)
-    except ValueError:
-        return None
+        PDFPageInterpreter(recursos, dispositivo).process_page(documento["paginas"][num_pagina - 1])
+    finally:
+        dispositivo.close()
+    return salida.getvalue().rstrip("\x0c")
+
+
+_MOTORES_EXTRACCION = {
+    "pypdf": {
+        "disponible": lambda: _modulo_disponible("pypdf"),
+        "version": lambda: _importar_pypdf().__version__,
+        "abrir": _abrir_pypdf,
+        "paginas": lambda documento: len(documento.pages),
+        "texto": lambda documento, n: documento.pages[n - 1].extract_text() or "",
+    },
+    "pypdf-layout": {
+        "disponible": _pypdf_con_layout,
+        "version": lambda: _importar_pypdf().__version__,
+        "abrir": _abrir_pypdf,
+        "paginas": lambda documento: len(documento.pages),
+        "texto": lambda documento, n: documento.pages[n - 1].extract_text(extraction_mode="layout") or "",
+    },
+    # Parcial: solo sirve para los parsers de San Isidro (ver _texto_regiones)
+    "pypdf-regiones": {
+        "disponible": lambda: _modulo_disponible("pypdf"),
+        "version": lambda: _importar_pypdf().__version__,
+        "abrir": _abrir_pypdf,
+        "paginas": lambda documento: len(documento.pages),
+        "texto": lambda documento, n: _texto_regiones(documento.pages[n - 1]),
+        "parcial": True,
+    },
+    "pypdfium2": {
+        "disponible": lambda: _modulo_disponible("pypdfium2"),
+        "version": lambda: _version_paquete("pypdfium2"),
+        "abrir": _abrir_pdfium,
+        "paginas": len,
+        "texto": _texto_pdfium,
+    },
+    "pdfminer": {
+        "disponible": lambda: _modulo_disponible("pdfminer"),
+        "version": lambda: _version_paquete("pdfminer.six"),
+        "abrir": _abrir_pdfminer,
+        "paginas": lambda documento: len(documento["paginas"]),
+        "texto": _texto_pdfminer,
+    },
+}
 
+_MOTOR_EXTRACCION = os.environ.get("CARRERAS_MOTOR_EXTRACCION") or None
 
-def _normalizar_desde_lista_apuestas(apuestas_raw):
+
+def motores_disponibles(parciales=False):
     """
-    Construye la estructura normalizada a partir de la lista de apuestas
-    [num_carrera, cantidad_caballos, codigo_apuesta, valor].
+    Nombres de los motores de extracción instalados, en orden de registro.
+    parciales: incluir los que solo sirven para algunos parsers (pypdf-regiones).
     """
-    resultado = {}
-    
-    for num_carrera, cantidad_caballos, codigo_apuesta, valor_str in apuestas_raw:
-        if num_carrera not in resultado:
-            resultado[num_carrera] = {
-                "caballos": cantidad_caballos,
-                "apuestas": {}
-            }
-        
-        valor_float = _parsear_monto_str(valor_str)
-        resultado[num_carrera]["apuestas"][codigo_apuesta] = valor_float
-    
-    return resultado
+    return [
+        nombre for nombre, motor in _MOTORES_EXTRACCION.items()
+        if motor["disponible"]() and (parciales or not motor.get("parcial"))
+    ]
 
 
-def _normalizar_pdf(ruta_pdf, apuestas_raw=None):
+def configurar_motor(nombre=None):
     """
-    Normaliza los datos extraídos del PDF en una estructura de diccionario.
-    Si se pasa apuestas_raw (lista ya leída), no se vuelve a leer el PDF.
+    Fija el motor de extracción (equivalente a CARRERAS_MOTOR_EXTRACCION).
+    None vuelve a la elección guardada por el benchmark o a pypdf.
 
-    Retorna
-    -------
-    dict[int, dict]
-        Estructura: {num_carrera: {"caballos": int, "apuestas": {codigo: float o None}}}
+    Raises
+    ------
+    ValueError
+        Si el motor no existe o no está instalado.
     """
-    if apuestas_raw is None:
-        apuestas_raw = obtener_apuestas_por_carrera(ruta_pdf)
-    return _normalizar_desde_lista_apuestas(apuestas_raw)
+    global _MOTOR_EXTRACCION
+    if nombre is not None:
+        if nombre not in _MOTORES_EXTRACCION:
+            raise ValueError(f"Motor de extracción desconocido: {nombre}")
+        if _MOTORES_EXTRACCION[nombre].get("parcial"):
+            raise ValueError(f"El motor {nombre} no extrae el texto completo; ver configurar_regiones")
+        if not _MOTORES_EXTRACCION[nombre]["disponible"]():
+            raise ValueError(f"El motor de extracción {nombre} no está instalado")
+    _MOTOR_EXTRACCION = nombre
+
+
+def motor_extraccion():
+    """Nombre del motor de extracción en uso."""
+    if _MOTOR_EXTRACCION is not None:
+        # configurar_motor ya lo validó; el valor de CARRERAS_MOTOR_EXTRACCION no
+        motor = _MOTORES_EXTRACCION.get(_MOTOR_EXTRACCION)
+        if motor is not None and not motor.get("parcial") and motor["disponible"]():
+            return _MOTOR_EXTRACCION
+        _avisar_configuracion(
+            f"CARRERAS_MOTOR_EXTRACCION={_MOTOR_EXTRACCION!r} no es un motor instalado "
+            f"({', '.join(motores_disponibles())}); se ignora"
+        )
+    elegido = _leer_cache_json("configuracion", "motor_extraccion")
+    if elegido:
+        motor = _MOTORES_EXTRACCION.get(elegido.get("motor"))
+        # La elección vale mientras el motor siga instalado en la misma versión
+        if motor is not None and motor["disponible"]() and motor["version"]() == elegido.get("version"):
+            return elegido["motor"]
+    return "pypdf"
+
+
+def _etiqueta_motor(nombre):
+    """Etiqueta del motor para la clave de caché de textos ("pypdf-6.1.0", "pypdfium2-4.30.0", ...)."""
+    return f"{nombre}-{_MOTORES_EXTRACCION[nombre]['version']()}"
+
+
+# Extracción por regiones, solo para los parsers de San Isidro. De una página de
+# carrera se usan tres cosas: el encabezado ("1ª - Premio X - 14:05 hs."), las
+# líneas con número de caballo y la línea de APUESTAS con la siguiente; las
+# tablas de performances y las notas, que son la mayor parte del texto, no
+# sirven. Una pasada barata por los operadores del stream (sin mapear fuentes)
+# agrupa los tramos de texto en renglones por su altura, como lo hace
+# extract_text(), y a extract_text() se le pasa el mismo stream sin los
+# operadores que muestran el texto de los renglones que no interesan. Los
+# operadores de posición quedan todos, así que los renglones conservados salen
+# idénticos a la extracción completa. Páginas con fuentes compuestas, texto
+# rotado, formularios (XObject /Form) o sin encabezado reconocible se extraen
+# completas. El texto que resulta solo sirve para esos parsers: por eso es un
+# motor "parcial", que no se puede elegir con --motor. Se activa con
+# CARRERAS_EXTRACCION_REGIONES=1 (0 lo apaga) o con `benchmark-motores
+# --guardar` cuando en los PDF medidos da lo mismo que pypdf y es más rápido.
+_EXTRACCION_REGIONES = (
+    os.environ["CARRERAS_EXTRACCION_REGIONES"] != "0" if os.environ.get("CARRERAS_EXTRACCION_REGIONES") else None
+)
 
+# Comienzo de renglón que podría ser un número de caballo en el texto completo
+# ("01 NOMBRE", "01" y el nombre en otro tramo, "1" y "2 NOMBRE" en tramos
+# separados...). Es más laxo que _PATRON_CABALLO: conservar de más solo cuesta tiempo.
+_PATRON_INICIO_CABALLO = re.compile(r"\d{1,2}(?:[^\W\d_]|\s|$)")
+_PATRON_SOLO_NUMERO = re.compile(r"\d{1,2}\s*$")
 
-def _normalizar_reporte(ruta_reporte):
+
+def configurar_regiones(activa=None):
     """
-    Lee reporte.txt y extrae cantidad de caballos, apuestas activas y valores mínimos.
-    
+    Activa o desactiva la extracción por regiones en los parsers de San Isidro
+    (equivalente a CARRERAS_EXTRACCION_REGIONES). None vuelve a la elección
+    guardada por el benchmark.
+    """
+    global _EXTRACCION_REGIONES
+    _EXTRACCION_REGIONES = activa
+
+
+def extraccion_por_regiones():
+    """
+    True si los parsers de San Isidro usan la extracción por regiones. Solo
+    aplica cuando el motor en uso es pypdf, sobre el que está construida.
+    """
+    if motor_extraccion() != "pypdf":
+        return False
+    if _EXTRACCION_REGIONES is not None:
+        return _EXTRACCION_REGIONES
+    elegido = _leer_cache_json("configuracion", "extraccion_regiones")
+    return bool(
+        elegido
+        and elegido.get("activa")
+        and elegido.get("version") == _MOTORES_EXTRACCION["pypdf-regiones"]["version"]()
+    )
+
+
+def _multiplicar_matrices(a, b):
+    """Producto de matrices de transformación PDF [a b c d e f] (a aplicada primero)."""
+    return [
+        a[0] * b[0] + a[1] * b[2],
+        a[0] * b[1] + a[1] * b[3],
+        a[2] * b[0] + a[3] * b[2],
+        a[2] * b[1] + a[3] * b[3],
+        a[4] * b[0] + a[5] * b[2] + b[4],
+        a[4] * b[1] + a[5] * b[3] + b[5],
+    ]
+
+
+def _distancia_renglon(renglon, y):
+    """Distancia vertical entre la altura y y la franja [y_min, y_max] del renglón."""
+    if renglon["y_min"] <= y <= renglon["y_max"]:
+        return 0.0
+    return min(abs(y - renglon["y_min"]), abs(y - renglon["y_max"]))
+
+
+def _renglones_operaciones(operaciones):
+    """
+    Agrupa los operadores que muestran texto (Tj, TJ, ', ") en renglones con el
+    mismo criterio de extract_text(): un tramo empieza renglón nuevo si su altura
+    se aleja de la franja del renglón en curso más que el alto de la letra (pypdf
+    corta con el 80 %, así que un renglón de acá nunca parte uno de pypdf).
+
     Retorna
     -------
-    dict[int, dict]
-        Estructura: {num_carrera: {"caballos": int, "apuestas": {codigo: float o None}}}
+    list[dict] o None
+        Renglones en el orden del stream, con "indices" (de los operadores),
+        "y_min"/"y_max", "alto", "texto" e "inicios" (posiciones en "texto"
+        donde cambia la altura, que es donde pypdf puede empezar una línea).
+        None si hay texto rotado o espejado.
     """
-    with open(ruta_reporte, "r", encoding="utf-8", errors="ignore") as f:
-        contenido = f.read()
-    
-    resultado = {}
-    
-    # 1. Extraer cantidad de caballos y apuestas activas por carrera
-    # Patrón para líneas de carrera: "1  GAN SEG TER 1/9 1/9 ..."
-    patron_carrera = re.compile(r"^\s*(\d+)\s+([A-Z\s]+?)(?:\s+1/9)+", re.MULTILINE)
-    patron_caballos = re.compile(r"1/9")
-    patron_scr = re.compile(r"\bSCR\b", re.IGNORECASE)
-    patron_apuestas_linea = re.compile(r"\b(GAN|SEG|TER|EXA|TRI|IMP|DOB|TPL|QTN|QTP|CAD|CUA)\b")
-    
-    lineas = contenido.split("\n")
-    apuestas_por_carrera = {}  # {num_carrera: set de códigos}
-    caballos_por_carrera = {}  # {num_carrera: cantidad}
-    
-    # Buscar líneas de carrera y contar caballos
-    i = 0
-    while i < len(lineas):
-        linea = lineas[i]
-        m = patron_carrera.match(linea)
-        if m:
-            num_carrera = int(m.group(1))
-            # Contar caballos: cada "1/9" cuenta 1, y cada "SCR" también cuenta 1
-            cantidad = len(patron_caballos.findall(linea)) + len(patron_scr.findall(linea))
-            caballos_por_carrera[num_carrera] = cantidad
-            
-            # Extraer apuestas de esta línea
-            apuestas_en_linea = set(patron_apuestas_linea.findall(linea))
-            if num_carrera not in apuestas_por_carrera:
-                apuestas_por_carrera[num_carrera] = set()
-            apuestas_por_carrera[num_carrera].update(apuestas_en_linea)
-            
-            # Buscar líneas siguientes con apuestas adicionales (ej. "DOB( 1,2 )")
-            # Las líneas siguientes que empiezan con espacios pertenecen a esta carrera
-            j = i + 1
-            max_lineas_siguientes = 15  # evita bucles infinitos
-            while j < len(lineas) and (j - (i + 1)) < max_lineas_siguientes:
-                linea_siguiente = lineas[j]
-                linea_stripped = linea_siguiente.strip()
-                if not linea_stripped:
-                    break
-                # Línea indentada (espacio o tab al inicio)
-                if not (linea_siguiente.startswith(" ") or linea_siguiente.startswith("\t")):
-                    break
-                # Otra carrera: empieza con número de carrera
-                if re.match(r"^\s*\d+\s+", linea_siguiente):
-                    break
-                apuestas_adicionales = patron_apuestas_linea.findall(linea_siguiente)
-                if apuestas_adicionales:
-                    apuestas_por_carrera[num_carrera].update(apuestas_adicionales)
-                j += 1
-        i += 1
-    
-    # 2. Extraer valores mínimos desde RSM TABLE
-    valores_por_carrera = {}  # {num_carrera: {codigo_apuesta: valor}}
-    
-    # Buscar sección RSM TABLE
-    inicio_rsm = contenido.find("RSM TABLE")
-    if inicio_rsm != -1:
-        # Leer desde RSM TABLE hasta encontrar una línea vacía seguida de otra sección
-        seccion_rsm = contenido[inicio_rsm:]
-        # Buscar hasta encontrar "TIM BETTING" o similar
-        fin_rsm_1 = seccion_rsm.find("\n\n\n")
-        fin_rsm_2 = seccion_rsm.find("TIM BETTING")
-        fin_rsm = None
-        if fin_rsm_1 != -1 and fin_rsm_2 != -1:
-            fin_rsm = min(fin_rsm_1, fin_rsm_2)
-        elif fin_rsm_1 != -1:
-            fin_rsm = fin_rsm_1
-        elif fin_rsm_2 != -1:
-            fin_rsm = fin_rsm_2
-        
-        if fin_rsm is not None and fin_rsm != -1:
-            seccion_rsm = seccion_rsm[:fin_rsm]
-        
-        # Patrón para líneas RSM: "  2  ALL  ---  EXA  TS  1000,00 ..."
-        patron_rsm = re.compile(
-            r"^\s*\d+\s+([^\s]+(?:[-\s,][^\s]+)*)\s+---\s+([A-Z]+)\s+TS\s+([\d.,]+)",
-            re.MULTILINE
-        )
-        
-        # Mapeo de códigos RSM a códigos estándar
-        mapeo_rsm = {
-            "WPS": None,  # WPS incluye GAN, SEG, TER pero no lo mapeamos directamente
-            "EXA": "EXA",
-            "TRI": "TRI",
-            "IMP": "IMP",
-            "DOB": "DOB",
-            "TPL": "TPL",
-            "QTN": "QTN",
-            "QTP": "QTP",
-            "CAD": "CAD",
-            "CUA": "CUA",
-        }
-        
-        # Carreras "reales" del reporte (las que tienen línea con 1/9). ALL solo aplica a estas.
-        carreras_reales_reporte = sorted(caballos_por_carrera.keys()) if caballos_por_carrera else []
+    identidad = [1.0, 0.0, 0.0, 1.0, 0.0, 0.0]
+    ctm = identidad
+    pila = []
+    tm = tlm = identidad
+    interlineado = 0.0
+    tamanio = 0.0
+    renglones = []
+    actual = None
+    y_anterior = None
+    cortado = True
+
+    for indice, (operandos, operador) in enumerate(operaciones):
+        if operador == b"q":
+            pila.append(ctm)
+        elif operador == b"Q":
+            ctm = pila.pop() if pila else identidad
+        elif operador == b"cm" and len(operandos) >= 6:
+            ctm = _multiplicar_matrices([float(v) for v in operandos[:6]], ctm)
+        elif operador == b"BT":
+            tm = tlm = identidad
+        elif operador == b"Tf" and len(operandos) >= 2:
+            tamanio = float(operandos[1])
+        elif operador == b"TL" and operandos:
+            interlineado = float(operandos[0])
+        elif operador in (b"Td", b"TD") and len(operandos) >= 2:
+            if operador == b"TD":
+                interlineado = -float(operandos[1])
+            tm = tlm = _multiplicar_matrices([1.0, 0.0, 0.0, 1.0, float(operandos[0]), float(operandos[1])], tlm)
+        elif operador == b"Tm" and len(operandos) >= 6:
+            tm = tlm = [float(v) for v in operandos[:6]]
+        if operador in (b"T*", b"'", b'"'):
+            tm = tlm = _multiplicar_matrices([1.0, 0.0, 0.0, 1.0, 0.0, -interlineado], tlm)
+        if operador in _OPERADORES_CORTE_TEXTO:
+            cortado = True
+
+        if operador in (b"Tj", b"'", b'"'):
+            textos = operandos[-1:]
+        elif operador == b"TJ":
+            textos = operandos[0] if operandos else []
+        else:
+            continue
 
-        for m in patron_rsm.finditer(seccion_rsm):
-            race_map = m.group(1).strip()
-            tipo_rsm = m.group(2).strip()
-            valor_str = m.group(3).strip()
-            
-            valor_float = _parsear_monto_str(valor_str)
-            if valor_float is None:
-                continue
-            
-            # Mapear tipo
-            codigo_apuesta = mapeo_rsm.get(tipo_rsm)
-            if not codigo_apuesta:
-                continue
-            
-            # Expandir race_map: si es ALL, solo carreras que existen en el reporte (no los 15 renglones del RSM)
-            if race_map.upper() == "ALL":
-                carreras = list(carreras_reales_reporte) if carreras_reales_reporte else _expandir_race_map(race_map)
-            else:
-                carreras = _expandir_race_map(race_map)
-            
-            # Asignar valor a cada carrera (solo a carreras reales si tenemos lista)
-            for carrera in carreras:
-                if carreras_reales_reporte and carrera not in carreras_reales_reporte:
-                    continue
-                if carrera not in valores_por_carrera:
-                    valores_por_carrera[carrera] = {}
-                valores_por_carrera[carrera][codigo_apuesta] = valor_float
-    
-    # 3. Leer valores por defecto desde CARD DEFAULT MINIMUMS
-    valores_default = {}
-    inicio_defaults = contenido.find("CARD DEFAULT MINIMUMS - ARS")
-    if inicio_defaults != -1:
-        seccion_defaults = contenido[inicio_defaults:inicio_defaults+500]
-        patron_default = re.compile(r"(GAN|SEG|TER|EXA|IMP|TRI|DOB|TPL|QTN|QTP|CAD|CUA)\s+([\d.,]+)")
-        for m in patron_default.finditer(seccion_defaults):
-            codigo = m.group(1)
-            valor_str = m.group(2)
-            v = _parsear_monto_str(valor_str)
-            if v is not None:
-                valores_default[codigo] = v
-    
-    # 4. Combinar todo en estructura final (solo carreras con línea 1/9 en el reporte, no las filas del RSM)
-    todas_las_carreras = set(caballos_por_carrera.keys()) | set(apuestas_por_carrera.keys())
-    
-    for num_carrera in todas_las_carreras:
-        resultado[num_carrera] = {
-            "caballos": caballos_por_carrera.get(num_carrera, 0),
-            "apuestas": {}
-        }
-        
-        # Agregar apuestas con sus valores
-        apuestas_carrera = apuestas_por_carrera.get(num_carrera, set())
-        valores_carrera = valores_por_carrera.get(num_carrera, {})
-        
-        for codigo in apuestas_carrera:
-            # Solo usar valor si está en RSM TABLE para esta carrera. Si no, NULL (no usar CARD DEFAULT MINIMUMS).
-            if codigo in valores_carrera:
-                resultado[num_carrera]["apuestas"][codigo] = valores_carrera[codigo]
-            else:
-                resultado[num_carrera]["apuestas"][codigo] = None
-    
-    return resultado
+        m = _multiplicar_matrices(tm, ctm)
+        if abs(m[1]) > 1e-6 or abs(m[2]) > 1e-6 or m[0] <= 0 or m[3] <= 0:
+            return None
+        y = m[5]
+        alto = abs(tamanio * m[3])
+        tramo = "".join(
+            t.decode("latin-1") if isinstance(t, bytes) else t for t in textos if isinstance(t, (bytes, str))
+        )
 
+        if actual is None or _distancia_renglon(actual, y) > max(alto, actual["alto"]):
+            actual = {"indices": [], "y_min": y, "y_max": y, "alto": alto, "texto": "", "inicios": [0]}
+            renglones.append(actual)
+        else:
+            if cortado:
+                actual["texto"] += " "
+            if y != y_anterior:
+                actual["inicios"].append(len(actual["texto"]))
+            actual["y_min"] = min(actual["y_min"], y)
+            actual["y_max"] = max(actual["y_max"], y)
+            actual["alto"] = max(actual["alto"], alto)
+        actual["indices"].append(indice)
+        actual["texto"] += tramo
+        y_anterior = y
+        cortado = operador in (b"'", b'"')
+    return renglones
+
+
+def _renglones_a_conservar(renglones):
+    """
+    Índices de los renglones que necesitan los parsers de San Isidro, o None si
+    no se reconoce el encabezado de carrera (la página se extrae completa).
+    """
+    texto = ""
+    posiciones = []
+    for renglon in renglones:
+        posiciones.append(len(texto))
+        texto += renglon["texto"] + "\n"
+    m = _PATRON_CARRERA_PDF.search(texto)
+    if m is None:
+        return None
 
-def _normalizar_reporte_palermo(ruta_reporte):
+    conservar = set()
+    for i, renglon in enumerate(renglones):
+        if posiciones[i] <= m.end() and m.start() <= posiciones[i] + len(renglon["texto"]):
+            conservar.add(i)
+        if "APUESTAS" in renglon["texto"].upper():
+            conservar.update((i, i + 1))
+        for inicio in renglon["inicios"]:
+            resto = renglon["texto"][inicio:].lstrip()
+            if _PATRON_INICIO_CABALLO.match(resto):
+                conservar.add(i)
+                # "01" solo: el nombre puede venir en la línea siguiente
+                if _PATRON_SOLO_NUMERO.match(resto):
+                    conservar.add(i + 1)
+    conservar = sorted(i for i in conservar if i < len(renglones))
+
+    # Dos renglones conservados a la misma altura con otros descartados en el
+    # medio quedarían pegados en una sola línea: se conserva lo del medio.
+    for anterior, siguiente in zip(conservar, conservar[1:]):
+        if siguiente > anterior + 1:
+            renglon = renglones[siguiente]
+            if min(
+                _distancia_renglon(renglones[anterior], renglon["y_min"]),
+                _distancia_renglon(renglones[anterior], renglon["y_max"]),
+            ) <= max(renglon["alto"], renglones[anterior]["alto"]):
+                conservar.extend(range(anterior + 1, siguiente))
+    return set(conservar)
+
+
+def _texto_regiones(pagina):
     """
-    Versión específica para PALERMO.
-    Solo lee la sección RSM TABLE y construye:
-        {num_carrera: {codigo_apuesta: valor_float}}
+    Texto de la página con solo los renglones que usan los parsers de San Isidro
+    (ver _renglones_a_conservar), extraído por pypdf. Si la página no se presta,
+    devuelve la extracción completa.
+    """
+    pypdf = _importar_pypdf()
+
+    recursos = pagina.get("/Resources") or {}
+    recursos = recursos.get_object() if hasattr(recursos, "get_object") else recursos
+    fuentes = recursos.get("/Font") or {}
+    objetos = recursos.get("/XObject") or {}
+    compleja = any(fuentes[nombre].get_object().get("/Subtype") == "/Type0" for nombre in fuentes) or any(
+        objetos[nombre].get_object().get("/Subtype") == "/Form" for nombre in objetos
+    )
+    if compleja or "/Contents" not in pagina:
+        return pagina.extract_text() or ""
+
+    # Mismo parseo que hace extract_text(), para no leer el stream dos veces
+    flujo = pypdf.generic.ContentStream(pagina["/Contents"].get_object(), pagina.pdf, "bytes")
+    operaciones = flujo.operations
+    renglones = _renglones_operaciones(operaciones)
+    conservar = _renglones_a_conservar(renglones) if renglones is not None else None
+    if conservar is not None:
+        descartados = set()
+        for i, renglon in enumerate(renglones):
+            if i not in conservar:
+                descartados.update(renglon["indices"])
+        filtradas = []
+        for indice, (operandos, operador) in enumerate(operaciones):
+            if indice not in descartados:
+                filtradas.append((operandos, operador))
+            elif operador == b"'":
+                filtradas.append(([], b"T*"))
+            elif operador == b'"' and len(operandos) >= 3:
+                filtradas.extend((([operandos[0]], b"Tw"), ([operandos[1]], b"Tc"), ([], b"T*")))
+        operaciones = filtradas
+
+    copia = pypdf.PageObject(pagina.pdf, pagina.indirect_reference)
+    copia.update(pagina)
+    flujo_copia = pypdf.generic.ContentStream(None, pagina.pdf)
+    flujo_copia.operations = operaciones
+    copia[pypdf.generic.NameObject("/Contents")] = flujo_copia
+    return copia.extract_text() or ""
+
+
+# Modo de memoria acotada para boletines enormes: las páginas se recorren en
+# ventanas y al cerrar cada ventana se sueltan los objetos que pypdf ya resolvió
+# (streams de contenido decodificados, fuentes, recursos). Los textos no quedan en
+# memoria: cada página se consume y de ella solo sobrevive el resultado compacto.
+# Se activa con un techo de memoria (CARRERAS_MEMORIA_MAX_MB, en MB) o solo a
+# partir de _PAGINAS_MODO_ACOTADO páginas.
+_LIMITE_MEMORIA_MB = _DEL_ENTORNO
+_PAGINAS_POR_VENTANA = _DEL_ENTORNO  # CARRERAS_VENTANA_PAGINAS, 16 por defecto
+_PAGINAS_MODO_ACOTADO = 150
+
+
+def _limite_memoria_mb():
+    """Techo de memoria en MB (None = sin techo)."""
+    if _LIMITE_MEMORIA_MB is _DEL_ENTORNO:
+        return _numero_entorno("CARRERAS_MEMORIA_MAX_MB")
+    return _LIMITE_MEMORIA_MB
+
+
+def _paginas_por_ventana():
+    if _PAGINAS_POR_VENTANA is _DEL_ENTORNO:
+        return _numero_entorno("CARRERAS_VENTANA_PAGINAS", int, 16)
+    return _PAGINAS_POR_VENTANA
+
+
+def configurar_memoria(limite_mb=None, paginas_por_ventana=None):
+    """
+    Ajusta el modo de memoria acotada (equivalente a las variables de entorno).
+    limite_mb: techo de memoria del proceso en MB (None = sin techo).
+    paginas_por_ventana: páginas que se procesan antes de soltar los objetos de pypdf.
+    """
+    global _LIMITE_MEMORIA_MB, _PAGINAS_POR_VENTANA
+    _LIMITE_MEMORIA_MB = limite_mb
+    if paginas_por_ventana is not None:
+        _PAGINAS_POR_VENTANA = max(1, int(paginas_por_ventana))
 
-    Ejemplo de líneas a leer:
-      1  ALL                   ---  EXA  TS  1000,00  ...
-      2  2,4,6,9,12            ---  IMP  TS  1000,00  ...
-      ...
-      12 2,4,6,9,12            ---  CUA  TS   500,00  ...
 
-    Regla especial:
-    - Cuando el race_map es 'ALL', se interpreta como "todas las carreras"
-      desde 1 hasta la última carrera que aparezca en los demás race_map.
+def _memoria_en_uso_mb():
     """
-    with open(ruta_reporte, "r", encoding="utf-8", errors="ignore") as f:
-        contenido = f.read()
+    Memoria residente del proceso en MB, o None si no se puede medir.
+    Usa psutil si está instalado; si no, /proc (Linux) o la API de Windows.
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
 
-    # Localizar la sección RSM TABLE
-    inicio_rsm = contenido.find("RSM TABLE")
-    if inicio_rsm == -1:
-        return {}
+    if os.name == "nt":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class _ContadoresMemoria(ctypes.Structure):
+                _fields_ = [
+                    ("cb", wintypes.DWORD),
+                    ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t),
+                    ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t),
+                    ("PeakPagefileUsage", ctypes.c_size_t),
+                ]
+
+            contadores = _ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(contadores)
+            proceso = ctypes.windll.kernel32.GetCurrentProcess()
+            if not ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb):
+                return None
+            return contadores.WorkingSetSize / 2**20
+        except (OSError, AttributeError):
+            return None
 
-    seccion_rsm = contenido[inicio_rsm:]
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
 
-    # Delimitar final de la sección (similar a _normalizar_reporte)
-    fin_rsm_1 = seccion_rsm.find("\n\n\n")
-    fin_rsm_2 = seccion_rsm.find("TIM BETTING")
-    fin_rsm = None
-    if fin_rsm_1 != -1 and fin_rsm_2 != -1:
-        fin_rsm = min(fin_rsm_1, fin_rsm_2)
-    elif fin_rsm_1 != -1:
-        fin_rsm = fin_rsm_1
-    elif fin_rsm_2 != -1:
-        fin_rsm = fin_rsm_2
 
-    if fin_rsm is not None and fin_rsm != -1:
-        seccion_rsm = seccion_rsm[:fin_rsm]
+def _liberar_objetos_pdf(reader):
+    """
+    Suelta los objetos que el reader de pypdf resolvió y guardó (se vuelven a leer
+    del archivo si otra página los necesita).
+    """
+    import gc
 
-    patron_rsm = re.compile(
-        r"^\s*\d+\s+([^\s]+(?:[-\s,][^\s]+)*)\s+---\s+([A-Z]+)\s+TS\s+([\d.,]+)",
-        re.MULTILINE
-    )
+    reader.resolved_objects.clear()
+    gc.collect()
 
-    mapeo_rsm = {
-        "EXA": "EXA",
-        "TRI": "TRI",
-        "IMP": "IMP",
-        "DOB": "DOB",
-        "TPL": "TPL",
-        "QTN": "QTN",
-        "QTP": "QTP",
-        "CAD": "CAD",
-        "CUA": "CUA",
-        # Otros tipos se ignoran para Palermo
-    }
 
-    # Primero, determinar la última carrera (máximo número) a partir de los race_map
-    max_carrera = 0
-    for m in patron_rsm.finditer(seccion_rsm):
-        race_map = m.group(1).strip()
-        if race_map.upper() == "ALL":
-            continue
-        carreras = _expandir_race_map(race_map)
-        if carreras:
-            max_carrera = max(max_carrera, max(carreras))
+# Presupuestos de tiempo para extraer texto, en segundos. Si alguno está
+# definido, la extracción de texto corre en un proceso aparte supervisado: una
+# página que supera su tiempo se mata, se reintenta una vez con la extracción
+# simple (_lineas_texto_simple) y, si tampoco sale, queda registrada como
+# ilegible y se sigue con el resto. Al agotarse el tiempo del documento, las páginas que
+# faltan se marcan ilegibles sin intentarlas.
+_TIEMPO_MAX_PAGINA_S = _DEL_ENTORNO
+_TIEMPO_MAX_PDF_S = _DEL_ENTORNO
+_MODOS_EXTRACCION = ("completo", "simple")
 
-    if max_carrera == 0:
-        # Si no se pudo inferir, asumimos 15 como máximo razonable
-        max_carrera = 15
+# Páginas que no se pudieron leer: {hash_archivo: {num_pagina: motivo}}
+_PAGINAS_ILEGIBLES = {}
 
-    # Ahora sí, construir estructura por carrera
-    valores_por_carrera = {}  # {num_carrera: {codigo_apuesta: valor_float}}
 
-    for m in patron_rsm.finditer(seccion_rsm):
-        race_map = m.group(1).strip()
-        tipo_rsm = m.group(2).strip()
-        valor_str = m.group(3).strip()
+def configurar_tiempos(max_pagina_s=None, max_pdf_s=None):
+    """
+    Ajusta los presupuestos de tiempo de extracción (equivalente a las variables
+    de entorno). None en ambos vuelve a extraer en el mismo proceso, sin límite.
+    """
+    global _TIEMPO_MAX_PAGINA_S, _TIEMPO_MAX_PDF_S
+    _TIEMPO_MAX_PAGINA_S = max_pagina_s
+    _TIEMPO_MAX_PDF_S = max_pdf_s
 
-        codigo_apuesta = mapeo_rsm.get(tipo_rsm)
-        if not codigo_apuesta:
-            continue
 
-        valor_float = _parsear_monto_str(valor_str)
-        if valor_float is None:
-            continue
+def _tiempo_max_pagina_s():
+    if _TIEMPO_MAX_PAGINA_S is _DEL_ENTORNO:
+        return _numero_entorno("CARRERAS_TIEMPO_MAX_PAGINA")
+    return _TIEMPO_MAX_PAGINA_S
 
-        if race_map.upper() == "ALL":
-            carreras = list(range(1, max_carrera + 1))
-        else:
-            carreras = _expandir_race_map(race_map)
 
-        for carrera in carreras:
-            if carrera not in valores_por_carrera:
-                valores_por_carrera[carrera] = {}
-            valores_por_carrera[carrera][codigo_apuesta] = valor_float
+def _tiempo_max_pdf_s():
+    if _TIEMPO_MAX_PDF_S is _DEL_ENTORNO:
+        return _numero_entorno("CARRERAS_TIEMPO_MAX_PDF")
+    return _TIEMPO_MAX_PDF_S
 
-    return valores_por_carrera
+
+def paginas_ilegibles(ruta_pdf, paginas=None):
+    """
+    Páginas del PDF que no se pudieron leer en la última extracción, como lista
+    ordenada de (num_pagina, motivo). paginas: limitar a esos números de página.
+    """
+    if hasattr(ruta_pdf, "read"):
+        posicion = ruta_pdf.tell()
+        hash_archivo = hashlib.sha256(ruta_pdf.read()).hexdigest()
+        ruta_pdf.seek(posicion)
+    else:
+        hash_archivo = _hash_archivo(ruta_pdf)
+    ilegibles = _PAGINAS_ILEGIBLES.get(hash_archivo, {})
+    if paginas is not None:
+        paginas = set(paginas)
+        ilegibles = {n: m for n, m in ilegibles.items() if n in paginas}
+    return sorted(ilegibles.items())
 
 
-def _expandir_race_map(race_map):
+def _trabajador_extraccion(conexion, contenido, nombre_motor="pypdf"):
     """
-    Expande un race_map del RSM TABLE a lista de números de carrera.
-    
-    Ejemplos:
-    - "ALL" -> [1, 2, 3, ..., 15]
-    - "1-13" -> [1, 2, 3, ..., 13]
-    - "1,5,7" -> [1, 5, 7]
-    - "2,4,6-7,10" -> [2, 4, 6, 7, 10]  (rangos dentro de listas)
-    - "14" -> [14]
+    Proceso que extrae el texto de las páginas que le pide el supervisor.
+    Recibe (num_pagina, modo) y responde ("ok", texto) o ("error", motivo).
+    El modo "completo" usa el motor de extracción indicado; "simple" siempre pypdf.
     """
-    race_map = race_map.strip().upper()
-    
-    if race_map == "ALL":
-        # Asumimos máximo 15 carreras (puede ajustarse)
-        return list(range(1, 16))
-    
-    carreras = []
-    
-    # Primero dividir por comas para manejar listas como "2,4,6-7,10"
-    if "," in race_map:
-        partes = race_map.split(",")
-        for parte in partes:
-            parte = parte.strip()
-            if not parte:
-                continue
-            
-            # Cada parte puede ser un número único o un rango "X-Y"
-            if "-" in parte:
-                # Es un rango: "6-7"
-                rango_parts = parte.split("-")
-                if len(rango_parts) == 2:
-                    try:
-                        inicio = int(rango_parts[0].strip())
-                        fin = int(rango_parts[1].strip())
-                        carreras.extend(range(inicio, fin + 1))
-                    except ValueError:
-                        pass
+    pypdf = _importar_pypdf()
+    reader = pypdf.PdfReader(io.BytesIO(contenido))
+    motor = _MOTORES_EXTRACCION[nombre_motor]
+    documento = motor["abrir"](contenido, reader)
+    conexion.send(("listo", None))
+    while True:
+        pedido = conexion.recv()
+        if pedido is None:
+            return
+        num_pagina, modo = pedido
+        try:
+            if modo == "simple":
+                lineas = _lineas_texto_simple(reader.pages[num_pagina - 1])
+                if lineas is None:
+                    conexion.send(("error", "la página usa fuentes compuestas"))
+                    continue
+                texto = "\n".join(lineas)
             else:
-                # Es un número único: "2", "4", "10"
+                texto = motor["texto"](documento, num_pagina)
+            conexion.send(("ok", texto))
+        except Exception as e:
+            conexion.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def _tiempo_disponible(supervisor):
+    """Segundos que puede tardar el próximo pedido (None = sin límite)."""
+    import time
+
+    limites = []
+    if _tiempo_max_pagina_s() is not None:
+        limites.append(_tiempo_max_pagina_s())
+    if supervisor["limite_documento"] is not None:
+        limites.append(supervisor["limite_documento"] - time.monotonic())
+    return min(limites) if limites else None
+
+
+def _iniciar_trabajador_extraccion(supervisor):
+    """
+    Lanza el proceso de extracción y espera a que abra el PDF. Ese tiempo no se
+    descuenta de la página, pero la espera tampoco puede superar su presupuesto
+    (ni lo que queda del documento): un PDF que cuelga al abrirse es justamente
+    lo que hay que cortar. Devuelve False si no llegó a estar listo.
+    """
+    import multiprocessing
+
+    propia, remota = multiprocessing.Pipe()
+    proceso = multiprocessing.Process(
+        target=_trabajador_extraccion, args=(remota, supervisor["contenido"], supervisor["motor"]), daemon=True
+    )
+    proceso.start()
+    remota.close()
+    supervisor["proceso"] = proceso
+    supervisor["conexion"] = propia
+
+    espera = _tiempo_disponible(supervisor)
+    if espera is not None:
+        espera = max(0, espera)
+    try:
+        if propia.poll(espera) and propia.recv()[0] == "listo":
+            return True
+    except EOFError:
+        pass
+    _detener_trabajador_extraccion(supervisor)
+    return False
+
+
+def _detener_trabajador_extraccion(supervisor, ordenado=False):
+    proceso = supervisor.get("proceso")
+    if proceso is None:
+        return
+    if ordenado:
+        try:
+            supervisor["conexion"].send(None)
+            proceso.join(1)
+        except (OSError, EOFError):
+            pass
+    if proceso.is_alive():
+        proceso.terminate()
+    proceso.join()
+    supervisor["conexion"].close()
+    supervisor["proceso"] = None
+    supervisor["conexion"] = None
+
+
+def _texto_pagina_supervisado(supervisor, num_pagina):
+    """
+    Extrae el texto de una página en el proceso supervisado, respetando los
+    presupuestos de tiempo. Devuelve (texto, None) o (None, motivo).
+    """
+    motivo = None
+    for modo in _MODOS_EXTRACCION:
+        espera = _tiempo_disponible(supervisor)
+        if espera is not None and espera <= 0:
+            return None, motivo or "se agotó el tiempo total del PDF"
+        if supervisor["proceso"] is None and not _iniciar_trabajador_extraccion(supervisor):
+            return None, "no se pudo iniciar el proceso de extracción"
+
+        conexion = supervisor["conexion"]
+        espera = _tiempo_disponible(supervisor)
+        conexion.send((num_pagina, modo))
+        if not conexion.poll(espera):
+            # Colgado: se mata el proceso; el próximo pedido levanta uno nuevo
+            _detener_trabajador_extraccion(supervisor)
+            motivo = f"la extracción superó {max(espera, 0):.0f} s"
+            continue
+        try:
+            respuesta, valor = conexion.recv()
+        except EOFError:
+            _detener_trabajador_extraccion(supervisor)
+            motivo = "el proceso de extracción terminó inesperadamente"
+            continue
+        if respuesta == "ok":
+            return valor, None
+        motivo = valor
+    return None, motivo
+
+
+# Planificador de ejecución: decide, para cada PDF o tanda de reportes, si
+# conviene trabajar en serie o con un pool de procesos. Un PDF ya visto sale de
+# la caché y no se planifica nada más. La predicción usa un historial local
+# (planificador.jsonl en la carpeta de caché) con lo que tardó cada corrida en
+# esta máquina, por tarea ("paginas" o "reportes") y por hipódromo:
+#   - serie:    unidades * costo por unidad
+#   - paralelo: arranque del pool + unidades * costo por unidad / procesos
+# Cada corrida anota la estrategia elegida, lo previsto, lo que realmente tardó
+# y el trabajo total (la suma de lo que tardó cada página o reporte en el
+# proceso que le tocó); lo que sale entero de la caché no se anota. Del trabajo sale el costo por unidad con cualquier
+# estrategia; el arranque es lo que una corrida en paralelo tardó de más
+# respecto del reparto perfecto de su trabajo. Así las predicciones siguientes
+# se ajustan solas. CARRERAS_PLANIFICADOR=0 vuelve a trabajar como antes.
+_PLANIFICADOR_ACTIVO = os.environ.get("CARRERAS_PLANIFICADOR", "1") != "0"
+_MAX_ENTRADAS_HISTORIAL = 500
+# Las entradas se agregan al final del archivo; recién cuando tiene el doble de
+# _MAX_ENTRADAS_HISTORIAL se reescribe con las últimas. Varios procesos
+# (backfill, archivar) anotan a la vez: agregar y reescribir se hacen con el
+# candado planificador.jsonl.lock tomado, así ninguno pisa lo que anotó otro.
+_ESPERA_CANDADO_S = 2.0
+_CANDADO_ABANDONADO_S = 30.0
+_LINEAS_HISTORIAL = 0  # líneas del archivo del historial, según este proceso
+_MUESTRAS_MODELO = 20
+# Sin historial: segundos por página extraída y por byte de reporte parseado
+_COSTOS_INICIALES = {"paginas": 0.04, "reportes": 2e-7}
+_ARRANQUE_POOL_INICIAL_S = 1.0
+_HISTORIAL_PLANES = None  # entradas del historial (se carga con la primera planificación)
+
+
+def configurar_planificador(activo=True):
+    """Activa o desactiva el planificador (equivalente a CARRERAS_PLANIFICADOR)."""
+    global _PLANIFICADOR_ACTIVO
+    _PLANIFICADOR_ACTIVO = bool(activo)
+
+
+def _ruta_historial_planes():
+    return os.path.join(_DIRECTORIO_CACHE, "planificador.jsonl")
+
+
+def _maquina_actual():
+    """Identifica la máquina en el historial: nombre y cantidad de núcleos."""
+    import platform
+
+    return f"{platform.node() or 'local'}/{os.cpu_count() or 1}"
+
+
+def _leer_historial_planes(ruta):
+    """(entradas, cantidad de líneas) del archivo del historial."""
+    entradas = []
+    lineas = 0
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                lineas += 1
                 try:
-                    carreras.append(int(parte))
+                    entradas.append(json.loads(linea))
                 except ValueError:
-                    pass
-        return carreras
-    
-    # Si no hay comas, puede ser un rango simple "1-13" o un número único "14"
-    if "-" in race_map:
-        partes = race_map.split("-")
-        if len(partes) == 2:
+                    continue  # línea a medio escribir
+    except OSError:
+        pass
+    return entradas, lineas
+
+
+def historial_planes():
+    """Entradas del historial del planificador, de la más vieja a la más nueva."""
+    global _HISTORIAL_PLANES, _LINEAS_HISTORIAL
+    if _HISTORIAL_PLANES is None:
+        _HISTORIAL_PLANES, _LINEAS_HISTORIAL = _leer_historial_planes(_ruta_historial_planes())
+        del _HISTORIAL_PLANES[:-_MAX_ENTRADAS_HISTORIAL]
+    return _HISTORIAL_PLANES
+
+
+def _tomar_candado(ruta):
+    """
+    Crea el archivo de candado `ruta` (falla si ya existe). Espera hasta
+    _ESPERA_CANDADO_S a que otro proceso lo suelte; uno de más de
+    _CANDADO_ABANDONADO_S quedó de un proceso que se cortó y se borra.
+    Devuelve True si se tomó.
+    """
+    import time
+
+    limite = time.monotonic() + _ESPERA_CANDADO_S
+    while True:
+        try:
+            os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
             try:
-                inicio = int(partes[0].strip())
-                fin = int(partes[1].strip())
-                return list(range(inicio, fin + 1))
-            except ValueError:
-                pass
-    
-    # Número único: "14"
-    try:
-        return [int(race_map)]
-    except ValueError:
-        return []
+                if time.time() - os.path.getmtime(ruta) > _CANDADO_ABANDONADO_S:
+                    os.remove(ruta)
+                    continue
+            except OSError:
+                continue  # lo soltaron recién
+        except OSError:
+            return False
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
 
 
-def comparar_pdf_y_reporte(ruta_pdf, ruta_reporte, apuestas_raw=None):
+def _mediana(valores):
+    valores = sorted(valores)
+    if not valores:
+        return None
+    medio = len(valores) // 2
+    return valores[medio] if len(valores) % 2 else (valores[medio - 1] + valores[medio]) / 2
+
+
+def modelo_planificador(tarea, hipodromo=None):
     """
-    Compara los datos extraídos del PDF con los del archivo reporte.txt.
-    
-    Compara:
-    - Cantidad de caballos por carrera
-    - Apuestas disponibles por carrera (incluye GAN, SEG, TER)
-    - Valores mínimos de apuestas (donde existan en ambos), excepto GAN, SEG y TER
-      (esas tres solo se comprueba que existan; no se comparan sus valores)
-    
+    Costos estimados para una tarea en esta máquina, a partir de las últimas
+    corridas del historial (o de los valores iniciales si todavía no hay).
+
+    Retorna
+    -------
+    dict
+        - "costo_unidad": segundos por página (o por byte de reporte) en serie
+        - "arranque_pool": segundos que agrega trabajar con un pool de procesos
+        - "muestras_serie", "muestras_paralelo": corridas en las que se basa
+    """
+    maquina = _maquina_actual()
+    entradas = [
+        e for e in historial_planes()
+        if e.get("maquina") == maquina and e.get("tarea") == tarea and e.get("hipodromo") == hipodromo
+        and e.get("unidades") and e.get("real_s") is not None
+    ]
+    entradas = [e for e in entradas if e["estrategia"] in ("serie", "paralelo")][-_MUESTRAS_MODELO:]
+    paralelo = [e for e in entradas if e["estrategia"] == "paralelo"]
+    costo = _mediana([e.get("trabajo_s", e["real_s"]) / e["unidades"] for e in entradas])
+    if costo is None:
+        costo = _COSTOS_INICIALES[tarea]
+    arranque = _mediana([
+        max(0.0, e["real_s"] - e.get("trabajo_s", e["real_s"]) / e["procesos"]) for e in paralelo
+    ])
+    if arranque is None:
+        arranque = _ARRANQUE_POOL_INICIAL_S
+    return {
+        "costo_unidad": costo,
+        "arranque_pool": arranque,
+        "muestras_serie": len(entradas) - len(paralelo),
+        "muestras_paralelo": len(paralelo),
+    }
+
+
+def _procesos_disponibles():
+    """
+    Procesos que se pueden usar desde acá: uno por núcleo en el hilo principal
+    del proceso principal, y uno solo dentro de un worker de otro pool
+    (backfill, archivar, palermo-todas ya reparten los núcleos: un pool por
+    worker serían núcleos² procesos) o desde otro hilo (la ventana gráfica, la
+    compuerta), donde no conviene hacer fork.
+    """
+    import multiprocessing
+    import threading
+
+    if multiprocessing.parent_process() is not None or threading.current_thread() is not threading.main_thread():
+        return 1
+    return os.cpu_count() or 1
+
+
+def planificar(tarea, unidades, hipodromo=None, max_procesos=None):
+    """
+    Elige la estrategia más rápida según el historial para procesar `unidades`
+    (páginas a extraer o bytes de reportes) de una tarea.
+
     Parámetros
     ----------
-    ruta_pdf : str
-        Ruta al archivo PDF
-    ruta_reporte : str
-        Ruta al archivo reporte.txt
-    apuestas_raw : list, optional
-        Si ya tienes la lista de apuestas del PDF (obtener_apuestas_por_carrera),
-        pásala aquí para no leer el PDF dos veces.
-    
+    tarea : str
+        "paginas" o "reportes".
+    unidades : int
+        Páginas sin texto en caché, o bytes de los reportes. Con 0 el plan es
+        "cache" (no hay nada que procesar).
+    hipodromo : str, optional
+        "san_isidro" o "palermo": el costo por página depende del formato.
+    max_procesos : int, optional
+        Tope de procesos (por ejemplo, la cantidad de reportes).
+
     Retorna
     -------
-    tuple[bool, list[str]]
-        (coincide_todo, diferencias)
-        - coincide_todo: True si todo coincide, False si hay diferencias
-        - diferencias: Lista de mensajes detallando las diferencias encontradas,
-          incluyendo explícitamente el número de carrera afectada
+    dict
+        Plan para registrar_plan: "tarea", "hipodromo", "unidades",
+        "estrategia" ("cache", "serie" o "paralelo"), "procesos" y
+        "previsto_s" (segundos previstos). Dentro de un worker o fuera del hilo
+        principal la estrategia nunca es "paralelo" (ver _procesos_disponibles).
     """
-    datos_pdf = _normalizar_pdf(ruta_pdf, apuestas_raw=apuestas_raw)
-    datos_reporte = _normalizar_reporte(ruta_reporte)
-    
-    # GAN, SEG y TER solo se comparan en existencia, no en valor
-    apuestas_sin_comparar_valor = {"GAN", "SEG", "TER"}
-    diferencias = []
-    todas_las_carreras = set(datos_pdf.keys()) | set(datos_reporte.keys())
-    
-    for num_carrera in sorted(todas_las_carreras):
-        tiene_pdf = num_carrera in datos_pdf
-        tiene_reporte = num_carrera in datos_reporte
-        
-        if not tiene_pdf:
-            diferencias.append(f"Carrera {num_carrera}: presente en Reporte pero no en PDF")
-            continue
-        
-        if not tiene_reporte:
-            diferencias.append(f"Carrera {num_carrera}: presente en PDF pero no en Reporte")
-            continue
-        
-        # Comparar cantidad de caballos
-        caballos_pdf = datos_pdf[num_carrera]["caballos"]
-        caballos_reporte = datos_reporte[num_carrera]["caballos"]
-        if caballos_pdf != caballos_reporte:
-            diferencias.append(
-                f"Carrera {num_carrera}: cantidad de caballos difiere "
-                f"(PDF: {caballos_pdf}, Reporte: {caballos_reporte})"
-            )
-        
-        # Comparar apuestas disponibles
-        apuestas_pdf = set(datos_pdf[num_carrera]["apuestas"].keys())
-        apuestas_reporte = set(datos_reporte[num_carrera]["apuestas"].keys())
-        
-        solo_en_pdf = apuestas_pdf - apuestas_reporte
-        solo_en_reporte = apuestas_reporte - apuestas_pdf
-        
-        if solo_en_pdf:
-            diferencias.append(
-                f"Carrera {num_carrera}: apuestas presentes en PDF pero no en Reporte: {', '.join(sorted(solo_en_pdf))}"
-            )
-        
-        if solo_en_reporte:
-            diferencias.append(
-                f"Carrera {num_carrera}: apuestas presentes en Reporte pero no en PDF: {', '.join(sorted(solo_en_reporte))}"
-            )
-        
-        # Comparar valores de apuestas comunes (GAN, SEG y TER solo se comparan en existencia, no en valor)
-        apuestas_comunes = apuestas_pdf & apuestas_reporte
-        for codigo in apuestas_comunes:
-            if codigo in apuestas_sin_comparar_valor:
-                continue
-            valor_pdf = datos_pdf[num_carrera]["apuestas"][codigo]
-            valor_reporte = datos_reporte[num_carrera]["apuestas"][codigo]
-            
-            # Solo comparar si ambos tienen valor numérico
-            if valor_pdf is not None and valor_reporte is not None:
-                # Comparar con tolerancia pequeña para floats
-                if abs(valor_pdf - valor_reporte) > 0.01:
-                    diferencias.append(
-                        f"Carrera {num_carrera}: valor de {codigo} es diferente (PDF: {valor_pdf}, Reporte: {valor_reporte})"
-                    )
-            elif valor_pdf is not None and valor_reporte is None:
-                diferencias.append(
-                    f"Carrera {num_carrera}: {codigo} en el PDF figura {valor_pdf} pero en el reporte NULL"
-                )
-            elif valor_pdf is None and valor_reporte is not None:
-                diferencias.append(
-                    f"Carrera {num_carrera}: {codigo} en el reporte figura {valor_reporte} pero en el PDF NULL"
-                )
-    
-    coincide_todo = len(diferencias) == 0
-    return coincide_todo, diferencias
+    plan = {"tarea": tarea, "hipodromo": hipodromo, "unidades": unidades}
+    if unidades <= 0:
+        plan.update(estrategia="cache", procesos=1, previsto_s=0.0)
+        return plan
+    modelo = modelo_planificador(tarea, hipodromo)
+    serie = unidades * modelo["costo_unidad"]
+    plan.update(estrategia="serie", procesos=1, previsto_s=serie)
+    procesos = min(_procesos_disponibles(), max_procesos or unidades, unidades)
+    if procesos > 1:
+        paralelo = modelo["arranque_pool"] + serie / procesos
+        if paralelo < serie:
+            plan.update(estrategia="paralelo", procesos=procesos, previsto_s=paralelo)
+    return plan
+
+
+def registrar_plan(plan, segundos, trabajo_s=None):
+    """
+    Anota en el historial el plan elegido y lo que realmente tardó. trabajo_s:
+    suma de lo que tardó cada unidad en su proceso (por defecto, `segundos`).
+    Los planes "cache" solo se cuentan en las métricas: no le enseñan nada al
+    modelo y desplazarían del historial las corridas que sí.
+    """
+    import datetime
 
+    global _LINEAS_HISTORIAL
 
-def _mapear_nombre_apuesta_palermo(descripcion):
+    _contar("carreras_planes_total", plan["tarea"], plan["estrategia"])
+    if plan["estrategia"] == "cache":
+        return
+
+    entrada = dict(
+        plan,
+        fecha=datetime.datetime.now().isoformat(timespec="seconds"),
+        maquina=_maquina_actual(),
+        previsto_s=round(plan["previsto_s"], 4),
+        real_s=round(segundos, 4),
+        trabajo_s=round(segundos if trabajo_s is None else trabajo_s, 4),
+    )
+    historial = historial_planes()
+    historial.append(entrada)
+    del historial[:-_MAX_ENTRADAS_HISTORIAL]
+    ruta = _ruta_historial_planes()
+    candado = f"{ruta}.lock"
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    except OSError:
+        return
+    # Sin candado (otro proceso lo tiene hace rato) se agrega igual: el
+    # historial es solo una guía y una línea suelta no rompe nada
+    tomado = _tomar_candado(candado)
+    try:
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        _LINEAS_HISTORIAL += 1
+        if tomado and _LINEAS_HISTORIAL > 2 * _MAX_ENTRADAS_HISTORIAL:
+            # Se relee (otros procesos también agregaron) y se dejan las últimas
+            entradas, _ = _leer_historial_planes(ruta)
+            entradas = entradas[-_MAX_ENTRADAS_HISTORIAL:]
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entradas)
+            os.replace(temporal, ruta)
+            _LINEAS_HISTORIAL = len(entradas)
+    except OSError:
+        pass
+    finally:
+        if tomado:
+            try:
+                os.remove(candado)
+            except OSError:
+                pass
+
+
+# Extracción de páginas en un pool de procesos (estrategia "paralelo" del
+# planificador): cada worker abre el PDF una sola vez, al arrancar, y extrae
+# tramos de páginas seguidas.
+_PDF_TRABAJADOR = {}
+_TRAMOS_POR_PROCESO = 4
+
+
+def _iniciar_trabajador_paginas(contenido, nombre_motor):
+    reader = _importar_pypdf().PdfReader(io.BytesIO(contenido))
+    motor = _MOTORES_EXTRACCION[nombre_motor]
+    _PDF_TRABAJADOR.update(motor=motor, documento=motor["abrir"](contenido, reader))
+
+
+def _extraer_tramo_paginas(numeros):
+    """Tarea de un worker: [(num_pagina, texto, segundos), ...] de las páginas del tramo."""
+    import time
+
+    motor = _PDF_TRABAJADOR["motor"]
+    resultado = []
+    for num_pagina in numeros:
+        inicio = time.perf_counter()
+        texto = motor["texto"](_PDF_TRABAJADOR["documento"], num_pagina)
+        resultado.append((num_pagina, texto, time.perf_counter() - inicio))
+    return resultado
+
+
+def _extraer_en_paralelo(contenido, nombre_motor, numeros, procesos):
     """
-    Dado el texto de la columna izquierda del PDF de Palermo, devuelve el código de apuesta.
-    Mapea, por ejemplo:
-    - 'Doble' / 'Doble extra'        -> 'DOB'
-    - '5 y 6'                        -> 'CAD'
-    - 'pick cuatro'                  -> 'QTN'
-    - 'pick cinco'                   -> 'QTP'
-    - 'exacta'                       -> 'EXA'
-    - 'trifecta'                     -> 'TRI'
-    - 'cuatrifecta'                  -> 'CUA'
-    - 'triplo'                       -> 'TPL'
-    - 'imperfecta'                   -> 'IMP'
+    Genera (num_pagina, texto, segundos) de `numeros`, en orden, extrayendo en
+    un pool de `procesos` procesos. El pool arranca con el primer pedido.
     """
-    if not descripcion:
-        return None
+    from concurrent.futures import ProcessPoolExecutor
 
-    texto = descripcion.strip().lower()
+    tamanio = max(1, -(-len(numeros) // (procesos * _TRAMOS_POR_PROCESO)))
+    tramos = [numeros[i:i + tamanio] for i in range(0, len(numeros), tamanio)]
+    pool = ProcessPoolExecutor(
+        max_workers=procesos, initializer=_iniciar_trabajador_paginas, initargs=(contenido, nombre_motor),
+    )
+    try:
+        for resultado in pool.map(_extraer_tramo_paginas, tramos):
+            yield from resultado
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
-    # Normalizaciones simples
-    texto = texto.replace("  ", " ")
 
-    # Mapeos por substring (del más específico al más genérico).
-    # IMPORTANTE: 'cuatrifecta' contiene 'trifecta', por eso se evalúa primero.
-    if "cuatrifecta" in texto:
-        return "CUA"
-    if "trifecta" in texto:
-        return "TRI"
-    if "doble extra" in texto:
-        return "DOB"
-    if "doble" in texto:
-        return "DOB"
-    if "5 y 6" in texto or "5y6" in texto or "5 & 6" in texto:
-        return "CAD"
-    if "pick cuatro" in texto or "pick 4" in texto:
-        return "QTN"
-    if "pick cinco" in texto or "pick 5" in texto:
-        return "QTP"
-    if "exacta" in texto:
-        return "EXA"
-    if "triplo" in texto:
-        return "TPL"
-    if "imperfecta" in texto:
-        return "IMP"
+def _extraer_paginas_pdf(ruta_pdf, usar_cache=True, paginas=None, regiones=False):
+    """
+    Lee el PDF y devuelve, por cada página, su huella y su texto.
 
-    return None
+    Con usar_cache=True se reutiliza el texto de cualquier página cuya huella ya
+    se haya extraído antes (en este proceso o en ejecuciones anteriores, vía la
+    caché en disco). Así, cuando llega una nueva revisión de un programa ya
+    conocido, solo se extrae el texto de las páginas que cambiaron. Si el archivo
+    es idéntico a uno ya leído, ni siquiera se abre con pypdf.
 
+    Parámetros
+    ----------
+    ruta_pdf : str o archivo binario
+        Ruta al PDF (o un objeto con método read()).
+    usar_cache : bool
+        False para forzar la extracción completa.
+    paginas : iterable de int, optional
+        Números de página (1-based) a leer. Por defecto, todas.
+    regiones : bool
+        True si al llamador le alcanza con la extracción por regiones
+        (parsers de San Isidro, ver _texto_regiones).
 
-def _leer_palermo_desde_pdf(ruta_pdf):
+    Retorna
+    -------
+    list[dict]
+        Un diccionario por página leída con:
+        - "pagina": int (1-based)
+        - "huella": str
+        - "texto": str
+        - "reutilizada": bool (True si el texto salió de la caché)
     """
-    Lee el PDF de Palermo y extrae:
-    - Lista de fechas encontradas en el texto (formato dd/mm/aaaa, etc.).
-    - Estructura de apuestas por carrera y monto:
-      {num_carrera: {codigo_apuesta: valor_float}}
+    return list(_iterar_paginas_pdf(ruta_pdf, usar_cache=usar_cache, paginas=paginas, regiones=regiones))
 
-    Se asume un formato con 2 columnas:
-    - Izquierda: nombre de la apuesta con el monto entre paréntesis, ej. 'Doble (1000,00)'
-    - Derecha: mapa de carreras donde se juega esa apuesta, ej. '1-13' o '1,3,5'
+
+def _guardar_texto_en_memoria(clave, texto):
+    _TEXTOS_EN_MEMORIA[clave] = texto
+    _TEXTOS_EN_MEMORIA.move_to_end(clave)
+    while len(_TEXTOS_EN_MEMORIA) > _MAX_TEXTOS_EN_MEMORIA:
+        _TEXTOS_EN_MEMORIA.popitem(last=False)
+
+
+def _iterar_paginas_pdf(ruta_pdf, usar_cache=True, paginas=None, acotado=None, regiones=False, hipodromo=None):
     """
-    try:
-        import pypdf
-    except ImportError:
-        raise ImportError("Se necesita la librería pypdf. Instalar con: pip install pypdf")
+    Como _extraer_paginas_pdf, pero entrega las páginas de a una (generador).
+    En modo de memoria acotada (ver _limite_memoria_mb) cada página debe
+    consumirse antes de pedir la siguiente: los objetos de pypdf se sueltan
+    cada _paginas_por_ventana() páginas o cuando se supera el techo de memoria.
+    acotado: True/False fuerza el modo; None lo decide según techo y páginas.
+    regiones: el llamador es un parser de San Isidro y le alcanza con la
+    extracción por regiones (si está activa, ver extraccion_por_regiones).
+    hipodromo: formato del parser que pide las páginas; con él, el planificador
+    decide si las páginas sin caché se extraen en serie o en un pool de
+    procesos (fuera del modo acotado y sin presupuestos de tiempo).
+    """
+    import time
+
+    forzado = acotado
+    pypdf = _importar_pypdf()
+    contenido = _leer_bytes(ruta_pdf)
+    nombre_motor = "pypdf-regiones" if regiones and extraccion_por_regiones() else motor_extraccion()
+    motor = _MOTORES_EXTRACCION[nombre_motor]
+    etiqueta_extractor = _etiqueta_motor(nombre_motor)
+    # El texto completo sirve en lugar del parcial: si ya está en caché se usa ese
+    etiquetas = [etiqueta_extractor]
+    if nombre_motor == "pypdf-regiones":
+        etiquetas.insert(0, _etiqueta_motor("pypdf"))
+    hash_archivo = hashlib.sha256(contenido).hexdigest()
+    paginas = set(paginas) if paginas is not None else None
+
+    def _texto_cacheado(huella):
+        for etiqueta in etiquetas:
+            clave = f"{huella}-{etiqueta}"
+            if clave in _TEXTOS_EN_MEMORIA:
+                _contar("carreras_cache_total", "paginas", "acierto")
+                _TEXTOS_EN_MEMORIA.move_to_end(clave)
+                return _TEXTOS_EN_MEMORIA[clave]
+        for etiqueta in etiquetas:
+            clave = f"{huella}-{etiqueta}"
+            datos = _leer_cache_json("paginas", clave)
+            if datos is not None:
+                _contar("carreras_cache_total", "paginas", "acierto")
+                try:
+                    os.utime(_ruta_cache("paginas", clave))
+                except OSError:
+                    pass
+                if not acotado:
+                    _guardar_texto_en_memoria(clave, datos["texto"])
+                return datos["texto"]
+        _contar("carreras_cache_total", "paginas", "fallo")
+        return None
+
+    def _en_cache(huella):
+        return any(
+            f"{huella}-{e}" in _TEXTOS_EN_MEMORIA or os.path.isfile(_ruta_cache("paginas", f"{huella}-{e}"))
+            for e in etiquetas
+        )
+
+    planificado = hipodromo is not None and _PLANIFICADOR_ACTIVO
+    # Archivo ya visto: las huellas están guardadas, no hace falta abrir el PDF
+    limite_memoria_mb = _limite_memoria_mb()
+    acotado = limite_memoria_mb is not None if forzado is None else forzado
+    if usar_cache:
+        huellas = _leer_cache_json("archivos", hash_archivo)
+        _contar("carreras_cache_total", "archivos", "fallo" if huellas is None else "acierto")
+        if huellas is not None:
+            seleccion = [
+                (i, h) for i, h in enumerate(huellas, start=1) if paginas is None or i in paginas
+            ]
+            if forzado is None:
+                acotado = acotado or len(seleccion) >= _PAGINAS_MODO_ACOTADO
+            if all(_en_cache(h) for _, h in seleccion):
+                segundos = 0.0
+                for i, h in seleccion:
+                    inicio = time.perf_counter()
+                    texto = _texto_cacheado(h)
+                    segundos += time.perf_counter() - inicio
+                    if texto is None:
+                        break
+                    _contar("carreras_paginas_total", "cache")
+                    yield {"pagina": i, "huella": h, "texto": texto, "reutilizada": True}
+                else:
+                    if planificado:
+                        registrar_plan(planificar("paginas", 0, hipodromo), segundos)
+                    return
+                # Una entrada de la caché desapareció a mitad de camino: se extrae de nuevo
+                # desde la página que falta.
+                paginas = {n for n, _ in seleccion if n >= i}
+
+    reader = pypdf.PdfReader(io.BytesIO(contenido))
+    if forzado is None:
+        acotado = limite_memoria_mb is not None or len(reader.pages) >= _PAGINAS_MODO_ACOTADO
+    ilegibles = _PAGINAS_ILEGIBLES.setdefault(hash_archivo, {})
+    supervisor = None
+    tiempo_max_pdf_s = _tiempo_max_pdf_s()
+    if _tiempo_max_pagina_s() is not None or tiempo_max_pdf_s is not None:
+        supervisor = {
+            "contenido": contenido,
+            "motor": nombre_motor,
+            "proceso": None,
+            "conexion": None,
+            "limite_documento": time.monotonic() + tiempo_max_pdf_s if tiempo_max_pdf_s is not None else None,
+        }
+    memo = {}
+    huellas = []
+    escritas = 0  # páginas nuevas en la caché en disco
+    en_ventana = 0
+    paginas_por_ventana = _paginas_por_ventana()
+    documento = None  # del motor de extracción; se abre recién con la primera página sin caché
+
+    # Planificación: con las huellas se sabe cuántas páginas hay que extraer
+    plan = None
+    huellas_previas = {}
+    en_pool = set()  # páginas que extrae el pool de procesos
+    recibidas = {}  # {num_pagina: (texto, segundos)} que el pool ya entregó
+    extraidas = None
+    segundos_extraccion = 0.0  # lo que se esperó a la extracción (el pool trabaja mientras tanto)
+    trabajo_extraccion = 0.0  # suma de lo que tardó cada página en su proceso
+    if planificado and supervisor is None and not acotado:
+        faltantes = []
+        vistas = set()  # páginas repetidas: se extrae la primera y las demás salen de la caché
+        for num_pagina, pagina in enumerate(reader.pages, start=1):
+            if paginas is not None and num_pagina not in paginas:
+                continue
+            huella = huellas_previas[num_pagina] = huella_pagina_pdf(pagina, memo)
+            if huella not in vistas and not (usar_cache and _en_cache(huella)):
+                faltantes.append(num_pagina)
+            vistas.add(huella)
+        plan = planificar("paginas", len(faltantes), hipodromo)
+        if plan["estrategia"] == "paralelo":
+            en_pool = set(faltantes)
+            extraidas = _extraer_en_paralelo(contenido, nombre_motor, faltantes, plan["procesos"])
+
+    try:
+        for num_pagina, pagina in enumerate(reader.pages, start=1):
+            if paginas is not None and num_pagina not in paginas:
+                continue
+            huella = huellas_previas.get(num_pagina) or huella_pagina_pdf(pagina, memo)
+            huellas.append(huella)
+            texto = _texto_cacheado(huella) if usar_cache else None
+            reutilizada = texto is not None
+            ilegibles.pop(num_pagina, None)
+            if texto is None:
+                inicio = time.perf_counter()
+                motivo = None
+                if num_pagina in en_pool:
+                    # El pool entrega en orden; lo que llega antes de esta página queda a mano
+                    while num_pagina not in recibidas:
+                        num_recibida, texto_recibido, segundos_recibida = next(extraidas)
+                        recibidas[num_recibida] = (texto_recibido, segundos_recibida)
+                    texto, segundos = recibidas.pop(num_pagina)
+                    segundos_extraccion += time.perf_counter() - inicio
+                elif supervisor is None:
+                    if documento is None:
+                        documento = motor["abrir"](contenido, reader)
+                    texto = motor["texto"](documento, num_pagina)
+                    segundos = time.perf_counter() - inicio
+                    segundos_extraccion += segundos
+                else:
+                    texto, motivo = _texto_pagina_supervisado(supervisor, num_pagina)
+                    segundos = time.perf_counter() - inicio
+                _observar("carreras_extraccion_pagina_segundos", segundos, nombre_motor)
+                trabajo_extraccion += segundos
+                _contar("carreras_paginas_total", "extraida" if motivo is None else "ilegible")
+                if motivo is not None:
+                    # Se sigue con las demás páginas; el texto vacío no se guarda en caché
+                    ilegibles[num_pagina] = motivo
+                    texto = ""
+                else:
+                    clave = f"{huella}-{etiqueta_extractor}"
+                    if not acotado:
+                        _guardar_texto_en_memoria(clave, texto)
+                    if usar_cache:
+                        _escribir_cache_json("paginas", clave, {"texto": texto})
+                        escritas += 1
+            else:
+                _contar("carreras_paginas_total", "cache")
+            yield {
+                "pagina": num_pagina,
+                "huella": huella,
+                "texto": texto,
+                "reutilizada": reutilizada,
+            }
+
+            if acotado:
+                en_ventana += 1
+                excedido = limite_memoria_mb is not None and (_memoria_en_uso_mb() or 0) > limite_memoria_mb
+                if en_ventana >= paginas_por_ventana or excedido:
+                    _liberar_objetos_pdf(reader)
+                    en_ventana = 0
+    finally:
+        if supervisor is not None:
+            _detener_trabajador_extraccion(supervisor, ordenado=True)
+        if extraidas is not None:
+            extraidas.close()
+
+    if usar_cache and paginas is None:
+        _escribir_cache_json("archivos", hash_archivo, huellas)
+        _podar_cache("archivos", _MAX_ARCHIVOS_EN_DISCO, _MAX_ARCHIVOS_EN_DISCO * 9 // 10)
+    if escritas:
+        _podar_cache("paginas", _MAX_PAGINAS_EN_DISCO, _MAX_PAGINAS_EN_DISCO * 9 // 10)
+    if plan is not None:
+        registrar_plan(plan, segundos_extraccion, trabajo_extraccion)
+
+
+def _textos_paginas_pdf(ruta_pdf, regiones=False, hipodromo=None):
+    """
+    Texto de cada página del PDF, en orden (iterador: se puede recorrer una sola vez).
+    regiones, hipodromo: ver _iterar_paginas_pdf.
+    """
+    return (p["texto"] for p in _iterar_paginas_pdf(ruta_pdf, regiones=regiones, hipodromo=hipodromo))
+
+
+def _cantidad_paginas_pdf(ruta_pdf):
+    """Cantidad de páginas del PDF; si el archivo ya se leyó, sale de la caché sin abrirlo."""
+    contenido = _leer_bytes(ruta_pdf)
+    huellas = _leer_cache_json("archivos", hashlib.sha256(contenido).hexdigest())
+    if huellas is not None:
+        return len(huellas)
+    return len(_importar_pypdf().PdfReader(io.BytesIO(contenido)).pages)
+
+
+def _con_progreso(textos, total, progreso):
+    """Deja pasar los textos de página llamando a progreso(hechas, total) con cada uno."""
+    for hechas, texto in enumerate(textos, start=1):
+        progreso(hechas, total)
+        yield texto
+
+# Patrón para el título de carrera: "1ª - Premio FLOWING RYE 2013 - 14:05 hs."
+# Acepta ª, º o 'a' (por si el PDF devuelve mal el carácter)
+_PATRON_CARRERA_PDF = re.compile(
+    r"(\d+)\s*[ªºa]\s*[-–]\s*(.+?)\s*[-–]\s*\d{1,2}\s*:\s*\d{2}\s*hs\.?",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def obtener_carreras_por_pagina(ruta_pdf):
+    """
+    Lee el PDF y retorna, por cada página, el número de carrera y el nombre
+    de la carrera (si la página contiene el encabezado de una carrera).
+
+    Formato esperado en el PDF: "1ª - Premio NOMBRE - 14:05 hs."
+
+    Parámetros
+    ----------
+    ruta_pdf : str
+        Ruta al archivo PDF.
+
+    Retorna
+    -------
+    list[dict]
+        Lista de diccionarios, uno por cada página del PDF. Cada elemento tiene:
+        - "pagina": int (número de página, 1-based)
+        - "numero_carrera": int o None (número de la carrera si la página la contiene)
+        - "nombre_carrera": str o None (nombre de la carrera si la página la contiene)
+
+    Raises
+    ------
+    ImportError
+        Si no está instalada la librería pypdf.
+    """
+    resultado = []
+
+    for num_pagina, texto in enumerate(_textos_paginas_pdf(ruta_pdf, regiones=True)):
+        pagina_actual = num_pagina + 1  # 1-based
+
+        numero_carrera = None
+        nombre_carrera = None
+
+        m = _PATRON_CARRERA_PDF.search(texto)
+        if m:
+            numero_carrera = int(m.group(1))
+            nombre_carrera = m.group(2).strip()
+            nombre_carrera = " ".join(nombre_carrera.split())
+
+        resultado.append({
+            "pagina": pagina_actual,
+            "numero_carrera": numero_carrera,
+            "nombre_carrera": nombre_carrera,
+        })
+
+    return resultado
+
+
+# Patrón para cada apuesta: "Nombre Apuesta $ valor" (valor con dígitos, punto o coma)
+_PATRON_APUESTA_VALOR = re.compile(
+    r"(.+?)\s*\$\s*([\d.,]+)",
+    re.IGNORECASE,
+)
+
+# Apuestas a excluir: desde 2do pase en adelante (2do, 3er, 4to, 5to, Ultimo pase, Final)
+# Nota: "Final 1er.Pase" (ej. "Cuaterna Final 1er.Pase") debe INCLUIRSE.
+_PATRON_EXCLUIR_PASE_SIN_FINAL = re.compile(
+    r"2do\.?\s*pase|3er\.?\s*pase|4to\.?\s*pase|5to\.?\s*pase|ultimo\s*pase",
+    re.IGNORECASE,
+)
+_PATRON_FINAL = re.compile(r"\bfinal\b|final\s*pase", re.IGNORECASE)
+_PATRON_PRIMER_PASE = re.compile(r"\b1er\.?\s*pase\b|\b1re\.?\s*pase\b", re.IGNORECASE)
+
+
+def es_apuesta_excluida(nombre):
+    """
+    Devuelve True si la apuesta debe excluirse (2do pase en adelante, último pase, etc.).
+    Regla especial: si contiene 'Final' pero también '1er.Pase' (o '1re.Pase'), NO se excluye.
+    'Doble Final Plus' y variantes de Doble se consideran DOB y no se excluyen.
+    """
+    if not nombre:
+        return False
+    # Doble Final Plus, Doble Plus, etc. son DOB y no deben excluirse
+    if nombre.strip().lower().startswith("doble"):
+        return False
+    if _PATRON_EXCLUIR_PASE_SIN_FINAL.search(nombre):
+        return True
+    if _PATRON_FINAL.search(nombre):
+        # Permitir "Final 1er.Pase"
+        if _PATRON_PRIMER_PASE.search(nombre):
+            return False
+        return True
+    return False
+
+
+# Mapeo de abreviaturas (debe estar antes de normalizar_nombre_apuesta para que pueda usarlo)
+_MAPEO_ABREVIATURAS = {
+    "ganador": "GAN",
+    "segundo": "SEG",
+    "tercero": "TER",
+    "exacta": "EXA",
+    "trifecta": "TRI",
+    "imperfecta": "IMP",
+    "cuatrifecta": "CUA",
+    "doble": "DOB",
+    "triplo": "TPL",
+    "cuaterna": "QTN",
+    "quintuplo": "QTP",
+    "cadena": "CAD",
+}
+
+
+def normalizar_nombre_apuesta(nombre):
+    """
+    Simplifica el nombre de la apuesta extrayendo solo la primera palabra
+    cuando contiene 'Pase' o cuando la primera palabra está en el diccionario de abreviaturas.
+    
+    Ejemplos:
+    - 'Cadena Con Jackpot 1er.Pase (Única Base)' → 'Cadena'
+    - 'Cuaterna 1er.Pase' → 'Cuaterna'
+    - 'Quintuplo 1er.Pase' → 'Quintuplo'
+    - 'Triplo 1er.Pase' → 'Triplo'
+    - 'Doble Plus' → 'Doble'
+    - 'Imperfecta Extra' → 'Imperfecta'
+    - 'Imperfecta' → 'Imperfecta' (sin cambios)
+    """
+    nombre = nombre.strip()
+    if not nombre:
+        return nombre
+    
+    palabras = nombre.split()
+    if not palabras:
+        return nombre
+    
+    primera_palabra = palabras[0]
+    
+    # Si contiene "Pase" o la primera palabra está en el diccionario de abreviaturas,
+    # tomar solo la primera palabra
+    if "pase" in nombre.lower() or primera_palabra.lower() in _MAPEO_ABREVIATURAS:
+        return primera_palabra
+    
+    return nombre
+
+
+def abreviar_apuesta(nombre):
+    """
+    Convierte el nombre de la apuesta a su abreviatura (case-insensitive).
+    Si no hay mapeo, devuelve el nombre tal cual.
+    """
+    nombre = (nombre or "").strip()
+    if not nombre:
+        return nombre
+    return _MAPEO_ABREVIATURAS.get(nombre.lower(), nombre)
+
+
+def obtener_caballos_por_carrera(ruta_pdf):
+    """
+    Extrae del PDF la cantidad de caballos por cada carrera.
+    
+    Retorna
+    -------
+    dict[int, int]
+        Diccionario {num_carrera: cantidad_caballos}
+    """
+    return _caballos_desde_textos(_textos_paginas_pdf(ruta_pdf, regiones=True))
+
+
+# Patrón para números de caballo: "01 NOMBRE", "02 NOMBRE", etc.
+_PATRON_CABALLO = re.compile(r"^(\d{2})\s+[A-Z]", re.MULTILINE | re.IGNORECASE)
+
+
+def _caballos_desde_textos(textos):
+    """Como obtener_caballos_por_carrera, pero a partir de los textos de página ya extraídos."""
+    resultado = {}
+
+    for texto in textos:
+        # Número de carrera de esta página
+        m_carrera = _PATRON_CARRERA_PDF.search(texto)
+        if not m_carrera:
+            continue
+        num_carrera = int(m_carrera.group(1))
+
+        # Buscar todos los números de caballo (01, 02, ..., 15, 16, etc.)
+        numeros_caballos = set()
+        for m in _PATRON_CABALLO.finditer(texto):
+            num = int(m.group(1))
+            if 1 <= num <= 24:  # Rango razonable de caballos
+                numeros_caballos.add(num)
+
+        # La cantidad es el número más alto encontrado (o el total de números únicos)
+        cantidad = max(numeros_caballos) if numeros_caballos else 0
+        resultado[num_carrera] = cantidad
+
+    return resultado
+
+
+def obtener_apuestas_por_carrera(ruta_pdf, progreso=None):
+    """
+    Extrae del PDF, por cada carrera, todas las apuestas indicadas en la línea
+    APUESTAS (y la línea siguiente si existe), con su valor sin el signo $.
+    No se incluyen apuestas desde 2do pase en adelante (2do.Pase, 3er.Pase,
+    4to.Pase, 5to.Pase, Ultimo Pase, Cuaterna Final, Triplo Final, etc.).
+    Sí se incluyen Cadena 1er.Pase y Quintuplo 1er.Pase cuando vienen en la
+    misma línea que otras de 2do pase (se toma solo el segmento que lleva el valor).
+
+    Retorna
+    -------
+    list[list]
+        Lista de tuplas [num_carrera, cantidad_caballos, apuesta, valor]. Ejemplo:
+        [[1, 15, "GAN", ""],
+         [1, 15, "IMP", "1000"],
+         [1, 15, "TRI", "1000"],
+         [1, 15, "QTN", "2000"],
+         [1, 15, "DOB", "1000"], ...]
+
+    progreso : callable, optional
+        progreso(paginas_leidas, total_paginas) después de cada página. Si lanza
+        una excepción, la lectura se interrumpe con esa excepción.
+
+    Raises
+    ------
+    ImportError
+        Si no está instalada la librería pypdf.
+    """
+    import time
+
+    inicio = time.perf_counter()
+    textos = _textos_paginas_pdf(ruta_pdf, regiones=True, hipodromo="san_isidro")
+    if progreso is not None:
+        textos = _con_progreso(textos, _cantidad_paginas_pdf(ruta_pdf), progreso)
+    apuestas = _apuestas_desde_textos(textos)
+    _contar("carreras_pdfs_total", "san_isidro")
+    _observar("carreras_parseo_pdf_segundos", time.perf_counter() - inicio, "san_isidro")
+    return apuestas
+
+
+def _apuestas_desde_textos(textos):
+    """
+    Como obtener_apuestas_por_carrera, pero a partir de los textos de página ya
+    extraídos. Recorre los textos una sola vez (pueden venir de un iterador): de
+    cada página se guarda solo lo que interesa y la cantidad de caballos se
+    completa al final, cuando ya se vieron todas las páginas de cada carrera.
+    """
+    resultado = []
+    caballos_por_carrera = {}
+
+    for texto in textos:
+        # Número de carrera de esta página
+        m_carrera = _PATRON_CARRERA_PDF.search(texto)
+        if not m_carrera:
+            continue
+        num_carrera = int(m_carrera.group(1))
+        caballos_por_carrera.update(_caballos_desde_textos([texto]))
+        cantidad_caballos = None  # se completa al final
+
+        # Bloque de APUESTAS: la línea que contiene "APUESTAS:" y la siguiente
+        lineas = texto.split("\n")
+        bloque_apuestas = []
+        for i, lin in enumerate(lineas):
+            if "APUESTAS:" in lin.upper():
+                # Quitar el prefijo "APUESTAS:" y tomar esta línea
+                idx = lin.upper().index("APUESTAS:")
+                bloque_apuestas.append(lin[idx + len("APUESTAS:"):].strip())
+                # Incluir la siguiente línea (suele tener más apuestas)
+                if i + 1 < len(lineas):
+                    bloque_apuestas.append(lineas[i + 1].strip())
+                break
+
+        texto_apuestas = " ".join(bloque_apuestas)
+        if not texto_apuestas:
+            continue
+
+        # Buscar todos "algo $ número"; excluir apuestas desde 2do pase en adelante.
+        # Si hay varias apuestas separadas por coma (ej. "Cuaterna 2do.Pase, Cadena 1er.Pase $200"),
+        # el valor corresponde a la última; usamos solo esa para no excluir Cadena/Quintuplo 1er.Pase.
+        # Caso especial: "Ganador, Segundo, Tercero $ 2" → queremos ver las tres apuestas.
+        for m in _PATRON_APUESTA_VALOR.finditer(texto_apuestas):
+            apuesta_bruta = m.group(1).strip().rstrip(",")
+            valor = m.group(2).strip()
+            if not apuesta_bruta or not valor:
+                continue
+
+            # Caso especial: bloque que contiene Ganador / Segundo / Tercero
+            # Solo nos interesa saber que existen estas apuestas; el monto no es crítico.
+            if "Ganador" in apuesta_bruta:
+                partes = [p.strip() for p in apuesta_bruta.split(",") if p.strip()]
+                for p in partes:
+                    # Para Ganador / Segundo / Tercero no forzamos ningún filtro de pases,
+                    # y podemos ignorar el valor (lo dejamos vacío).
+                    p_norm = normalizar_nombre_apuesta(p)
+                    p_cod = abreviar_apuesta(p_norm)
+                    resultado.append([num_carrera, cantidad_caballos, p_cod, ""])
+                continue
+
+            # Lógica genérica para el resto de apuestas
+            apuesta = apuesta_bruta
+            if "," in apuesta:
+                # En bloques mixtos, quedarnos solo con el último tramo (el que lleva el valor)
+                apuesta = apuesta.rsplit(",", 1)[-1].strip()
+
+            # Excluir desde 2do pase en adelante (permitiendo "Final 1er.Pase")
+            if not es_apuesta_excluida(apuesta):
+                # Normalizar el nombre (ej. "Cadena Con Jackpot 1er.Pase" → "Cadena")
+                apuesta_normalizada = normalizar_nombre_apuesta(apuesta)
+                apuesta_cod = abreviar_apuesta(apuesta_normalizada)
+                resultado.append([num_carrera, cantidad_caballos, apuesta_cod, valor])
+
+    for fila in resultado:
+        fila[1] = caballos_por_carrera.get(fila[0], 0)
+    return resultado
+
+
+def _parsear_monto_str(valor_str):
+    """
+    Convierte un string de monto a float, aceptando:
+    - Punto como separador de miles: "5.000" -> 5000.0
+    - Coma como decimal europeo: "1000,50" -> 1000.5
+    - Formato mixto: "1.000,50" -> 1000.5
+    Retorna None si no se puede parsear.
+    """
+    if not valor_str or not isinstance(valor_str, str):
+        return None
+    s = valor_str.strip()
+    if not s:
+        return None
+    # Formato europeo con coma decimal: 1.000,50 -> quitar puntos, coma a punto
+    if "," in s:
+        s = s.replace(".", "").replace(",", ".")
+        try:
+            return float(s)
+        except ValueError:
+            return None
+    # Solo punto(s): "5.000" = 5000 (miles), "5.5" = 5.5 (decimal)
+    if "." in s:
+        partes = s.split(".")
+        # Si la parte tras el último punto tiene exactamente 3 dígitos y todo son dígitos -> miles
+        if len(partes) >= 2 and all(p.isdigit() for p in partes) and len(partes[-1]) == 3:
+            try:
+                return float(s.replace(".", ""))
+            except ValueError:
+                pass
+        try:
+            return float(s)
+        except ValueError:
+            return None
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _normalizar_desde_lista_apuestas(apuestas_raw):
+    """
+    Construye la estructura normalizada a partir de la lista de apuestas
+    [num_carrera, cantidad_caballos, codigo_apuesta, valor].
+    """
+    resultado = {}
+    
+    for num_carrera, cantidad_caballos, codigo_apuesta, valor_str in apuestas_raw:
+        if num_carrera not in resultado:
+            resultado[num_carrera] = {
+                "caballos": cantidad_caballos,
+                "apuestas": {}
+            }
+        
+        valor_float = _parsear_monto_str(valor_str)
+        resultado[num_carrera]["apuestas"][codigo_apuesta] = valor_float
+    
+    return resultado
+
+
+def _normalizar_pdf(ruta_pdf, apuestas_raw=None):
+    """
+    Normaliza los datos extraídos del PDF en una estructura de diccionario.
+    Si se pasa apuestas_raw (lista ya leída), no se vuelve a leer el PDF.
+    ruta_pdf también puede ser un paquete .cprg (ver exportar_paquete).
+
+    Retorna
+    -------
+    dict[int, dict]
+        Estructura: {num_carrera: {"caballos": int, "apuestas": {codigo: float o None}}}
+    """
+    if apuestas_raw is None:
+        if es_paquete(ruta_pdf):
+            return _leer_paquete_tipo(ruta_pdf, "san_isidro")["datos"]
+        apuestas_raw = obtener_apuestas_por_carrera(ruta_pdf)
+    return _normalizar_desde_lista_apuestas(apuestas_raw)
+
+
+# Patrones del reporte.txt
+# Líneas de carrera: "1  GAN SEG TER 1/9 1/9 ..."
+_PATRON_CARRERA_REPORTE = re.compile(r"^\s*(\d+)\s+([A-Z\s]+?)(?:\s+1/9)+", re.MULTILINE)
+_PATRON_CABALLO_REPORTE = re.compile(r"1/9")
+_PATRON_SCR_REPORTE = re.compile(r"\bSCR\b", re.IGNORECASE)
+_PATRON_APUESTAS_REPORTE = re.compile(r"\b(GAN|SEG|TER|EXA|TRI|IMP|DOB|TPL|QTN|QTP|CAD|CUA)\b")
+_PATRON_INICIO_CARRERA_REPORTE = re.compile(r"^\s*\d+\s+")
+# Líneas RSM: "  2  ALL  ---  EXA  TS  1000,00 ..."
+# El race_map son palabras separadas por un solo espacio ("2,4,6", "1-4", "1, 3").
+_PATRON_FILA_RSM = re.compile(
+    r"^\s*\d+\s+(\S+(?:\s\S+)*)\s+---\s+([A-Z]+)\s+TS\s+([\d.,]+)",
+    re.MULTILINE
+)
+_PATRON_MONTO_RSM = re.compile(r"[\d.,]+")
+_PATRON_ESPACIO_DOBLE = re.compile(r"\s\s")
+
+# Mapeo de códigos RSM a códigos estándar
+_MAPEO_RSM = {
+    "WPS": None,  # WPS incluye GAN, SEG, TER pero no lo mapeamos directamente
+    "EXA": "EXA",
+    "TRI": "TRI",
+    "IMP": "IMP",
+    "DOB": "DOB",
+    "TPL": "TPL",
+    "QTN": "QTN",
+    "QTP": "QTP",
+    "CAD": "CAD",
+    "CUA": "CUA",
+}
+
+
+def _leer_reporte(ruta_reporte):
+    """Devuelve el contenido de texto del reporte (también desde un .zip/.gz)."""
+    if _partes_miembro(ruta_reporte) is not None:
+        # Igual que open() en modo texto: fines de línea universales
+        flujo = io.TextIOWrapper(io.BytesIO(_leer_bytes(ruta_reporte)), encoding="utf-8", errors="ignore")
+        return flujo.read()
+    with open(ruta_reporte, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def _apariciones_carreras_reporte(contenido, desde=0, hasta=None):
+    """
+    Apariciones de carreras en el reporte cuya primera línea empieza entre las
+    posiciones `desde` (inicio de una línea) y `hasta` del texto, sin separar
+    el texto en líneas. Cada aparición es la línea con "1/9" más las líneas
+    indentadas siguientes (ej. "DOB( 1,2 )"), que pertenecen a esa misma
+    carrera; para armarla se miran hasta 15 líneas más, aunque pasen de `hasta`.
+
+    Retorna
+    -------
+    list[tuple[int, int, tuple[str, ...]]]
+        [(posicion, num_carrera, lineas_de_la_aparicion)] en orden
+    """
+    hasta = len(contenido) if hasta is None else hasta
+    apariciones = []
+    # Una línea de carrera tiene "1/9": solo esas líneas pasan por el patrón
+    buscar = desde
+    while True:
+        marca = contenido.find("1/9", buscar)
+        if marca == -1:
+            break
+        inicio_linea = contenido.rfind("\n", 0, marca) + 1
+        if inicio_linea >= hasta:
+            break
+        fin = contenido.find("\n", marca)
+        if fin == -1:
+            fin = len(contenido)
+        buscar = fin + 1
+        linea = contenido[inicio_linea:fin]
+        m = _PATRON_CARRERA_REPORTE.match(linea)
+        if not m:
+            continue
+        aparicion = [linea]
+        # Buscar líneas siguientes con apuestas adicionales
+        max_lineas_siguientes = 15  # evita bucles infinitos
+        while fin < len(contenido) and len(aparicion) <= max_lineas_siguientes:
+            fin_siguiente = contenido.find("\n", fin + 1)
+            if fin_siguiente == -1:
+                fin_siguiente = len(contenido)
+            linea_siguiente = contenido[fin + 1:fin_siguiente]
+            if not linea_siguiente.strip():
+                break
+            # Línea indentada (espacio o tab al inicio)
+            if not (linea_siguiente.startswith(" ") or linea_siguiente.startswith("\t")):
+                break
+            # Otra carrera: empieza con número de carrera
+            if _PATRON_INICIO_CARRERA_REPORTE.match(linea_siguiente):
+                break
+            aparicion.append(linea_siguiente)
+            fin = fin_siguiente
+        apariciones.append((inicio_linea, int(m.group(1)), tuple(aparicion)))
+    return apariciones
+
+
+def _largo_prefijo_comun(a, b):
+    """Cantidad de caracteres iniciales iguales (búsqueda binaria: las comparaciones de strings van en C)."""
+    bajo, alto = 0, min(len(a), len(b))
+    while bajo < alto:
+        medio = (bajo + alto + 1) // 2
+        if a[bajo:medio] == b[bajo:medio]:
+            bajo = medio
+        else:
+            alto = medio - 1
+    return bajo
+
+
+def _largo_sufijo_comun(a, b, maximo):
+    """Cantidad de caracteres finales iguales, como mucho `maximo`."""
+    bajo, alto = 0, maximo
+    while bajo < alto:
+        medio = (bajo + alto + 1) // 2
+        if a[len(a) - medio:len(a) - bajo] == b[len(b) - medio:len(b) - bajo]:
+            bajo = medio
+        else:
+            alto = medio - 1
+    return bajo
+
+
+def _apariciones_revision(contenido, contenido_anterior, apariciones_anteriores):
+    """
+    Apariciones de carreras (ver _apariciones_carreras_reporte) de una revisión
+    del reporte, reusando las de la revisión anterior fuera del tramo que
+    cambió. El tramo va desde 15 líneas antes del primer carácter distinto
+    (una aparición mira hasta 15 líneas hacia abajo) hasta la primera línea
+    que queda entera dentro del final común; las apariciones posteriores solo
+    se corren de posición.
+    """
+    prefijo = _largo_prefijo_comun(contenido_anterior, contenido)
+    sufijo = _largo_sufijo_comun(
+        contenido_anterior, contenido, min(len(contenido_anterior), len(contenido)) - prefijo
+    )
+    corrimiento = len(contenido) - len(contenido_anterior)
+
+    desde = contenido.rfind("\n", 0, prefijo) + 1
+    for _ in range(15):
+        if desde == 0:
+            break
+        desde = contenido.rfind("\n", 0, desde - 1) + 1
+    fin_linea = contenido.find("\n", len(contenido) - sufijo)
+    hasta = fin_linea + 1 if fin_linea != -1 else len(contenido)
+
+    return (
+        [a for a in apariciones_anteriores if a[0] < desde]
+        + _apariciones_carreras_reporte(contenido, desde, hasta)
+        + [(p + corrimiento, n, a) for p, n, a in apariciones_anteriores if p + corrimiento >= hasta]
+    )
+
+
+def _parsear_bloque_carrera_reporte(apariciones):
+    """
+    Cantidad de caballos y apuestas activas de una carrera a partir de sus líneas.
+    Cada "1/9" cuenta un caballo, y cada "SCR" (retirado) también cuenta uno.
+    """
+    caballos = 0
+    apuestas = set()
+    for aparicion in apariciones:
+        linea = aparicion[0]
+        caballos = len(_PATRON_CABALLO_REPORTE.findall(linea)) + len(_PATRON_SCR_REPORTE.findall(linea))
+        for linea_aparicion in aparicion:
+            apuestas.update(_PATRON_APUESTAS_REPORTE.findall(linea_aparicion))
+    return {"caballos": caballos, "apuestas": sorted(apuestas)}
+
+
+def _seccion_rsm(contenido):
+    """
+    Devuelve el texto de la sección RSM TABLE (hasta una triple línea vacía o
+    "TIM BETTING", lo que aparezca primero), o None si el reporte no la tiene.
+    """
+    inicio_rsm = contenido.find("RSM TABLE")
+    if inicio_rsm == -1:
+        return None
+
+    seccion_rsm = contenido[inicio_rsm:]
+    fin_rsm = _fin_seccion_rsm(seccion_rsm)
+    if fin_rsm is not None:
+        seccion_rsm = seccion_rsm[:fin_rsm]
+    return seccion_rsm
+
+
+def _fin_seccion_rsm(seccion_rsm):
+    """
+    Posición donde termina la sección RSM (texto desde "RSM TABLE"): la primera
+    triple línea vacía o "TIM BETTING". None si todavía no terminó.
+    """
+    fin_rsm_1 = seccion_rsm.find("\n\n\n")
+    fin_rsm_2 = seccion_rsm.find("TIM BETTING")
+    if fin_rsm_1 != -1 and fin_rsm_2 != -1:
+        return min(fin_rsm_1, fin_rsm_2)
+    if fin_rsm_1 != -1:
+        return fin_rsm_1
+    if fin_rsm_2 != -1:
+        return fin_rsm_2
+    return None
+
+
+def _columnas_fila_rsm(linea, m):
+    """Columnas (posición de "---", posición de "TS") de una fila reconocida por _PATRON_FILA_RSM."""
+    return linea.index("---", m.end(1)), linea.rindex("TS", 0, m.start(3))
+
+
+def _fila_rsm_por_columnas(linea, columnas):
+    """
+    Fila (race_map, tipo_rsm, valor_str) cortando la línea en las columnas de
+    _columnas_fila_rsm, con las mismas reglas que _PATRON_FILA_RSM. None si la
+    línea no encaja en esas columnas.
+    """
+    guiones, ts = columnas
+    if linea[guiones:guiones + 3] != "---" or linea[ts:ts + 2] != "TS":
+        return None
+    if not (
+        linea[guiones - 1:guiones].isspace() and linea[guiones + 3:guiones + 4].isspace()
+        and linea[ts - 1:ts].isspace() and linea[ts + 2:ts + 3].isspace()
+    ):
+        return None
+    partes = linea[:guiones].split(None, 1)
+    if len(partes) != 2 or not partes[0].isdecimal():
+        return None
+    race_map = partes[1].rstrip()
+    tipo = linea[guiones + 3:ts].strip()
+    if _PATRON_ESPACIO_DOBLE.search(race_map) or not (tipo.isascii() and tipo.isalpha() and tipo.isupper()):
+        return None
+    valor = _PATRON_MONTO_RSM.match(linea[ts + 2:].lstrip())
+    if valor is None:
+        return None
+    return race_map, tipo, valor.group()
+
+
+def _filas_rsm(seccion_rsm):
+    """
+    Filas de la sección RSM TABLE como tuplas (race_map, tipo_rsm, valor_str).
+
+    La tabla es salida de consola de ancho fijo: las columnas se toman de la
+    primera fila que reconoce _PATRON_FILA_RSM y las siguientes se cortan por
+    posición. Solo las líneas que no encajan (encabezados, o filas corridas
+    porque el número de fila pasó a tener dos dígitos) pasan por el patrón, y
+    una fila corrida deja sus columnas como las vigentes.
+    """
+    if not seccion_rsm:
+        return []
+    filas = []
+    columnas = None
+    for linea in seccion_rsm.split("\n"):
+        fila = _fila_rsm_por_columnas(linea, columnas) if columnas else None
+        if fila is None:
+            m = _PATRON_FILA_RSM.match(linea)
+            if m is None:
+                continue
+            columnas = _columnas_fila_rsm(linea, m)
+            fila = (m.group(1).strip(), m.group(2).strip(), m.group(3).strip())
+        filas.append(fila)
+    return filas
+
+
+def _combinar_reporte(carreras_linea, filas_rsm):
+    """
+    Arma la estructura final del reporte a partir de las carreras (líneas 1/9)
+    y de las filas del RSM TABLE.
+    """
+    # Valores mínimos desde RSM TABLE: {num_carrera: {codigo_apuesta: valor}}
+    valores_por_carrera = {}
+
+    # Carreras "reales" del reporte (las que tienen línea con 1/9). ALL solo aplica a estas.
+    carreras_reales_reporte = sorted(carreras_linea.keys())
+
+    for race_map, tipo_rsm, valor_str in filas_rsm:
+        valor_float = _parsear_monto_str(valor_str)
+        if valor_float is None:
+            continue
+
+        codigo_apuesta = _MAPEO_RSM.get(tipo_rsm)
+        if not codigo_apuesta:
+            continue
+
+        # Expandir race_map: si es ALL, solo carreras que existen en el reporte (no los 15 renglones del RSM)
+        if race_map.upper() == "ALL":
+            carreras = list(carreras_reales_reporte) if carreras_reales_reporte else _expandir_race_map(race_map)
+        else:
+            carreras = _expandir_race_map(race_map)
+
+        # Asignar valor a cada carrera (solo a carreras reales si tenemos lista)
+        for carrera in carreras:
+            if carreras_reales_reporte and carrera not in carreras_linea:
+                continue
+            if carrera not in valores_por_carrera:
+                valores_por_carrera[carrera] = {}
+            valores_por_carrera[carrera][codigo_apuesta] = valor_float
+
+    # Combinar todo (solo carreras con línea 1/9 en el reporte, no las filas del RSM)
+    resultado = {}
+    for num_carrera, info in carreras_linea.items():
+        resultado[num_carrera] = {
+            "caballos": info["caballos"],
+            "apuestas": {}
+        }
+        valores_carrera = valores_por_carrera.get(num_carrera, {})
+        for codigo in info["apuestas"]:
+            # Solo usar valor si está en RSM TABLE para esta carrera. Si no, NULL (no usar CARD DEFAULT MINIMUMS).
+            resultado[num_carrera]["apuestas"][codigo] = valores_carrera.get(codigo)
+    return resultado
+
+
+def _parsear_reporte_incremental(contenido, anterior=None):
+    """
+    Parsea el reporte guardando lo necesario para que, al parsear una revisión
+    nueva, solo se vuelva a procesar lo que cambió: se buscan líneas de carrera
+    solo en el tramo del texto que cambió (ver _apariciones_revision), se
+    re-parsean solo las carreras cuyas líneas cambiaron y la sección RSM solo
+    si cambió, y se recalculan las huellas solo de las carreras cuyos datos
+    pueden haber cambiado.
+
+    Parámetros
+    ----------
+    contenido : str
+        Texto completo del reporte.
+    anterior : dict, optional
+        Modelo devuelto por una llamada anterior (revisión previa del reporte).
+
+    Retorna
+    -------
+    dict
+        - "datos": estructura normalizada (ver _normalizar_reporte)
+        - "huellas_carreras": {num_carrera: huella de sus datos normalizados}
+        - "contenido", "apariciones", "lineas_por_carrera", "carreras_linea",
+          "seccion_rsm", "filas_rsm": estado interno reutilizable en la próxima
+          revisión
+        - "reparseado": {"carreras": [num_carrera, ...], "rsm": bool}
+    """
+    anterior = anterior or {}
+    contenido_anterior = anterior.get("contenido")
+    if contenido_anterior == contenido:
+        return dict(anterior, reparseado={"carreras": [], "rsm": False})
+
+    if contenido_anterior is None:
+        apariciones = _apariciones_carreras_reporte(contenido)
+    else:
+        apariciones = _apariciones_revision(contenido, contenido_anterior, anterior["apariciones"])
+    lineas_por_carrera = {}
+    for _, num_carrera, aparicion in apariciones:
+        lineas_por_carrera.setdefault(num_carrera, []).append(aparicion)
+
+    lineas_anteriores = anterior.get("lineas_por_carrera", {})
+    carreras_linea_anteriores = anterior.get("carreras_linea", {})
+    carreras_linea = {}
+    carreras_reparseadas = []
+    for num_carrera, lineas in lineas_por_carrera.items():
+        if lineas_anteriores.get(num_carrera) == lineas:
+            carreras_linea[num_carrera] = carreras_linea_anteriores[num_carrera]
+        else:
+            carreras_linea[num_carrera] = _parsear_bloque_carrera_reporte(lineas)
+            carreras_reparseadas.append(num_carrera)
+
+    seccion_rsm = _seccion_rsm(contenido)
+    rsm_reparseado = "filas_rsm" not in anterior or anterior["seccion_rsm"] != seccion_rsm
+    filas_rsm = _filas_rsm(seccion_rsm) if rsm_reparseado else anterior["filas_rsm"]
+
+    datos = _combinar_reporte(carreras_linea, filas_rsm)
+    # Los datos de una carrera dependen de sus líneas, de las filas RSM y (por
+    # las filas ALL) de qué carreras tiene el reporte
+    huellas_anteriores = anterior.get("huellas_carreras")
+    if huellas_anteriores is None or rsm_reparseado or set(carreras_linea) != set(carreras_linea_anteriores):
+        huellas_carreras = huellas_tarjeta(datos)["carreras"]
+    else:
+        huellas_carreras = dict(huellas_anteriores)
+        for num_carrera in carreras_reparseadas:
+            huellas_carreras[num_carrera] = huella_carrera(datos[num_carrera])
+
+    return {
+        "datos": datos,
+        "huellas_carreras": huellas_carreras,
+        "contenido": contenido,
+        "apariciones": apariciones,
+        "lineas_por_carrera": lineas_por_carrera,
+        "carreras_linea": carreras_linea,
+        "seccion_rsm": seccion_rsm,
+        "filas_rsm": filas_rsm,
+        "reparseado": {"carreras": sorted(carreras_reparseadas), "rsm": rsm_reparseado},
+    }
+
+
+def _normalizar_reporte(ruta_reporte):
+    """
+    Lee reporte.txt y extrae cantidad de caballos, apuestas activas y valores mínimos.
+    
+    Retorna
+    -------
+    dict[int, dict]
+        Estructura: {num_carrera: {"caballos": int, "apuestas": {codigo: float o None}}}
+    """
+    import time
+
+    inicio = time.perf_counter()
+    datos = _parsear_reporte_incremental(_leer_reporte(ruta_reporte))["datos"]
+    _observar("carreras_parseo_reporte_segundos", time.perf_counter() - inicio, "san_isidro")
+    return datos
+
+
+def _normalizar_reporte_palermo(ruta_reporte):
+    """
+    Versión específica para PALERMO.
+    Solo lee la sección RSM TABLE y construye:
+        {num_carrera: {codigo_apuesta: valor_float}}
+
+    Ejemplo de líneas a leer:
+      1  ALL                   ---  EXA  TS  1000,00  ...
+      2  2,4,6,9,12            ---  IMP  TS  1000,00  ...
+      ...
+      12 2,4,6,9,12            ---  CUA  TS   500,00  ...
+
+    Regla especial:
+    - Cuando el race_map es 'ALL', se interpreta como "todas las carreras"
+      desde 1 hasta la última carrera que aparezca en los demás race_map.
+    """
+    import time
+
+    inicio = time.perf_counter()
+    datos = _reporte_palermo_desde_contenido(_leer_reporte(ruta_reporte))
+    _observar("carreras_parseo_reporte_segundos", time.perf_counter() - inicio, "palermo")
+    return datos
+
+
+def _reporte_palermo_desde_contenido(contenido):
+    """Como _normalizar_reporte_palermo, pero a partir del texto del reporte."""
+    filas_rsm = _filas_rsm(_seccion_rsm(contenido))
+    if not filas_rsm:
+        return {}
+
+    # Primero, determinar la última carrera (máximo número) a partir de los race_map
+    max_carrera = 0
+    for race_map, _, _ in filas_rsm:
+        if race_map.upper() == "ALL":
+            continue
+        carreras = _expandir_race_map(race_map)
+        if carreras:
+            max_carrera = max(max_carrera, max(carreras))
+
+    if max_carrera == 0:
+        # Si no se pudo inferir, asumimos 15 como máximo razonable
+        max_carrera = 15
+
+    # Ahora sí, construir estructura por carrera
+    valores_por_carrera = {}  # {num_carrera: {codigo_apuesta: valor_float}}
+
+    for race_map, tipo_rsm, valor_str in filas_rsm:
+        # Otros tipos (WPS, etc.) se ignoran para Palermo
+        codigo_apuesta = _MAPEO_RSM.get(tipo_rsm)
+        if not codigo_apuesta:
+            continue
+
+        valor_float = _parsear_monto_str(valor_str)
+        if valor_float is None:
+            continue
+
+        if race_map.upper() == "ALL":
+            carreras = list(range(1, max_carrera + 1))
+        else:
+            carreras = _expandir_race_map(race_map)
+
+        for carrera in carreras:
+            if carrera not in valores_por_carrera:
+                valores_por_carrera[carrera] = {}
+            valores_por_carrera[carrera][codigo_apuesta] = valor_float
+
+    return valores_por_carrera
+
+
+def _expandir_race_map(race_map):
+    """
+    Expande un race_map del RSM TABLE a lista de números de carrera.
+    
+    Ejemplos:
+    - "ALL" -> [1, 2, 3, ..., 15]
+    - "1-13" -> [1, 2, 3, ..., 13]
+    - "1,5,7" -> [1, 5, 7]
+    - "2,4,6-7,10" -> [2, 4, 6, 7, 10]  (rangos dentro de listas)
+    - "14" -> [14]
+    """
+    race_map = race_map.strip().upper()
+    
+    if race_map == "ALL":
+        # Asumimos máximo 15 carreras (puede ajustarse)
+        return list(range(1, 16))
+    
+    carreras = []
+    
+    # Primero dividir por comas para manejar listas como "2,4,6-7,10"
+    if "," in race_map:
+        partes = race_map.split(",")
+        for parte in partes:
+            parte = parte.strip()
+            if not parte:
+                continue
+            
+            # Cada parte puede ser un número único o un rango "X-Y"
+            if "-" in parte:
+                # Es un rango: "6-7"
+                rango_parts = parte.split("-")
+                if len(rango_parts) == 2:
+                    try:
+                        inicio = int(rango_parts[0].strip())
+                        fin = int(rango_parts[1].strip())
+                        carreras.extend(range(inicio, fin + 1))
+                    except ValueError:
+                        pass
+            else:
+                # Es un número único: "2", "4", "10"
+                try:
+                    carreras.append(int(parte))
+                except ValueError:
+                    pass
+        return carreras
+    
+    # Si no hay comas, puede ser un rango simple "1-13" o un número único "14"
+    if "-" in race_map:
+        partes = race_map.split("-")
+        if len(partes) == 2:
+            try:
+                inicio = int(partes[0].strip())
+                fin = int(partes[1].strip())
+                return list(range(inicio, fin + 1))
+            except ValueError:
+                pass
+    
+    # Número único: "14"
+    try:
+        return [int(race_map)]
+    except ValueError:
+        return []
+
+
+def comparar_pdf_y_reporte(ruta_pdf, ruta_reporte, apuestas_raw=None):
+    """
+    Compara los datos extraídos del PDF con los del archivo reporte.txt.
+    
+    Compara:
+    - Cantidad de caballos por carrera
+    - Apuestas disponibles por carrera (incluye GAN, SEG, TER)
+    - Valores mínimos de apuestas (donde existan en ambos), excepto GAN, SEG y TER
+      (esas tres solo se comprueba que existan; no se comparan sus valores)
+    
+    Parámetros
+    ----------
+    ruta_pdf : str
+        Ruta al archivo PDF
+    ruta_reporte : str
+        Ruta al archivo reporte.txt
+    apuestas_raw : list, optional
+        Si ya tienes la lista de apuestas del PDF (obtener_apuestas_por_carrera),
+        pásala aquí para no leer el PDF dos veces.
+    
+    Retorna
+    -------
+    tuple[bool, list[str]]
+        (coincide_todo, diferencias)
+        - coincide_todo: True si todo coincide, False si hay diferencias
+        - diferencias: Lista de mensajes detallando las diferencias encontradas,
+          incluyendo explícitamente el número de carrera afectada
+    """
+    diferencias = list(_mensajes_diferencias(
+        iterar_diferencias_pdf_y_reporte(ruta_pdf, ruta_reporte, apuestas_raw=apuestas_raw)
+    ))
+    coincide_todo = len(diferencias) == 0
+    return coincide_todo, diferencias
+
+
+def iterar_diferencias_pdf_y_reporte(ruta_pdf, ruta_reporte, apuestas_raw=None):
+    """
+    Igual que comparar_pdf_y_reporte, pero genera las diferencias como registros
+    Diferencia (una por apuesta), a medida que se encuentran.
+    """
+    datos_pdf = _normalizar_pdf(ruta_pdf, apuestas_raw=apuestas_raw)
+    datos_reporte = _normalizar_reporte(ruta_reporte)
+    _contar("carreras_comparaciones_total", "san_isidro")
+    yield from _registros_paginas_ilegibles(ruta_pdf)
+    yield from iterar_diferencias(datos_pdf, datos_reporte)
+
+
+# Tipos de diferencia (campo "tipo" de Diferencia)
+DIF_CARRERA_FALTANTE = "missing_race"     # la carrera figura en un solo lado
+DIF_APUESTA_SOBRANTE = "extra_bet"        # apuesta en el reporte que no está en el PDF
+DIF_APUESTA_FALTANTE = "missing_bet"      # apuesta del PDF que falta en el reporte
+DIF_VALOR_DISTINTO = "value_mismatch"     # ambos montos existen y difieren
+DIF_VALOR_NULL = "null_mismatch"          # un lado tiene monto y el otro NULL
+DIF_CANTIDAD_CABALLOS = "horse_count"     # distinta cantidad de caballos
+DIF_PAGINA_ILEGIBLE = "unreadable_page"   # página del PDF que no se pudo extraer a tiempo
+
+# Registro de una diferencia:
+# - carrera: int (None para unreadable_page)
+# - tipo: uno de los DIF_*
+# - apuesta: código de apuesta (None para missing_race, horse_count y unreadable_page)
+# - valor_pdf / valor_reporte: montos o cantidades de caballos; para missing_race,
+#   True/False según la carrera esté o no en ese lado; para extra_bet/missing_bet, None;
+#   para unreadable_page, valor_pdf es el número de página y valor_reporte None
+# - mensaje: el texto que se muestra por consola para esta diferencia
+Diferencia = namedtuple("Diferencia", ["carrera", "tipo", "apuesta", "valor_pdf", "valor_reporte", "mensaje"])
+
+
+def iterar_diferencias(datos_pdf, datos_reporte, palermo=False):
+    """
+    Genera las diferencias (registros Diferencia) entre los datos normalizados del
+    PDF y del reporte, carrera por carrera y en orden. Las carreras con la misma
+    huella en ambos lados se saltean sin compararlas campo por campo.
+
+    palermo=True para estructuras de Palermo ({carrera: {codigo: valor}}, sin caballos).
+    """
+    registros_carrera = _registros_carrera_palermo if palermo else _registros_carrera
+    hipodromo = "palermo" if palermo else "san_isidro"
+
+    # Camino rápido: si las huellas de toda la tarjeta coinciden, no hay diferencias
+    huellas_pdf = huellas_tarjeta(datos_pdf)
+    huellas_reporte = huellas_tarjeta(datos_reporte)
+    if huellas_pdf["tarjeta"] == huellas_reporte["tarjeta"]:
+        return
+
+    todas_las_carreras = set(datos_pdf.keys()) | set(datos_reporte.keys())
+    for num_carrera in sorted(todas_las_carreras):
+        # Carreras con la misma huella en ambos lados no necesitan comparación detallada
+        if huellas_pdf["carreras"].get(num_carrera) == huellas_reporte["carreras"].get(num_carrera):
+            continue
+        yield from _contar_diferencias(
+            registros_carrera(num_carrera, datos_pdf.get(num_carrera), datos_reporte.get(num_carrera)), hipodromo
+        )
+
+
+def _contar_diferencias(registros, hipodromo):
+    """Deja pasar los registros contándolos en la métrica de diferencias."""
+    for r in registros:
+        _contar("carreras_diferencias_total", hipodromo, r.tipo, r.apuesta)
+        yield r
+
+
+def _registros_paginas_ilegibles(ruta_pdf, paginas=None, hipodromo="san_isidro"):
+    """Registros unreadable_page para las páginas del PDF que no se pudieron leer."""
+    if es_paquete(ruta_pdf):
+        return
+    for num_pagina, motivo in paginas_ilegibles(ruta_pdf, paginas=paginas):
+        _contar("carreras_diferencias_total", hipodromo, DIF_PAGINA_ILEGIBLE, None)
+        yield Diferencia(
+            None, DIF_PAGINA_ILEGIBLE, None, num_pagina, None,
+            f"Página {num_pagina} ilegible ({motivo}): sus carreras no se pudieron verificar",
+        )
+
+
+def _mensajes_diferencias(registros):
+    """
+    Convierte registros Diferencia en los mensajes de texto de siempre. Las
+    apuestas faltantes/sobrantes consecutivas de una misma carrera se agrupan en
+    un solo mensaje ("...: EXA, TRI"). Procesa el iterable a medida que llega.
+    """
+    agrupables = (DIF_APUESTA_SOBRANTE, DIF_APUESTA_FALTANTE)
+    pendiente = None  # (carrera, tipo, prefijo, [códigos])
+    for r in registros:
+        if pendiente and (r.carrera, r.tipo) != pendiente[:2]:
+            yield pendiente[2] + ", ".join(pendiente[3])
+            pendiente = None
+        if r.tipo in agrupables:
+            if pendiente:
+                pendiente[3].append(r.apuesta)
+            else:
+                pendiente = (r.carrera, r.tipo, r.mensaje[:-len(r.apuesta)], [r.apuesta])
+            continue
+        yield r.mensaje
+    if pendiente:
+        yield pendiente[2] + ", ".join(pendiente[3])
+
+
+# GAN, SEG y TER solo se comparan en existencia, no en valor
+_APUESTAS_SIN_COMPARAR_VALOR = {"GAN", "SEG", "TER"}
+
+
+def huella_carrera(info):
+    """
+    Huella canónica de una carrera: cantidad de caballos, códigos de apuesta
+    disponibles y montos mínimos (redondeados al centavo). GAN, SEG y TER entran
+    solo por su presencia, igual que en la comparación.
+
+    Si dos carreras tienen la misma huella, la comparación detallada no
+    encontraría diferencias. Las huellas son estables entre ejecuciones, así que
+    se pueden guardar y comparar entre días o revisiones.
+
+    Parámetros
+    ----------
+    info : dict
+        {"caballos": int, "apuestas": {codigo: float o None}} (San Isidro) o
+        directamente {codigo: float o None} (Palermo, sin caballos).
+
+    Retorna
+    -------
+    str
+        Huella hexadecimal (sha1).
+    """
+    if "apuestas" in info:
+        partes = [f"C{info.get('caballos')}"]
+        apuestas = info["apuestas"]
+    else:
+        partes = []
+        apuestas = info
+    for codigo in sorted(apuestas):
+        valor = apuestas[codigo]
+        if codigo in _APUESTAS_SIN_COMPARAR_VALOR:
+            partes.append(codigo)
+        elif valor is None:
+            partes.append(f"{codigo}=NULL")
+        else:
+            partes.append(f"{codigo}={valor:.2f}")
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def huellas_tarjeta(datos):
+    """
+    Huellas por carrera y huella de toda la tarjeta (sobre las huellas por carrera).
+
+    Parámetros
+    ----------
+    datos : dict[int, dict]
+        Estructura normalizada del PDF o del reporte ({num_carrera: info}).
+
+    Retorna
+    -------
+    dict
+        {"carreras": {num_carrera: huella}, "tarjeta": huella}
+    """
+    carreras = {num_carrera: huella_carrera(info) for num_carrera, info in datos.items()}
+    tarjeta = hashlib.sha1(
+        "|".join(f"{c}:{carreras[c]}" for c in sorted(carreras)).encode("utf-8")
+    ).hexdigest()
+    return {"carreras": carreras, "tarjeta": tarjeta}
+
+
+def _diferencias_carrera(num_carrera, info_pdf, info_reporte):
+    """Mensajes de diferencia de una carrera entre PDF y reporte (ver _registros_carrera)."""
+    return list(_mensajes_diferencias(
+        _contar_diferencias(_registros_carrera(num_carrera, info_pdf, info_reporte), "san_isidro")
+    ))
+
+
+def _registros_carrera(num_carrera, info_pdf, info_reporte):
+    """
+    Diferencias de una carrera entre PDF y reporte (ver comparar_pdf_y_reporte),
+    como registros Diferencia.
+    info_pdf / info_reporte: {"caballos": int, "apuestas": {codigo: float o None}}
+    o None si la carrera no figura en ese lado.
+    """
+    if info_pdf is None:
+        yield Diferencia(num_carrera, DIF_CARRERA_FALTANTE, None, False, True,
+                         f"Carrera {num_carrera}: presente en Reporte pero no en PDF")
+        return
+    
+    if info_reporte is None:
+        yield Diferencia(num_carrera, DIF_CARRERA_FALTANTE, None, True, False,
+                         f"Carrera {num_carrera}: presente en PDF pero no en Reporte")
+        return
+    
+    # Comparar cantidad de caballos
+    caballos_pdf = info_pdf["caballos"]
+    caballos_reporte = info_reporte["caballos"]
+    if caballos_pdf != caballos_reporte:
+        yield Diferencia(
+            num_carrera, DIF_CANTIDAD_CABALLOS, None, caballos_pdf, caballos_reporte,
+            f"Carrera {num_carrera}: cantidad de caballos difiere "
+            f"(PDF: {caballos_pdf}, Reporte: {caballos_reporte})"
+        )
+    
+    # Comparar apuestas disponibles
+    apuestas_pdf = set(info_pdf["apuestas"].keys())
+    apuestas_reporte = set(info_reporte["apuestas"].keys())
+    
+    for codigo in sorted(apuestas_pdf - apuestas_reporte):
+        yield Diferencia(
+            num_carrera, DIF_APUESTA_FALTANTE, codigo, None, None,
+            f"Carrera {num_carrera}: apuestas presentes en PDF pero no en Reporte: {codigo}"
+        )
+    
+    for codigo in sorted(apuestas_reporte - apuestas_pdf):
+        yield Diferencia(
+            num_carrera, DIF_APUESTA_SOBRANTE, codigo, None, None,
+            f"Carrera {num_carrera}: apuestas presentes en Reporte pero no en PDF: {codigo}"
+        )
+    
+    # Comparar valores de apuestas comunes (GAN, SEG y TER solo se comparan en existencia, no en valor)
+    apuestas_comunes = apuestas_pdf & apuestas_reporte
+    for codigo in sorted(apuestas_comunes):
+        if codigo in _APUESTAS_SIN_COMPARAR_VALOR:
+            continue
+        valor_pdf = info_pdf["apuestas"][codigo]
+        valor_reporte = info_reporte["apuestas"][codigo]
+        
+        # Solo comparar si ambos tienen valor numérico
+        if valor_pdf is not None and valor_reporte is not None:
+            # Comparar con tolerancia pequeña para floats
+            if abs(valor_pdf - valor_reporte) > 0.01:
+                yield Diferencia(
+                    num_carrera, DIF_VALOR_DISTINTO, codigo, valor_pdf, valor_reporte,
+                    f"Carrera {num_carrera}: valor de {codigo} es diferente (PDF: {valor_pdf}, Reporte: {valor_reporte})"
+                )
+        elif valor_pdf is not None and valor_reporte is None:
+            yield Diferencia(
+                num_carrera, DIF_VALOR_NULL, codigo, valor_pdf, None,
+                f"Carrera {num_carrera}: {codigo} en el PDF figura {valor_pdf} pero en el reporte NULL"
+            )
+        elif valor_pdf is None and valor_reporte is not None:
+            yield Diferencia(
+                num_carrera, DIF_VALOR_NULL, codigo, None, valor_reporte,
+                f"Carrera {num_carrera}: {codigo} en el reporte figura {valor_reporte} pero en el PDF NULL"
+            )
+
+
+def comparar_pdf_y_reporte_incremental(ruta_pdf, ruta_reporte, estado=None, apuestas_raw=None):
+    """
+    Igual que comparar_pdf_y_reporte, pero pensado para volver a comparar
+    mientras el reporte se sigue editando.
+
+    Se guarda en `estado` el lado del PDF ya normalizado (por hash del archivo) y
+    el modelo del reporte con huellas por sección y por carrera. En la siguiente
+    llamada solo se re-parsean las secciones del reporte que cambiaron y solo se
+    vuelven a comparar las carreras cuyos datos cambiaron; el resto de las
+    diferencias se toma de la comparación anterior.
+
+    Parámetros
+    ----------
+    ruta_pdf, ruta_reporte, apuestas_raw :
+        Igual que en comparar_pdf_y_reporte.
+    estado : dict, optional
+        Estado devuelto por la llamada anterior (None en la primera).
+
+    Retorna
+    -------
+    tuple[bool, list[str], dict]
+        (coincide_todo, diferencias, estado). El estado incluye además
+        "carreras_recomparadas": lista de carreras que se volvieron a comparar.
+    """
+    estado = estado or {}
+    hash_pdf = hashlib.sha256(_leer_bytes(ruta_pdf)).hexdigest()
+    pdf_sin_cambios = estado.get("hash_pdf") == hash_pdf
+    if pdf_sin_cambios:
+        datos_pdf = estado["datos_pdf"]
+    else:
+        datos_pdf = _normalizar_pdf(ruta_pdf, apuestas_raw=apuestas_raw)
+
+    import time
+
+    modelo_anterior = estado.get("modelo_reporte")
+    inicio = time.perf_counter()
+    modelo = _parsear_reporte_incremental(_leer_reporte(ruta_reporte), modelo_anterior)
+    _observar("carreras_parseo_reporte_segundos", time.perf_counter() - inicio, "san_isidro")
+    _contar("carreras_comparaciones_total", "san_isidro")
+    datos_reporte = modelo["datos"]
+
+    todas_las_carreras = set(datos_pdf.keys()) | set(datos_reporte.keys())
+    diferencias_por_carrera = {
+        c: d for c, d in estado.get("diferencias_por_carrera", {}).items() if c in todas_las_carreras
+    }
+    if pdf_sin_cambios and modelo_anterior is not None:
+        huellas_anteriores = modelo_anterior["huellas_carreras"]
+        a_comparar = [
+            c for c in todas_las_carreras
+            if c not in diferencias_por_carrera
+            or huellas_anteriores.get(c) != modelo["huellas_carreras"].get(c)
+        ]
+    else:
+        a_comparar = list(todas_las_carreras)
+
+    huellas_pdf = estado["huellas_pdf"] if pdf_sin_cambios else huellas_tarjeta(datos_pdf)["carreras"]
+    for num_carrera in a_comparar:
+        if huellas_pdf.get(num_carrera) == modelo["huellas_carreras"].get(num_carrera):
+            diferencias_por_carrera[num_carrera] = []
+            continue
+        diferencias_por_carrera[num_carrera] = _diferencias_carrera(
+            num_carrera, datos_pdf.get(num_carrera), datos_reporte.get(num_carrera)
+        )
+
+    diferencias = [r.mensaje for r in _registros_paginas_ilegibles(ruta_pdf)]
+    for num_carrera in sorted(diferencias_por_carrera):
+        diferencias.extend(diferencias_por_carrera[num_carrera])
+
+    nuevo_estado = {
+        "hash_pdf": hash_pdf,
+        "datos_pdf": datos_pdf,
+        "huellas_pdf": huellas_pdf,
+        "modelo_reporte": modelo,
+        "diferencias_por_carrera": diferencias_por_carrera,
+        "carreras_recomparadas": sorted(a_comparar),
+    }
+    return len(diferencias) == 0, diferencias, nuevo_estado
+
+
+def comparar_revisiones_programa(ruta_pdf_anterior, ruta_pdf_nueva):
+    """
+    Compara dos revisiones del mismo programa oficial (por ejemplo, la de la
+    mañana y la republicada con retiros o mínimos cambiados) e indica qué páginas
+    y qué carreras cambiaron.
+
+    Gracias a las huellas por página, de la revisión nueva solo se extrae el texto
+    de las páginas que cambiaron; el resto se reutiliza de la lectura anterior.
+
+    Retorna
+    -------
+    dict
+        - "paginas_cambiadas": list[int] páginas de la revisión nueva que no
+          estaban en la anterior (1-based)
+        - "paginas_reutilizadas": int cantidad de páginas cuyo texto no se volvió a extraer
+        - "carreras_cambiadas": dict[int, list[str]] {num_carrera: motivos}
+    """
+    paginas_anteriores = _extraer_paginas_pdf(ruta_pdf_anterior, regiones=True)
+    paginas_nuevas = _extraer_paginas_pdf(ruta_pdf_nueva, regiones=True)
+
+    huellas_anteriores = {p["huella"] for p in paginas_anteriores}
+    paginas_cambiadas = [p["pagina"] for p in paginas_nuevas if p["huella"] not in huellas_anteriores]
+    paginas_reutilizadas = sum(1 for p in paginas_nuevas if p["reutilizada"])
+
+    datos_anteriores = _normalizar_desde_lista_apuestas(
+        _apuestas_desde_textos([p["texto"] for p in paginas_anteriores])
+    )
+    datos_nuevos = _normalizar_desde_lista_apuestas(
+        _apuestas_desde_textos([p["texto"] for p in paginas_nuevas])
+    )
+
+    carreras_cambiadas = {}
+    for num_carrera in sorted(set(datos_anteriores.keys()) | set(datos_nuevos.keys())):
+        anterior = datos_anteriores.get(num_carrera)
+        nueva = datos_nuevos.get(num_carrera)
+        if anterior == nueva:
+            continue
+        if anterior is None:
+            carreras_cambiadas[num_carrera] = ["carrera agregada en la revisión nueva"]
+            continue
+        if nueva is None:
+            carreras_cambiadas[num_carrera] = ["carrera eliminada en la revisión nueva"]
+            continue
+
+        motivos = []
+        if anterior["caballos"] != nueva["caballos"]:
+            motivos.append(f"cantidad de caballos: {anterior['caballos']} -> {nueva['caballos']}")
+        apuestas_anteriores = anterior["apuestas"]
+        apuestas_nuevas = nueva["apuestas"]
+        for codigo in sorted(set(apuestas_anteriores.keys()) | set(apuestas_nuevas.keys())):
+            if codigo not in apuestas_nuevas:
+                motivos.append(f"{codigo} eliminada")
+            elif codigo not in apuestas_anteriores:
+                motivos.append(f"{codigo} agregada ({apuestas_nuevas[codigo]})")
+            elif apuestas_anteriores[codigo] != apuestas_nuevas[codigo]:
+                motivos.append(f"{codigo}: {apuestas_anteriores[codigo]} -> {apuestas_nuevas[codigo]}")
+        carreras_cambiadas[num_carrera] = motivos
+
+    return {
+        "paginas_cambiadas": paginas_cambiadas,
+        "paginas_reutilizadas": paginas_reutilizadas,
+        "carreras_cambiadas": carreras_cambiadas,
+    }
+
+
+def _mapear_nombre_apuesta_palermo(descripcion):
+    """
+    Dado el texto de la columna izquierda del PDF de Palermo, devuelve el código de apuesta.
+    Mapea, por ejemplo:
+    - 'Doble' / 'Doble extra'        -> 'DOB'
+    - '5 y 6'                        -> 'CAD'
+    - 'pick cuatro'                  -> 'QTN'
+    - 'pick cinco'                   -> 'QTP'
+    - 'exacta'                       -> 'EXA'
+    - 'trifecta'                     -> 'TRI'
+    - 'cuatrifecta'                  -> 'CUA'
+    - 'triplo'                       -> 'TPL'
+    - 'imperfecta'                   -> 'IMP'
+    """
+    if not descripcion:
+        return None
+
+    texto = descripcion.strip().lower()
+
+    # Normalizaciones simples
+    texto = texto.replace("  ", " ")
+
+    # Mapeos por substring (del más específico al más genérico).
+    # IMPORTANTE: 'cuatrifecta' contiene 'trifecta', por eso se evalúa primero.
+    if "cuatrifecta" in texto:
+        return "CUA"
+    if "trifecta" in texto:
+        return "TRI"
+    if "doble extra" in texto:
+        return "DOB"
+    if "doble" in texto:
+        return "DOB"
+    if "5 y 6" in texto or "5y6" in texto or "5 & 6" in texto:
+        return "CAD"
+    if "pick cuatro" in texto or "pick 4" in texto:
+        return "QTN"
+    if "pick cinco" in texto or "pick 5" in texto:
+        return "QTP"
+    if "exacta" in texto:
+        return "EXA"
+    if "triplo" in texto:
+        return "TPL"
+    if "imperfecta" in texto:
+        return "IMP"
+
+    return None
+
+
+# Regex para fechas tipo 01/02/2026 o 1/2/26
+_PATRON_FECHA_PALERMO = re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b")
+
+# Regex genérico para fila: "<descripcion>($ monto)  columnas_derecha"
+# Ejemplo de línea: "CUATRIFECTA: ($ 500.-) 2ª4ª6ª9ª; 12ª"
+# Capturamos solo el número dentro de los paréntesis, ignorando el signo $ y el sufijo ".-".
+_PATRON_FILA_PALERMO = re.compile(r"(.+?)\(\s*[\$\s]*([\d.,]+)(?:\.-)?\s*\)\s+(.+)")
+
+# Monto entre paréntesis de una fila de apuestas, aunque el resto de la fila
+# esté en otro tramo: "($ 500.-)"
+_PATRON_MONTO_PALERMO = re.compile(r"\(\s*[\$\s]*\d[\d.,]*")
+
+# Lo que queda de una fecha partida en tramos: "01/03", "/2026", "/"
+_PATRON_PEDAZO_FECHA = re.compile(r"\d\s*/|/\s*\d|^\s*/\s*$")
+
+# Operadores de texto que cambian de línea/posición (cortan el texto al buscar fechas)
+_OPERADORES_CORTE_TEXTO = {b"Td", b"TD", b"T*", b"Tm", b"BT", b"ET", b"'", b'"'}
+
+
+def _extraer_carreras_palermo(carreras_str):
+    """
+    Extrae números de carrera desde el texto de la columna derecha.
+
+    Casos soportados:
+    - '2ª4ª6ª9ª; 12ª'        -> [2, 4, 6, 9, 12]
+    - '1ª, 10ª'             -> [1, 10]
+    - 'DESDE LA 1ª HASTA LA 11ª' -> [1, 2, ..., 11]
+    """
+    texto = carreras_str.upper()
+
+    # Caso especial: 'DESDE LA Xª HASTA LA Yª' -> rango X..Y
+    m_rango = re.search(r"DESDE\s+LA\s+(\d+)\s*[ªº]?\s+HASTA\s+LA\s+(\d+)\s*[ªº]?", texto)
+    if m_rango:
+        inicio = int(m_rango.group(1))
+        fin = int(m_rango.group(2))
+        if inicio <= fin:
+            return list(range(inicio, fin + 1))
+
+    # Caso general: lista de números con o sin sufijo ª / º
+    numeros = re.findall(r"(\d+)\s*[ªº]?", carreras_str)
+    return [int(n) for n in numeros]
+
+
+def _lineas_texto_simple(pagina):
+    """
+    Líneas de texto de una página leyendo directamente los strings de los
+    operadores de texto (Tj/TJ) del stream de contenido, sin el armado de
+    líneas ni el mapeo de fuentes de extract_text(). Es mucho más barato y
+    no se cuelga con páginas complejas, pero es más tosco.
+
+    Solo es confiable con fuentes simples (Type1/TrueType), donde los caracteres
+    se guardan tal cual. Si la página usa fuentes compuestas (Type0), Type3 o
+    una codificación propia (/Encoding con /Differences) devuelve None para que
+    el llamador extraiga el texto completo.
+    """
+    recursos = pagina.get("/Resources") or {}
+    fuentes = recursos.get("/Font") or {}
+    for nombre in fuentes:
+        fuente = fuentes[nombre].get_object()
+        if fuente.get("/Subtype") in ("/Type0", "/Type3"):
+            return None
+        codificacion = fuente.get("/Encoding")
+        if codificacion is not None and hasattr(codificacion.get_object(), "get"):
+            if "/Differences" in codificacion.get_object():
+                return None
+
+    contenido = pagina.get_contents()
+    if contenido is None:
+        return []
+
+    lineas = []
+    tramos = []
+
+    def _cortar():
+        if tramos:
+            lineas.append("".join(tramos))
+            tramos.clear()
+
+    for operandos, operador in contenido.operations:
+        if operador in _OPERADORES_CORTE_TEXTO:
+            _cortar()
+        if operador in (b"Tj", b"'", b'"'):
+            textos = operandos[-1:]
+        elif operador == b"TJ":
+            textos = operandos[0] if operandos else []
+        else:
+            continue
+        for t in textos:
+            if isinstance(t, bytes):
+                tramos.append(t.decode("latin-1"))
+            elif isinstance(t, str):
+                tramos.append(t)
+        if operador in (b"'", b'"'):
+            _cortar()
+    _cortar()
+    return lineas
+
+
+def _fechas_en_pagina_rapido(pagina):
+    """
+    Busca fechas en una página con _lineas_texto_simple. Devuelve None si no
+    se puede confiar en que encontró todas (hay que extraer el texto completo):
+    la página usa fuentes que la lectura directa no entiende, o tiene filas de
+    apuestas y además pedazos de fecha sueltos (una fecha partida en tramos con
+    posición), que extract_text() sí junta. Con una fecha sin ver, las filas
+    que le siguen quedarían asignadas a la fecha anterior de la página.
+    """
+    lineas = _lineas_texto_simple(pagina)
+    if lineas is None:
+        return None
+    fechas = []
+    con_filas = False
+    con_pedazos = False
+    for linea in lineas:
+        fechas.extend(_PATRON_FECHA_PALERMO.findall(linea))
+        con_filas = con_filas or _PATRON_MONTO_PALERMO.search(linea) is not None
+        con_pedazos = con_pedazos or _PATRON_PEDAZO_FECHA.search(_PATRON_FECHA_PALERMO.sub("", linea)) is not None
+    if con_filas and con_pedazos:
+        return None
+    return fechas
+
+
+# Cambia cuando cambia la forma de armar el índice, para no usar los viejos de la caché
+_VERSION_INDICE_PALERMO = 2
+
+
+def indexar_fechas_palermo(ruta_pdf):
+    """
+    Primera pasada liviana sobre el PDF de Palermo: qué páginas mencionan qué
+    fechas. Sirve para ofrecer la elección de fecha sin parsear todo el PDF; luego
+    _leer_palermo_desde_pdf(ruta_pdf, fecha=...) procesa solo esas páginas.
+
+    La lectura directa (_fechas_en_pagina_rapido) no entiende codificaciones
+    propias (/Encoding con /Differences) ni fechas partidas en tramos con
+    posición: una página en la que no encuentra ninguna fecha, o en la que no
+    puede asegurar haberlas encontrado todas, se extrae completa, para que una
+    fecha no desaparezca del menú (ni sus filas de la comparación) sin aviso.
+
+    El índice se guarda en la caché local por hash del PDF, así que volver a
+    abrir el mismo boletín es inmediato.
+
+    Retorna
+    -------
+    dict
+        - "fechas": list[str] fechas en orden de aparición
+        - "paginas_por_fecha": dict[str, list[int]] páginas (1-based) donde aparece cada fecha
+    """
+    if es_paquete(ruta_pdf):
+        return _leer_paquete_tipo(ruta_pdf, "palermo")["indice"]
+
+    contenido = _leer_bytes(ruta_pdf)
+    hash_archivo = hashlib.sha256(contenido).hexdigest()
+    clave = f"{hash_archivo}-v{_VERSION_INDICE_PALERMO}"
+    indice = _leer_cache_json("indices_palermo", clave)
+    _contar("carreras_cache_total", "indices_palermo", "fallo" if indice is None else "acierto")
+    if indice is not None:
+        return indice
+
+    pypdf = _importar_pypdf()
+    reader = pypdf.PdfReader(io.BytesIO(contenido))
+    fechas = []
+    fechas_vistas = set()
+    paginas_por_fecha = {}
+    paginas_sin_sniff = []
+    for num_pagina, pagina in enumerate(reader.pages, start=1):
+        fechas_pagina = _fechas_en_pagina_rapido(pagina)
+        if not fechas_pagina:
+            paginas_sin_sniff.append(num_pagina)
+            continue
+        for f in fechas_pagina:
+            if f not in fechas_vistas:
+                fechas_vistas.add(f)
+                fechas.append(f)
+            paginas = paginas_por_fecha.setdefault(f, [])
+            if not paginas or paginas[-1] != num_pagina:
+                paginas.append(num_pagina)
+
+    # Páginas con fuentes compuestas o sin fechas a la vista: se usa el texto
+    # completo (queda en caché para después)
+    if paginas_sin_sniff:
+        for p in _iterar_paginas_pdf(io.BytesIO(contenido), paginas=paginas_sin_sniff):
+            for f in _PATRON_FECHA_PALERMO.findall(p["texto"]):
+                if f not in fechas_vistas:
+                    fechas_vistas.add(f)
+                    fechas.append(f)
+                paginas = paginas_por_fecha.setdefault(f, [])
+                if p["pagina"] not in paginas:
+                    paginas.append(p["pagina"])
+        for paginas in paginas_por_fecha.values():
+            paginas.sort()
+        # Orden de aparición: las fechas de estas páginas se agregaron al final
+        fechas.sort(key=lambda f: paginas_por_fecha[f][0])
+
+    indice = {"fechas": fechas, "paginas_por_fecha": paginas_por_fecha}
+    # Si alguna página no se pudo leer el índice está incompleto: no se guarda
+    if not (paginas_sin_sniff and paginas_ilegibles(io.BytesIO(contenido), paginas=paginas_sin_sniff)):
+        _escribir_cache_json("indices_palermo", clave, indice)
+    return indice
+
+
+def _leer_palermo_desde_pdf(ruta_pdf, fecha=None, progreso=None):
+    """
+    Lee el PDF de Palermo y extrae:
+    - Lista de fechas encontradas en el texto (formato dd/mm/aaaa, etc.).
+    - Estructura de apuestas por carrera y monto:
+      {num_carrera: {codigo_apuesta: valor_float}}
+
+    Se asume un formato con 2 columnas:
+    - Izquierda: nombre de la apuesta con el monto entre paréntesis, ej. 'Doble (1000,00)'
+    - Derecha: mapa de carreras donde se juega esa apuesta, ej. '1-13' o '1,3,5'
+
+    Si se indica `fecha`, solo se procesan las páginas que la mencionan (según
+    indexar_fechas_palermo) y "apuestas_por_fecha" contiene solo esa fecha;
+    "fechas" sigue listando todas las fechas del PDF.
+
+    progreso: progreso(paginas_leidas, total_paginas) después de cada página
+    (como en obtener_apuestas_por_carrera).
+
+    ruta_pdf también puede ser un paquete .cprg (ver exportar_paquete).
+    """
+    if es_paquete(ruta_pdf):
+        datos = _leer_paquete_tipo(ruta_pdf, "palermo")["datos"]
+        if fecha is not None:
+            datos["apuestas_por_fecha"] = {
+                f: a for f, a in datos["apuestas_por_fecha"].items() if f == fecha
+            }
+            datos["resumen_por_fecha"] = {
+                f: r for f, r in datos["resumen_por_fecha"].items() if f == fecha
+            }
+        return datos
+
+    import time
+
+    inicio = time.perf_counter()
+    if fecha is None:
+        textos = _textos_paginas_pdf(ruta_pdf, hipodromo="palermo")
+        if progreso is not None:
+            textos = _con_progreso(textos, _cantidad_paginas_pdf(ruta_pdf), progreso)
+        datos = _palermo_desde_textos(textos)
+    else:
+        contenido = _leer_bytes(ruta_pdf)
+        indice = indexar_fechas_palermo(io.BytesIO(contenido))
+        paginas = indice["paginas_por_fecha"].get(fecha, [])
+        textos = (
+            p["texto"] for p in _iterar_paginas_pdf(io.BytesIO(contenido), paginas=paginas, hipodromo="palermo")
+        ) if paginas else []
+        if progreso is not None:
+            textos = _con_progreso(textos, len(paginas), progreso)
+        datos = _palermo_desde_textos(list(textos), fecha=fecha)
+        datos["fechas"] = list(indice["fechas"])
+    _contar("carreras_pdfs_total", "palermo")
+    _observar("carreras_parseo_pdf_segundos", time.perf_counter() - inicio, "palermo")
+    return datos
+
+
+def _palermo_desde_textos(textos, fecha=None):
+    """
+    Como _leer_palermo_desde_pdf, pero a partir de los textos de página ya
+    extraídos. Con `fecha`, solo se guardan las filas asociadas a esa fecha.
+    """
+    fechas_encontradas = []
+    fechas_vistas = set()
+    # Estructura: {fecha: {carrera: {codigo_apuesta: valor}}}
+    apuestas_por_fecha = {}
+    # Metadatos para poder aplicar reglas tipo "si aparece una sola vez, es ALL"
+    # Estructura: {fecha: {codigo_apuesta: {"conteo_lineas": int, "valor": float, "carreras": set[int]}}}
+    resumen_por_fecha = {}
+
+    for texto in textos:
+        # Recorremos línea a línea, manteniendo la "fecha actual" (no pasa de una página a otra)
+        fecha_actual = None
+
+        for linea in texto.split("\n"):
+            linea_stripped = linea.strip()
+            if not linea_stripped:
+                continue
+
+            # Actualizar fecha actual si la línea contiene alguna fecha
+            for f in _PATRON_FECHA_PALERMO.findall(linea_stripped):
+                if f not in fechas_vistas:
+                    fechas_vistas.add(f)
+                    fechas_encontradas.append(f)
+                fecha_actual = f
+
+            # Filas de apuestas requieren paréntesis con monto
+            if "(" not in linea_stripped or ")" not in linea_stripped:
+                continue
+
+            # Si todavía no vimos ninguna fecha, no sabemos a qué fecha asociar esta línea
+            if not fecha_actual:
+                continue
+            if fecha is not None and fecha_actual != fecha:
+                continue
+
+            m = _PATRON_FILA_PALERMO.match(linea_stripped)
+            if not m:
+                continue
+
+            descripcion = m.group(1).strip()
+            monto_str = m.group(2).strip()
+            carreras_str = m.group(3).strip()
+
+            codigo_apuesta = _mapear_nombre_apuesta_palermo(descripcion)
+            if not codigo_apuesta:
+                continue
+
+            valor = _parsear_monto_str(monto_str)
+            if valor is None:
+                continue
+
+            # Extraer carreras específicas para Palermo (ej. '2ª4ª6ª9ª; 12ª')
+            carreras = _extraer_carreras_palermo(carreras_str)
+            if not carreras:
+                continue
+
+            if fecha_actual not in apuestas_por_fecha:
+                apuestas_por_fecha[fecha_actual] = {}
+            if fecha_actual not in resumen_por_fecha:
+                resumen_por_fecha[fecha_actual] = {}
+            if codigo_apuesta not in resumen_por_fecha[fecha_actual]:
+                resumen_por_fecha[fecha_actual][codigo_apuesta] = {
+                    "conteo_lineas": 0,
+                    "valor": valor,
+                    "carreras": set(),
+                }
+            # Incrementar el conteo de líneas donde aparece la apuesta en esta fecha
+            resumen_por_fecha[fecha_actual][codigo_apuesta]["conteo_lineas"] += 1
+            resumen_por_fecha[fecha_actual][codigo_apuesta]["valor"] = valor
+
+            for carrera in carreras:
+                if carrera not in apuestas_por_fecha[fecha_actual]:
+                    apuestas_por_fecha[fecha_actual][carrera] = {}
+                apuestas_por_fecha[fecha_actual][carrera][codigo_apuesta] = valor
+                resumen_por_fecha[fecha_actual][codigo_apuesta]["carreras"].add(carrera)
+
+    return {
+        "fechas": fechas_encontradas,
+        "apuestas_por_fecha": apuestas_por_fecha,
+        "resumen_por_fecha": resumen_por_fecha,
+    }
+
+
+def comparar_palermo(ruta_pdf_palermo, ruta_reporte, fecha_objetivo=None, datos_pdf=None):
+    """
+    Compara, para PALERMO, solo:
+    - Apuestas por carrera
+    - Montos mínimos de cada apuesta
+
+    Usa:
+    - PDF de Palermo (columna izquierda: apuesta y monto; columna derecha: carreras)
+    - El mismo reporte.txt utilizado para San Isidro.
+
+    Retorna:
+    - coincide_todo: bool
+    - diferencias: lista de strings con las diferencias encontradas
+    - fechas: lista de fechas detectadas en el PDF de Palermo
+    """
+    if datos_pdf is None:
+        datos_pdf = _leer_palermo_desde_pdf(ruta_pdf_palermo)
+
+    fechas = datos_pdf["fechas"]
+
+    # Para Palermo usamos un normalizador propio que solo mira RSM TABLE
+    datos_reporte = _normalizar_reporte_palermo(ruta_reporte)  # {carrera: {codigo_apuesta: valor}}
+    apuestas_pdf = _apuestas_palermo_para_fecha(datos_pdf, fecha_objetivo, datos_reporte)
+    _contar("carreras_comparaciones_total", "palermo")
+
+    registros = iterar_diferencias(apuestas_pdf, datos_reporte, palermo=True)
+    diferencias = [r.mensaje for r in _registros_ilegibles_palermo(ruta_pdf_palermo, fecha_objetivo)]
+    diferencias.extend(_mensajes_diferencias(registros))
+    coincide_todo = len(diferencias) == 0
+    return coincide_todo, diferencias, fechas
+
+
+def iterar_diferencias_palermo(ruta_pdf_palermo, ruta_reporte, fecha_objetivo=None, datos_pdf=None):
+    """
+    Igual que comparar_palermo, pero genera las diferencias como registros
+    Diferencia (una por apuesta), a medida que se encuentran.
+    """
+    if datos_pdf is None:
+        datos_pdf = _leer_palermo_desde_pdf(ruta_pdf_palermo, fecha=fecha_objetivo)
+    datos_reporte = _normalizar_reporte_palermo(ruta_reporte)
+    apuestas_pdf = _apuestas_palermo_para_fecha(datos_pdf, fecha_objetivo, datos_reporte)
+    _contar("carreras_comparaciones_total", "palermo")
+    yield from _registros_ilegibles_palermo(ruta_pdf_palermo, fecha_objetivo)
+    yield from iterar_diferencias(apuestas_pdf, datos_reporte, palermo=True)
+
+
+def _registros_ilegibles_palermo(ruta_pdf_palermo, fecha=None):
+    """
+    Registros unreadable_page del PDF de Palermo que pueden afectar a `fecha`:
+    las páginas de esa fecha y las que no se sabe a qué fecha pertenecen.
+    Sin ruta (datos del PDF ya leídos en otro proceso) no hay nada que informar.
+    """
+    if ruta_pdf_palermo is None or es_paquete(ruta_pdf_palermo):
+        return iter(())
+    paginas = None
+    if fecha is not None:
+        paginas_por_fecha = indexar_fechas_palermo(ruta_pdf_palermo)["paginas_por_fecha"]
+        con_fecha = {n for lista in paginas_por_fecha.values() for n in lista}
+        paginas = set(paginas_por_fecha.get(fecha, []))
+        paginas.update(n for n, _ in paginas_ilegibles(ruta_pdf_palermo) if n not in con_fecha)
+    return _registros_paginas_ilegibles(ruta_pdf_palermo, paginas=paginas, hipodromo="palermo")
+
+
+def _apuestas_palermo_para_fecha(datos_pdf, fecha_objetivo, datos_reporte):
+    """
+    Apuestas del PDF de Palermo a comparar para una fecha: {carrera: {codigo: valor}}.
+    Devuelve una copia, así los datos del PDF (que pueden estar en caché) no se modifican.
+    """
+    apuestas_por_fecha = datos_pdf["apuestas_por_fecha"]  # {fecha: {carrera: {codigo: valor}}}
+    resumen_por_fecha = datos_pdf.get("resumen_por_fecha", {})
+
+    # Si no se indica fecha, usar todas combinadas (fallback seguro)
+    apuestas_pdf = {}
+    if fecha_objetivo is None:
+        for _, apuestas_carreras in apuestas_por_fecha.items():
+            for carrera, apuestas in apuestas_carreras.items():
+                if carrera not in apuestas_pdf:
+                    apuestas_pdf[carrera] = {}
+                apuestas_pdf[carrera].update(apuestas)
+        return apuestas_pdf
+
+    for carrera, apuestas in apuestas_por_fecha.get(fecha_objetivo, {}).items():
+        apuestas_pdf[carrera] = dict(apuestas)
+
+    # Regla Palermo:
+    # Si una apuesta (por ejemplo EXACTA/TRIFECTA) aparece UNA sola vez en el PDF para esa fecha,
+    # se interpreta como "misma base para todas las carreras" (equivalente a ALL en el reporte).
+    # Entonces expandimos esa apuesta a todas las carreras del reporte con el mismo valor.
+    resumen_fecha = resumen_por_fecha.get(fecha_objetivo, {})
+    codigos_all_si_unica = {"EXA", "TRI"}
+    for codigo in codigos_all_si_unica:
+        info = resumen_fecha.get(codigo)
+        if not info:
+            continue
+        if info.get("conteo_lineas", 0) != 1:
+            continue
+        valor = info.get("valor")
+        if valor is None:
+            continue
+        for carrera in datos_reporte.keys():
+            if carrera not in apuestas_pdf:
+                apuestas_pdf[carrera] = {}
+            # Solo completar si no estaba explícitamente en el PDF para esa carrera
+            if codigo not in apuestas_pdf[carrera]:
+                apuestas_pdf[carrera][codigo] = valor
+    return apuestas_pdf
+
+
+def _registros_carrera_palermo(num_carrera, apuestas_carrera_pdf, apuestas_carrera_rep):
+    """
+    Diferencias de una carrera de Palermo (ver comparar_palermo), como registros Diferencia.
+    Cada lado es {codigo: valor} o None si la carrera no figura en ese lado.
+    """
+    if apuestas_carrera_pdf is None:
+        yield Diferencia(num_carrera, DIF_CARRERA_FALTANTE, None, False, True,
+                         f"Carrera {num_carrera}: presente en reporte pero sin apuestas en PDF de Palermo")
+        return
+
+    if apuestas_carrera_rep is None:
+        yield Diferencia(num_carrera, DIF_CARRERA_FALTANTE, None, True, False,
+                         f"Carrera {num_carrera}: presente en PDF de Palermo pero no en reporte")
+        return
+
+    codigos_pdf = set(apuestas_carrera_pdf.keys())
+    codigos_rep = set(apuestas_carrera_rep.keys())
+
+    for codigo in sorted(codigos_pdf - codigos_rep):
+        yield Diferencia(
+            num_carrera, DIF_APUESTA_FALTANTE, codigo, None, None,
+            f"Carrera {num_carrera}: apuestas presentes en PDF de Palermo pero no en reporte: {codigo}"
+        )
+
+    for codigo in sorted(codigos_rep - codigos_pdf):
+        yield Diferencia(
+            num_carrera, DIF_APUESTA_SOBRANTE, codigo, None, None,
+            f"Carrera {num_carrera}: apuestas presentes en reporte pero no en PDF de Palermo: {codigo}"
+        )
+
+    # Comparar montos de apuestas comunes
+    codigos_comunes = codigos_pdf & codigos_rep
+    for codigo in sorted(codigos_comunes):
+        valor_pdf = apuestas_carrera_pdf.get(codigo)
+        valor_rep = apuestas_carrera_rep.get(codigo)
+
+        if valor_pdf is None and valor_rep is None:
+            continue
+        if valor_pdf is None and valor_rep is not None:
+            yield Diferencia(
+                num_carrera, DIF_VALOR_NULL, codigo, None, valor_rep,
+                f"Carrera {num_carrera}: {codigo} sin monto en PDF de Palermo pero con valor {valor_rep} en reporte"
+            )
+            continue
+        if valor_pdf is not None and valor_rep is None:
+            yield Diferencia(
+                num_carrera, DIF_VALOR_NULL, codigo, valor_pdf, None,
+                f"Carrera {num_carrera}: {codigo} con monto {valor_pdf} en PDF de Palermo pero NULL en reporte"
+            )
+            continue
+
+        # Ambos tienen valor numérico
+        if abs(valor_pdf - valor_rep) > 0.01:
+            yield Diferencia(
+                num_carrera, DIF_VALOR_DISTINTO, codigo, valor_pdf, valor_rep,
+                f"Carrera {num_carrera}: monto de {codigo} difiere (PDF Palermo: {valor_pdf}, Reporte: {valor_rep})"
+            )
+
+
+def _volcar_texto(registros, archivo):
+    """Salida de consola: los mensajes de siempre, uno por línea."""
+    cantidad = 0
+    for mensaje in _mensajes_diferencias(registros):
+        archivo.write(f"  - {mensaje}\n")
+        cantidad += 1
+    return cantidad
+
+
+def _volcar_jsonl(registros, archivo):
+    """Salida JSON Lines: un objeto JSON por diferencia."""
+    cantidad = 0
+    for r in registros:
+        archivo.write(json.dumps(r._asdict(), ensure_ascii=False) + "\n")
+        cantidad += 1
+    return cantidad
+
+
+def _volcar_csv(registros, archivo):
+    """Salida CSV con encabezado (los valores None quedan vacíos)."""
+    import csv
+
+    escritor = csv.writer(archivo)
+    escritor.writerow(Diferencia._fields)
+    cantidad = 0
+    for r in registros:
+        escritor.writerow(["" if v is None else v for v in r])
+        cantidad += 1
+    return cantidad
+
+
+# Salidas disponibles para volcar_diferencias: {formato: función(registros, archivo) -> cantidad}
+SALIDAS_DIFERENCIAS = {
+    "texto": _volcar_texto,
+    "jsonl": _volcar_jsonl,
+    "csv": _volcar_csv,
+}
+
+
+def volcar_diferencias(registros, archivo, formato="texto"):
+    """
+    Escribe las diferencias en `archivo` a medida que el generador las produce
+    (memoria constante, sin armar la lista completa).
+
+    Parámetros
+    ----------
+    registros : iterable de Diferencia
+        Por ejemplo iterar_diferencias_pdf_y_reporte(...) o iterar_diferencias_palermo(...).
+    archivo : objeto de texto con write()
+    formato : str
+        Una de las claves de SALIDAS_DIFERENCIAS ("texto", "jsonl", "csv").
+
+    Retorna
+    -------
+    int
+        Cantidad de líneas/registros escritos.
+    """
+    try:
+        salida = SALIDAS_DIFERENCIAS[formato]
+    except KeyError:
+        raise ValueError(f"Formato de salida desconocido: {formato}")
+    return salida(registros, archivo)
+
+
+# Comparación en vivo: el sistema de apuestas escribe el reporte de a poco
+# (líneas de carrera, RSM TABLE, CARD DEFAULT MINIMUMS...). Las filas ALL del RSM
+# pueden aparecer en cualquier lugar de la tabla, así que una carrera queda
+# completa cuando cierra la sección RSM: en ese momento se emiten los resultados,
+# sin esperar el resto del archivo.
+
+# Resultado por carrera de la comparación en vivo:
+# - carrera: int (None para el bloque de páginas ilegibles del PDF)
+# - registros: list[Diferencia] (vacía si la carrera coincide)
+# - reporte_completo: False si el reporte terminó antes de cerrar la sección RSM
+ResultadoCarrera = namedtuple("ResultadoCarrera", ["carrera", "registros", "reporte_completo"])
+
+
+def _lineas_en_vivo(origen, intervalo=0.5, inactividad=30.0):
+    """
+    Genera las líneas completas (sin el fin de línea) de un reporte que se está
+    escribiendo.
+
+    origen: ruta de archivo (se sigue como `tail -f`), "-" para la entrada
+    estándar o un objeto de texto ya abierto (pipe). Con un archivo, si no hay
+    datos nuevos se espera `intervalo` segundos; si no crece (o no aparece)
+    durante `inactividad` segundos se da por terminado. Con pipes termina al
+    llegar al fin de archivo.
+    """
+    import sys
+    import time
+
+    if origen == "-":
+        origen = sys.stdin
+    elif _partes_miembro(origen) is not None:
+        # Un miembro de un archivo comprimido ya está completo: no hay nada que seguir
+        origen = io.StringIO(_leer_reporte(origen))
+    if hasattr(origen, "readline"):
+        for linea in origen:
+            yield linea.rstrip("\r\n")
+        return
+
+    ultimo_dato = time.monotonic()
+    while not os.path.exists(origen):
+        if time.monotonic() - ultimo_dato > inactividad:
+            raise FileNotFoundError(f"No apareció el reporte: {origen}")
+        time.sleep(intervalo)
+
+    with open(origen, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        pendiente = ""
+        ultimo_dato = time.monotonic()
+        while True:
+            bloque = f.readline()
+            if bloque:
+                ultimo_dato = time.monotonic()
+                pendiente += bloque
+                if pendiente.endswith("\n"):
+                    yield pendiente.rstrip("\r\n")
+                    pendiente = ""
+                continue
+            if time.monotonic() - ultimo_dato > inactividad:
+                if pendiente:
+                    yield pendiente.rstrip("\r\n")
+                return
+            time.sleep(intervalo)
+
+
+def _fecha_palermo_en_vivo(ruta_pdf, origen_reporte):
+    """
+    Fecha del PDF de Palermo a comparar con un reporte en vivo cuando no se
+    indicó: la del nombre del reporte o la única del PDF. Con varias fechas y
+    un reporte sin fecha en el nombre (o leído de un pipe) lanza ValueError:
+    mezclar las tarjetas de todas las fechas no es una verificación.
+    """
+    fechas = indexar_fechas_palermo(ruta_pdf)["fechas"]
+    nombre = origen_reporte if isinstance(origen_reporte, str) and origen_reporte != "-" else ""
+    fecha = _fecha_palermo_para_reporte(nombre, fechas)
+    if fecha is None and len(fechas) > 1:
+        raise ValueError(
+            f"el PDF tiene {len(fechas)} fechas ({', '.join(fechas)}) y no se sabe cuál corresponde "
+            "al reporte; indique --fecha"
+        )
+    return fecha
+
+
+def iterar_resultados_en_vivo(ruta_pdf, origen_reporte, palermo=False, fecha=None, intervalo=0.5, inactividad=30.0):
+    """
+    Compara el PDF contra un reporte que todavía se está escribiendo.
+
+    El PDF se parsea primero. Del reporte se van acumulando las líneas a medida
+    que llegan: al aparecer "RSM TABLE" las líneas de carrera ya están completas
+    y se parsean (modelo incremental); al cerrar la sección RSM solo falta
+    parsear esa sección y se emite el resultado de cada carrera. Lo que el
+    sistema escriba después (CARD DEFAULT MINIMUMS, etc.) no cambia la
+    comparación, así que con un archivo se deja de leer ahí. Con un pipe se sigue
+    leyendo (y descartando) hasta el final para no bloquear a quien escribe.
+
+    Parámetros
+    ----------
+    ruta_pdf : str
+        PDF (o paquete .cprg) ya disponible.
+    origen_reporte : str o archivo de texto
+        Ruta del reporte que crece, "-" para la entrada estándar, o un pipe abierto.
+    palermo, fecha :
+        Como en comparar_palermo (fecha del PDF de Palermo a comparar). Sin
+        fecha se usa la del nombre del reporte o la única del PDF; si no se
+        puede saber, ValueError (ver _fecha_palermo_en_vivo).
+    intervalo, inactividad :
+        Ver _lineas_en_vivo.
+
+    Genera
+    ------
+    ResultadoCarrera
+        Uno por carrera, en orden, apenas se puede comparar.
+    """
+    if palermo:
+        if fecha is None:
+            fecha = _fecha_palermo_en_vivo(ruta_pdf, origen_reporte)
+        datos_pdf = _leer_palermo_desde_pdf(ruta_pdf, fecha=fecha)
+        ilegibles = list(_registros_ilegibles_palermo(ruta_pdf, fecha))
+    else:
+        datos_pdf = _normalizar_pdf(ruta_pdf)
+        ilegibles = list(_registros_paginas_ilegibles(ruta_pdf))
+
+    lineas = _lineas_en_vivo(origen_reporte, intervalo=intervalo, inactividad=inactividad)
+    leidas = []
+    modelo = None
+    seccion_rsm = None  # texto desde "RSM TABLE" (None hasta que aparece)
+    rsm_cerrada = False
+    for linea in lineas:
+        leidas.append(linea)
+        if seccion_rsm is None:
+            inicio = linea.find("RSM TABLE")
+            if inicio == -1:
+                continue
+            seccion_rsm = linea[inicio:] + "\n"
+            if not palermo:
+                # Las líneas de carrera ya llegaron: se parsean ahora y no al final
+                modelo = _parsear_reporte_incremental("\n".join(leidas[:-1]) + "\n")
+        else:
+            seccion_rsm += linea + "\n"
+        if _fin_seccion_rsm(seccion_rsm) is not None:
+            rsm_cerrada = True
+            break
+
+    contenido = "\n".join(leidas) + "\n"
+    if palermo:
+        datos_reporte = _reporte_palermo_desde_contenido(contenido)
+        apuestas_pdf = _apuestas_palermo_para_fecha(datos_pdf, fecha, datos_reporte)
+        registros_carrera = _registros_carrera_palermo
+    else:
+        datos_reporte = _parsear_reporte_incremental(contenido, modelo)["datos"]
+        apuestas_pdf = datos_pdf
+        registros_carrera = _registros_carrera
+    hipodromo = "palermo" if palermo else "san_isidro"
+    _contar("carreras_comparaciones_total", hipodromo)
+
+    if ilegibles:
+        yield ResultadoCarrera(None, ilegibles, rsm_cerrada)
+    for num_carrera in sorted(set(apuestas_pdf) | set(datos_reporte)):
+        registros = list(_contar_diferencias(
+            registros_carrera(num_carrera, apuestas_pdf.get(num_carrera), datos_reporte.get(num_carrera)), hipodromo
+        ))
+        yield ResultadoCarrera(num_carrera, registros, rsm_cerrada)
+
+    # Con un pipe, se vacía el resto para que el proceso que escribe no se bloquee
+    if origen_reporte == "-" or hasattr(origen_reporte, "readline"):
+        for _ in lineas:
+            pass
+    else:
+        lineas.close()
+
+
+def _variantes_fecha_en_nombre(fecha):
+    """
+    Formas en que una fecha del PDF de Palermo ('1/3/26', '01/03/2026') puede
+    aparecer en el nombre de un archivo de reporte: 01032026, 20260301,
+    01-03-2026, 2026-03-01, 01_03_2026, 01.03.2026, 010326...
+    """
+    try:
+        dia, mes, anio = (int(p) for p in fecha.split("/"))
+    except ValueError:
+        return set()
+    if anio < 100:
+        anio += 2000
+    dd, mm, aaaa, aa = f"{dia:02d}", f"{mes:02d}", f"{anio:04d}", f"{anio % 100:02d}"
+    variantes = {dd + mm + aaaa, aaaa + mm + dd, dd + mm + aa}
+    for sep in "-_.":
+        variantes.add(sep.join((dd, mm, aaaa)))
+        variantes.add(sep.join((aaaa, mm, dd)))
+    return variantes
+
+
+def asociar_reportes_palermo(fechas, directorio=None, manifiesto=None):
+    """
+    Asocia cada fecha del PDF de Palermo con su reporte.
+
+    - Con `manifiesto`: archivo JSON {"01/03/2026": "reporte_0103.txt", ...}; las
+      rutas relativas se resuelven desde la carpeta del manifiesto.
+    - Con `directorio`: se buscan archivos .txt cuyo nombre contenga la fecha
+      (01032026, 2026-03-01, 01_03_2026, etc.), también comprimidos (.txt.gz).
+      `directorio` puede ser un .zip: se buscan entre sus miembros sin
+      descomprimirlo a disco.
+
+    Retorna
+    -------
+    dict
+        - "reportes": {fecha: ruta_reporte}
+        - "sin_reporte": [fecha, ...]
+        - "ambiguas": {fecha: [rutas candidatas]} (más de un archivo coincide)
+    """
+    reportes = {}
+    ambiguas = {}
+    if manifiesto:
+        with open(manifiesto, "r", encoding="utf-8") as f:
+            entradas = json.load(f)
+        base = os.path.dirname(os.path.abspath(manifiesto))
+        for fecha in fechas:
+            ruta = entradas.get(fecha)
+            if ruta:
+                reportes[fecha] = ruta if os.path.isabs(ruta) else os.path.join(base, ruta)
+    elif directorio:
+        if os.path.isfile(directorio):
+            # {nombre sin extensión: ruta del miembro}
+            archivos = {
+                os.path.basename(r.split(_SEPARADOR_MIEMBRO, 1)[1]): r
+                for r in miembros_archivo(directorio, {".txt"})
+            }
+        else:
+            archivos = {
+                n: os.path.join(directorio, n) for n in os.listdir(directorio)
+                if extension_logica(n) == ".txt" and os.path.isfile(os.path.join(directorio, n))
+            }
+        for fecha in fechas:
+            patrones = [
+                re.compile(rf"(?<!\d){re.escape(v)}(?!\d)") for v in _variantes_fecha_en_nombre(fecha)
+            ]
+            candidatos = [
+                archivos[n] for n in sorted(archivos)
+                if any(p.search(os.path.splitext(n[:-3] if n.lower().endswith(".gz") else n)[0]) for p in patrones)
+            ]
+            if len(candidatos) == 1:
+                reportes[fecha] = candidatos[0]
+            elif candidatos:
+                ambiguas[fecha] = candidatos
+
+    sin_reporte = [f for f in fechas if f not in reportes and f not in ambiguas]
+    return {"reportes": reportes, "sin_reporte": sin_reporte, "ambiguas": ambiguas}
+
+
+def _comparar_palermo_fecha(trabajo):
+    """Tarea de un worker: (fecha, ruta_reporte, datos_pdf) -> (fecha, coincide, diferencias)."""
+    fecha, ruta_reporte, datos_pdf = trabajo
+    coincide, diferencias, _ = comparar_palermo(None, ruta_reporte, fecha_objetivo=fecha, datos_pdf=datos_pdf)
+    return fecha, coincide, diferencias
+
+
+def comparar_palermo_todas_las_fechas(ruta_pdf_palermo, reportes, max_procesos=None):
+    """
+    Compara todas las fechas de un PDF de Palermo contra sus reportes en una sola
+    corrida: el PDF se parsea una vez y las comparaciones por fecha se reparten
+    en un pool de procesos.
+
+    Parámetros
+    ----------
+    ruta_pdf_palermo : str
+        Ruta al PDF de Palermo.
+    reportes : dict[str, str]
+        {fecha: ruta_reporte} (ver asociar_reportes_palermo).
+    max_procesos : int, optional
+        Cantidad de procesos (por defecto, los que prevea el planificador según
+        el tamaño de los reportes). Con 1 se compara en serie.
+
+    Retorna
+    -------
+    dict
+        - "coincide_todo": bool (True solo si todas las fechas del PDF tienen
+          reporte y coinciden: una fecha sin verificar no cuenta como coincidente)
+        - "fechas": list[str] fechas detectadas en el PDF
+        - "por_fecha": {fecha: {"reporte": str, "coincide": bool, "diferencias": list[str]}}
+        - "sin_reporte": fechas del PDF que no tienen reporte asociado
+    """
+    datos_pdf = _leer_palermo_desde_pdf(ruta_pdf_palermo)
+    fechas = datos_pdf["fechas"]
+
+    trabajos = []
+    for fecha in fechas:
+        if fecha not in reportes:
+            continue
+        # A cada worker le llega solo la parte del PDF de su fecha
+        datos_fecha = {
+            "fechas": fechas,
+            "apuestas_por_fecha": {fecha: datos_pdf["apuestas_por_fecha"].get(fecha, {})},
+            "resumen_por_fecha": {fecha: datos_pdf["resumen_por_fecha"].get(fecha, {})},
+        }
+        trabajos.append((fecha, reportes[fecha], datos_fecha))
+
+    import time
+
+    plan = None
+    if trabajos:
+        max_procesos, plan = _procesos_para_reportes([t[1] for t in trabajos], max_procesos, "palermo")
+    inicio = time.perf_counter()
+    trabajo_s = None
+    if not trabajos or max_procesos == 1:
+        # Reportes dentro de archivos comprimidos: se descomprimen todos a la vez
+        _precargar_miembros([t[1] for t in trabajos])
+        resultados = [_comparar_palermo_fecha(t) for t in trabajos]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+            pares = list(_resultados_con_metricas(
+                pool.map(partial(_con_metricas, partial(_con_tiempo, _comparar_palermo_fecha)), trabajos)
+            ))
+        resultados = [r for r, _ in pares]
+        trabajo_s = sum(segundos for _, segundos in pares)
+    if plan is not None:
+        registrar_plan(plan, time.perf_counter() - inicio, trabajo_s)
+
+    por_fecha = {}
+    for fecha, coincide, diferencias in resultados:
+        ilegibles = [r.mensaje for r in _registros_ilegibles_palermo(ruta_pdf_palermo, fecha)]
+        por_fecha[fecha] = {
+            "reporte": reportes[fecha],
+            "coincide": coincide and not ilegibles,
+            "diferencias": ilegibles + diferencias,
+        }
+
+    sin_reporte = [f for f in fechas if f not in reportes]
+    return {
+        "coincide_todo": bool(por_fecha) and not sin_reporte and all(r["coincide"] for r in por_fecha.values()),
+        "fechas": fechas,
+        "por_fecha": por_fecha,
+        "sin_reporte": sin_reporte,
+    }
+
+
+def _cli_palermo_todas(args):
+    fechas = indexar_fechas_palermo(args.pdf)["fechas"]
+    asociacion = asociar_reportes_palermo(fechas, directorio=args.directorio, manifiesto=args.manifiesto)
+    for fecha, candidatos in asociacion["ambiguas"].items():
+        print(f"Fecha {fecha}: más de un reporte posible ({', '.join(candidatos)}); se omite.")
+
+    resultado = comparar_palermo_todas_las_fechas(args.pdf, asociacion["reportes"], max_procesos=args.procesos)
+    for fecha in resultado["fechas"]:
+        info = resultado["por_fecha"].get(fecha)
+        if info is None:
+            if fecha not in asociacion["ambiguas"]:
+                print(f"Fecha {fecha}: sin reporte asociado.")
+            continue
+        if info["coincide"]:
+            print(f"Fecha {fecha}: todo coincide ({info['reporte']}).")
+        else:
+            print(f"Fecha {fecha}: se encontraron diferencias ({info['reporte']}):")
+            for d in info["diferencias"]:
+                print(f"  - {d}")
+    if resultado["sin_reporte"]:
+        print(f"Fechas sin verificar: {', '.join(resultado['sin_reporte'])}.")
+    return 0 if resultado["coincide_todo"] else 1
+
+
+# Detección automática del formato: con mirar las primeras páginas del PDF (o
+# el encabezado del reporte) alcanza para saber qué extractor corresponde, sin
+# que el operador tenga que elegir el hipódromo.
+#   - San Isidro (y La Plata): encabezados "1ª - Premio ... - 14:05 hs." y
+#     montos "Exacta $ 1000" sueltos.
+#   - Palermo: filas "EXACTA ($ 1000.-) ..." con el monto entre paréntesis y
+#     fechas dd/mm/aaaa.
+_PAGINAS_DETECCION = 2
+_CONFIANZA_MINIMA = 0.5
+_PATRON_MONTO_PARENTESIS = re.compile(r"\(\s*\$\s*[\d.,]+")
+_PATRON_MONTO_SUELTO = re.compile(r"(?<!\()\$\s*[\d.,]+")
+_PATRON_HIPODROMO_REPORTE = re.compile(r"\b(SAN\s+ISIDRO|PALERMO|LA\s+PLATA)\b", re.IGNORECASE)
+
+
+def _indicios_programa(textos):
+    """Puntaje {formato: puntos} de los textos de las primeras páginas de un programa."""
+    texto = "\n".join(textos)
+    sin_parentesis = _PATRON_MONTO_PARENTESIS.sub("", texto)
+    return {
+        "san_isidro": 3 * len(_PATRON_CARRERA_PDF.findall(texto)) + len(_PATRON_MONTO_SUELTO.findall(sin_parentesis)),
+        "palermo": 2 * len(_PATRON_MONTO_PARENTESIS.findall(texto)) + len(_PATRON_FECHA_PALERMO.findall(texto)),
+    }
+
+
+def _indicios_reporte(contenido):
+    """
+    Puntaje {formato: puntos} de un reporte. El formato del reporte es el mismo
+    para los dos hipódromos, así que solo el nombre del hipódromo en el
+    encabezado es un indicio fuerte; las líneas de carrera (que Palermo no usa)
+    o un reporte con solo la tabla RSM son indicios débiles.
+    """
+    indicios = {"san_isidro": 0, "palermo": 0}
+    encabezado = "\n".join(contenido.splitlines()[:5])
+    for nombre in _PATRON_HIPODROMO_REPORTE.findall(encabezado):
+        indicios["palermo" if nombre.upper() == "PALERMO" else "san_isidro"] += 6
+    if _PATRON_CARRERA_REPORTE.search(contenido):
+        indicios["san_isidro"] += 2
+    elif _seccion_rsm(contenido):
+        indicios["palermo"] += 2
+    return indicios
+
+
+def _confianza_indicios(indicios):
+    """(formato, confianza 0-1): proporción del puntaje ganador, atenuada si hay pocos indicios."""
+    total = sum(indicios.values())
+    if not total:
+        return None, 0.0
+    formato = max(indicios, key=indicios.get)
+    return formato, round(indicios[formato] / total * min(1.0, total / 6), 2)
+
+
+def _primeras_paginas(reader, cantidad):
+    """
+    Las primeras `cantidad` páginas recorriendo el árbol /Pages directamente.
+    reader.pages arma la lista de todas las páginas antes de devolver la
+    primera, lo que en un boletín de cientos de páginas se lleva casi todo el
+    tiempo de la detección. Los atributos heredados (/Resources) se copian a la
+    página, como hace pypdf.
+    """
+    pypdf = _importar_pypdf()
+    paginas = []
+    pendientes = [(reader.trailer["/Root"]["/Pages"], {})]
+    while pendientes and len(paginas) < cantidad:
+        nodo, heredados = pendientes.pop()
+        referencia = nodo.indirect_reference if hasattr(nodo, "indirect_reference") else None
+        nodo = nodo.get_object()
+        if nodo.get("/Type") == "/Pages" or "/Kids" in nodo:
+            heredados = dict(heredados)
+            for clave in ("/Resources", "/MediaBox", "/CropBox", "/Rotate"):
+                if clave in nodo:
+                    heredados[clave] = nodo[clave]
+            pendientes.extend((hijo, heredados) for hijo in reversed(nodo["/Kids"]))
+            continue
+        pagina = pypdf.PageObject(reader, referencia)
+        pagina.update(heredados)
+        pagina.update(nodo)
+        paginas.append(pagina)
+    return paginas
+
+
+def detectar_formato(ruta):
+    """
+    Reconoce si un programa o reporte es de San Isidro o de Palermo mirando solo
+    las primeras páginas (_PAGINAS_DETECCION) o el encabezado del reporte. Tarda
+    milisegundos: usa la lectura directa de los operadores de texto
+    (_lineas_texto_simple) y solo recurre a la extracción completa, que queda en
+    caché, en páginas con fuentes compuestas.
+
+    Retorna
+    -------
+    dict
+        - "tipo": "programa", "paquete" o "reporte"
+        - "formato": "san_isidro", "palermo" o None (sin indicios)
+        - "confianza": float entre 0 y 1
+        - "indicios": {formato: puntaje}
+    """
+    extension = extension_logica(ruta) if isinstance(ruta, str) else ".pdf"
+    if es_paquete(ruta):
+        tipo = _leer_bytes(ruta)[len(_MAGIA_PAQUETE) + 1]
+        formato = _TIPOS_PAQUETE.get(tipo)
+        return {"tipo": "paquete", "formato": formato, "confianza": 1.0 if formato else 0.0, "indicios": {}}
+
+    if extension == ".txt":
+        indicios = _indicios_reporte(_leer_reporte(ruta))
+        tipo = "reporte"
+    else:
+        pypdf = _importar_pypdf()
+        contenido = _leer_bytes(ruta)
+        reader = pypdf.PdfReader(io.BytesIO(contenido))
+        textos = []
+        paginas_completas = []
+        for num_pagina, pagina in enumerate(_primeras_paginas(reader, _PAGINAS_DETECCION), start=1):
+            lineas = _lineas_texto_simple(pagina)
+            if lineas is None:
+                paginas_completas.append(num_pagina)
+            else:
+                textos.append("\n".join(lineas))
+        if paginas_completas:
+            textos.extend(p["texto"] for p in _iterar_paginas_pdf(io.BytesIO(contenido), paginas=paginas_completas))
+        indicios = _indicios_programa(textos)
+        tipo = "programa"
+
+    formato, confianza = _confianza_indicios(indicios)
+    return {"tipo": tipo, "formato": formato, "confianza": confianza, "indicios": indicios}
+
+
+def detectar_hipodromo(ruta_pdf, ruta_reporte=None):
+    """
+    Formato a usar para comparar un programa con un reporte: manda el programa;
+    el reporte (si se indica) sube la confianza cuando coincide y la baja cuando no.
+
+    Retorna
+    -------
+    tuple[str | None, float]
+        (formato, confianza)
+    """
+    programa = detectar_formato(ruta_pdf)
+    formato, confianza = programa["formato"], programa["confianza"]
+    if ruta_reporte is None or ruta_reporte == "-":
+        return formato, confianza
+    reporte = detectar_formato(ruta_reporte)
+    if reporte["formato"] is None:
+        return formato, confianza
+    if formato is None:
+        return reporte["formato"], reporte["confianza"]
+    if reporte["formato"] == formato:
+        return formato, round(1 - (1 - confianza) * (1 - reporte["confianza"]), 2)
+    return formato, round(confianza * (1 - reporte["confianza"]), 2)
+
+
+def _es_programa_palermo(ruta_pdf):
+    """True si la detección reconoce el PDF como programa de Palermo con confianza suficiente."""
+    try:
+        deteccion = detectar_formato(ruta_pdf)
+    except Exception:
+        return False
+    return deteccion["formato"] == "palermo" and deteccion["confianza"] >= _CONFIANZA_MINIMA
+
+
+# PDF combinado con varias reuniones seguidas (por ejemplo San Isidro y después
+# Palermo en un mismo archivo): se extrae una sola vez y cada página va al
+# parser de su tramo. Un tramo nuevo empieza cuando cambia el formato de las
+# páginas (ver _indicios_programa), cuando el encabezado nombra otro hipódromo
+# o, en el formato de San Isidro, cuando la numeración de carreras vuelve a 1.
+# Las páginas sin indicios (tapas, tablas de performances) quedan en el tramo
+# en curso.
+def _formato_pagina(texto):
+    """Formato de una página según sus indicios, o None si no tiene ninguno."""
+    indicios = _indicios_programa([texto])
+    if not any(indicios.values()):
+        return None
+    return max(indicios, key=indicios.get)
+
+
+def _hipodromo_en_encabezado(texto):
+    """Nombre del hipódromo en las primeras líneas de la página ("San Isidro", "Palermo", "La Plata") o None."""
+    m = _PATRON_HIPODROMO_REPORTE.search("\n".join(texto.splitlines()[:5]))
+    if m is None:
+        return None
+    return " ".join(m.group(1).split()).title()
+
+
+def leer_programa_combinado(ruta_pdf):
+    """
+    Recorre una vez un PDF con varias reuniones y devuelve los datos de cada
+    tramo, parseados con el parser que corresponde a su formato.
+
+    Retorna
+    -------
+    list[dict]
+        Un dict por tramo, en orden:
+        - "hipodromo": nombre leído del encabezado, o None
+        - "formato": "san_isidro" o "palermo"
+        - "paginas": list[int] páginas del tramo (1-based)
+        - "datos": como _normalizar_pdf (San Isidro) o _leer_palermo_desde_pdf (Palermo)
+    """
+    tramos = []
+    actual = None
+    pendientes_iniciales = []  # (página, texto) sin indicios antes del primer tramo
+    for p in _iterar_paginas_pdf(ruta_pdf):
+        texto = p["texto"]
+        formato = _formato_pagina(texto)
+        hipodromo = _hipodromo_en_encabezado(texto)
+        m = _PATRON_CARRERA_PDF.search(texto) if formato == "san_isidro" else None
+        carrera = int(m.group(1)) if m else None
+
+        nuevo = actual is None and formato is not None
+        if actual is not None:
+            if formato is not None and formato != actual["formato"]:
+                nuevo = True
+            elif hipodromo is not None and actual["hipodromo"] is not None and hipodromo != actual["hipodromo"]:
+                nuevo = True
+            elif carrera == 1 and actual["ultima_carrera"] > 1:
+                nuevo = True
+        if nuevo:
+            actual = {
+                "hipodromo": hipodromo,
+                "formato": formato,
+                "paginas": [],
+                "textos": [],
+                "ultima_carrera": 0,
+            }
+            tramos.append(actual)
+            # Páginas sin indicios antes del primer tramo (tapa): van con el primero
+            if len(tramos) == 1 and pendientes_iniciales:
+                actual["paginas"].extend(n for n, _ in pendientes_iniciales)
+                actual["textos"].extend(t for _, t in pendientes_iniciales)
+        if actual is None:
+            pendientes_iniciales.append((p["pagina"], texto))
+            continue
+        if actual["hipodromo"] is None:
+            actual["hipodromo"] = hipodromo
+        if carrera is not None:
+            actual["ultima_carrera"] = carrera
+        actual["paginas"].append(p["pagina"])
+        actual["textos"].append(texto)
+
+    resultado = []
+    for tramo in tramos:
+        if tramo["formato"] == "palermo":
+            datos = _palermo_desde_textos(tramo["textos"])
+        else:
+            datos = _normalizar_desde_lista_apuestas(_apuestas_desde_textos(tramo["textos"]))
+        resultado.append({
+            "hipodromo": tramo["hipodromo"],
+            "formato": tramo["formato"],
+            "paginas": tramo["paginas"],
+            "datos": datos,
+        })
+    return resultado
+
+
+def _fecha_palermo_para_reporte(ruta_reporte, fechas):
+    """Fecha del tramo de Palermo que corresponde al reporte: la de su nombre, o la única del tramo."""
+    nombre = os.path.basename(ruta_reporte.split(_SEPARADOR_MIEMBRO)[-1])
+    fecha_nombre = _fecha_en_nombre(nombre)
+    if fecha_nombre is not None:
+        for fecha in fechas:
+            if _fecha_iso_palermo(fecha) == "%04d-%02d-%02d" % fecha_nombre:
+                return fecha
+    return fechas[0] if len(fechas) == 1 else None
+
+
+def _hipodromo_de_reporte(ruta_reporte):
+    """Hipódromo nombrado en el encabezado del reporte ("San Isidro", "Palermo", "La Plata") o None."""
+    return _hipodromo_en_encabezado(_leer_reporte(ruta_reporte))
+
+
+def comparar_programa_combinado(ruta_pdf, rutas_reportes, tramos=None):
+    """
+    Compara cada reporte contra el tramo del PDF combinado que le corresponde.
+    Los candidatos son los tramos con carreras en común con el reporte; si el
+    encabezado del reporte nombra un hipódromo, quedan los tramos de ese
+    hipódromo, y en los de Palermo, los que tienen la fecha del reporte (la de
+    su nombre, o la única del tramo). Si queda más de un candidato el reporte
+    no se compara y se informa como ambiguo: elegir el tramo con menos
+    diferencias escondería las diferencias reales.
+
+    Parámetros
+    ----------
+    ruta_pdf : str
+        PDF combinado.
+    rutas_reportes : list[str]
+        Reportes, uno por reunión (en cualquier orden).
+    tramos : list[dict], optional
+        Resultado de leer_programa_combinado, si ya se leyó el PDF.
+
+    Retorna
+    -------
+    list[dict]
+        Uno por reporte, en el orden recibido: "reporte", "tramo" (índice o
+        None si no hay un único tramo), "candidatos" (índices de los tramos
+        posibles; más de uno si es ambiguo), "hipodromo", "formato", "paginas",
+        "fecha" (Palermo) y "registros" (list[Diferencia], con las páginas
+        ilegibles del tramo primero).
+    """
+    if tramos is None:
+        tramos = leer_programa_combinado(ruta_pdf)
+    resultados = []
+    for ruta_reporte in rutas_reportes:
+        hipodromo = _hipodromo_de_reporte(ruta_reporte)
+        reportes = {}
+        candidatos = []
+        for indice, tramo in enumerate(tramos):
+            formato = tramo["formato"]
+            if formato not in reportes:
+                reportes[formato] = (
+                    _normalizar_reporte_palermo(ruta_reporte) if formato == "palermo" else _normalizar_reporte(ruta_reporte)
+                )
+            datos_reporte = reportes[formato]
+            fecha = None
+            if formato == "palermo":
+                fecha = _fecha_palermo_para_reporte(ruta_reporte, tramo["datos"]["fechas"])
+                if fecha is None:
+                    # Sin fecha no se sabe contra qué tarjeta del tramo comparar
+                    continue
+                datos_pdf = _apuestas_palermo_para_fecha(tramo["datos"], fecha, datos_reporte)
+            else:
+                datos_pdf = tramo["datos"]
+            # Un reporte sin carreras en común con el tramo no es de esa reunión
+            if not set(datos_pdf) & set(datos_reporte):
+                continue
+            candidatos.append((indice, fecha, datos_pdf, datos_reporte))
+        if hipodromo is not None:
+            candidatos = [c for c in candidatos if tramos[c[0]]["hipodromo"] == hipodromo] or [
+                c for c in candidatos if tramos[c[0]]["hipodromo"] is None
+            ]
+        if len(candidatos) != 1:
+            resultados.append({
+                "reporte": ruta_reporte, "tramo": None, "candidatos": [c[0] for c in candidatos],
+                "hipodromo": None, "formato": None, "paginas": [], "fecha": None, "registros": [],
+            })
+            continue
+        indice, fecha, datos_pdf, datos_reporte = candidatos[0]
+        tramo = tramos[indice]
+        formato = tramo["formato"]
+        _contar("carreras_comparaciones_total", formato)
+        registros = list(_registros_paginas_ilegibles(ruta_pdf, paginas=tramo["paginas"], hipodromo=formato))
+        registros.extend(iterar_diferencias(datos_pdf, datos_reporte, palermo=formato == "palermo"))
+        resultados.append({
+            "reporte": ruta_reporte,
+            "tramo": indice,
+            "candidatos": [indice],
+            "hipodromo": tramo["hipodromo"],
+            "formato": formato,
+            "paginas": tramo["paginas"],
+            "fecha": fecha,
+            "registros": registros,
+        })
+    return resultados
+
+
+def _rango_paginas(paginas):
+    return f"{paginas[0]}-{paginas[-1]}" if len(paginas) > 1 else str(paginas[0]) if paginas else "-"
+
+
+def _cli_combinado(args):
+    tramos = leer_programa_combinado(args.pdf)
+    print(f"{len(tramos)} reuniones en {args.pdf}:")
+    for i, tramo in enumerate(tramos, start=1):
+        cantidad = len(tramo["datos"]) if tramo["formato"] == "san_isidro" else len(tramo["datos"]["fechas"])
+        detalle = f"{cantidad} carreras" if tramo["formato"] == "san_isidro" else f"fechas {', '.join(tramo['datos']['fechas'])}"
+        print(
+            f"  {i}. {tramo['hipodromo'] or '(sin nombre)'} - formato {tramo['formato']} - "
+            f"páginas {_rango_paginas(tramo['paginas'])} - {detalle}"
+        )
+    if not args.reportes:
+        return 0
+
+    hay_diferencias = False
+    for r in comparar_programa_combinado(args.pdf, args.reportes, tramos=tramos):
+        if r["tramo"] is None:
+            if r["candidatos"]:
+                reuniones = ", ".join(str(i + 1) for i in r["candidatos"])
+                print(
+                    f"\n{r['reporte']}: puede ser de más de una reunión ({reuniones}); no se compara. "
+                    "Indique el hipódromo en el encabezado o la fecha en el nombre del reporte."
+                )
+            else:
+                print(f"\n{r['reporte']}: ninguna reunión del PDF tiene carreras en común con el reporte.")
+            hay_diferencias = True
+            continue
+        fecha = f", fecha {r['fecha']}" if r["fecha"] else ""
+        print(f"\n{r['reporte']} -> reunión {r['tramo'] + 1} ({r['hipodromo'] or r['formato']}{fecha}):")
+        mensajes = list(_mensajes_diferencias(r["registros"]))
+        if not mensajes:
+            print("  todo coincide.")
+        for mensaje in mensajes:
+            print(f"  - {mensaje}")
+        hay_diferencias = hay_diferencias or bool(mensajes)
+    return 1 if hay_diferencias else 0
+
+
+# Compuerta (go/no-go) antes de abrir las apuestas: solo importa si el reporte
+# coincide con el programa, no la lista completa de diferencias. Se parsea el
+# reporte (lo barato) y después el PDF de San Isidro carrera por carrera, en
+# orden: cada carrera se verifica apenas se leyeron todas sus páginas (al
+# aparecer la siguiente) y la primera diferencia corta la lectura. En cada
+# carrera se mira primero lo más barato (presencia, caballos, apuestas
+# disponibles) y al final los montos, en el orden de _registros_carrera. Los
+# programas de Palermo y los paquetes .cprg se leen enteros y se revisan en el
+# mismo orden. El plazo se controla entre página y página; en la línea de
+# comandos, además, se corta el proceso si una página sola se come el plazo.
+_PLAZO_COMPUERTA_S = 30  # por defecto; CARRERAS_PLAZO_COMPUERTA lo cambia (ver _numero_entorno)
+
+# Códigos de salida del comando compuerta (2 queda para los errores de argumentos)
+SALIDAS_COMPUERTA = {"coincide": 0, "difiere": 1, "sin_decision": 3}
+
+
+class PlazoVencido(Exception):
+    """Se agotó el plazo de la compuerta."""
+
+
+def _carreras_en_orden(textos):
+    """
+    Genera (num_carrera, info) de cada carrera de un programa de San Isidro
+    apenas se leyeron todas sus páginas (al aparecer otra carrera o al
+    terminar), con la estructura de _normalizar_pdf. Supone, como en los
+    programas oficiales, que las páginas de una carrera van seguidas.
+    """
+    actual = None
+    paginas = []
+    for texto in textos:
+        m_carrera = _PATRON_CARRERA_PDF.search(texto)
+        if not m_carrera:
+            continue
+        num_carrera = int(m_carrera.group(1))
+        if num_carrera != actual and paginas:
+            yield from _normalizar_desde_lista_apuestas(_apuestas_desde_textos(paginas)).items()
+            paginas = []
+        actual = num_carrera
+        paginas.append(texto)
+    if paginas:
+        yield from _normalizar_desde_lista_apuestas(_apuestas_desde_textos(paginas)).items()
+
+
+def _primera_diferencia(datos_pdf, datos_reporte, palermo=False):
+    """
+    Primera diferencia (Diferencia) entre datos ya normalizados, o None si
+    coinciden: primero qué carreras están en un solo lado y después, carrera
+    por carrera, lo mismo que iterar_diferencias.
+    """
+    registros_carrera = _registros_carrera_palermo if palermo else _registros_carrera
+    sueltas = sorted(set(datos_pdf) ^ set(datos_reporte))
+    if sueltas:
+        num_carrera = sueltas[0]
+        return next(registros_carrera(num_carrera, datos_pdf.get(num_carrera), datos_reporte.get(num_carrera)))
+    return next(iterar_diferencias(datos_pdf, datos_reporte, palermo=palermo), None)
+
+
+def verificar_compuerta(ruta_pdf, ruta_reporte, palermo=None, fecha=None, plazo_s=None):
+    """
+    Go/no-go: ¿el reporte coincide con el programa? Se detiene en la primera
+    diferencia confirmada; el detalle completo sigue disponible con
+    comparar_pdf_y_reporte / comparar_palermo.
+
+    Parámetros
+    ----------
+    ruta_pdf, ruta_reporte : str
+        Programa (PDF o paquete .cprg) y reporte.
+    palermo : bool, optional
+        Formato del programa; por defecto se detecta (ver detectar_formato).
+    fecha : str, optional
+        Fecha del PDF de Palermo a verificar. Por defecto, la del nombre del
+        reporte o la única del PDF; si no se puede saber, el resultado es
+        "sin_decision" (mezclar las tarjetas de varias fechas no es una
+        verificación).
+    plazo_s : float, optional
+        Segundos máximos; vencidos, el resultado es "sin_decision".
+
+    Retorna
+    -------
+    dict
+        - "resultado": "coincide", "difiere" o "sin_decision" (ver SALIDAS_COMPUERTA)
+        - "diferencia": la primera Diferencia encontrada (None si no difiere)
+        - "motivo": por qué no hubo decisión (None si la hubo)
+        - "carreras": cantidad de carreras verificadas
+        - "fecha": fecha de Palermo verificada (None en San Isidro)
+        - "segundos": lo que tardó
+    """
+    import time
+
+    inicio = time.monotonic()
+    limite = inicio + plazo_s if plazo_s is not None else None
+    verificadas = set()
+
+    def _vigilar(*_):
+        if limite is not None and time.monotonic() > limite:
+            raise PlazoVencido()
+
+    def _resultado(resultado, diferencia=None, motivo=None):
+        _contar("carreras_compuertas_total", resultado)
+        return {
+            "resultado": resultado,
+            "diferencia": diferencia,
+            "motivo": motivo,
+            "carreras": len(verificadas),
+            "fecha": fecha if palermo else None,
+            "segundos": time.monotonic() - inicio,
+        }
+
+    if palermo is None:
+        palermo = _es_programa_palermo(ruta_pdf)
+    paginas = None
+    try:
+        if palermo:
+            if fecha is None:
+                fechas = indexar_fechas_palermo(ruta_pdf)["fechas"]
+                fecha = _fecha_palermo_para_reporte(ruta_reporte, fechas)
+                if fecha is None and fechas:
+                    return _resultado(
+                        "sin_decision",
+                        motivo=f"el PDF tiene {len(fechas)} fechas ({', '.join(fechas)}) y no se sabe cuál "
+                               "corresponde al reporte; indique --fecha",
+                    )
+            datos_reporte = _normalizar_reporte_palermo(ruta_reporte)
+            _vigilar()
+            datos_pdf = _leer_palermo_desde_pdf(ruta_pdf, fecha=fecha, progreso=_vigilar)
+            apuestas_pdf = _apuestas_palermo_para_fecha(datos_pdf, fecha, datos_reporte)
+            verificadas.update(apuestas_pdf, datos_reporte)
+            diferencia = _primera_diferencia(apuestas_pdf, datos_reporte, palermo=True)
+            ilegibles = list(_registros_ilegibles_palermo(ruta_pdf, fecha))
+        elif es_paquete(ruta_pdf):
+            datos_reporte = _normalizar_reporte(ruta_reporte)
+            datos_pdf = _normalizar_pdf(ruta_pdf)
+            verificadas.update(datos_pdf, datos_reporte)
+            diferencia = _primera_diferencia(datos_pdf, datos_reporte)
+            ilegibles = []
+        else:
+            datos_reporte = _normalizar_reporte(ruta_reporte)
+            _vigilar()
+            paginas = _iterar_paginas_pdf(ruta_pdf, regiones=True, hipodromo="san_isidro")
+            diferencia = None
+            for num_carrera, info in _carreras_en_orden(_con_progreso((p["texto"] for p in paginas), None, _vigilar)):
+                verificadas.add(num_carrera)
+                diferencia = next(_registros_carrera(num_carrera, info, datos_reporte.get(num_carrera)), None)
+                if diferencia is not None:
+                    break
+            else:
+                # Recién al terminar el PDF se sabe qué carreras del reporte no están
+                faltantes = sorted(set(datos_reporte) - verificadas)
+                if faltantes:
+                    verificadas.add(faltantes[0])
+                    diferencia = next(_registros_carrera(faltantes[0], None, datos_reporte[faltantes[0]]))
+            ilegibles = list(_registros_paginas_ilegibles(ruta_pdf))
+    except PlazoVencido:
+        return _resultado("sin_decision", motivo=f"se agotó el plazo de {plazo_s:g} s")
+    finally:
+        if paginas is not None:
+            paginas.close()
+
+    _contar("carreras_comparaciones_total", "palermo" if palermo else "san_isidro")
+    if diferencia is not None:
+        return _resultado("difiere", diferencia=diferencia)
+    if ilegibles:
+        return _resultado("sin_decision", motivo=ilegibles[0].mensaje)
+    return _resultado("coincide")
+
+
+def _cli_compuerta(args):
+    import sys
+    import threading
+
+    plazo = args.plazo if args.plazo is not None else _numero_entorno("CARRERAS_PLAZO_COMPUERTA", defecto=_PLAZO_COMPUERTA_S)
+    salida = {}
+
+    def _verificar():
+        try:
+            palermo = _resolver_palermo(args, args.pdf, args.reporte)
+            salida.update(verificar_compuerta(args.pdf, args.reporte, palermo=palermo, fecha=args.fecha, plazo_s=plazo))
+        except Exception as e:
+            salida.update(resultado="sin_decision", motivo=f"{type(e).__name__}: {e}")
+
+    # El plazo se controla entre páginas; si una página sola lo supera, se
+    # corta el proceso acá mismo (el hilo no se puede interrumpir).
+    hilo = threading.Thread(target=_verificar, daemon=True)
+    hilo.start()
+    hilo.join(plazo)
+    if hilo.is_alive():
+        print(f"SIN DECISIÓN: se agotó el plazo de {plazo:g} s.")
+        sys.stdout.flush()
+        escribir_metricas()
+        os._exit(SALIDAS_COMPUERTA["sin_decision"])
+
+    if salida["resultado"] == "coincide":
+        print(f"OK: el reporte coincide con el programa ({salida['carreras']} carreras, {salida['segundos']:.2f} s).")
+    elif salida["resultado"] == "difiere":
+        print(f"DIFERENCIA: {salida['diferencia'].mensaje}")
+        detalle = " --palermo" if args.palermo else ""
+        if salida.get("fecha"):
+            detalle += f" --fecha {salida['fecha']}"
+        print(f"  Detalle completo: carreras_desde_pdf comparar{detalle} {args.pdf} {args.reporte}")
+    else:
+        print(f"SIN DECISIÓN: {salida['motivo']}.")
+    return SALIDAS_COMPUERTA[salida["resultado"]]
+
+
+# Un programa contra varios reportes (por ejemplo, los de distintas terminales
+# o sistemas): el PDF se parsea una sola vez y cada reporte se parsea y se
+# compara con esos datos en un pool de procesos. El resultado incluye una
+# matriz con qué reporte difiere del programa en qué carrera y apuesta.
+_BYTES_REPORTES_POR_PROCESO = 2 * 2**20
+
+# Abreviaturas de los tipos de diferencia para las celdas de la matriz
+_ABREVIATURAS_DIFERENCIA = {
+    DIF_CARRERA_FALTANTE: "CARR",
+    DIF_APUESTA_SOBRANTE: "SOBRA",
+    DIF_APUESTA_FALTANTE: "FALTA",
+    DIF_VALOR_DISTINTO: "MONTO",
+    DIF_VALOR_NULL: "NULL",
+    DIF_CANTIDAD_CABALLOS: "CAB",
+}
+
+
+def _tamanio_origen(ruta):
+    """Tamaño en bytes del contenido de una ruta (descomprimido si es un miembro de .zip/.gz)."""
+    if _partes_miembro(ruta) is not None:
+        return len(_leer_bytes(ruta))
+    return os.path.getsize(ruta)
+
+
+def _procesos_para_reportes(rutas_reportes, max_procesos=None, hipodromo=None):
+    """
+    Procesos a usar para parsear `rutas_reportes`, como (procesos, plan): como
+    máximo uno por reporte y, sin max_procesos, lo que prevea el planificador
+    para esos bytes de reportes (el plan se registra con registrar_plan al
+    terminar). Con el planificador desactivado, uno por núcleo pero no más de
+    uno cada _BYTES_REPORTES_POR_PROCESO (arrancar un proceso tarda más que
+    parsear un reporte chico); en ese caso y con max_procesos, plan es None.
+    """
+    plan = None
+    if max_procesos is None:
+        total = sum(_tamanio_origen(r) for r in rutas_reportes)
+        if _PLANIFICADOR_ACTIVO:
+            plan = planificar("reportes", total, hipodromo, max_procesos=len(rutas_reportes))
+            max_procesos = plan["procesos"]
+        else:
+            max_procesos = min(_procesos_disponibles(), -(-total // _BYTES_REPORTES_POR_PROCESO))
+    return max(1, min(max_procesos, len(rutas_reportes))), plan
+
+
+def _comparar_reporte_con_programa(trabajo):
+    """Tarea de un worker: (ruta_reporte, palermo, fecha, datos_pdf) -> list[Diferencia]."""
+    ruta_reporte, palermo, fecha, datos_pdf = trabajo
+    if palermo:
+        datos_reporte = _normalizar_reporte_palermo(ruta_reporte)
+        datos_pdf = _apuestas_palermo_para_fecha(datos_pdf, fecha, datos_reporte)
+    else:
+        datos_reporte = _normalizar_reporte(ruta_reporte)
+    _contar("carreras_comparaciones_total", "palermo" if palermo else "san_isidro")
+    return list(iterar_diferencias(datos_pdf, datos_reporte, palermo=palermo))
+
+
+def comparar_contra_reportes(ruta_pdf, rutas_reportes, palermo=None, fecha=None, max_procesos=None):
+    """
+    Compara un programa con varios reportes: el PDF se parsea una sola vez y los
+    reportes se parsean y se comparan en paralelo.
+
+    Parámetros
+    ----------
+    ruta_pdf : str
+        PDF o paquete .cprg del programa.
+    rutas_reportes : list[str]
+        Reportes a comparar (también miembros de .zip/.gz).
+    palermo : bool, optional
+        Formato del programa; por defecto se detecta (ver detectar_formato).
+    fecha : str, optional
+        Palermo: fecha a comparar con todos los reportes. Por defecto, la que
+        figura en el nombre de cada reporte, o la única del PDF; un reporte sin
+        fecha en un PDF con varias no se compara (queda con "sin_fecha").
+    max_procesos : int, optional
+        Procesos en paralelo (por defecto, los que prevea el planificador según
+        el tamaño de los reportes). Con 1 se compara en serie.
+
+    Retorna
+    -------
+    dict
+        - "formato": "san_isidro" o "palermo"
+        - "reportes": uno por reporte, en el orden recibido: {"reporte", "fecha"
+          (Palermo), "sin_fecha" (True si no se pudo asociar a una fecha del PDF
+          y por eso no se comparó), "coincide", "registros" (list[Diferencia],
+          con las páginas ilegibles que lo afectan)}
+        - "matriz": [{"carrera", "apuesta", "tipos"}, ...] una fila por carrera
+          y apuesta en la que al menos un reporte difiere; "tipos" tiene, por
+          reporte y en el mismo orden, el tipo de diferencia (DIF_*) o None si
+          ese reporte coincide con el programa
+        - "coincide_todo": bool
+    """
+    if palermo is None:
+        palermo = _es_programa_palermo(ruta_pdf)
+    formato = "palermo" if palermo else "san_isidro"
+
+    if palermo:
+        datos_pdf = _leer_palermo_desde_pdf(ruta_pdf)
+        fechas_reportes = [
+            fecha if fecha is not None else _fecha_palermo_para_reporte(r, datos_pdf["fechas"])
+            for r in rutas_reportes
+        ]
+    else:
+        datos_pdf = _normalizar_pdf(ruta_pdf)
+        fechas_reportes = [None] * len(rutas_reportes)
+
+    trabajos = []
+    for ruta_reporte, fecha_reporte in zip(rutas_reportes, fechas_reportes):
+        datos = datos_pdf
+        if palermo:
+            if fecha_reporte is None:
+                # Sin fecha no se sabe contra qué tarjeta comparar (como la fila
+                # "sin fecha" de la ventana): mezclar todas las fechas no sirve
+                continue
+            # A cada worker le llega solo la parte del PDF de su fecha
+            datos = {
+                "fechas": datos_pdf["fechas"],
+                "apuestas_por_fecha": {fecha_reporte: datos_pdf["apuestas_por_fecha"].get(fecha_reporte, {})},
+                "resumen_por_fecha": {fecha_reporte: datos_pdf["resumen_por_fecha"].get(fecha_reporte, {})},
+            }
+        trabajos.append((ruta_reporte, palermo, fecha_reporte, datos))
+
+    import time
+
+    # Reportes dentro de archivos comprimidos: se descomprimen todos a la vez
+    _precargar_miembros([t[0] for t in trabajos])
+    max_procesos, plan = _procesos_para_reportes([t[0] for t in trabajos], max_procesos, formato) if trabajos else (1, None)
+    inicio = time.perf_counter()
+    trabajo_s = None
+    if max_procesos == 1:
+        resultados = [_comparar_reporte_con_programa(t) for t in trabajos]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+            pares = list(_resultados_con_metricas(
+                pool.map(partial(_con_metricas, partial(_con_tiempo, _comparar_reporte_con_programa)), trabajos)
+            ))
+        resultados = [r for r, _ in pares]
+        trabajo_s = sum(segundos for _, segundos in pares)
+    if plan is not None:
+        registrar_plan(plan, time.perf_counter() - inicio, trabajo_s)
+
+    por_reporte = []
+    celdas = {}  # {(carrera, apuesta): {índice del reporte: tipo}}
+    resultados = iter(resultados)
+    for indice, (ruta_reporte, fecha_reporte) in enumerate(zip(rutas_reportes, fechas_reportes)):
+        if palermo and fecha_reporte is None:
+            por_reporte.append({
+                "reporte": ruta_reporte, "fecha": None, "sin_fecha": True, "coincide": False, "registros": [],
+            })
+            continue
+        registros = next(resultados)
+        if palermo:
+            ilegibles = list(_registros_ilegibles_palermo(ruta_pdf, fecha_reporte))
+        else:
+            ilegibles = list(_registros_paginas_ilegibles(ruta_pdf))
+        for r in registros:
+            celdas.setdefault((r.carrera, r.apuesta), {}).setdefault(indice, r.tipo)
+        por_reporte.append({
+            "reporte": ruta_reporte,
+            "fecha": fecha_reporte,
+            "sin_fecha": False,
+            "coincide": not registros and not ilegibles,
+            "registros": ilegibles + registros,
+        })
+
+    matriz = [
+        {
+            "carrera": carrera,
+            "apuesta": apuesta,
+            "tipos": [celdas[(carrera, apuesta)].get(i) for i in range(len(rutas_reportes))],
+        }
+        for carrera, apuesta in sorted(celdas, key=lambda c: (c[0], c[1] or ""))
+    ]
+    return {
+        "formato": formato,
+        "reportes": por_reporte,
+        "matriz": matriz,
+        "coincide_todo": all(r["coincide"] for r in por_reporte),
+    }
+
+
+def _cli_matriz(args):
+    import sys
+
+    args.palermo = _resolver_palermo(args, args.pdf, args.reportes[0])
+    resultado = comparar_contra_reportes(
+        args.pdf, args.reportes, palermo=args.palermo, fecha=args.fecha, max_procesos=args.procesos,
+    )
+    nombres = [f"R{i}" for i in range(1, len(args.reportes) + 1)]
+    sin_fecha = [r["sin_fecha"] for r in resultado["reportes"]]
+
+    if args.formato == "csv":
+        import csv
+
+        escritor = csv.writer(sys.stdout)
+        escritor.writerow(["carrera", "apuesta"] + [r["reporte"] for r in resultado["reportes"]])
+        for fila in resultado["matriz"]:
+            escritor.writerow(
+                [fila["carrera"], fila["apuesta"] or ""]
+                + ["sin_fecha" if s else t or "" for t, s in zip(fila["tipos"], sin_fecha)]
+            )
+        return 0 if resultado["coincide_todo"] else 1
+
+    for nombre, r in zip(nombres, resultado["reportes"]):
+        fecha = f" (fecha {r['fecha']})" if r["fecha"] else ""
+        if r["sin_fecha"]:
+            estado = "sin fecha: no se comparó (indique --fecha)"
+        else:
+            estado = "todo coincide" if r["coincide"] else f"diferencias: {len(r['registros'])}"
+        print(f"{nombre}: {r['reporte']}{fecha} - {estado}")
+    ilegibles = {m.mensaje for r in resultado["reportes"] for m in r["registros"] if m.carrera is None}
+    for mensaje in sorted(ilegibles):
+        print(f"Aviso: {mensaje}")
+    if not resultado["matriz"]:
+        return 0 if resultado["coincide_todo"] else 1
+
+    anchos = [max(len(n), 5) for n in nombres]
+    print()
+    print(("Carrera  Apuesta  " + "  ".join(n.ljust(a) for n, a in zip(nombres, anchos))).rstrip())
+    for fila in resultado["matriz"]:
+        celdas = [
+            ("?" if s else _ABREVIATURAS_DIFERENCIA.get(t, t) if t else ".").ljust(a)
+            for t, s, a in zip(fila["tipos"], sin_fecha, anchos)
+        ]
+        print(f"{fila['carrera']:>7}  {(fila['apuesta'] or '-'):<7}  " + "  ".join(celdas).rstrip())
+    print()
+    leyenda = "  ".join(f"{a}={_ETIQUETAS_DIFERENCIA[t]}" for t, a in _ABREVIATURAS_DIFERENCIA.items()) + "  .=coincide"
+    print(leyenda + ("  ?=sin fecha" if any(sin_fecha) else ""))
+    return 0 if resultado["coincide_todo"] else 1
+
+
+# Revisión retroactiva de temporadas (backfill): recorre un árbol de archivos
+# con programas y reportes de años anteriores, los compara en un pool de
+# procesos y anota cada par terminado en un archivo de checkpoint, de modo que
+# una corrida interrumpida retoma donde quedó.
+#
+# Unidades de trabajo:
+#   - San Isidro: un PDF y un .txt de la misma carpeta con la misma fecha en el nombre.
+#   - Palermo (carpetas cuya ruta contiene "palermo", o PDF que detectar_formato
+#     reconoce como de Palermo): cada PDF con todos los reportes de su carpeta,
+#     asociados por fecha (asociar_reportes_palermo).
+_PATRONES_FECHA_NOMBRE = (
+    (re.compile(r"(?<!\d)(\d{4})[-_.](\d{2})[-_.](\d{2})(?!\d)"), (0, 1, 2)),
+    (re.compile(r"(?<!\d)(\d{2})[-_.](\d{2})[-_.](\d{4})(?!\d)"), (2, 1, 0)),
+    (re.compile(r"(?<!\d)((?:19|20)\d{2})(\d{2})(\d{2})(?!\d)"), (0, 1, 2)),
+    (re.compile(r"(?<!\d)(\d{2})(\d{2})(\d{4})(?!\d)"), (2, 1, 0)),
+    (re.compile(r"(?<!\d)(\d{2})(\d{2})(\d{2})(?!\d)"), (2, 1, 0)),
+)
+
+
+def _fecha_en_nombre(nombre):
+    """
+    Fecha (aaaa, mm, dd) contenida en un nombre de archivo, en cualquiera de las
+    formas de _variantes_fecha_en_nombre, o None si no hay ninguna válida.
+    """
+    import datetime
+
+    base = nombre[:-3] if nombre.lower().endswith(".gz") else nombre
+    base = os.path.splitext(base)[0]
+    for patron, orden in _PATRONES_FECHA_NOMBRE:
+        for m in patron.finditer(base):
+            anio, mes, dia = (int(m.group(i + 1)) for i in orden)
+            if anio < 100:
+                anio += 2000
+            try:
+                datetime.date(anio, mes, dia)
+            except ValueError:
+                continue
+            return anio, mes, dia
+    return None
+
+
+def _anio_de_fecha_palermo(fecha):
+    """'1/3/26' -> 2026; None si la fecha no tiene el formato esperado."""
+    try:
+        anio = int(fecha.rsplit("/", 1)[1])
+    except (IndexError, ValueError):
+        return None
+    return anio + 2000 if anio < 100 else anio
+
+
+def _firma_archivos(rutas):
+    """Identifica una unidad de trabajo por ruta, tamaño y fecha de modificación de sus archivos."""
+    partes = [__version__]
+    for ruta in rutas:
+        contenedor = ruta.split(_SEPARADOR_MIEMBRO, 1)[0]
+        st = os.stat(contenedor)
+        partes.append(f"{ruta}|{st.st_size}|{st.st_mtime_ns}")
+    return hashlib.sha256("\n".join(partes).encode("utf-8")).hexdigest()
+
+
+def _es_carpeta_palermo(directorio, raiz):
+    """Las carpetas de Palermo se reconocen por el nombre ("palermo" en la ruta, desde `raiz`)."""
+    return "palermo" in os.path.relpath(directorio, raiz).lower() or "palermo" in os.path.basename(
+        os.path.abspath(raiz)
+    ).lower()
+
+
+def descubrir_pares_backfill(raiz):
+    """
+    Recorre `raiz` y arma las unidades de trabajo del backfill.
+
+    Retorna
+    -------
+    tuple[list[dict], list[str]]
+        (trabajos, avisos). Cada trabajo es un dict con "id", "hipodromo", "pdf",
+        "reporte" (San Isidro) o "directorio" (Palermo), "anio" y "tamaño" (bytes,
+        para repartir primero los más pesados). Los avisos describen archivos que
+        no se pudieron emparejar.
+
+    El id de un programa de Palermo incluye todos los reportes de su carpeta
+    (los candidatos de asociar_reportes_palermo): agregar o corregir un reporte
+    hace que la unidad se vuelva a comparar.
+    """
+    trabajos = []
+    avisos = []
+    for directorio, subdirectorios, nombres in os.walk(raiz):
+        subdirectorios.sort()
+        pdfs = sorted(n for n in nombres if extension_logica(n) == ".pdf")
+        if not pdfs:
+            continue
+        carpeta_palermo = _es_carpeta_palermo(directorio, raiz)
+        # Fuera de las carpetas de Palermo, los programas de Palermo se reconocen por su contenido
+        pdfs_palermo = pdfs if carpeta_palermo else [
+            n for n in pdfs if _es_programa_palermo(os.path.join(directorio, n))
+        ]
+        reportes_carpeta = [os.path.join(directorio, n) for n in sorted(nombres) if extension_logica(n) == ".txt"]
+        for n in pdfs_palermo:
+            ruta = os.path.join(directorio, n)
+            trabajos.append({
+                "id": _firma_archivos([ruta] + reportes_carpeta),
+                "hipodromo": "Palermo",
+                "pdf": ruta,
+                "directorio": directorio,
+                "anio": None,
+                "tamaño": os.path.getsize(ruta),
+            })
+        pdfs = [n for n in pdfs if n not in pdfs_palermo]
+        if not pdfs:
+            continue
+
+        reportes_por_fecha = {}
+        for n in nombres:
+            if extension_logica(n) == ".txt":
+                reportes_por_fecha.setdefault(_fecha_en_nombre(n), []).append(n)
+        for n in pdfs:
+            fecha = _fecha_en_nombre(n)
+            candidatos = reportes_por_fecha.get(fecha, [])
+            if fecha is None and len(pdfs) == 1 and sum(map(len, reportes_por_fecha.values())) == 1:
+                # Carpeta con un solo programa y un solo reporte: se emparejan aunque no tengan fecha
+                candidatos = [r for lista in reportes_por_fecha.values() for r in lista]
+            ruta = os.path.join(directorio, n)
+            if len(candidatos) != 1:
+                motivo = "sin reporte" if not candidatos else f"{len(candidatos)} reportes posibles"
+                avisos.append(f"{ruta}: {motivo}; se omite.")
+                continue
+            ruta_reporte = os.path.join(directorio, candidatos[0])
+            anio = fecha[0] if fecha else None
+            if anio is None:
+                anios = re.findall(r"(?<!\d)(?:19|20)\d{2}(?!\d)", os.path.relpath(directorio, raiz))
+                anio = int(anios[-1]) if anios else None
+            trabajos.append({
+                "id": _firma_archivos([ruta, ruta_reporte]),
+                "hipodromo": "San Isidro",
+                "pdf": ruta,
+                "reporte": ruta_reporte,
+                "anio": anio,
+                "tamaño": os.path.getsize(ruta) + os.path.getsize(ruta_reporte),
+            })
+    return trabajos, avisos
+
+
+def _contar_tipos(registros):
+    tipos = {}
+    for r in registros:
+        tipos[r.tipo] = tipos.get(r.tipo, 0) + 1
+    return tipos
+
+
+def _ejecutar_trabajo_backfill(trabajo):
+    """
+    Tarea de un worker: compara una unidad de trabajo y devuelve la entrada de
+    checkpoint {"id", "hipodromo", "pdf", "resultados": [...], "avisos": [...],
+    "error"}. Cada resultado es {"reporte", "fecha", "anio", "tipos": {tipo:
+    cantidad}}; los avisos son las fechas de Palermo que quedaron sin comparar.
+    Los errores se devuelven como texto para que un archivo dañado no corte la
+    corrida.
+    """
+    entrada = {
+        "id": trabajo["id"], "hipodromo": trabajo["hipodromo"], "pdf": trabajo["pdf"],
+        "resultados": [], "avisos": [], "error": None,
+    }
+    try:
+        if trabajo["hipodromo"] == "Palermo":
+            fechas = indexar_fechas_palermo(trabajo["pdf"])["fechas"]
+            asociacion = asociar_reportes_palermo(fechas, directorio=trabajo["directorio"])
+            reportes = asociacion["reportes"]
+            for fecha in asociacion["sin_reporte"]:
+                entrada["avisos"].append(f"{trabajo['pdf']}: fecha {fecha} sin reporte; se omite.")
+            for fecha, candidatos in asociacion["ambiguas"].items():
+                entrada["avisos"].append(f"{trabajo['pdf']}: fecha {fecha} con {len(candidatos)} reportes posibles; se omite.")
+            if reportes:
+                _precargar_miembros(list(reportes.values()))
+                datos_pdf = _leer_palermo_desde_pdf(trabajo["pdf"])
+                for fecha in fechas:
+                    if fecha not in reportes:
+                        continue
+                    registros = iterar_diferencias_palermo(
+                        trabajo["pdf"], reportes[fecha], fecha_objetivo=fecha, datos_pdf=datos_pdf
+                    )
+                    entrada["resultados"].append({
+                        "reporte": reportes[fecha],
+                        "fecha": fecha,
+                        "anio": _anio_de_fecha_palermo(fecha),
+                        "tipos": _contar_tipos(registros),
+                    })
+        else:
+            registros = iterar_diferencias_pdf_y_reporte(trabajo["pdf"], trabajo["reporte"])
+            entrada["resultados"].append({
+                "reporte": trabajo["reporte"],
+                "fecha": None,
+                "anio": trabajo["anio"],
+                "tipos": _contar_tipos(registros),
+            })
+    except Exception as e:
+        entrada["error"] = f"{type(e).__name__}: {e}"
+    return entrada
+
+
+def _ruta_checkpoint_backfill(raiz):
+    """Checkpoint por defecto: en la caché local, uno por carpeta raíz (el archivo histórico puede ser de solo lectura)."""
+    clave = hashlib.sha256(os.path.abspath(raiz).encode("utf-8")).hexdigest()[:16]
+    return _ruta_cache("backfill", clave, extension=".jsonl")
+
+
+def _leer_checkpoint_backfill(ruta):
+    """
+    Entradas ya terminadas {id: entrada}. El archivo es JSON Lines y solo se
+    agregan líneas, así que una corrida cortada a mitad de escritura deja a lo
+    sumo una última línea incompleta, que se ignora. Las entradas con error no
+    cuentan como terminadas: se reintentan.
+    """
+    hechas = {}
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    continue
+                if entrada.get("error") is None:
+                    hechas[entrada["id"]] = entrada
+    except OSError:
+        pass
+    return hechas
+
+
+def resumir_backfill(entradas):
+    """
+    Resumen agregado por hipódromo y año.
+
+    Retorna
+    -------
+    dict
+        {(hipodromo, anio): {"pares", "con_diferencias", "errores", "tipos": {tipo: cantidad}}}
+    """
+    resumen = {}
+    for entrada in entradas:
+        if entrada["error"] is not None:
+            grupo = resumen.setdefault((entrada["hipodromo"], None), {"pares": 0, "con_diferencias": 0, "errores": 0, "tipos": {}})
+            grupo["errores"] += 1
+            continue
+        for r in entrada["resultados"]:
+            grupo = resumen.setdefault((entrada["hipodromo"], r["anio"]), {"pares": 0, "con_diferencias": 0, "errores": 0, "tipos": {}})
+            grupo["pares"] += 1
+            if r["tipos"]:
+                grupo["con_diferencias"] += 1
+            for tipo, cantidad in r["tipos"].items():
+                grupo["tipos"][tipo] = grupo["tipos"].get(tipo, 0) + cantidad
+    return resumen
+
+
+def ejecutar_backfill(raiz, ruta_checkpoint=None, max_procesos=None, reiniciar=False, progreso=None):
+    """
+    Compara todos los pares encontrados bajo `raiz`, retomando desde el checkpoint.
+
+    Los trabajos se reparten de a uno entre los procesos (el que termina toma el
+    siguiente), empezando por los más pesados para que ninguno quede solo al
+    final; así una temporada con boletines de tamaños muy distintos no deja
+    núcleos ociosos. Cada unidad terminada se agrega al checkpoint en el momento,
+    de modo que cortar la corrida (Ctrl+C, reinicio del equipo) pierde a lo sumo
+    las unidades en curso.
+
+    Parámetros
+    ----------
+    raiz : str
+        Carpeta con el archivo histórico.
+    ruta_checkpoint : str, optional
+        Archivo de checkpoint (por defecto, en la caché local según `raiz`).
+    max_procesos : int, optional
+        Procesos en paralelo (por defecto, uno por núcleo). Con 1 se compara en serie.
+    reiniciar : bool
+        Descarta el checkpoint y vuelve a comparar todo (por ejemplo, después de
+        corregir una regla de parseo sin cambiar __version__).
+    progreso : callable, optional
+        progreso(hechos, total, pares_por_segundo, segundos_restantes, entrada)
+        después de cada unidad terminada en esta corrida.
+
+    Retorna
+    -------
+    dict
+        - "resumen": ver resumir_backfill (incluye lo hecho en corridas anteriores)
+        - "total", "retomados", "procesados", "errores": cantidades de unidades
+        - "avisos": archivos y fechas que no se pudieron emparejar (incluye los
+          de unidades retomadas del checkpoint)
+        - "checkpoint": ruta del checkpoint
+        - "segundos": duración de esta corrida
+    """
+    import time
+
+    ruta_checkpoint = ruta_checkpoint or _ruta_checkpoint_backfill(raiz)
+    if reiniciar:
+        try:
+            os.remove(ruta_checkpoint)
+        except OSError:
+            pass
+    hechas = _leer_checkpoint_backfill(ruta_checkpoint)
+
+    trabajos, avisos = descubrir_pares_backfill(raiz)
+    entradas = [hechas[t["id"]] for t in trabajos if t["id"] in hechas]
+    pendientes = sorted((t for t in trabajos if t["id"] not in hechas), key=lambda t: -t["tamaño"])
+
+    if max_procesos is None:
+        max_procesos = _procesos_disponibles()
+    max_procesos = max(1, min(max_procesos, len(pendientes) or 1))
+
+    directorio = os.path.dirname(ruta_checkpoint)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    inicio = time.perf_counter()
+    errores = 0
+    with open(ruta_checkpoint, "a+", encoding="utf-8") as checkpoint:
+        # Si la corrida anterior se cortó a mitad de una línea, se la cierra para
+        # que la primera entrada nueva no quede pegada a ella.
+        if checkpoint.tell() > 0:
+            checkpoint.seek(checkpoint.tell() - 1)
+            if checkpoint.read(1) != "\n":
+                checkpoint.write("\n")
+
+        def registrar(entrada):
+            nonlocal errores
+            checkpoint.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+            entradas.append(entrada)
+            if entrada["error"] is not None:
+                errores += 1
+            if progreso is not None:
+                hechos = len(entradas) - (len(trabajos) - len(pendientes))
+                transcurrido = time.perf_counter() - inicio
+                por_segundo = hechos / transcurrido if transcurrido > 0 else 0.0
+                restante = (len(pendientes) - hechos) / por_segundo if por_segundo else None
+                progreso(hechos, len(pendientes), por_segundo, restante, entrada)
+
+        if max_procesos == 1:
+            for trabajo in pendientes:
+                registrar(_ejecutar_trabajo_backfill(trabajo))
+        else:
+            from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+            cola = iter(pendientes)
+            with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+                # Pocos trabajos en vuelo a la vez: el resto espera en la cola y
+                # lo toma el primer proceso que se libera.
+                en_curso = set()
+                try:
+                    for trabajo in cola:
+                        en_curso.add(pool.submit(_con_metricas, _ejecutar_trabajo_backfill, trabajo))
+                        if len(en_curso) >= 2 * max_procesos:
+                            break
+                    while en_curso:
+                        listos, en_curso = wait(en_curso, return_when=FIRST_COMPLETED)
+                        for futuro in listos:
+                            entrada, metricas = futuro.result()
+                            _sumar_metricas(metricas)
+                            registrar(entrada)
+                            siguiente = next(cola, None)
+                            if siguiente is not None:
+                                en_curso.add(pool.submit(_con_metricas, _ejecutar_trabajo_backfill, siguiente))
+                except BaseException:
+                    for futuro in en_curso:
+                        futuro.cancel()
+                    raise
+
+    return {
+        "resumen": resumir_backfill(entradas),
+        "total": len(trabajos),
+        "retomados": len(trabajos) - len(pendientes),
+        "procesados": len(pendientes),
+        "errores": errores,
+        "avisos": avisos + [a for entrada in entradas for a in entrada.get("avisos", [])],
+        "checkpoint": ruta_checkpoint,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def _formatear_duracion(segundos):
+    if segundos is None:
+        return "?"
+    segundos = int(segundos)
+    if segundos >= 3600:
+        return f"{segundos // 3600}h{segundos % 3600 // 60:02d}m"
+    if segundos >= 60:
+        return f"{segundos // 60}m{segundos % 60:02d}s"
+    return f"{segundos}s"
+
+
+def _cli_backfill(args):
+    import sys
+
+    def progreso(hechos, total, por_segundo, restante, entrada):
+        estado = "error" if entrada["error"] else "ok"
+        print(
+            f"[{hechos}/{total}] {por_segundo:.2f} u/s, restan ~{_formatear_duracion(restante)} "
+            f"({estado}: {entrada['pdf']})",
+            file=sys.stderr,
+        )
+        if entrada["error"]:
+            print(f"  {entrada['error']}", file=sys.stderr)
+
+    resultado = ejecutar_backfill(
+        args.raiz, ruta_checkpoint=args.checkpoint, max_procesos=args.procesos,
+        reiniciar=args.reiniciar, progreso=progreso,
+    )
+    for aviso in resultado["avisos"]:
+        print(aviso, file=sys.stderr)
+
+    print(
+        f"{resultado['total']} unidades: {resultado['retomados']} retomadas del checkpoint, "
+        f"{resultado['procesados']} procesadas en {_formatear_duracion(resultado['segundos'])}, "
+        f"{resultado['errores']} con error."
+    )
+    print(f"Checkpoint: {resultado['checkpoint']}")
+    hay_diferencias = False
+    for (hipodromo, anio), grupo in sorted(resultado["resumen"].items(), key=lambda e: (e[0][0], e[0][1] or 0)):
+        print(f"{hipodromo} {anio or 's/año'}: {grupo['pares']} pares, {grupo['con_diferencias']} con diferencias"
+              + (f", {grupo['errores']} con error" if grupo["errores"] else ""))
+        for tipo, cantidad in sorted(grupo["tipos"].items(), key=lambda e: -e[1]):
+            print(f"  {tipo}: {cantidad}")
+        hay_diferencias = hay_diferencias or grupo["con_diferencias"] or grupo["errores"]
+    # Lo que quedó sin comparar tampoco cuenta como verificado
+    return 1 if hay_diferencias or resultado["errores"] or resultado["avisos"] else 0
+
+
+# Archivo histórico en SQLite: cada programa y reporte parseado se guarda por
+# hipódromo, fecha, carrera y apuesta, para consultar temporadas enteras sin
+# volver a leer los PDF. Es opcional: solo se usa con los comandos archivar /
+# consultar (sqlite3 se importa recién ahí).
+#
+# Esquema:
+#   documentos: un programa o reporte de una fecha (un PDF de Palermo con varias
+#               fechas genera un documento por fecha). Varias revisiones del
+#               programa de un mismo día son documentos distintos (distinto hash).
+#   carreras:   (documento, carrera) -> caballos (NULL en Palermo), huella
+#   apuestas:   (documento, carrera, codigo) -> valor (NULL si el monto no figura)
+_ESQUEMA_ARCHIVO = """
+CREATE TABLE IF NOT EXISTS documentos (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    tipo TEXT NOT NULL CHECK (tipo IN ('programa', 'reporte')),
+    hipodromo TEXT NOT NULL,
+    fecha TEXT,
+    ruta TEXT NOT NULL,
+    version TEXT NOT NULL,
+    archivado REAL NOT NULL,
+    UNIQUE (hash, tipo, hipodromo, fecha)
+);
+CREATE INDEX IF NOT EXISTS documentos_por_fecha ON documentos (hipodromo, fecha, tipo);
+CREATE TABLE IF NOT EXISTS carreras (
+    documento_id INTEGER NOT NULL REFERENCES documentos (id) ON DELETE CASCADE,
+    carrera INTEGER NOT NULL,
+    caballos INTEGER,
+    huella TEXT NOT NULL,
+    PRIMARY KEY (documento_id, carrera)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS apuestas (
+    documento_id INTEGER NOT NULL REFERENCES documentos (id) ON DELETE CASCADE,
+    carrera INTEGER NOT NULL,
+    codigo TEXT NOT NULL,
+    valor REAL,
+    PRIMARY KEY (documento_id, carrera, codigo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS apuestas_por_codigo ON apuestas (codigo, valor);
+"""
+
+
+def abrir_archivo_db(ruta_db):
+    """Abre (y crea si hace falta) el archivo histórico SQLite."""
+    import sqlite3
+
+    conexion = sqlite3.connect(ruta_db)
+    conexion.execute("PRAGMA foreign_keys = ON")
+    conexion.execute("PRAGMA journal_mode = WAL")
+    conexion.execute("PRAGMA synchronous = NORMAL")
+    conexion.executescript(_ESQUEMA_ARCHIVO)
+    return conexion
+
+
+def _fecha_iso_palermo(fecha):
+    """'1/3/26' -> '2026-03-01'; None si no tiene el formato esperado."""
+    try:
+        dia, mes, anio = (int(p) for p in fecha.split("/"))
+    except ValueError:
+        return None
+    if anio < 100:
+        anio += 2000
+    return f"{anio:04d}-{mes:02d}-{dia:02d}"
+
+
+def _documentos_para_archivo(tarea):
+    """
+    Tarea de un worker: parsea un archivo y devuelve (ruta, documentos, error).
+    Cada documento es {"tipo", "hipodromo", "fecha", "hash", "carreras"} con
+    carreras = {num: {"caballos", "huella", "apuestas": {codigo: valor}}}.
+    """
+    ruta, tipo, hipodromo = tarea
+    try:
+        hash_archivo = _hash_archivo(ruta)
+        fecha_nombre = _fecha_en_nombre(os.path.basename(ruta.split(_SEPARADOR_MIEMBRO)[-1]))
+        fecha_nombre = "%04d-%02d-%02d" % fecha_nombre if fecha_nombre else None
+        por_fecha = {}
+        if hipodromo == "Palermo":
+            if tipo == "programa":
+                datos = _leer_palermo_desde_pdf(ruta)
+                for fecha in datos["fechas"]:
+                    por_fecha[_fecha_iso_palermo(fecha)] = datos["apuestas_por_fecha"].get(fecha, {})
+            else:
+                por_fecha[fecha_nombre] = _normalizar_reporte_palermo(ruta)
+            documentos = [
+                {
+                    "carreras": {
+                        num: {"caballos": None, "huella": huella_carrera(apuestas), "apuestas": apuestas}
+                        for num, apuestas in carreras.items()
+                    },
+                    "fecha": fecha,
+                }
+                for fecha, carreras in por_fecha.items()
+            ]
+        else:
+            datos = _normalizar_pdf(ruta) if tipo == "programa" else _normalizar_reporte(ruta)
+            documentos = [{
+                "carreras": {
+                    num: {"caballos": info["caballos"], "huella": huella_carrera(info), "apuestas": info["apuestas"]}
+                    for num, info in datos.items()
+                },
+                "fecha": fecha_nombre,
+            }]
+    except Exception as e:
+        return ruta, [], f"{type(e).__name__}: {e}"
+    for documento in documentos:
+        documento.update(tipo=tipo, hipodromo=hipodromo, hash=hash_archivo)
+    return ruta, documentos, None
+
+
+def _insertar_documentos(conexion, ruta, documentos, archivado):
+    """Inserta (o reemplaza, si es de otra versión de la herramienta) los documentos de un archivo."""
+    for documento in documentos:
+        clave = (documento["hash"], documento["tipo"], documento["hipodromo"], documento["fecha"])
+        conexion.execute(
+            "DELETE FROM documentos WHERE hash = ? AND tipo = ? AND hipodromo = ? AND fecha IS ?", clave
+        )
+        cursor = conexion.execute(
+            "INSERT INTO documentos (hash, tipo, hipodromo, fecha, ruta, version, archivado) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            clave + (ruta, __version__, archivado),
+        )
+        documento_id = cursor.lastrowid
+        carreras = documento["carreras"]
+        conexion.executemany(
+            "INSERT INTO carreras (documento_id, carrera, caballos, huella) VALUES (?, ?, ?, ?)",
+            [(documento_id, num, info["caballos"], info["huella"]) for num, info in carreras.items()],
+        )
+        conexion.executemany(
+            "INSERT INTO apuestas (documento_id, carrera, codigo, valor) VALUES (?, ?, ?, ?)",
+            [
+                (documento_id, num, codigo, valor)
+                for num, info in carreras.items()
+                for codigo, valor in info["apuestas"].items()
+            ],
+        )
+
+
+def archivar_directorio(ruta_db, raiz, max_procesos=None, progreso=None):
+    """
+    Carga en el archivo histórico todos los programas (.pdf) y reportes (.txt)
+    bajo `raiz`, también comprimidos (.gz). Los archivos ya archivados con la
+    misma versión de la herramienta se saltean sin parsearlos, así que se puede
+    correr de nuevo sobre la misma carpeta para sumar lo nuevo. El hipódromo
+    sale de la carpeta ("palermo" en la ruta) o, si no, de detectar_formato.
+
+    El parseo se reparte en un pool de procesos; la escritura la hace un solo
+    proceso, en una única transacción con inserciones masivas (executemany).
+
+    Parámetros
+    ----------
+    ruta_db : str
+        Archivo SQLite (se crea si no existe).
+    raiz : str
+        Carpeta a recorrer.
+    max_procesos : int, optional
+        Procesos en paralelo (por defecto, uno por núcleo). Con 1 se parsea en serie.
+    progreso : callable, optional
+        progreso(hechos, total, ruta, error) después de cada archivo.
+
+    Retorna
+    -------
+    dict
+        {"archivos": int, "salteados": int, "documentos": int, "errores": {ruta: mensaje}}
+    """
+    import time
+
+    tareas = []
+    for directorio, subdirectorios, nombres in os.walk(raiz):
+        subdirectorios.sort()
+        carpeta_palermo = _es_carpeta_palermo(directorio, raiz)
+        for n in sorted(nombres):
+            extension = extension_logica(n)
+            if extension not in (".pdf", ".txt"):
+                continue
+            ruta = os.path.join(directorio, n)
+            if carpeta_palermo:
+                hipodromo = "Palermo"
+            else:
+                # Fuera de las carpetas de Palermo se decide por el contenido
+                try:
+                    deteccion = detectar_formato(ruta)
+                except Exception:
+                    deteccion = {"formato": None, "confianza": 0.0}
+                es_palermo = deteccion["formato"] == "palermo" and deteccion["confianza"] >= _CONFIANZA_MINIMA
+                hipodromo = "Palermo" if es_palermo else "San Isidro"
+            tareas.append((ruta, "programa" if extension == ".pdf" else "reporte", hipodromo))
+
+    conexion = abrir_archivo_db(ruta_db)
+    try:
+        ya_archivados = set(conexion.execute(
+            "SELECT hash, tipo, hipodromo FROM documentos WHERE version = ?", (__version__,)
+        ))
+        pendientes = [t for t in tareas if (_hash_archivo(t[0]), t[1], t[2]) not in ya_archivados]
+
+        if max_procesos is None:
+            max_procesos = _procesos_disponibles()
+        max_procesos = max(1, min(max_procesos, len(pendientes) or 1))
+        if max_procesos == 1:
+            resultados = map(_documentos_para_archivo, pendientes)
+            pool = None
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            from functools import partial
+
+            pool = ProcessPoolExecutor(max_workers=max_procesos)
+            resultados = _resultados_con_metricas(
+                pool.map(partial(_con_metricas, _documentos_para_archivo), pendientes, chunksize=4)
+            )
+
+        errores = {}
+        documentos_insertados = 0
+        archivado = time.time()
+        try:
+            with conexion:
+                for hechos, (ruta, documentos, error) in enumerate(resultados, start=1):
+                    if error is not None:
+                        errores[ruta] = error
+                    else:
+                        _insertar_documentos(conexion, ruta, documentos, archivado)
+                        documentos_insertados += len(documentos)
+                    if progreso is not None:
+                        progreso(hechos, len(pendientes), ruta, error)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+    finally:
+        conexion.close()
+
+    return {
+        "archivos": len(tareas),
+        "salteados": len(tareas) - len(pendientes),
+        "documentos": documentos_insertados,
+        "errores": errores,
+    }
+
+
+def _filtros_documento(hipodromo=None, desde=None, hasta=None, alias="d"):
+    """Condiciones SQL (y parámetros) por hipódromo y rango de fechas ISO."""
+    condiciones, parametros = [], []
+    if hipodromo:
+        condiciones.append(f"{alias}.hipodromo = ?")
+        parametros.append(hipodromo)
+    if desde:
+        condiciones.append(f"{alias}.fecha >= ?")
+        parametros.append(desde)
+    if hasta:
+        condiciones.append(f"{alias}.fecha <= ?")
+        parametros.append(hasta)
+    return condiciones, parametros
+
+
+def consultar_minimos_distintos(conexion, codigo, valor, tipo="programa", hipodromo=None, desde=None, hasta=None):
+    """
+    Carreras en las que el mínimo de `codigo` no es `valor` (o no figura). Por
+    ejemplo, todos los días del mes en que el mínimo de QTP no fue 500.
+
+    Retorna
+    -------
+    list[tuple]
+        (hipodromo, fecha, carrera, valor, ruta), ordenadas por fecha y carrera.
+    """
+    condiciones, parametros = _filtros_documento(hipodromo, desde, hasta)
+    condiciones = ["a.codigo = ?", "d.tipo = ?", "(a.valor IS NULL OR abs(a.valor - ?) >= 0.005)"] + condiciones
+    consulta = (
+        "SELECT d.hipodromo, d.fecha, a.carrera, a.valor, d.ruta FROM apuestas a "
+        "JOIN documentos d ON d.id = a.documento_id WHERE " + " AND ".join(condiciones) +
+        " ORDER BY d.fecha, d.hipodromo, a.carrera"
+    )
+    return conexion.execute(consulta, [codigo, tipo, valor] + parametros).fetchall()
+
+
+def consultar_cambios_caballos(conexion, hipodromo=None, desde=None, hasta=None):
+    """
+    Carreras cuya cantidad de caballos cambió entre revisiones consecutivas del
+    programa de un mismo día (en orden de archivado).
+
+    Retorna
+    -------
+    list[tuple]
+        (hipodromo, fecha, carrera, caballos_antes, caballos_despues, ruta_antes, ruta_despues)
+    """
+    condiciones, parametros = _filtros_documento(hipodromo, desde, hasta, alias="d1")
+    condiciones = ["d1.tipo = 'programa'", "d1.fecha IS NOT NULL"] + condiciones
+    consulta = (
+        "SELECT d1.hipodromo, d1.fecha, c1.carrera, c1.caballos, c2.caballos, d1.ruta, d2.ruta "
+        "FROM documentos d1 "
+        "JOIN documentos d2 ON d2.hipodromo = d1.hipodromo AND d2.fecha = d1.fecha "
+        "AND d2.tipo = 'programa' AND d2.id = ("
+        "  SELECT d3.id FROM documentos d3 WHERE d3.hipodromo = d1.hipodromo AND d3.fecha = d1.fecha "
+        "  AND d3.tipo = 'programa' AND d3.id > d1.id ORDER BY d3.id LIMIT 1) "
+        "JOIN carreras c1 ON c1.documento_id = d1.id "
+        "JOIN carreras c2 ON c2.documento_id = d2.id AND c2.carrera = c1.carrera "
+        "WHERE c1.caballos IS NOT c2.caballos AND " + " AND ".join(condiciones) +
+        " ORDER BY d1.fecha, d1.hipodromo, c1.carrera"
+    )
+    return conexion.execute(consulta, parametros).fetchall()
+
+
+def _cli_archivar(args):
+    import sys
+
+    def progreso(hechos, total, ruta, error):
+        if error is not None:
+            print(f"[{hechos}/{total}] {ruta}: {error}", file=sys.stderr)
+        elif hechos % 50 == 0 or hechos == total:
+            print(f"[{hechos}/{total}]", file=sys.stderr)
+
+    resultado = archivar_directorio(args.db, args.raiz, max_procesos=args.procesos, progreso=progreso)
+    print(
+        f"{resultado['archivos']} archivos: {resultado['salteados']} ya archivados, "
+        f"{resultado['documentos']} documentos nuevos, {len(resultado['errores'])} con error."
+    )
+    return 1 if resultado["errores"] else 0
+
+
+def _cli_consultar(args):
+    conexion = abrir_archivo_db(args.db)
+    try:
+        if args.sql:
+            cursor = conexion.execute(args.sql)
+            if cursor.description:
+                print("\t".join(c[0] for c in cursor.description))
+            filas = cursor.fetchall()
+        elif args.minimo:
+            codigo, valor = args.minimo
+            filas = consultar_minimos_distintos(
+                conexion, codigo.upper(), _parsear_monto_str(valor), tipo=args.tipo,
+                hipodromo=args.hipodromo, desde=args.desde, hasta=args.hasta,
+            )
+        else:
+            filas = consultar_cambios_caballos(conexion, hipodromo=args.hipodromo, desde=args.desde, hasta=args.hasta)
+    finally:
+        conexion.close()
+    for fila in filas:
+        print("\t".join("NULL" if v is None else str(v) for v in fila))
+    return 0
+
+
+# Paquete de programa pre-parseado (.cprg): el PDF se parsea una vez y las
+# estaciones de trabajo comparan contra el paquete, sin necesitar pypdf.
+#
+# Formato (little-endian):
+#   cabecera: b"CPRG", u8 versión de formato, u8 tipo (0 San Isidro, 1 Palermo),
+#             u32 largo del cuerpo, 32 bytes sha256 del cuerpo
+#   cuerpo:   comprimido con zlib; ver _escribir_cuerpo_* / _leer_cuerpo_*
+# Las apuestas conocidas van como máscara de bits (orden de _CODIGOS_PAQUETE) y
+# los montos en centavos (-1 = NULL).
+_MAGIA_PAQUETE = b"CPRG"
+_VERSION_FORMATO_PAQUETE = 1
+_TIPOS_PAQUETE = {0: "san_isidro", 1: "palermo"}
+_CODIGOS_PAQUETE = ("GAN", "SEG", "TER", "EXA", "IMP", "TRI", "DOB", "TPL", "QTN", "QTP", "CAD", "CUA")
+_EXTENSION_PAQUETE = ".cprg"
+
+
+def _escribir_struct(flujo, formato, *valores):
+    flujo.write(struct.pack("<" + formato, *valores))
+
+
+def _leer_struct(flujo, formato):
+    formato = "<" + formato
+    valores = struct.unpack(formato, flujo.read(struct.calcsize(formato)))
+    return valores[0] if len(valores) == 1 else valores
+
+
+def _escribir_texto_binario(flujo, texto):
+    datos = texto.encode("utf-8")
+    _escribir_struct(flujo, "H", len(datos))
+    flujo.write(datos)
+
+
+def _leer_texto_binario(flujo):
+    return flujo.read(_leer_struct(flujo, "H")).decode("utf-8")
+
+
+def _centavos(valor):
+    return -1 if valor is None else int(round(valor * 100))
+
+
+def _desde_centavos(centavos):
+    return None if centavos < 0 else centavos / 100
+
+
+def _escribir_apuestas_binario(flujo, apuestas):
+    """{codigo: valor} -> máscara de bits + montos, y aparte las apuestas no estándar."""
+    mascara = 0
+    for i, codigo in enumerate(_CODIGOS_PAQUETE):
+        if codigo in apuestas:
+            mascara |= 1 << i
+    _escribir_struct(flujo, "H", mascara)
+    for codigo in _CODIGOS_PAQUETE:
+        if codigo in apuestas:
+            _escribir_struct(flujo, "q", _centavos(apuestas[codigo]))
+    otras = [c for c in apuestas if c not in _CODIGOS_PAQUETE]
+    _escribir_struct(flujo, "B", len(otras))
+    for codigo in otras:
+        _escribir_texto_binario(flujo, codigo)
+        _escribir_struct(flujo, "q", _centavos(apuestas[codigo]))
+
+
+def _leer_apuestas_binario(flujo):
+    mascara = _leer_struct(flujo, "H")
+    apuestas = {}
+    for i, codigo in enumerate(_CODIGOS_PAQUETE):
+        if mascara & (1 << i):
+            apuestas[codigo] = _desde_centavos(_leer_struct(flujo, "q"))
+    for _ in range(_leer_struct(flujo, "B")):
+        codigo = _leer_texto_binario(flujo)
+        apuestas[codigo] = _desde_centavos(_leer_struct(flujo, "q"))
+    return apuestas
+
+
+def _escribir_cuerpo_san_isidro(flujo, ruta_pdf):
+    textos = list(_textos_paginas_pdf(ruta_pdf, regiones=True))
+    datos = _normalizar_desde_lista_apuestas(_apuestas_desde_textos(textos))
+
+    # Índice de páginas: qué carrera contiene cada página
+    _escribir_struct(flujo, "H", len(textos))
+    for num_pagina, texto in enumerate(textos, start=1):
+        m = _PATRON_CARRERA_PDF.search(texto)
+        _escribir_struct(flujo, "HH", num_pagina, int(m.group(1)) if m else 0)
+        _escribir_texto_binario(flujo, " ".join(m.group(2).strip().split()) if m else "")
+
+    _escribir_struct(flujo, "H", len(datos))
+    for num_carrera in sorted(datos):
+        _escribir_struct(flujo, "HH", num_carrera, datos[num_carrera]["caballos"])
+        _escribir_apuestas_binario(flujo, datos[num_carrera]["apuestas"])
+
+
+def _leer_cuerpo_san_isidro(flujo):
+    paginas = []
+    for _ in range(_leer_struct(flujo, "H")):
+        num_pagina, num_carrera = _leer_struct(flujo, "HH")
+        nombre = _leer_texto_binario(flujo)
+        paginas.append({
+            "pagina": num_pagina,
+            "numero_carrera": num_carrera or None,
+            "nombre_carrera": nombre or None,
+        })
+
+    datos = {}
+    for _ in range(_leer_struct(flujo, "H")):
+        num_carrera, caballos = _leer_struct(flujo, "HH")
+        datos[num_carrera] = {"caballos": caballos, "apuestas": _leer_apuestas_binario(flujo)}
+    return {"paginas": paginas, "datos": datos}
+
+
+def _escribir_cuerpo_palermo(flujo, ruta_pdf):
+    contenido = _leer_bytes(ruta_pdf)
+    datos = _leer_palermo_desde_pdf(io.BytesIO(contenido))
+    indice = indexar_fechas_palermo(io.BytesIO(contenido))
+
+    _escribir_struct(flujo, "H", len(datos["fechas"]))
+    for fecha in datos["fechas"]:
+        _escribir_texto_binario(flujo, fecha)
+        paginas = indice["paginas_por_fecha"].get(fecha, [])
+        _escribir_struct(flujo, "H", len(paginas))
+        for p in paginas:
+            _escribir_struct(flujo, "H", p)
+
+        apuestas_carreras = datos["apuestas_por_fecha"].get(fecha, {})
+        _escribir_struct(flujo, "H", len(apuestas_carreras))
+        for num_carrera in sorted(apuestas_carreras):
+            _escribir_struct(flujo, "H", num_carrera)
+            _escribir_apuestas_binario(flujo, apuestas_carreras[num_carrera])
+
+        resumen = datos["resumen_por_fecha"].get(fecha, {})
+        _escribir_struct(flujo, "H", len(resumen))
+        for codigo, info in resumen.items():
+            _escribir_texto_binario(flujo, codigo)
+            _escribir_struct(flujo, "Hq", info["conteo_lineas"], _centavos(info["valor"]))
+            carreras = sorted(info["carreras"])
+            _escribir_struct(flujo, "H", len(carreras))
+            for carrera in carreras:
+                _escribir_struct(flujo, "H", carrera)
+
+
+def _leer_cuerpo_palermo(flujo):
+    fechas = []
+    paginas_por_fecha = {}
+    apuestas_por_fecha = {}
+    resumen_por_fecha = {}
+    for _ in range(_leer_struct(flujo, "H")):
+        fecha = _leer_texto_binario(flujo)
+        fechas.append(fecha)
+        paginas_por_fecha[fecha] = [_leer_struct(flujo, "H") for _ in range(_leer_struct(flujo, "H"))]
+
+        apuestas_carreras = {}
+        for _ in range(_leer_struct(flujo, "H")):
+            num_carrera = _leer_struct(flujo, "H")
+            apuestas_carreras[num_carrera] = _leer_apuestas_binario(flujo)
+
+        resumen = {}
+        for _ in range(_leer_struct(flujo, "H")):
+            codigo = _leer_texto_binario(flujo)
+            conteo_lineas, centavos = _leer_struct(flujo, "Hq")
+            carreras = {_leer_struct(flujo, "H") for _ in range(_leer_struct(flujo, "H"))}
+            resumen[codigo] = {"conteo_lineas": conteo_lineas, "valor": _desde_centavos(centavos), "carreras": carreras}
+
+        # Igual que _leer_palermo_desde_pdf: solo fechas con filas de apuestas
+        if apuestas_carreras or resumen:
+            apuestas_por_fecha[fecha] = apuestas_carreras
+            resumen_por_fecha[fecha] = resumen
+
+    return {
+        "indice": {"fechas": list(fechas), "paginas_por_fecha": paginas_por_fecha},
+        "datos": {"fechas": fechas, "apuestas_por_fecha": apuestas_por_fecha, "resumen_por_fecha": resumen_por_fecha},
+    }
+
+
+def exportar_paquete(ruta_pdf, ruta_salida, palermo=False):
+    """
+    Parsea el programa oficial una vez y lo guarda como paquete binario (.cprg)
+    para distribuir a las estaciones de trabajo.
+
+    Parámetros
+    ----------
+    ruta_pdf : str
+        PDF de San Isidro (formato "1ª - Premio ...") o de Palermo (palermo=True).
+    ruta_salida : str
+        Ruta del paquete a generar.
+    palermo : bool
+        True si el PDF es un programa de Palermo.
+
+    Retorna
+    -------
+    int
+        Tamaño del paquete en bytes.
+    """
+    import zlib
+
+    cuerpo = io.BytesIO()
+    # Trazabilidad: hash del PDF de origen y versión de la herramienta que lo generó
+    cuerpo.write(hashlib.sha256(_leer_bytes(ruta_pdf)).digest())
+    _escribir_texto_binario(cuerpo, __version__)
+    if palermo:
+        _escribir_cuerpo_palermo(cuerpo, ruta_pdf)
+    else:
+        _escribir_cuerpo_san_isidro(cuerpo, ruta_pdf)
+    # Un paquete con páginas sin leer se distribuiría como si estuviera completo
+    ilegibles = paginas_ilegibles(ruta_pdf)
+    if ilegibles:
+        raise ValueError(
+            "No se generó el paquete: páginas ilegibles "
+            + ", ".join(f"{n} ({motivo})" for n, motivo in ilegibles)
+        )
+
+    comprimido = zlib.compress(cuerpo.getvalue(), 9)
+    with open(ruta_salida, "wb") as f:
+        f.write(_MAGIA_PAQUETE)
+        _escribir_struct(f, "BBI", _VERSION_FORMATO_PAQUETE, 1 if palermo else 0, len(comprimido))
+        f.write(hashlib.sha256(comprimido).digest())
+        f.write(comprimido)
+    return len(_MAGIA_PAQUETE) + struct.calcsize("<BBI") + 32 + len(comprimido)
+
+
+def es_paquete(origen):
+    """True si la ruta (o el objeto binario) es un paquete .cprg, según su firma."""
+    if hasattr(origen, "read"):
+        if not hasattr(origen, "seek"):
+            return False
+        posicion = origen.tell()
+        firma = origen.read(len(_MAGIA_PAQUETE))
+        origen.seek(posicion)
+        return firma == _MAGIA_PAQUETE
+    if _partes_miembro(origen) is not None:
+        import zipfile
+
+        try:
+            return _leer_bytes(origen)[:len(_MAGIA_PAQUETE)] == _MAGIA_PAQUETE
+        except (OSError, KeyError, zipfile.BadZipFile):
+            return False
+    try:
+        with open(origen, "rb") as f:
+            return f.read(len(_MAGIA_PAQUETE)) == _MAGIA_PAQUETE
+    except OSError:
+        return False
+
+
+def leer_paquete(ruta_paquete):
+    """
+    Lee un paquete .cprg verificando firma, versión de formato y checksum.
+
+    Retorna
+    -------
+    dict
+        - "tipo": "san_isidro" o "palermo"
+        - "hash_pdf": sha256 del PDF de origen
+        - "version": versión de la herramienta que generó el paquete
+        - San Isidro: "paginas" (como obtener_carreras_por_pagina) y
+          "datos" (como _normalizar_pdf)
+        - Palermo: "indice" (como indexar_fechas_palermo) y
+          "datos" (como _leer_palermo_desde_pdf)
+
+    Raises
+    ------
+    ValueError
+        Si el archivo no es un paquete válido o está dañado.
+    """
+    import zlib
+
+    contenido = _leer_bytes(ruta_paquete)
+    flujo = io.BytesIO(contenido)
+    if flujo.read(len(_MAGIA_PAQUETE)) != _MAGIA_PAQUETE:
+        raise ValueError("El archivo no es un paquete de programa (.cprg)")
+    version_formato, tipo, largo = _leer_struct(flujo, "BBI")
+    if version_formato != _VERSION_FORMATO_PAQUETE:
+        raise ValueError(f"Versión de paquete no soportada: {version_formato}")
+    if tipo not in _TIPOS_PAQUETE:
+        raise ValueError(f"Tipo de paquete desconocido: {tipo}")
+    checksum = flujo.read(32)
+    comprimido = flujo.read(largo)
+    if len(comprimido) != largo or hashlib.sha256(comprimido).digest() != checksum:
+        raise ValueError("El paquete está dañado (checksum inválido)")
+
+    cuerpo = io.BytesIO(zlib.decompress(comprimido))
+    hash_pdf = cuerpo.read(32).hex()
+    version = _leer_texto_binario(cuerpo)
+    if tipo == 1:
+        resultado = _leer_cuerpo_palermo(cuerpo)
+    else:
+        resultado = _leer_cuerpo_san_isidro(cuerpo)
+    resultado.update({"tipo": _TIPOS_PAQUETE[tipo], "hash_pdf": hash_pdf, "version": version})
+    return resultado
+
+
+def _leer_paquete_tipo(ruta_paquete, tipo):
+    paquete = leer_paquete(ruta_paquete)
+    if paquete["tipo"] != tipo:
+        raise ValueError(f"El paquete es de tipo {paquete['tipo']}, se esperaba {tipo}")
+    return paquete
+
+
+# Caché de resultados de comparación (LRU): en memoria y, opcionalmente, en disco.
+# Con CARRERAS_CACHE_RESULTADOS=memoria no se guardan en disco.
+_RESULTADOS_EN_MEMORIA = OrderedDict()
+_MAX_RESULTADOS_EN_MEMORIA = 32
+_MAX_RESULTADOS_EN_DISCO = 256
+_RESULTADOS_EN_DISCO = os.environ.get("CARRERAS_CACHE_RESULTADOS", "disco") != "memoria"
+
+
+def clave_resultado(ruta_pdf, ruta_reporte, hipodromo, fecha=None):
+    """
+    Clave de caché de una comparación: hash del contenido del PDF y del reporte,
+    hipódromo, fecha (Palermo), versión de la herramienta y cómo se extrae el
+    texto (motor y versión, y si se usa la extracción por regiones): con otra
+    extracción el resultado puede ser otro.
+    """
+    partes = [
+        __version__, _etiqueta_motor(motor_extraccion()), "regiones" if extraccion_por_regiones() else "completa",
+        _hash_archivo(ruta_pdf), _hash_archivo(ruta_reporte), hipodromo.lower(), fecha or "",
+    ]
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def obtener_resultado_cacheado(clave):
+    """
+    Devuelve el resultado guardado para la clave (ver guardar_resultado) o None.
+    Un acierto lo marca como usado recientemente, en memoria y en disco.
+    """
+    if clave in _RESULTADOS_EN_MEMORIA:
+        _RESULTADOS_EN_MEMORIA.move_to_end(clave)
+        _contar("carreras_cache_total", "resultados", "acierto")
+        return _RESULTADOS_EN_MEMORIA[clave]
+    if not _RESULTADOS_EN_DISCO:
+        _contar("carreras_cache_total", "resultados", "fallo")
+        return None
+    resultado = _leer_cache_json("resultados", clave)
+    if resultado is None or resultado.get("version") != __version__:
+        _contar("carreras_cache_total", "resultados", "fallo")
+        return None
+    _contar("carreras_cache_total", "resultados", "acierto")
+    try:
+        os.utime(_ruta_cache("resultados", clave))
+    except OSError:
+        pass
+    _guardar_resultado_en_memoria(clave, resultado)
+    return resultado
+
+
+def _guardar_resultado_en_memoria(clave, resultado):
+    _RESULTADOS_EN_MEMORIA[clave] = resultado
+    _RESULTADOS_EN_MEMORIA.move_to_end(clave)
+    while len(_RESULTADOS_EN_MEMORIA) > _MAX_RESULTADOS_EN_MEMORIA:
+        _RESULTADOS_EN_MEMORIA.popitem(last=False)
+
+
+def guardar_resultado(clave, resultado):
+    """
+    Guarda un resultado de comparación en la caché.
+
+    Parámetros
+    ----------
+    clave : str
+        Ver clave_resultado.
+    resultado : dict
+        Serializable a JSON, por ejemplo
+        {"coincide": bool, "diferencias": list[str], "tablas": str}.
+    """
+    resultado = dict(resultado, version=__version__)
+    _guardar_resultado_en_memoria(clave, resultado)
+    if not _RESULTADOS_EN_DISCO:
+        return
+    _escribir_cache_json("resultados", clave, resultado)
+    # Desalojar los menos usados recientemente (por fecha de modificación)
+    _podar_cache("resultados", _MAX_RESULTADOS_EN_DISCO)
+
+
+def _formatear_apuestas(apuestas_dict):
+    """
+    Devuelve un string legible de un dict {codigo_apuesta: valor_float_o_None}.
+    Ejemplo: {'GAN': None, 'IMP': 1000.0} -> 'GAN, IMP=1000'
+    """
+    if not apuestas_dict:
+        return "-"
+
+    # Orden lógico de códigos para que se vea prolijo
+    orden_preferido = ["GAN", "SEG", "TER", "EXA", "IMP", "TRI", "DOB", "TPL", "QTN", "QTP", "CAD", "CUA"]
+
+    def _clave_orden(cod):
+        try:
+            return (0, orden_preferido.index(cod))
+        except ValueError:
+            return (1, cod)
+
+    partes = []
+    for codigo in sorted(apuestas_dict.keys(), key=_clave_orden):
+        valor = apuestas_dict[codigo]
+        if valor is None:
+            partes.append(f"{codigo}")
+        else:
+            # Mostrar enteros sin decimales cuando aplique
+            if isinstance(valor, (int, float)) and abs(valor - int(valor)) < 1e-6:
+                partes.append(f"{codigo}={int(valor)}")
+            else:
+                partes.append(f"{codigo}={valor:.2f}")
+    return ", ".join(partes)
+
+
+def _renderizar_tablas(datos_pdf, datos_reporte, palermo=False):
+    """
+    Texto de las tablas "DATOS OBTENIDOS DEL PDF / DEL REPORTE" que muestran los
+    menús. Para San Isidro incluye la cantidad de caballos; para Palermo solo las
+    apuestas ({carrera: {codigo: valor}}).
+    """
+    todas_carreras = sorted(set(datos_pdf.keys()) | set(datos_reporte.keys()))
+    lineas = [""]
+    for titulo, datos in (("DEL PDF", datos_pdf), ("DEL REPORTE", datos_reporte)):
+        if palermo:
+            lineas.append(f"  DATOS OBTENIDOS {titulo} (PALERMO)")
+            lineas.append("  " + "-" * 62)
+            lineas.append("  Carrera  | Apuestas (código=monto)")
+            lineas.append("  ---------+----------------------------------------")
+            for c in todas_carreras:
+                lineas.append(f"  {c:>8} | {_formatear_apuestas(datos.get(c, {}))}")
+        else:
+            lineas.append(f"  DATOS OBTENIDOS {titulo}")
+            lineas.append("  " + "-" * 62)
+            lineas.append("  Carrera  | Cab.   | Apuestas / Montos")
+            lineas.append("  ---------+--------+----------------------------------------")
+            for c in todas_carreras:
+                info = datos.get(c)
+                cab = info.get("caballos", 0) if info else 0
+                ap = _formatear_apuestas(info.get("apuestas", {})) if info else "-"
+                lineas.append(f"  {c:>8} | {cab:>6} | {ap}")
+        lineas.append("")
+    return "\n".join(lineas)
+
+
+def _resolver_palermo(args, ruta_pdf, ruta_reporte=None):
+    """
+    Aplica --palermo / --san-isidro; sin ninguno de los dos, detecta el formato
+    del programa (y del reporte). Con poca confianza se compara como San Isidro,
+    como antes de la detección, y se avisa por la salida de errores.
+    """
+    import sys
+
+    if args.palermo or args.san_isidro:
+        return args.palermo
+    formato, confianza = detectar_hipodromo(ruta_pdf, ruta_reporte)
+    if formato is None or confianza < _CONFIANZA_MINIMA:
+        print(
+            f"No se pudo reconocer el formato del programa (confianza {confianza:.0%}); se compara como "
+            "San Isidro. Use --palermo o --san-isidro para indicarlo.",
+            file=sys.stderr,
+        )
+        return False
+    return formato == "palermo"
+
+
+def _cli_comparar(args):
+    import sys
+
+    args.palermo = _resolver_palermo(args, args.pdf, args.reporte)
+    if args.seguir:
+        return _cli_comparar_en_vivo(args)
+    if args.palermo:
+        registros = iterar_diferencias_palermo(args.pdf, args.reporte, fecha_objetivo=args.fecha)
+    else:
+        registros = iterar_diferencias_pdf_y_reporte(args.pdf, args.reporte)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8", newline="") as f:
+            cantidad = volcar_diferencias(registros, f, args.formato)
+    else:
+        cantidad = volcar_diferencias(registros, sys.stdout, args.formato)
+
+    if args.formato == "texto" and not args.salida:
+        if cantidad == 0:
+            print("COMPARACIÓN: todo coincide correctamente entre el PDF y el reporte.")
+    return 0 if cantidad == 0 else 1
+
+
+def _cli_comparar_en_vivo(args):
+    import sys
+
+    if args.palermo and args.fecha is None:
+        # Antes de empezar a seguir el reporte, no cuando ya está llegando
+        try:
+            args.fecha = _fecha_palermo_en_vivo(args.pdf, args.reporte)
+        except ValueError as e:
+            print(f"No se puede comparar en vivo: {e}.", file=sys.stderr)
+            return 1
+    resultados = iterar_resultados_en_vivo(
+        args.pdf, args.reporte, palermo=args.palermo, fecha=args.fecha, inactividad=args.inactividad
+    )
+    archivo = open(args.salida, "w", encoding="utf-8", newline="") if args.salida else sys.stdout
+    estado = {"completo": True}
+    try:
+        if args.formato == "texto":
+            cantidad = 0
+            for r in resultados:
+                estado["completo"] = r.reporte_completo
+                mensajes = list(_mensajes_diferencias(r.registros))
+                if r.carrera is not None and not mensajes:
+                    archivo.write(f"Carrera {r.carrera}: coincide\n")
+                for mensaje in mensajes:
+                    archivo.write(f"  - {mensaje}\n")
+                cantidad += len(mensajes)
+                archivo.flush()
+        else:
+            def _registros():
+                for r in resultados:
+                    estado["completo"] = r.reporte_completo
+                    yield from r.registros
+                    archivo.flush()
+
+            cantidad = volcar_diferencias(_registros(), archivo, args.formato)
+    finally:
+        if args.salida:
+            archivo.close()
+
+    if not estado["completo"]:
+        print(
+            "Aviso: el reporte terminó antes de cerrar la sección RSM TABLE; los montos pueden estar incompletos.",
+            file=sys.stderr,
+        )
+    return 0 if cantidad == 0 and estado["completo"] else 1
+
+
+def _cli_exportar(args):
+    tamanio = exportar_paquete(args.pdf, args.salida, palermo=_resolver_palermo(args, args.pdf))
+    print(f"Paquete generado: {args.salida} ({tamanio} bytes)")
+    return 0
+
+
+def _cli_revision(args):
+    resultado = comparar_revisiones_programa(args.pdf_anterior, args.pdf_nuevo)
+    paginas = resultado["paginas_cambiadas"]
+    print(f"Páginas cambiadas: {', '.join(str(p) for p in paginas) if paginas else 'ninguna'}")
+    print(f"Páginas reutilizadas sin volver a extraer: {resultado['paginas_reutilizadas']}")
+    if not resultado["carreras_cambiadas"]:
+        print("No hay carreras con cambios entre las dos revisiones.")
+        return 0
+    print("Carreras con cambios:")
+    for num_carrera, motivos in resultado["carreras_cambiadas"].items():
+        print(f"  - Carrera {num_carrera}: {'; '.join(motivos)}")
+    return 1
+
+
+def _cli_huellas(args):
+    if args.archivo.lower().endswith(".pdf") or es_paquete(args.archivo):
+        datos = _normalizar_pdf(args.archivo)
+    else:
+        datos = _normalizar_reporte(args.archivo)
+    print(json.dumps(huellas_tarjeta(datos), indent=2, sort_keys=True))
+    return 0
+
+
+# Texto que indica que el menú principal ya está en pantalla (solo ASCII para no
+# depender de la codificación de la consola).
+_MARCA_MENU_PRINCIPAL = b"Seleccione el hip"
+
+
+def medir_arranque(comando, repeticiones=5, timeout=60):
+    """
+    Mide el tiempo hasta que aparece el menú principal (time-to-menu).
+    comando: lista para subprocess, por ejemplo [ruta_exe] o [python, script].
+    Devuelve {"tiempos": [...], "minimo", "mediana", "maximo"} en segundos.
+    """
+    import statistics
+    import subprocess
+    import threading
+    import time
+
+    entorno = dict(os.environ)
+    entorno["PYTHONUNBUFFERED"] = "1"
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.Popen(
+            comando,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=entorno,
+        )
+        leido = bytearray()
+        listo = threading.Event()
+
+        # La lectura va en un hilo: read1 se bloquea mientras el programa no
+        # escriba nada, y así el timeout se cumple igual.
+        def _leer():
+            while True:
+                bloque = proceso.stdout.read1(4096)
+                if not bloque:
+                    break
+                leido.extend(bloque)
+                if _MARCA_MENU_PRINCIPAL in leido:
+                    listo.set()
+            listo.set()
+
+        lector = threading.Thread(target=_leer, daemon=True)
+        lector.start()
+        try:
+            if not listo.wait(timeout):
+                raise RuntimeError(f"El menú no apareció en {timeout} s.")
+            if _MARCA_MENU_PRINCIPAL not in leido:
+                raise RuntimeError("El programa terminó sin mostrar el menú principal.")
+            tiempos.append(time.perf_counter() - inicio)
+            # Opción 4: salir
+            try:
+                proceso.stdin.write(b"4\n")
+                proceso.stdin.close()
+            except BrokenPipeError:
+                pass
+            proceso.wait(timeout=timeout)
+        finally:
+            if proceso.poll() is None:
+                proceso.kill()
+                proceso.wait()
+            lector.join()
+
+    return {
+        "tiempos": tiempos,
+        "minimo": min(tiempos),
+        "mediana": statistics.median(tiempos),
+        "maximo": max(tiempos),
+    }
+
+
+def _cli_benchmark_arranque(args):
+    import sys
+
+    if args.ejecutable:
+        comando = [args.ejecutable]
+    else:
+        comando = [sys.executable, os.path.abspath(__file__)]
+    resultado = medir_arranque(comando, repeticiones=args.repeticiones)
+    print(f"Comando: {' '.join(comando)}")
+    print(
+        f"Tiempo hasta el menú ({len(resultado['tiempos'])} arranques): "
+        f"mín {resultado['minimo']:.3f} s, mediana {resultado['mediana']:.3f} s, "
+        f"máx {resultado['maximo']:.3f} s"
+    )
+    return 0
+
+
+def medir_memoria_extraccion(ruta_pdf, paginas=None, palermo=False, acotado=None):
+    """
+    Extrae y parsea el PDF (sin caché) midiendo la memoria: pico de tracemalloc
+    durante la extracción y memoria residente al terminar.
+    paginas: cantidad de páginas a procesar desde el inicio (None = todas).
+
+    Retorna
+    -------
+    dict
+        "paginas", "pico_tracemalloc_mb", "rss_mb" (None si no se puede medir),
+        "segundos".
+    """
+    import time
+    import tracemalloc
+
+    seleccion = range(1, paginas + 1) if paginas else None
+    leidas = []
+
+    def _textos():
+        for p in _iterar_paginas_pdf(ruta_pdf, usar_cache=False, paginas=seleccion, acotado=acotado):
+            leidas.append(p["pagina"])
+            yield p["texto"]
+
+    ya_activo = tracemalloc.is_tracing()
+    if not ya_activo:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    try:
+        if palermo:
+            _palermo_desde_textos(_textos())
+        else:
+            _normalizar_desde_lista_apuestas(_apuestas_desde_textos(_textos()))
+        pico = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if not ya_activo:
+            tracemalloc.stop()
+    return {
+        "paginas": len(leidas),
+        "pico_tracemalloc_mb": pico / 2**20,
+        "rss_mb": _memoria_en_uso_mb(),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def _cli_benchmark_memoria(args):
+    tamanios = [int(n) for n in args.paginas.split(",")] if args.paginas else [None]
+    modos = {"normal": False, "acotado": True}
+    if args.modo != "ambos":
+        modos = {args.modo: modos[args.modo]}
+    print(f"PDF: {args.pdf} (ventana de {_paginas_por_ventana()} páginas; tracemalloc enlentece la extracción)")
+    for nombre_modo, acotado in modos.items():
+        for n in tamanios:
+            r = medir_memoria_extraccion(args.pdf, paginas=n, palermo=args.palermo, acotado=acotado)
+            rss = f"{r['rss_mb']:.1f} MB" if r["rss_mb"] is not None else "n/d"
+            print(
+                f"{nombre_modo:>8}: {r['paginas']:>5} páginas  pico {r['pico_tracemalloc_mb']:7.1f} MB  "
+                f"RSS {rss}  {r['segundos']:.1f} s"
+            )
+    return 0
+
+
+def _parsear_para_comparar_motores(textos, formato):
+    """Lo que los parsers obtienen de los textos de un PDF; dos motores equivalen si coincide."""
+    textos = list(textos)
+    if formato == "palermo":
+        return _palermo_desde_textos(textos)
+    carreras = []
+    for texto in textos:
+        m = _PATRON_CARRERA_PDF.search(texto)
+        carreras.append((int(m.group(1)), " ".join(m.group(2).split())) if m else None)
+    return {"carreras": carreras, "datos": _normalizar_desde_lista_apuestas(_apuestas_desde_textos(textos))}
+
+
+def medir_motores(rutas_pdf, motores=None):
+    """
+    Extrae cada PDF con cada motor disponible (sin caché), mide el tiempo y
+    verifica que los parsers obtengan lo mismo que con pypdf (la referencia).
+    Los motores parciales (pypdf-regiones) se miden solo con los programas de
+    San Isidro y no compiten por el motor por defecto. Un PDF que pypdf no
+    puede leer se omite para todos los motores.
+
+    Retorna
+    -------
+    dict
+        - "motores": {motor: {"segundos": float, "paginas": int, "coincide": bool,
+          "distintos": [rutas cuyo resultado difiere], "error": str o None,
+          "segundos_pypdf": segundos de pypdf en los mismos PDF}}
+        - "omitidos": {ruta: error} PDF que no se pudieron medir
+        - "elegido": el motor más rápido cuyo resultado coincide en todos los PDF
+          medidos, o None si no se pudo medir ninguno
+    """
+    import time
+
+    motores = [m for m in motores or motores_disponibles(parciales=True) if m != "pypdf"]
+    motores = ["pypdf"] + motores  # la referencia va primero en cada PDF
+    resultados = {
+        m: {"segundos": 0.0, "paginas": 0, "coincide": True, "distintos": [], "error": None, "segundos_pypdf": 0.0}
+        for m in motores
+    }
+    omitidos = {}
+    for ruta in rutas_pdf:
+        try:
+            contenido = _leer_bytes(ruta)
+            formato = detectar_formato(ruta)["formato"] or "san_isidro"
+        except Exception as e:
+            omitidos[ruta] = f"{type(e).__name__}: {e}"
+            continue
+        referencia = None
+        segundos_pypdf = 0.0
+        for nombre in motores:
+            resultado = resultados[nombre]
+            if resultado["error"] is not None:
+                continue
+            motor = _MOTORES_EXTRACCION[nombre]
+            if motor.get("parcial") and formato != "san_isidro":
+                continue
+            inicio = time.perf_counter()
+            try:
+                documento = motor["abrir"](contenido, None)
+                cantidad = motor["paginas"](documento)
+                textos = [motor["texto"](documento, n) for n in range(1, cantidad + 1)]
+            except Exception as e:
+                if nombre == "pypdf":
+                    # Sin referencia no hay con qué comparar: el PDF no cuenta para ningún motor
+                    omitidos[ruta] = f"{type(e).__name__}: {e}"
+                    break
+                resultado.update(error=f"{type(e).__name__}: {e}", coincide=False)
+                continue
+            segundos = time.perf_counter() - inicio
+            resultado["segundos"] += segundos
+            resultado["paginas"] += cantidad
+            parseado = _parsear_para_comparar_motores(textos, formato)
+            if nombre == "pypdf":
+                referencia = parseado
+                segundos_pypdf = segundos
+            elif parseado != referencia:
+                resultado["coincide"] = False
+                resultado["distintos"].append(ruta)
+            resultado["segundos_pypdf"] += segundos_pypdf
+
+    candidatos = [m for m in motores if resultados[m]["coincide"] and not _MOTORES_EXTRACCION[m].get("parcial")]
+    elegido = None
+    if candidatos and resultados["pypdf"]["paginas"]:
+        elegido = min(candidatos, key=lambda m: resultados[m]["segundos"])
+    return {"motores": resultados, "omitidos": omitidos, "elegido": elegido}
+
+
+def _cli_benchmark_motores(args):
+    rutas = []
+    for ruta in args.pdfs:
+        if os.path.isdir(ruta):
+            for directorio, subdirectorios, nombres in os.walk(ruta):
+                subdirectorios.sort()
+                rutas.extend(os.path.join(directorio, n) for n in sorted(nombres) if extension_logica(n) == ".pdf")
+        else:
+            rutas.append(ruta)
+    if not rutas:
+        print("No se encontraron PDF para medir.")
+        return 1
+
+    resultado = medir_motores(rutas)
+    print(f"{len(rutas)} PDF; motor actual: {motor_extraccion()}")
+    for ruta, error in resultado["omitidos"].items():
+        print(f"Se omite {ruta}: pypdf no lo pudo leer ({error})")
+    if resultado["elegido"] is None:
+        print("No se pudo medir ningún PDF.")
+        return 1
+    for nombre, r in resultado["motores"].items():
+        if r["error"] is not None:
+            print(f"{nombre:>14}: error ({r['error']})")
+            continue
+        parcial = _MOTORES_EXTRACCION[nombre].get("parcial")
+        if parcial and not r["paginas"]:
+            print(f"{nombre:>14}: sin programas de San Isidro para medir")
+            continue
+        por_pagina = r["segundos"] / r["paginas"] * 1000 if r["paginas"] else 0.0
+        estado = "coincide" if r["coincide"] else f"difiere en {len(r['distintos'])} PDF"
+        if parcial and r["segundos"]:
+            estado += f"; solo San Isidro, {r['segundos_pypdf'] / r['segundos']:.1f}x frente a pypdf"
+        print(f"{nombre:>14}: {r['segundos']:7.2f} s  ({por_pagina:6.1f} ms/página)  {estado}")
+        for ruta in r["distintos"][:5]:
+            print(f"{'':>16}- {ruta}")
+    print(f"Más rápido con el mismo resultado: {resultado['elegido']}")
+    if args.guardar:
+        elegido = resultado["elegido"]
+        _escribir_cache_json(
+            "configuracion", "motor_extraccion",
+            {"motor": elegido, "version": _MOTORES_EXTRACCION[elegido]["version"]()},
+        )
+        print("Guardado como motor por defecto (CARRERAS_MOTOR_EXTRACCION o --motor tienen prioridad).")
+        regiones = resultado["motores"].get("pypdf-regiones")
+        if regiones is not None and regiones["error"] is None and regiones["paginas"]:
+            activa = regiones["coincide"] and regiones["segundos"] < regiones["segundos_pypdf"]
+            _escribir_cache_json(
+                "configuracion", "extraccion_regiones",
+                {"activa": activa, "version": _MOTORES_EXTRACCION["pypdf-regiones"]["version"]()},
+            )
+            print(
+                "Extracción por regiones en San Isidro: "
+                + ("activada" if activa else "desactivada")
+                + " (CARRERAS_EXTRACCION_REGIONES o --regiones/--sin-regiones tienen prioridad)."
+            )
+    return 0
+
+
+def _cli_planificador(args):
+    ruta = _ruta_historial_planes()
+    if args.borrar:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        print(f"Historial del planificador borrado ({ruta}).")
+        return 0
+
+    historial = historial_planes()
+    maquina = _maquina_actual()
+    print(f"Historial: {ruta} ({len(historial)} corridas)")
+    print(f"Máquina: {maquina}" + ("" if _PLANIFICADOR_ACTIVO else " - planificador desactivado"))
+    claves = sorted(
+        {(e["tarea"], e.get("hipodromo")) for e in historial if e.get("maquina") == maquina},
+        key=lambda c: (c[0], c[1] or ""),
+    )
+    if claves:
+        print("Modelo en esta máquina:")
+    for tarea, hipodromo in claves:
+        modelo = modelo_planificador(tarea, hipodromo)
+        if tarea == "paginas":
+            costo = f"{modelo['costo_unidad'] * 1000:.1f} ms/página"
+        else:
+            costo = f"{modelo['costo_unidad'] * 2**20:.2f} s/MB"
+        print(
+            f"  {tarea} {hipodromo or '-'}: {costo} ({modelo['muestras_serie']} corridas en serie), "
+            f"arranque del pool {modelo['arranque_pool']:.2f} s ({modelo['muestras_paralelo']} en paralelo)"
+        )
+    ultimas = historial[-args.ultimas:] if args.ultimas > 0 else []
+    if ultimas:
+        print("Últimas corridas:")
+    for e in ultimas:
+        detalle = f"  {e['fecha']} {e['tarea']} {e.get('hipodromo') or '-'}: {e['estrategia']}"
+        if e["estrategia"] == "paralelo":
+            detalle += f" x{e['procesos']}"
+        if e["estrategia"] != "cache":
+            detalle += (
+                f", {e['unidades']} {'páginas' if e['tarea'] == 'paginas' else 'bytes'}, "
+                f"previsto {e['previsto_s']:.3f} s"
+            )
+        print(f"{detalle}, real {e['real_s']:.3f} s")
+    return 0
+
+
+# Ventana gráfica: la misma comparación que el menú, pero la lectura del PDF y
+# del reporte corre en un hilo aparte y la ventana sigue respondiendo. El hilo
+# no toca tkinter: manda mensajes por una cola que la ventana revisa cada
+# _INTERVALO_VENTANA_MS (progreso por página, lotes de filas, fin). Cancelar
+# marca un evento que el hilo mira después de cada página. Las tablas son
+# virtuales: el Treeview tiene solo las filas visibles y al desplazarse se les
+# cambian los valores, así que miles de filas (varias tarjetas) no la frenan.
+_INTERVALO_VENTANA_MS = 50
+_MENSAJES_POR_CICLO = 500
+_FILAS_POR_LOTE = 200
+
+_HIPODROMOS_VENTANA = {
+    "Detectar automáticamente": None,
+    "San Isidro / La Plata": "san_isidro",
+    "Palermo": "palermo",
+}
+_FECHA_SEGUN_REPORTE = "(según el nombre del reporte)"
+
+_ETIQUETAS_DIFERENCIA = {
+    DIF_CARRERA_FALTANTE: "carrera faltante",
+    DIF_APUESTA_SOBRANTE: "apuesta sobrante",
+    DIF_APUESTA_FALTANTE: "apuesta faltante",
+    DIF_VALOR_DISTINTO: "monto distinto",
+    DIF_VALOR_NULL: "monto sin valor",
+    DIF_CANTIDAD_CABALLOS: "caballos",
+    DIF_PAGINA_ILEGIBLE: "página ilegible",
+}
 
-    reader = pypdf.PdfReader(ruta_pdf)
 
-    # Regex para fechas tipo 01/02/2026 o 1/2/26
-    patron_fecha = re.compile(r"\b\d{1,2}/\d{1,2}/\d{2,4}\b")
+class ComparacionCancelada(Exception):
+    """La comparación se canceló desde la ventana."""
 
-    # Regex genérico para fila: "<descripcion>($ monto)  columnas_derecha"
-    # Ejemplo de línea: "CUATRIFECTA: ($ 500.-) 2ª4ª6ª9ª; 12ª"
-    # Capturamos solo el número dentro de los paréntesis, ignorando el signo $ y el sufijo ".-".
-    patron_fila = re.compile(r"(.+?)\(\s*[\$\s]*([\d.,]+)(?:\.-)?\s*\)\s+(.+)")
 
-    fechas_encontradas = []
-    # Estructura: {fecha: {carrera: {codigo_apuesta: valor}}}
-    apuestas_por_fecha = {}
-    # Metadatos para poder aplicar reglas tipo "si aparece una sola vez, es ALL"
-    # Estructura: {fecha: {codigo_apuesta: {"conteo_lineas": int, "valor": float, "carreras": set[int]}}}
-    resumen_por_fecha = {}
+def _filas_datos(tarjeta, datos, palermo=False):
+    """Filas (tarjeta, carrera, caballos, apuestas) de una tabla "DATOS OBTENIDOS"."""
+    filas = []
+    for carrera in sorted(datos):
+        info = datos[carrera]
+        if palermo:
+            filas.append((tarjeta, carrera, "", _formatear_apuestas(info)))
+        else:
+            filas.append((tarjeta, carrera, info.get("caballos", 0), _formatear_apuestas(info.get("apuestas", {}))))
+    return filas
 
-    def _extraer_carreras_palermo(carreras_str):
-        """
-        Extrae números de carrera desde el texto de la columna derecha.
 
-        Casos soportados:
-        - '2ª4ª6ª9ª; 12ª'        -> [2, 4, 6, 9, 12]
-        - '1ª, 10ª'             -> [1, 10]
-        - 'DESDE LA 1ª HASTA LA 11ª' -> [1, 2, ..., 11]
-        """
-        texto = carreras_str.upper()
-
-        # Caso especial: 'DESDE LA Xª HASTA LA Yª' -> rango X..Y
-        m_rango = re.search(r"DESDE\s+LA\s+(\d+)\s*[ªº]?\s+HASTA\s+LA\s+(\d+)\s*[ªº]?", texto)
-        if m_rango:
-            inicio = int(m_rango.group(1))
-            fin = int(m_rango.group(2))
-            if inicio <= fin:
-                return list(range(inicio, fin + 1))
+def _filas_diferencias(tarjeta, registros):
+    """Filas (tarjeta, carrera, tipo, detalle) de la tabla de diferencias."""
+    return [
+        (tarjeta, r.carrera if r.carrera is not None else "", _ETIQUETAS_DIFERENCIA.get(r.tipo, r.tipo), r.mensaje)
+        for r in registros
+    ]
 
-        # Caso general: lista de números con o sin sufijo ª / º
-        numeros = re.findall(r"(\d+)\s*[ªº]?", carreras_str)
-        return [int(n) for n in numeros]
 
-    for num_pagina in range(len(reader.pages)):
-        texto = reader.pages[num_pagina].extract_text() or ""
+def _comparar_para_ventana(pedido, enviar, cancelada):
+    """
+    Trabajo del hilo de la ventana: compara el programa con cada reporte y
+    manda con enviar(tipo, valor) el progreso y las filas de las tablas
+    ("pdf", "reporte", "diferencias"). Con varios reportes, la columna Tarjeta
+    indica a cuál corresponde cada fila.
 
-        # Recorremos línea a línea, manteniendo la "fecha actual"
-        fecha_actual = None
+    pedido: {"pdf": ruta, "reportes": [rutas], "formato": "san_isidro",
+    "palermo" o None (detectar), "fecha": fecha de Palermo o None (según el
+    nombre de cada reporte)}. cancelada: threading.Event que se revisa después
+    de cada página.
 
-        for linea in texto.split("\n"):
-            linea_stripped = linea.strip()
-            if not linea_stripped:
+    Raises
+    ------
+    ComparacionCancelada
+        Si se marcó `cancelada`.
+    """
+    def _progreso(hechas, total):
+        if cancelada.is_set():
+            raise ComparacionCancelada()
+        enviar("progreso", (hechas, total))
+
+    def _enviar_filas(tabla, filas):
+        for i in range(0, len(filas), _FILAS_POR_LOTE):
+            enviar("filas", (tabla, filas[i:i + _FILAS_POR_LOTE]))
+
+    def _nombre(ruta):
+        return os.path.basename(ruta.split(_SEPARADOR_MIEMBRO)[-1])
+
+    ruta_pdf = pedido["pdf"]
+    reportes = pedido["reportes"]
+    formato = pedido["formato"]
+    if formato is None:
+        formato, confianza = detectar_hipodromo(ruta_pdf, reportes[0])
+        if formato is None or confianza < _CONFIANZA_MINIMA:
+            formato = "san_isidro"
+        enviar("etapa", f"Formato detectado: {'Palermo' if formato == 'palermo' else 'San Isidro'}")
+
+    cantidad = 0
+    if formato == "palermo":
+        fechas = indexar_fechas_palermo(ruta_pdf)["fechas"]
+        reportes_por_fecha = {}
+        for ruta_reporte in reportes:
+            fecha = pedido["fecha"] or _fecha_palermo_para_reporte(ruta_reporte, fechas)
+            if fecha is None:
+                cantidad += 1
+                enviar("filas", ("diferencias", [(
+                    _nombre(ruta_reporte), "", "sin fecha",
+                    f"No se pudo asociar el reporte a una fecha del PDF ({', '.join(fechas)}); elija la fecha",
+                )]))
                 continue
+            reportes_por_fecha.setdefault(fecha, []).append(ruta_reporte)
+        for fecha, rutas in reportes_por_fecha.items():
+            enviar("etapa", f"Leyendo el PDF de Palermo ({fecha})")
+            datos_pdf = _leer_palermo_desde_pdf(ruta_pdf, fecha=fecha, progreso=_progreso)
+            for ruta_reporte in rutas:
+                if cancelada.is_set():
+                    raise ComparacionCancelada()
+                tarjeta = fecha if len(reportes) == 1 else f"{fecha} {_nombre(ruta_reporte)}"
+                datos_reporte = _normalizar_reporte_palermo(ruta_reporte)
+                _enviar_filas(
+                    "pdf", _filas_datos(tarjeta, _apuestas_palermo_para_fecha(datos_pdf, fecha, datos_reporte), True)
+                )
+                _enviar_filas("reporte", _filas_datos(tarjeta, datos_reporte, True))
+                registros = list(
+                    iterar_diferencias_palermo(ruta_pdf, ruta_reporte, fecha_objetivo=fecha, datos_pdf=datos_pdf)
+                )
+                cantidad += len(registros)
+                _enviar_filas("diferencias", _filas_diferencias(tarjeta, registros))
+    else:
+        enviar("etapa", "Leyendo el PDF")
+        apuestas = None if es_paquete(ruta_pdf) else obtener_apuestas_por_carrera(ruta_pdf, progreso=_progreso)
+        datos_pdf = _normalizar_pdf(ruta_pdf, apuestas_raw=apuestas)
+        _enviar_filas("pdf", _filas_datos("", datos_pdf))
+        for ruta_reporte in reportes:
+            if cancelada.is_set():
+                raise ComparacionCancelada()
+            tarjeta = "" if len(reportes) == 1 else _nombre(ruta_reporte)
+            enviar("etapa", f"Leyendo el reporte {_nombre(ruta_reporte)}")
+            _enviar_filas("reporte", _filas_datos(tarjeta, _normalizar_reporte(ruta_reporte)))
+            registros = list(iterar_diferencias_pdf_y_reporte(ruta_pdf, ruta_reporte, apuestas_raw=apuestas))
+            cantidad += len(registros)
+            _enviar_filas("diferencias", _filas_diferencias(tarjeta, registros))
 
-            # Actualizar fecha actual si la línea contiene alguna fecha
-            for f in patron_fecha.findall(linea_stripped):
-                if f not in fechas_encontradas:
-                    fechas_encontradas.append(f)
-                fecha_actual = f
+    try:
+        escribir_metricas()
+    except OSError:
+        pass
+    enviar("fin", cantidad)
 
-            # Filas de apuestas requieren paréntesis con monto
-            if "(" not in linea_stripped or ")" not in linea_stripped:
-                continue
 
-            m = patron_fila.match(linea_stripped)
-            if not m:
-                continue
+def _formato_para_ventana(ruta_pdf, enviar, cancelada):
+    """Trabajo del hilo de la ventana al elegir el PDF: formato detectado y, si es de Palermo, sus fechas."""
+    deteccion = detectar_formato(ruta_pdf)
+    enviar("formato", deteccion)
+    if deteccion["formato"] == "palermo":
+        enviar("fechas", indexar_fechas_palermo(ruta_pdf)["fechas"])
 
-            # Si todavía no vimos ninguna fecha, no sabemos a qué fecha asociar esta línea
-            if not fecha_actual:
-                continue
 
-            descripcion = m.group(1).strip()
-            monto_str = m.group(2).strip()
-            carreras_str = m.group(3).strip()
+def _tabla_virtual(padre, columnas, anchos, filas_visibles=18):
+    """
+    Tabla de solo lectura que muestra miles de filas sin crear un ítem por fila:
+    el Treeview tiene filas_visibles ítems y al desplazarse se les cambian los
+    valores. Devuelve un dict con "marco" (para ubicarla en la ventana),
+    "agregar"(filas), "limpiar"() y "cantidad"().
+    """
+    from tkinter import ttk
+
+    marco = ttk.Frame(padre)
+    arbol = ttk.Treeview(marco, columns=columnas, show="headings", height=filas_visibles, selectmode="none")
+    for columna, ancho in zip(columnas, anchos):
+        arbol.heading(columna, text=columna, anchor="w")
+        arbol.column(columna, width=ancho, anchor="w", stretch=columna == columnas[-1])
+    barra = ttk.Scrollbar(marco, orient="vertical")
+    arbol.grid(row=0, column=0, sticky="nsew")
+    barra.grid(row=0, column=1, sticky="ns")
+    marco.rowconfigure(0, weight=1)
+    marco.columnconfigure(0, weight=1)
+
+    items = [arbol.insert("", "end", values=()) for _ in range(filas_visibles)]
+    vacia = ("",) * len(columnas)
+    estado = {"filas": [], "inicio": 0}
+
+    def _actualizar_barra():
+        total = max(len(estado["filas"]), filas_visibles)
+        barra.set(estado["inicio"] / total, (estado["inicio"] + filas_visibles) / total)
+
+    def _refrescar():
+        filas = estado["filas"]
+        for i, item in enumerate(items):
+            indice = estado["inicio"] + i
+            arbol.item(item, values=filas[indice] if indice < len(filas) else vacia)
+        _actualizar_barra()
+
+    def _ir_a(inicio):
+        inicio = max(0, min(int(inicio), len(estado["filas"]) - filas_visibles))
+        if inicio != estado["inicio"]:
+            estado["inicio"] = inicio
+            _refrescar()
+
+    def _desplazar(accion, cantidad, unidad=None):
+        if accion == "moveto":
+            _ir_a(float(cantidad) * len(estado["filas"]))
+        elif accion == "scroll":
+            paso = filas_visibles - 1 if unidad == "pages" else 1
+            _ir_a(estado["inicio"] + int(cantidad) * paso)
+
+    def _rueda(evento):
+        # Windows y macOS mandan <MouseWheel> con delta; X11, los botones 4 y 5
+        arriba = evento.num == 4 or getattr(evento, "delta", 0) > 0
+        _ir_a(estado["inicio"] + (-3 if arriba else 3))
+        return "break"
+
+    barra.configure(command=_desplazar)
+    for secuencia in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+        arbol.bind(secuencia, _rueda)
+    arbol.bind("<Prior>", lambda e: _desplazar("scroll", -1, "pages"))
+    arbol.bind("<Next>", lambda e: _desplazar("scroll", 1, "pages"))
+    arbol.bind("<Up>", lambda e: _desplazar("scroll", -1, "units"))
+    arbol.bind("<Down>", lambda e: _desplazar("scroll", 1, "units"))
+    arbol.bind("<Home>", lambda e: _ir_a(0))
+    arbol.bind("<End>", lambda e: _ir_a(len(estado["filas"])))
+    arbol.bind("<Button-1>", lambda e: arbol.focus_set())
+
+    def agregar(filas):
+        anterior = len(estado["filas"])
+        estado["filas"].extend(filas)
+        # Solo se reescriben los ítems si alguna fila nueva cae en la parte visible
+        if anterior < estado["inicio"] + filas_visibles:
+            _refrescar()
+        else:
+            _actualizar_barra()
 
-            codigo_apuesta = _mapear_nombre_apuesta_palermo(descripcion)
-            if not codigo_apuesta:
-                continue
+    def limpiar():
+        estado["filas"] = []
+        estado["inicio"] = 0
+        _refrescar()
 
-            valor = _parsear_monto_str(monto_str)
-            if valor is None:
-                continue
+    _refrescar()
+    return {"marco": marco, "agregar": agregar, "limpiar": limpiar, "cantidad": lambda: len(estado["filas"])}
 
-            # Extraer carreras específicas para Palermo (ej. '2ª4ª6ª9ª; 12ª')
-            carreras = _extraer_carreras_palermo(carreras_str)
-            if not carreras:
-                continue
 
-            if fecha_actual not in apuestas_por_fecha:
-                apuestas_por_fecha[fecha_actual] = {}
-            if fecha_actual not in resumen_por_fecha:
-                resumen_por_fecha[fecha_actual] = {}
-            if codigo_apuesta not in resumen_por_fecha[fecha_actual]:
-                resumen_por_fecha[fecha_actual][codigo_apuesta] = {
-                    "conteo_lineas": 0,
-                    "valor": valor,
-                    "carreras": set(),
-                }
-            # Incrementar el conteo de líneas donde aparece la apuesta en esta fecha
-            resumen_por_fecha[fecha_actual][codigo_apuesta]["conteo_lineas"] += 1
-            resumen_por_fecha[fecha_actual][codigo_apuesta]["valor"] = valor
+def abrir_ventana(ruta_pdf=None, rutas_reportes=None):
+    """
+    Abre la ventana de comparación y vuelve cuando se cierra. ruta_pdf y
+    rutas_reportes, si se indican, quedan precargados.
 
-            for carrera in carreras:
-                if carrera not in apuestas_por_fecha[fecha_actual]:
-                    apuestas_por_fecha[fecha_actual][carrera] = {}
-                apuestas_por_fecha[fecha_actual][carrera][codigo_apuesta] = valor
-                resumen_por_fecha[fecha_actual][codigo_apuesta]["carreras"].add(carrera)
+    Raises
+    ------
+    RuntimeError
+        Si tkinter no está instalado o no hay entorno gráfico.
+    """
+    import queue
+    import threading
 
-    return {
-        "fechas": fechas_encontradas,
-        "apuestas_por_fecha": apuestas_por_fecha,
-        "resumen_por_fecha": resumen_por_fecha,
+    try:
+        import tkinter as tk
+        from tkinter import filedialog, ttk
+    except ImportError:
+        raise RuntimeError("La ventana gráfica necesita tkinter")
+    try:
+        raiz = tk.Tk()
+    except tk.TclError as e:
+        raise RuntimeError(f"No hay entorno gráfico disponible: {e}")
+    raiz.title(f"Comparar archivos - carreras_desde_pdf {__version__}")
+    raiz.minsize(760, 480)
+
+    cola = queue.Queue()
+    # Cada trabajo lleva un número: los mensajes de un trabajo ya reemplazado se descartan
+    estado = {"comparacion": 0, "consulta": 0, "cancelada": None, "corriendo": False, "pdf_consultado": None}
+
+    marco = ttk.Frame(raiz, padding=8)
+    marco.grid(row=0, column=0, sticky="nsew")
+    raiz.rowconfigure(0, weight=1)
+    raiz.columnconfigure(0, weight=1)
+    marco.columnconfigure(1, weight=1)
+
+    var_pdf = tk.StringVar(value=ruta_pdf or "")
+    var_reportes = tk.StringVar(value="; ".join(rutas_reportes or []))
+    var_formato = tk.StringVar(value="")
+    var_estado = tk.StringVar(value="Elija el programa y el reporte.")
+
+    ttk.Label(marco, text="Programa (PDF o .cprg):").grid(row=0, column=0, sticky="w")
+    entrada_pdf = ttk.Entry(marco, textvariable=var_pdf)
+    entrada_pdf.grid(row=0, column=1, sticky="ew", padx=4)
+    ttk.Label(marco, text="Reportes (TXT, separados por ;):").grid(row=1, column=0, sticky="w")
+    ttk.Entry(marco, textvariable=var_reportes).grid(row=1, column=1, sticky="ew", padx=4)
+
+    opciones = ttk.Frame(marco)
+    opciones.grid(row=2, column=0, columnspan=3, sticky="ew", pady=4)
+    ttk.Label(opciones, text="Hipódromo:").pack(side="left")
+    combo_hipodromo = ttk.Combobox(opciones, values=list(_HIPODROMOS_VENTANA), state="readonly", width=24)
+    combo_hipodromo.current(0)
+    combo_hipodromo.pack(side="left", padx=4)
+    ttk.Label(opciones, text="Fecha (Palermo):").pack(side="left", padx=(12, 0))
+    combo_fecha = ttk.Combobox(opciones, values=[_FECHA_SEGUN_REPORTE], width=28)
+    combo_fecha.current(0)
+    combo_fecha.pack(side="left", padx=4)
+    ttk.Label(opciones, textvariable=var_formato).pack(side="left", padx=(12, 0))
+
+    acciones = ttk.Frame(marco)
+    acciones.grid(row=3, column=0, columnspan=3, sticky="ew", pady=4)
+    boton_comparar = ttk.Button(acciones, text="Comparar")
+    boton_comparar.pack(side="left")
+    boton_cancelar = ttk.Button(acciones, text="Cancelar", state="disabled")
+    boton_cancelar.pack(side="left", padx=4)
+    barra_progreso = ttk.Progressbar(acciones, mode="determinate", length=260)
+    barra_progreso.pack(side="left", padx=8)
+    ttk.Label(acciones, textvariable=var_estado).pack(side="left", fill="x", expand=True)
+
+    pestanias = ttk.Notebook(marco)
+    pestanias.grid(row=4, column=0, columnspan=3, sticky="nsew", pady=(4, 0))
+    marco.rowconfigure(4, weight=1)
+    tablas = {
+        "pdf": ("Datos obtenidos del PDF", ("Tarjeta", "Carrera", "Caballos", "Apuestas / Montos"), (140, 60, 70, 480)),
+        "reporte": ("Datos obtenidos del reporte", ("Tarjeta", "Carrera", "Caballos", "Apuestas / Montos"), (140, 60, 70, 480)),
+        "diferencias": ("Diferencias", ("Tarjeta", "Carrera", "Tipo", "Detalle"), (140, 60, 120, 480)),
     }
+    for clave, (titulo, columnas, anchos) in tablas.items():
+        tabla = _tabla_virtual(pestanias, columnas, anchos)
+        pestanias.add(tabla["marco"], text=titulo)
+        tabla["titulo"] = titulo
+        tablas[clave] = tabla
 
+    def _enviador(tipo_trabajo, numero):
+        return lambda tipo, valor=None: cola.put((tipo_trabajo, numero, tipo, valor))
 
-def comparar_palermo(ruta_pdf_palermo, ruta_reporte, fecha_objetivo=None, datos_pdf=None):
-    """
-    Compara, para PALERMO, solo:
-    - Apuestas por carrera
-    - Montos mínimos de cada apuesta
+    def _lanzar(tipo_trabajo, funcion, pedido, cancelada):
+        estado[tipo_trabajo] += 1
+        enviar = _enviador(tipo_trabajo, estado[tipo_trabajo])
 
-    Usa:
-    - PDF de Palermo (columna izquierda: apuesta y monto; columna derecha: carreras)
-    - El mismo reporte.txt utilizado para San Isidro.
+        def _correr():
+            try:
+                funcion(pedido, enviar, cancelada)
+            except ComparacionCancelada:
+                enviar("cancelado")
+            except Exception as e:
+                enviar("error", f"{type(e).__name__}: {e}")
+
+        threading.Thread(target=_correr, daemon=True).start()
+
+    def _partir_reportes():
+        return [r.strip().strip('"') for r in var_reportes.get().split(";") if r.strip().strip('"')]
+
+    def _pdf_elegido():
+        ruta = var_pdf.get().strip().strip('"')
+        if ruta == estado["pdf_consultado"]:
+            return
+        estado["pdf_consultado"] = ruta
+        combo_fecha.configure(values=[_FECHA_SEGUN_REPORTE])
+        combo_fecha.current(0)
+        var_formato.set("")
+        if ruta and existe_origen(ruta):
+            _lanzar("consulta", _formato_para_ventana, ruta, threading.Event())
+
+    def _elegir_pdf():
+        ruta = filedialog.askopenfilename(
+            title="Seleccionar programa oficial (PDF)",
+            filetypes=[("Programas", f"*.pdf *{_EXTENSION_PAQUETE}"), ("Todos los archivos", "*.*")],
+        )
+        if ruta:
+            var_pdf.set(ruta)
+            _pdf_elegido()
 
-    Retorna:
-    - coincide_todo: bool
-    - diferencias: lista de strings con las diferencias encontradas
-    - fechas: lista de fechas detectadas en el PDF de Palermo
-    """
-    if datos_pdf is None:
-        datos_pdf = _leer_palermo_desde_pdf(ruta_pdf_palermo)
+    def _elegir_reportes():
+        rutas = filedialog.askopenfilenames(
+            title="Seleccionar reportes (TXT)", filetypes=[("Reportes", "*.txt"), ("Todos los archivos", "*.*")],
+        )
+        if rutas:
+            var_reportes.set("; ".join(rutas))
+
+    ttk.Button(marco, text="Elegir...", command=_elegir_pdf).grid(row=0, column=2)
+    # Ruta escrita a mano: se detecta el formato al confirmarla o al salir del campo
+    entrada_pdf.bind("<Return>", lambda e: _pdf_elegido())
+    entrada_pdf.bind("<FocusOut>", lambda e: _pdf_elegido())
+    ttk.Button(marco, text="Elegir...", command=_elegir_reportes).grid(row=1, column=2)
+
+    def _terminar(mensaje):
+        estado["corriendo"] = False
+        boton_comparar.state(["!disabled"])
+        boton_cancelar.state(["disabled"])
+        var_estado.set(mensaje)
+
+    def _comparar():
+        ruta = var_pdf.get().strip().strip('"')
+        reportes = _partir_reportes()
+        if not ruta or not existe_origen(ruta):
+            var_estado.set("El programa elegido no existe.")
+            return
+        faltantes = [r for r in reportes if not existe_origen(r)]
+        if not reportes or faltantes:
+            var_estado.set(f"No existe el reporte: {faltantes[0]}" if faltantes else "Elija al menos un reporte.")
+            return
+        for tabla in tablas.values():
+            tabla["limpiar"]()
+            pestanias.tab(tabla["marco"], text=tabla["titulo"])
+        barra_progreso.configure(value=0, maximum=1)
+        fecha = combo_fecha.get().strip()
+        pedido = {
+            "pdf": ruta,
+            "reportes": reportes,
+            "formato": _HIPODROMOS_VENTANA[combo_hipodromo.get()],
+            "fecha": None if fecha in ("", _FECHA_SEGUN_REPORTE) else fecha,
+        }
+        estado["cancelada"] = threading.Event()
+        estado["corriendo"] = True
+        boton_comparar.state(["disabled"])
+        boton_cancelar.state(["!disabled"])
+        var_estado.set("Comparando...")
+        _lanzar("comparacion", _comparar_para_ventana, pedido, estado["cancelada"])
+
+    def _cancelar():
+        if estado["cancelada"] is not None:
+            estado["cancelada"].set()
+            var_estado.set("Cancelando...")
+
+    boton_comparar.configure(command=_comparar)
+    boton_cancelar.configure(command=_cancelar)
+
+    def _procesar(tipo_trabajo, tipo, valor):
+        if tipo_trabajo == "consulta":
+            if tipo == "formato" and valor["formato"] is not None:
+                nombre = "Palermo" if valor["formato"] == "palermo" else "San Isidro"
+                var_formato.set(f"Detectado: {nombre} ({valor['confianza']:.0%})")
+            elif tipo == "fechas":
+                combo_fecha.configure(values=[_FECHA_SEGUN_REPORTE] + list(valor))
+            return
+        if tipo == "etapa":
+            var_estado.set(valor)
+        elif tipo == "filas":
+            clave, filas = valor
+            tabla = tablas[clave]
+            tabla["agregar"](filas)
+            pestanias.tab(tabla["marco"], text=f"{tabla['titulo']} ({tabla['cantidad']()})")
+        elif tipo == "fin":
+            barra_progreso.configure(value=barra_progreso["maximum"])
+            if valor:
+                pestanias.select(tablas["diferencias"]["marco"])
+                _terminar(f"Se encontraron {valor} diferencias.")
+            else:
+                _terminar("Todo coincide correctamente entre el PDF y el reporte.")
+        elif tipo == "cancelado":
+            _terminar("Comparación cancelada.")
+        elif tipo == "error":
+            _terminar(f"Ocurrió un error durante la comparación: {valor}")
+
+    def _revisar_cola():
+        progreso = None
+        for _ in range(_MENSAJES_POR_CICLO):
+            try:
+                tipo_trabajo, numero, tipo, valor = cola.get_nowait()
+            except queue.Empty:
+                break
+            if numero != estado[tipo_trabajo]:
+                continue
+            if tipo == "progreso":
+                # Del progreso solo importa el último de cada ciclo
+                progreso = valor
+                continue
+            _procesar(tipo_trabajo, tipo, valor)
+        if progreso is not None and estado["corriendo"]:
+            hechas, total = progreso
+            barra_progreso.configure(maximum=max(total, 1), value=hechas)
+            var_estado.set(f"Página {hechas} de {total}")
+        raiz.after(_INTERVALO_VENTANA_MS, _revisar_cola)
+
+    def _cerrar():
+        _cancelar()
+        raiz.destroy()
 
-    fechas = datos_pdf["fechas"]
-    apuestas_por_fecha = datos_pdf["apuestas_por_fecha"]  # {fecha: {carrera: {codigo: valor}}}
-    resumen_por_fecha = datos_pdf.get("resumen_por_fecha", {})
+    raiz.protocol("WM_DELETE_WINDOW", _cerrar)
+    if var_pdf.get():
+        _pdf_elegido()
+    raiz.after(_INTERVALO_VENTANA_MS, _revisar_cola)
+    raiz.mainloop()
 
-    # Si no se indica fecha, usar todas combinadas (fallback seguro)
-    if fecha_objetivo is None:
-        apuestas_pdf = {}
-        for _, apuestas_carreras in apuestas_por_fecha.items():
-            for carrera, apuestas in apuestas_carreras.items():
-                if carrera not in apuestas_pdf:
-                    apuestas_pdf[carrera] = {}
-                apuestas_pdf[carrera].update(apuestas)
-    else:
-        apuestas_pdf = apuestas_por_fecha.get(fecha_objetivo, {})
 
-    # Para Palermo usamos un normalizador propio que solo mira RSM TABLE
-    datos_reporte = _normalizar_reporte_palermo(ruta_reporte)  # {carrera: {codigo_apuesta: valor}}
+def _cli_ventana(args):
+    try:
+        abrir_ventana(args.pdf, args.reportes)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    return 0
 
-    # Regla Palermo:
-    # Si una apuesta (por ejemplo EXACTA/TRIFECTA) aparece UNA sola vez en el PDF para esa fecha,
-    # se interpreta como "misma base para todas las carreras" (equivalente a ALL en el reporte).
-    # Entonces expandimos esa apuesta a todas las carreras del reporte con el mismo valor.
-    if fecha_objetivo is not None:
-        resumen_fecha = resumen_por_fecha.get(fecha_objetivo, {})
-        codigos_all_si_unica = {"EXA", "TRI"}
-        for codigo in codigos_all_si_unica:
-            info = resumen_fecha.get(codigo)
-            if not info:
-                continue
-            if info.get("conteo_lineas", 0) != 1:
-                continue
-            valor = info.get("valor")
-            if valor is None:
-                continue
-            for carrera in datos_reporte.keys():
-                if carrera not in apuestas_pdf:
-                    apuestas_pdf[carrera] = {}
-                # Solo completar si no estaba explícitamente en el PDF para esa carrera
-                if codigo not in apuestas_pdf[carrera]:
-                    apuestas_pdf[carrera][codigo] = valor
 
-    diferencias = []
-    todas_las_carreras = set(apuestas_pdf.keys()) | set(datos_reporte.keys())
+def _ejecutar_cli(argv):
+    """
+    Modo línea de comandos (sin menú). Devuelve el código de salida:
+    0 si todo coincide / no hay cambios, 1 si hay diferencias.
+    """
+    import argparse
 
-    for num_carrera in sorted(todas_las_carreras):
-        tiene_pdf = num_carrera in apuestas_pdf
-        tiene_reporte = num_carrera in datos_reporte
+    parser = argparse.ArgumentParser(
+        prog="carreras_desde_pdf",
+        description="Compara programas oficiales (PDF) con reportes del sistema de apuestas.",
+    )
+    parser.add_argument(
+        "--memoria-max", type=float, default=None,
+        help="Techo de memoria en MB: activa la extracción por ventanas (ver CARRERAS_MEMORIA_MAX_MB)",
+    )
+    parser.add_argument(
+        "--ventana", type=int, default=None, help="Páginas por ventana en el modo de memoria acotada",
+    )
+    parser.add_argument(
+        "--tiempo-pagina", type=float, default=None,
+        help="Segundos máximos por página: extrae en un proceso supervisado (ver CARRERAS_TIEMPO_MAX_PAGINA)",
+    )
+    parser.add_argument(
+        "--tiempo-pdf", type=float, default=None,
+        help="Segundos máximos por documento (ver CARRERAS_TIEMPO_MAX_PDF)",
+    )
+    parser.add_argument(
+        "--motor", choices=sorted(n for n, m in _MOTORES_EXTRACCION.items() if not m.get("parcial")), default=None,
+        help="Motor de extracción de texto (ver CARRERAS_MOTOR_EXTRACCION y benchmark-motores)",
+    )
+    regiones = parser.add_mutually_exclusive_group()
+    regiones.add_argument(
+        "--regiones", dest="regiones", action="store_const", const=True, default=None,
+        help="En programas de San Isidro, extraer solo encabezado, caballos y APUESTAS "
+             "(ver CARRERAS_EXTRACCION_REGIONES)",
+    )
+    regiones.add_argument(
+        "--sin-regiones", dest="regiones", action="store_const", const=False,
+        help="Extraer siempre las páginas completas",
+    )
+    parser.add_argument(
+        "--sin-planificador", action="store_true",
+        help="No usar el planificador: páginas siempre en serie y reportes repartidos con la regla fija "
+             "(ver CARRERAS_PLANIFICADOR)",
+    )
+    parser.add_argument(
+        "--metricas-archivo", default=None,
+        help="Al terminar, escribir las métricas de Prometheus en este archivo .prom (ver CARRERAS_METRICAS_ARCHIVO)",
+    )
+    parser.add_argument(
+        "--metricas-puerto", type=int, default=None,
+        help="Exponer las métricas en http://127.0.0.1:PUERTO/metrics mientras dure la corrida "
+             "(ver CARRERAS_METRICAS_PUERTO)",
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    p_comparar = subparsers.add_parser("comparar", help="Compara un PDF con un reporte")
+    p_comparar.add_argument("pdf")
+    p_comparar.add_argument("reporte")
+    hipodromo = p_comparar.add_mutually_exclusive_group()
+    hipodromo.add_argument("--palermo", action="store_true", help="El PDF es un programa de Palermo")
+    hipodromo.add_argument(
+        "--san-isidro", action="store_true",
+        help="El PDF es un programa de San Isidro (por defecto, el formato se detecta solo)",
+    )
+    p_comparar.add_argument("--fecha", help="Fecha del PDF de Palermo a comparar")
+    p_comparar.add_argument("--formato", choices=sorted(SALIDAS_DIFERENCIAS), default="texto")
+    p_comparar.add_argument("--salida", help="Archivo de salida (por defecto, la consola)")
+    p_comparar.add_argument(
+        "--seguir", action="store_true",
+        help="El reporte se está escribiendo: seguirlo (o leerlo de la entrada estándar con '-') "
+             "y mostrar cada carrera apenas está completa",
+    )
+    p_comparar.add_argument(
+        "--inactividad", type=float, default=30.0,
+        help="Con --seguir, segundos sin que el reporte crezca para darlo por terminado",
+    )
+    p_comparar.set_defaults(funcion=_cli_comparar)
 
-        if not tiene_pdf:
-            diferencias.append(f"Carrera {num_carrera}: presente en reporte pero sin apuestas en PDF de Palermo")
-            continue
+    p_compuerta = subparsers.add_parser(
+        "compuerta",
+        help="Go/no-go antes de abrir las apuestas: se detiene en la primera diferencia "
+             f"(sale con {SALIDAS_COMPUERTA['coincide']} si coincide, {SALIDAS_COMPUERTA['difiere']} si difiere "
+             f"y {SALIDAS_COMPUERTA['sin_decision']} si no llegó a decidir)",
+    )
+    p_compuerta.add_argument("pdf")
+    p_compuerta.add_argument("reporte")
+    hipodromo = p_compuerta.add_mutually_exclusive_group()
+    hipodromo.add_argument("--palermo", action="store_true", help="El PDF es un programa de Palermo")
+    hipodromo.add_argument(
+        "--san-isidro", action="store_true",
+        help="El PDF es un programa de San Isidro (por defecto, el formato se detecta solo)",
+    )
+    p_compuerta.add_argument("--fecha", help="Fecha del PDF de Palermo a verificar")
+    p_compuerta.add_argument(
+        "--plazo", type=float, default=None,
+        help=f"Segundos máximos para decidir (por defecto CARRERAS_PLAZO_COMPUERTA o {_PLAZO_COMPUERTA_S:g})",
+    )
+    p_compuerta.set_defaults(funcion=_cli_compuerta)
 
-        if not tiene_reporte:
-            diferencias.append(f"Carrera {num_carrera}: presente en PDF de Palermo pero no en reporte")
-            continue
+    p_exportar = subparsers.add_parser(
+        "exportar", help=f"Parsea un programa y lo guarda como paquete {_EXTENSION_PAQUETE}"
+    )
+    p_exportar.add_argument("pdf")
+    p_exportar.add_argument("salida")
+    hipodromo = p_exportar.add_mutually_exclusive_group()
+    hipodromo.add_argument("--palermo", action="store_true", help="El PDF es un programa de Palermo")
+    hipodromo.add_argument(
+        "--san-isidro", action="store_true",
+        help="El PDF es un programa de San Isidro (por defecto, el formato se detecta solo)",
+    )
+    p_exportar.set_defaults(funcion=_cli_exportar)
 
-        apuestas_carrera_pdf = apuestas_pdf[num_carrera]
-        apuestas_carrera_rep = datos_reporte[num_carrera]
+    p_revision = subparsers.add_parser(
+        "revision", help="Muestra qué carreras cambiaron entre dos revisiones del programa"
+    )
+    p_revision.add_argument("pdf_anterior")
+    p_revision.add_argument("pdf_nuevo")
+    p_revision.set_defaults(funcion=_cli_revision)
 
-        codigos_pdf = set(apuestas_carrera_pdf.keys())
-        codigos_rep = set(apuestas_carrera_rep.keys())
+    p_huellas = subparsers.add_parser(
+        "huellas", help="Imprime (JSON) las huellas por carrera y de la tarjeta de un PDF o reporte"
+    )
+    p_huellas.add_argument("archivo")
+    p_huellas.set_defaults(funcion=_cli_huellas)
 
-        solo_en_pdf = codigos_pdf - codigos_rep
-        solo_en_reporte = codigos_rep - codigos_pdf
+    p_palermo = subparsers.add_parser(
+        "palermo-todas", help="Compara todas las fechas de un PDF de Palermo contra sus reportes"
+    )
+    p_palermo.add_argument("pdf")
+    origen_reportes = p_palermo.add_mutually_exclusive_group(required=True)
+    origen_reportes.add_argument("--directorio", help="Carpeta con reportes cuyo nombre incluye la fecha")
+    origen_reportes.add_argument("--manifiesto", help="JSON {fecha: ruta_reporte}")
+    p_palermo.add_argument(
+        "--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, según el planificador)",
+    )
+    p_palermo.set_defaults(funcion=_cli_palermo_todas)
 
-        if solo_en_pdf:
-            diferencias.append(
-                f"Carrera {num_carrera}: apuestas presentes en PDF de Palermo pero no en reporte: {', '.join(sorted(solo_en_pdf))}"
-            )
+    p_combinado = subparsers.add_parser(
+        "combinado",
+        help="PDF con varias reuniones: lo separa por hipódromo en una sola pasada y compara cada reporte con la suya",
+    )
+    p_combinado.add_argument("pdf")
+    p_combinado.add_argument("reportes", nargs="*", help="Reportes de las reuniones (sin reportes, solo lista los tramos)")
+    p_combinado.set_defaults(funcion=_cli_combinado)
 
-        if solo_en_reporte:
-            diferencias.append(
-                f"Carrera {num_carrera}: apuestas presentes en reporte pero no en PDF de Palermo: {', '.join(sorted(solo_en_reporte))}"
-            )
+    p_matriz = subparsers.add_parser(
+        "matriz",
+        help="Compara un programa con varios reportes (el PDF se lee una vez) y muestra qué reporte difiere en qué apuesta",
+    )
+    p_matriz.add_argument("pdf")
+    p_matriz.add_argument("reportes", nargs="+")
+    hipodromo = p_matriz.add_mutually_exclusive_group()
+    hipodromo.add_argument("--palermo", action="store_true", help="El PDF es un programa de Palermo")
+    hipodromo.add_argument(
+        "--san-isidro", action="store_true",
+        help="El PDF es un programa de San Isidro (por defecto, el formato se detecta solo)",
+    )
+    p_matriz.add_argument(
+        "--fecha", help="Fecha del PDF de Palermo para todos los reportes (por defecto, la del nombre de cada uno)",
+    )
+    p_matriz.add_argument(
+        "--procesos", type=int, default=None,
+        help="Procesos en paralelo (por defecto, según el planificador)",
+    )
+    p_matriz.add_argument("--formato", choices=["texto", "csv"], default="texto")
+    p_matriz.set_defaults(funcion=_cli_matriz)
 
-        # Comparar montos de apuestas comunes
-        codigos_comunes = codigos_pdf & codigos_rep
-        for codigo in codigos_comunes:
-            valor_pdf = apuestas_carrera_pdf.get(codigo)
-            valor_rep = apuestas_carrera_rep.get(codigo)
+    p_backfill = subparsers.add_parser(
+        "backfill", help="Revisa un archivo histórico completo (programas y reportes), retomando desde un checkpoint"
+    )
+    p_backfill.add_argument("raiz", help="Carpeta con programas y reportes (se recorre con sus subcarpetas)")
+    p_backfill.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto, en la caché local)")
+    p_backfill.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    p_backfill.add_argument("--reiniciar", action="store_true", help="Descarta el checkpoint y compara todo de nuevo")
+    p_backfill.set_defaults(funcion=_cli_backfill)
+
+    p_archivar = subparsers.add_parser(
+        "archivar", help="Carga programas y reportes de una carpeta en el archivo histórico SQLite"
+    )
+    p_archivar.add_argument("db", help="Archivo SQLite (se crea si no existe)")
+    p_archivar.add_argument("raiz", help="Carpeta con programas y reportes (se recorre con sus subcarpetas)")
+    p_archivar.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    p_archivar.set_defaults(funcion=_cli_archivar)
+
+    p_consultar = subparsers.add_parser("consultar", help="Consulta el archivo histórico SQLite")
+    p_consultar.add_argument("db")
+    consulta = p_consultar.add_mutually_exclusive_group(required=True)
+    consulta.add_argument(
+        "--minimo", nargs=2, metavar=("CODIGO", "VALOR"),
+        help="Carreras en las que el mínimo de CODIGO no es VALOR (por ejemplo: --minimo QTP 500)",
+    )
+    consulta.add_argument(
+        "--cambios-caballos", action="store_true",
+        help="Carreras cuya cantidad de caballos cambió entre revisiones del programa",
+    )
+    consulta.add_argument("--sql", help="Consulta SQL libre")
+    p_consultar.add_argument("--tipo", choices=["programa", "reporte"], default="programa", help="Con --minimo")
+    p_consultar.add_argument("--hipodromo", choices=["San Isidro", "Palermo"])
+    p_consultar.add_argument("--desde", help="Fecha inicial (AAAA-MM-DD)")
+    p_consultar.add_argument("--hasta", help="Fecha final (AAAA-MM-DD)")
+    p_consultar.set_defaults(funcion=_cli_consultar)
+
+    p_arranque = subparsers.add_parser(
+        "benchmark-arranque", help="Mide el tiempo desde el lanzamiento hasta que aparece el menú"
+    )
+    p_arranque.add_argument("--ejecutable", help="Ejecutable a medir (por defecto, este script con el Python actual)")
+    p_arranque.add_argument("--repeticiones", type=int, default=5)
+    p_arranque.set_defaults(funcion=_cli_benchmark_arranque)
 
-            if valor_pdf is None and valor_rep is None:
-                continue
-            if valor_pdf is None and valor_rep is not None:
-                diferencias.append(
-                    f"Carrera {num_carrera}: {codigo} sin monto en PDF de Palermo pero con valor {valor_rep} en reporte"
-                )
-                continue
-            if valor_pdf is not None and valor_rep is None:
-                diferencias.append(
-                    f"Carrera {num_carrera}: {codigo} con monto {valor_pdf} en PDF de Palermo pero NULL en reporte"
-                )
-                continue
+    p_memoria = subparsers.add_parser(
+        "benchmark-memoria", help="Mide el pico de memoria de la extracción según la cantidad de páginas"
+    )
+    p_memoria.add_argument("pdf")
+    p_memoria.add_argument("--paginas", help="Cantidades de páginas a medir, por ejemplo 50,100,200 (por defecto, todas)")
+    p_memoria.add_argument("--palermo", action="store_true", help="El PDF es un programa de Palermo")
+    p_memoria.add_argument("--modo", choices=["normal", "acotado", "ambos"], default="ambos")
+    p_memoria.set_defaults(funcion=_cli_benchmark_memoria)
+
+    p_motores = subparsers.add_parser(
+        "benchmark-motores",
+        help="Compara los motores de extracción instalados (tiempo y resultado de los parsers)",
+    )
+    p_motores.add_argument("pdfs", nargs="+", help="PDF o carpetas con PDF (se recorren con sus subcarpetas)")
+    p_motores.add_argument(
+        "--guardar", action="store_true", help="Usar por defecto el más rápido cuyo resultado coincide",
+    )
+    p_motores.set_defaults(funcion=_cli_benchmark_motores)
 
-            # Ambos tienen valor numérico
-            if abs(valor_pdf - valor_rep) > 0.01:
-                diferencias.append(
-                    f"Carrera {num_carrera}: monto de {codigo} difiere (PDF Palermo: {valor_pdf}, Reporte: {valor_rep})"
-                )
+    p_planificador = subparsers.add_parser(
+        "planificador",
+        help="Muestra lo que aprendió el planificador (costos por página y del pool) y sus últimas decisiones",
+    )
+    p_planificador.add_argument("--ultimas", type=int, default=10, help="Corridas recientes a listar")
+    p_planificador.add_argument("--borrar", action="store_true", help="Descarta el historial y vuelve a empezar")
+    p_planificador.set_defaults(funcion=_cli_planificador)
 
-    coincide_todo = len(diferencias) == 0
-    return coincide_todo, diferencias, fechas
+    p_ventana = subparsers.add_parser(
+        "ventana", help="Abre la ventana gráfica de comparación (la lectura no bloquea la ventana)",
+    )
+    p_ventana.add_argument("pdf", nargs="?", default=None, help="Programa a precargar")
+    p_ventana.add_argument("reportes", nargs="*", help="Reportes a precargar")
+    p_ventana.set_defaults(funcion=_cli_ventana)
+
+    args = parser.parse_args(argv)
+    if args.memoria_max is not None or args.ventana is not None:
+        configurar_memoria(
+            limite_mb=args.memoria_max if args.memoria_max is not None else _limite_memoria_mb(),
+            paginas_por_ventana=args.ventana,
+        )
+    if args.tiempo_pagina is not None or args.tiempo_pdf is not None:
+        configurar_tiempos(
+            max_pagina_s=args.tiempo_pagina if args.tiempo_pagina is not None else _tiempo_max_pagina_s(),
+            max_pdf_s=args.tiempo_pdf if args.tiempo_pdf is not None else _tiempo_max_pdf_s(),
+        )
+    if args.motor is not None:
+        try:
+            configurar_motor(args.motor)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.regiones is not None:
+        configurar_regiones(args.regiones)
+    if args.sin_planificador:
+        configurar_planificador(False)
+    puerto = args.metricas_puerto
+    if puerto is None:
+        puerto = _numero_entorno("CARRERAS_METRICAS_PUERTO", tipo=int)
+    configurar_metricas(archivo=args.metricas_archivo or _METRICAS_ARCHIVO, puerto=puerto)
+    try:
+        return args.funcion(args)
+    finally:
+        escribir_metricas()
 
 
 if __name__ == "__main__":
-    import os
     import sys
-    try:
-        import tkinter as _tk
-        from tkinter import filedialog as _filedialog
-        _TIENE_TK = True
-    except Exception:
-        _TIENE_TK = False
+
+    # Necesario para los pools de procesos en el ejecutable de PyInstaller (Windows).
+    # Fuera del ejecutable no hace falta y se evita importar multiprocessing al arrancar.
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+
+        multiprocessing.freeze_support()
+
+    # Con argumentos se ejecuta el modo línea de comandos; sin argumentos, el menú
+    if len(sys.argv) > 1:
+        sys.exit(_ejecutar_cli(sys.argv[1:]))
+
+    # tkinter se importa recién al abrir el primer diálogo: importarlo al inicio
+    # demora la aparición del menú aunque el operador escriba las rutas a mano.
+    _TK = {}
+
+    def _importar_tk():
+        """Devuelve (tkinter, filedialog) o None si no están disponibles."""
+        if "modulos" not in _TK:
+            try:
+                import tkinter
+                from tkinter import filedialog
+
+                _TK["modulos"] = (tkinter, filedialog)
+            except Exception:
+                _TK["modulos"] = None
+        return _TK["modulos"]
 
     def _limpiar_pantalla():
         """
         Limpia la consola para que los menús se vean como una sola pantalla.
         En Windows usa 'cls' y en otros sistemas 'clear'.
+        Si la salida no es una consola (redirigida, benchmark) no hace nada.
         """
+        if not sys.stdout.isatty():
+            return
         try:
             if os.name == "nt":
                 os.system("cls")
@@ -1148,10 +7463,38 @@ if __name__ == "__main__":
             # Si por algún motivo falla, simplemente no limpia.
             pass
 
+    def _elegir_miembro(ruta_zip, extensiones_validas):
+        """
+        Pide elegir, dentro de un .zip, el archivo a usar (sin descomprimirlo a disco).
+        Devuelve la ruta del miembro ("archivo.zip::nombre") o None.
+        """
+        try:
+            miembros = miembros_archivo(ruta_zip, extensiones_validas or None)
+        except Exception as e:
+            print(f"No se pudo abrir el archivo comprimido: {e}\n")
+            return None
+        if not miembros:
+            print(f"El archivo comprimido no contiene archivos de tipo: {', '.join(sorted(extensiones_validas))}\n")
+            return None
+        if len(miembros) == 1:
+            return miembros[0]
+        print("Archivos dentro del comprimido:")
+        for i, m in enumerate(miembros, start=1):
+            print(f"  {i}. {m.split(_SEPARADOR_MIEMBRO, 1)[1]}")
+        while True:
+            eleccion = input(f"Ingrese un número (1-{len(miembros)}) o Enter para cancelar: ").strip()
+            if not eleccion:
+                return None
+            if eleccion.isdigit() and 1 <= int(eleccion) <= len(miembros):
+                return miembros[int(eleccion) - 1]
+            print("Opción no válida.")
+
     def _pedir_ruta(mensaje, extensiones_validas):
         """
         Pide una ruta por consola y valida que exista y tenga una extensión permitida.
         extensiones_validas: conjunto de strings, por ejemplo {'.pdf'} o {'.txt'}.
+        También acepta un .zip (se elige el archivo de adentro), un .gz o
+        directamente "archivo.zip::nombre".
         """
         while True:
             ruta = input(mensaje).strip().strip('"')
@@ -1159,11 +7502,16 @@ if __name__ == "__main__":
                 print("Operación cancelada.\n")
                 return None
 
-            if not os.path.isfile(ruta):
+            if not existe_origen(ruta):
                 print("La ruta ingresada no es un archivo válido. Intente nuevamente.\n")
                 continue
 
-            ext = os.path.splitext(ruta)[1].lower()
+            if ruta.lower().endswith(".zip"):
+                ruta = _elegir_miembro(ruta, extensiones_validas)
+                if ruta is None:
+                    continue
+
+            ext = extension_logica(ruta)
             if extensiones_validas and ext not in extensiones_validas:
                 print(f"Extensión inválida ({ext}). Se esperan archivos de tipo: {', '.join(sorted(extensiones_validas))}\n")
                 continue
@@ -1176,16 +7524,23 @@ if __name__ == "__main__":
         extensiones_validas: conjunto de strings como {'.pdf'} o {'.txt'}.
         descripcion: texto descriptivo para el diálogo (por ejemplo 'programa oficial (PDF)').
         """
-        if not _TIENE_TK:
+        modulos = _importar_tk()
+        if modulos is None:
             return None
+        _tk, _filedialog = modulos
 
-        raiz = _tk.Tk()
+        try:
+            raiz = _tk.Tk()
+        except Exception:
+            # Sin entorno gráfico disponible: se pide la ruta por consola
+            return None
         raiz.withdraw()
 
         patrones = []
         for ext in sorted(extensiones_validas):
             patron = f"*{ext}"
             patrones.append((f"Archivos {ext.upper()}", patron))
+        patrones.append(("Archivos comprimidos", "*.zip *.gz"))
         patrones.append(("Todos los archivos", "*.*"))
 
         ruta = _filedialog.askopenfilename(
@@ -1201,45 +7556,50 @@ if __name__ == "__main__":
         if not os.path.isfile(ruta):
             return None
 
-        ext = os.path.splitext(ruta)[1].lower()
+        if ruta.lower().endswith(".zip"):
+            ruta = _elegir_miembro(ruta, extensiones_validas)
+            if ruta is None:
+                return None
+
+        ext = extension_logica(ruta)
         if extensiones_validas and ext not in extensiones_validas:
             return None
 
         return ruta
 
-    def _formatear_apuestas(apuestas_dict):
-        """
-        Devuelve un string legible de un dict {codigo_apuesta: valor_float_o_None}.
-        Ejemplo: {'GAN': None, 'IMP': 1000.0} -> 'GAN, IMP=1000'
-        """
-        if not apuestas_dict:
-            return "-"
-
-        # Orden lógico de códigos para que se vea prolijo
-        orden_preferido = ["GAN", "SEG", "TER", "EXA", "IMP", "TRI", "DOB", "TPL", "QTN", "QTP", "CAD", "CUA"]
+    _NOMBRES_FORMATO = {"san_isidro": "San Isidro", "palermo": "Palermo"}
 
-        def _clave_orden(cod):
-            try:
-                return (0, orden_preferido.index(cod))
-            except ValueError:
-                return (1, cod)
+    def _actualizar_metricas():
+        """Cada comparación del menú cuenta como una corrida: se reescribe el archivo de métricas."""
+        try:
+            escribir_metricas()
+        except OSError as e:
+            print(f"No se pudieron escribir las métricas: {e}\n")
 
-        partes = []
-        for codigo in sorted(apuestas_dict.keys(), key=_clave_orden):
-            valor = apuestas_dict[codigo]
-            if valor is None:
-                partes.append(f"{codigo}")
-            else:
-                # Mostrar enteros sin decimales cuando aplique
-                if isinstance(valor, (int, float)) and abs(valor - int(valor)) < 1e-6:
-                    partes.append(f"{codigo}={int(valor)}")
-                else:
-                    partes.append(f"{codigo}={valor:.2f}")
-        return ", ".join(partes)
+    def _aviso_formato(ruta, formato_esperado):
+        """
+        Aviso para mostrar junto al PDF elegido si la detección automática lo
+        reconoce como de otro hipódromo; None si coincide o no se puede saber.
+        """
+        try:
+            deteccion = detectar_formato(ruta)
+        except Exception:
+            return None
+        formato = deteccion["formato"]
+        if formato is None or formato == formato_esperado or deteccion["confianza"] < _CONFIANZA_MINIMA:
+            return None
+        return (
+            f"ATENCIÓN: el PDF parece un programa de {_NOMBRES_FORMATO[formato]} "
+            f"(confianza {deteccion['confianza']:.0%}). Verifique el hipódromo elegido."
+        )
 
     def _menu_comparar(hipodromo_nombre):
         ruta_pdf_seleccionada = None
+        aviso_pdf = None
         ruta_reporte_seleccionado = None
+        # Estado de la última comparación: al repetir la opción 3 con el reporte
+        # editado solo se re-parsean y se vuelven a comparar las carreras que cambiaron
+        estado_comparacion = None
 
         while True:
             _limpiar_pantalla()
@@ -1254,6 +7614,8 @@ if __name__ == "__main__":
 
             if ruta_pdf_seleccionada:
                 print(f"PDF seleccionado:      {ruta_pdf_seleccionada}")
+                if aviso_pdf:
+                    print(aviso_pdf)
             else:
                 print("PDF seleccionado:      (ninguno)")
 
@@ -1267,12 +7629,14 @@ if __name__ == "__main__":
 
             if opcion == "1":
                 print("Seleccione el programa oficial (PDF).")
-                ruta = _seleccionar_archivo_gui({".pdf"}, "programa oficial (PDF)")
+                ruta = _seleccionar_archivo_gui({".pdf", _EXTENSION_PAQUETE}, "programa oficial (PDF)")
                 if not ruta:
                     print("No se seleccionó ningún archivo desde la ventana. Puede ingresar la ruta manualmente.")
-                    ruta = _pedir_ruta("Ruta del PDF (Enter para cancelar): ", {".pdf"})
+                    ruta = _pedir_ruta("Ruta del PDF (Enter para cancelar): ", {".pdf", _EXTENSION_PAQUETE})
                 if ruta:
                     ruta_pdf_seleccionada = ruta
+                    # San Isidro y La Plata usan el mismo formato de programa
+                    aviso_pdf = _aviso_formato(ruta, "san_isidro")
                     print(f"PDF seleccionado: {ruta_pdf_seleccionada}\n")
 
             elif opcion == "2":
@@ -1293,54 +7657,42 @@ if __name__ == "__main__":
                 print(f"Comparando archivos para {hipodromo_nombre}...")
                 print("Leyendo datos del PDF y del reporte, por favor espere...\n")
                 try:
-                    apuestas = obtener_apuestas_por_carrera(ruta_pdf_seleccionada)
-                    coincide, diferencias = comparar_pdf_y_reporte(
-                        ruta_pdf_seleccionada,
-                        ruta_reporte_seleccionado,
-                        apuestas_raw=apuestas,
-                    )
+                    # Misma pareja de archivos sin cambios: se muestra el resultado guardado
+                    clave = clave_resultado(ruta_pdf_seleccionada, ruta_reporte_seleccionado, hipodromo_nombre)
+                    resultado = obtener_resultado_cacheado(clave)
+                    if resultado is None:
+                        coincide, diferencias, estado_comparacion = comparar_pdf_y_reporte_incremental(
+                            ruta_pdf_seleccionada,
+                            ruta_reporte_seleccionado,
+                            estado=estado_comparacion,
+                        )
+                        tablas = None
+                        # Para SAN ISIDRO (y formatos similares) mostrar tabla comparativa
+                        if hipodromo_nombre.lower() == "san isidro":
+                            try:
+                                tablas = _renderizar_tablas(
+                                    estado_comparacion["datos_pdf"],
+                                    estado_comparacion["modelo_reporte"]["datos"],
+                                )
+                            except Exception as e:
+                                print(f"No se pudo mostrar la tabla detallada: {e}\n")
+                        resultado = {"coincide": coincide, "diferencias": diferencias, "tablas": tablas}
+                        # Con páginas ilegibles se vuelve a intentar la próxima vez
+                        if not paginas_ilegibles(ruta_pdf_seleccionada):
+                            guardar_resultado(clave, resultado)
                 except Exception as e:
                     print(f"Ocurrió un error durante la comparación: {e}\n")
                     continue
+                _actualizar_metricas()
 
-                # Para SAN ISIDRO (y formatos similares) mostrar tabla comparativa
-                if hipodromo_nombre.lower() == "san isidro":
-                    try:
-                        datos_pdf_norm = _normalizar_pdf(ruta_pdf_seleccionada, apuestas_raw=apuestas)
-                        datos_rep_norm = _normalizar_reporte(ruta_reporte_seleccionado)
-
-                        todas_carreras = sorted(set(datos_pdf_norm.keys()) | set(datos_rep_norm.keys()))
-
-                        print("")
-                        print("  DATOS OBTENIDOS DEL PDF")
-                        print("  " + "-" * 62)
-                        print("  Carrera  | Cab.   | Apuestas / Montos")
-                        print("  ---------+--------+----------------------------------------")
-                        for c in todas_carreras:
-                            info = datos_pdf_norm.get(c)
-                            cab = info.get("caballos", 0) if info else 0
-                            ap = _formatear_apuestas(info.get("apuestas", {})) if info else "-"
-                            print(f"  {c:>8} | {cab:>6} | {ap}")
-                        print("")
-
-                        print("  DATOS OBTENIDOS DEL REPORTE")
-                        print("  " + "-" * 62)
-                        print("  Carrera  | Cab.   | Apuestas / Montos")
-                        print("  ---------+--------+----------------------------------------")
-                        for c in todas_carreras:
-                            info = datos_rep_norm.get(c)
-                            cab = info.get("caballos", 0) if info else 0
-                            ap = _formatear_apuestas(info.get("apuestas", {})) if info else "-"
-                            print(f"  {c:>8} | {cab:>6} | {ap}")
-                        print("")
-                    except Exception as e:
-                        print(f"No se pudo mostrar la tabla detallada: {e}\n")
+                if resultado["tablas"] is not None:
+                    print(resultado["tablas"])
 
-                if coincide:
+                if resultado["coincide"]:
                     print("COMPARACIÓN: todo coincide correctamente entre el PDF y el reporte.\n")
                 else:
                     print("COMPARACIÓN: se encontraron diferencias (carreras con inconsistencias):")
-                    for d in diferencias:
+                    for d in resultado["diferencias"]:
                         print(f"  - {d}")
                     print()
 
@@ -1368,6 +7720,7 @@ if __name__ == "__main__":
             ruta_pdf_palermo = None
 
         ruta_reporte = None
+        aviso_pdf = None
 
         while True:
             _limpiar_pantalla()
@@ -1382,6 +7735,8 @@ if __name__ == "__main__":
 
             if ruta_pdf_palermo:
                 print(f"PDF de Palermo seleccionado: {ruta_pdf_palermo}")
+                if aviso_pdf:
+                    print(aviso_pdf)
             else:
                 print("PDF de Palermo seleccionado: (ninguno)")
 
@@ -1395,12 +7750,13 @@ if __name__ == "__main__":
 
             if opcion == "1":
                 print("Seleccione el programa oficial (PDF) de PALERMO.")
-                ruta = _seleccionar_archivo_gui({".pdf"}, "programa oficial PALERMO (PDF)")
+                ruta = _seleccionar_archivo_gui({".pdf", _EXTENSION_PAQUETE}, "programa oficial PALERMO (PDF)")
                 if not ruta:
                     print("No se seleccionó ningún archivo desde la ventana. Puede ingresar la ruta manualmente.")
-                    ruta = _pedir_ruta("Ruta del PDF de PALERMO (Enter para cancelar): ", {".pdf"})
+                    ruta = _pedir_ruta("Ruta del PDF de PALERMO (Enter para cancelar): ", {".pdf", _EXTENSION_PAQUETE})
                 if ruta:
                     ruta_pdf_palermo = ruta
+                    aviso_pdf = _aviso_formato(ruta, "palermo")
                     print(f"PDF de Palermo seleccionado: {ruta_pdf_palermo}\n")
 
             elif opcion == "2":
@@ -1422,15 +7778,15 @@ if __name__ == "__main__":
                     print("Debe seleccionar primero el archivo de reporte (opción 2).\n")
                     continue
 
-                print("Leyendo datos del PDF de Palermo, por favor espere...\n")
+                print("Buscando fechas en el PDF de Palermo...\n")
 
                 try:
-                    datos_pdf = _leer_palermo_desde_pdf(ruta_pdf_palermo)
+                    indice_fechas = indexar_fechas_palermo(ruta_pdf_palermo)
                 except Exception as e:
                     print(f"Ocurrió un error leyendo el PDF de Palermo: {e}\n")
                     continue
 
-                fechas = datos_pdf.get("fechas", [])
+                fechas = indice_fechas.get("fechas", [])
                 if not fechas:
                     print("No se encontraron fechas en el PDF de Palermo.\n")
                     continue
@@ -1466,53 +7822,55 @@ if __name__ == "__main__":
 
                     print(f"\nFecha seleccionada: {fecha_seleccionada}\n")
 
-                print("Comparando PALERMO (apuestas y montos) con el reporte...")
-                print("Esto puede demorar unos instantes...\n")
+                clave = clave_resultado(ruta_pdf_palermo, ruta_reporte, "palermo", fecha_seleccionada)
+                resultado = obtener_resultado_cacheado(clave)
+                if resultado is None:
+                    # Solo se procesan en detalle las páginas de la fecha elegida
+                    print("Leyendo datos del PDF de Palermo, por favor espere...\n")
+                    try:
+                        datos_pdf = _leer_palermo_desde_pdf(ruta_pdf_palermo, fecha=fecha_seleccionada)
+                    except Exception as e:
+                        print(f"Ocurrió un error leyendo el PDF de Palermo: {e}\n")
+                        continue
 
-                try:
-                    coincide, diferencias, _ = comparar_palermo(
-                        ruta_pdf_palermo,
-                        ruta_reporte,
-                        fecha_objetivo=fecha_seleccionada,
-                        datos_pdf=datos_pdf,
-                    )
-                except Exception as e:
-                    print(f"Ocurrió un error durante la comparación: {e}\n")
-                    continue
+                    print("Comparando PALERMO (apuestas y montos) con el reporte...")
+                    print("Esto puede demorar unos instantes...\n")
 
-                # Mostrar tablas de apuestas PDF vs REPORTE para PALERMO
-                try:
-                    datos_rep_norm_pal = _normalizar_reporte_palermo(ruta_reporte)
-                    apuestas_por_fecha = datos_pdf.get("apuestas_por_fecha", {})
-                    apuestas_pdf_pal = apuestas_por_fecha.get(fecha_seleccionada, {})
-                    todas_carreras = sorted(set(apuestas_pdf_pal.keys()) | set(datos_rep_norm_pal.keys()))
+                    try:
+                        coincide, diferencias, _ = comparar_palermo(
+                            ruta_pdf_palermo,
+                            ruta_reporte,
+                            fecha_objetivo=fecha_seleccionada,
+                            datos_pdf=datos_pdf,
+                        )
+                    except Exception as e:
+                        print(f"Ocurrió un error durante la comparación: {e}\n")
+                        continue
 
-                    print()
-                    print("  DATOS OBTENIDOS DEL PDF (PALERMO)")
-                    print("  " + "-" * 62)
-                    print("  Carrera  | Apuestas (código=monto)")
-                    print("  ---------+----------------------------------------")
-                    for c in todas_carreras:
-                        ap_pdf = _formatear_apuestas(apuestas_pdf_pal.get(c, {}))
-                        print(f"  {c:>8} | {ap_pdf}")
-                    print()
+                    # Tablas de apuestas PDF vs REPORTE para PALERMO
+                    tablas = None
+                    try:
+                        datos_rep_norm_pal = _normalizar_reporte_palermo(ruta_reporte)
+                        apuestas_pdf_pal = _apuestas_palermo_para_fecha(
+                            datos_pdf, fecha_seleccionada, datos_rep_norm_pal
+                        )
+                        tablas = _renderizar_tablas(apuestas_pdf_pal, datos_rep_norm_pal, palermo=True)
+                    except Exception as e:
+                        print(f"No se pudo mostrar la tabla detallada de PALERMO: {e}\n")
 
-                    print("  DATOS OBTENIDOS DEL REPORTE (PALERMO)")
-                    print("  " + "-" * 62)
-                    print("  Carrera  | Apuestas (código=monto)")
-                    print("  ---------+----------------------------------------")
-                    for c in todas_carreras:
-                        ap_rep = _formatear_apuestas(datos_rep_norm_pal.get(c, {}))
-                        print(f"  {c:>8} | {ap_rep}")
-                    print()
-                except Exception as e:
-                    print(f"No se pudo mostrar la tabla detallada de PALERMO: {e}\n")
+                    resultado = {"coincide": coincide, "diferencias": diferencias, "tablas": tablas}
+                    if not paginas_ilegibles(ruta_pdf_palermo):
+                        guardar_resultado(clave, resultado)
+                _actualizar_metricas()
+
+                if resultado["tablas"] is not None:
+                    print(resultado["tablas"])
 
-                if coincide:
+                if resultado["coincide"]:
                     print("COMPARACIÓN PALERMO: todas las apuestas y montos coinciden con el reporte para la fecha seleccionada.\n")
                 else:
                     print("COMPARACIÓN PALERMO: se encontraron diferencias en apuestas/montos para la fecha seleccionada:")
-                    for d in diferencias:
+                    for d in resultado["diferencias"]:
                         print(f"  - {d}")
                     print()
 
@@ -1527,6 +7885,12 @@ if __name__ == "__main__":
                 print("Opción no válida. Intente nuevamente.\n")
 
     # Menú principal
+    puerto_metricas = _numero_entorno("CARRERAS_METRICAS_PUERTO", tipo=int)
+    if puerto_metricas is not None:
+        try:
+            servir_metricas(puerto_metricas)
+        except OSError as e:
+            print(f"No se pudo abrir el endpoint de métricas: {e}")
     while True:
         _limpiar_pantalla()
         print("======================================")
@@ -1536,9 +7900,11 @@ if __name__ == "__main__":
         print("2. PALERMO")
         print("3. LA PLATA  (PROXIMAMENTE)")
         print("4. Salir")
+        print("5. Abrir la ventana gráfica")
         print("======================================")
 
-        opcion = input("Seleccione el hipódromo (1-4): ").strip()
+        # "Seleccione el hipódromo" es la marca que espera medir_arranque
+        opcion = input("Seleccione el hipódromo (1-5): ").strip()
         print()
 
         if opcion == "1":
@@ -1550,5 +7916,11 @@ if __name__ == "__main__":
         elif opcion == "4":
             print("Saliendo del programa.")
             sys.exit(0)
+        elif opcion == "5":
+            try:
+                abrir_ventana()
+            except RuntimeError as e:
+                print(f"{e}\n")
+                input("Presione Enter para volver al menú principal...")
         else:
             print("Opción no válida. Intente nuevamente.\n")
\ No newline at end of file
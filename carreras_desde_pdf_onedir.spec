@@ -0,0 +1,50 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Build de arranque rápido: carpeta (one-dir) en lugar de un único .exe.
+# No se descomprime en un directorio temporal en cada lanzamiento y sin UPX
+# no hay que descomprimir las DLL, así que el menú aparece casi al instante.
+#   pyinstaller carreras_desde_pdf_onedir.spec
+# Resultado: dist/carreras_desde_pdf/carreras_desde_pdf.exe (distribuir la carpeta entera)
+
+
+a = Analysis(
+    ['carreras_desde_pdf.py'],
+    pathex=[],
+    binaries=[],
+    datas=[],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='carreras_desde_pdf',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='carreras_desde_pdf',
+)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import carreras_desde_pdf  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_aislada(tmp_path, monkeypatch):
+    """Cada prueba con su propia carpeta de caché y sin lo que quedó en memoria de otra."""
+    c = carreras_desde_pdf
+    directorio = str(tmp_path / "cache")
+    monkeypatch.setenv("CARRERAS_CACHE_DIR", directorio)
+    monkeypatch.setattr(c, "_DIRECTORIO_CACHE", directorio)
+    for nombre in (
+        "_TEXTOS_EN_MEMORIA", "_HASHES_ARCHIVOS", "_PAGINAS_ILEGIBLES",
+        "_MIEMBROS_EN_MEMORIA", "_RESULTADOS_EN_MEMORIA", "_VALORES_METRICAS", "_AVISOS_CONFIGURACION",
+    ):
+        monkeypatch.setattr(c, nombre, type(getattr(c, nombre))())
+    monkeypatch.setattr(c, "_HISTORIAL_PLANES", None)
+    monkeypatch.setattr(c, "_LINEAS_HISTORIAL", 0)
+    for nombre in ("_MOTOR_EXTRACCION", "_EXTRACCION_REGIONES"):
+        monkeypatch.setattr(c, nombre, None)
+    for nombre in ("_LIMITE_MEMORIA_MB", "_PAGINAS_POR_VENTANA", "_TIEMPO_MAX_PAGINA_S", "_TIEMPO_MAX_PDF_S"):
+        monkeypatch.setattr(c, nombre, c._DEL_ENTORNO)
+    for variable in list(os.environ):
+        if variable.startswith("CARRERAS_") and variable != "CARRERAS_CACHE_DIR":
+            monkeypatch.delenv(variable)
+    return directorio
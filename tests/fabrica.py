@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Programas y reportes sintéticos para las pruebas: PDF mínimos (una fuente
+Type1 con WinAnsiEncoding, un renglón por línea) con el formato de San Isidro
+y de Palermo, y reportes con líneas 1/9 y RSM TABLE.
+"""
+
+
+class Codificado(str):
+    """
+    Tramo dibujado con una fuente con codificación propia (/Differences): los
+    dígitos y "/" se guardan como las letras A-K, así que solo se leen bien con
+    el mapeo de fuentes de extract_text().
+    """
+
+
+_DIGITOS_CODIFICADOS = str.maketrans("0123456789/", "ABCDEFGHIJK")
+_FUENTE_CODIFICADA = (
+    b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding << /BaseEncoding /WinAnsiEncoding "
+    b"/Differences [65 /zero /one /two /three /four /five /six /seven /eight /nine /slash] >> >>"
+)
+
+
+def _escapar(texto):
+    return texto.encode("cp1252").replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def escribir_pdf(ruta, paginas):
+    """
+    Escribe un PDF con una página por elemento de `paginas` (listas de líneas).
+    Una línea puede ser una lista de tramos: cada tramo se dibuja con su
+    propio Tj, corrido a la derecha del anterior, en el mismo renglón. Los
+    tramos Codificado usan una segunda fuente, que solo se agrega a las
+    páginas que la necesitan.
+    """
+    objetos = []
+
+    def agregar(cuerpo):
+        objetos.append(cuerpo)
+        return len(objetos)
+
+    fuente = agregar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    fuente_codificada = None
+    id_paginas = agregar(b"")
+    hijos = []
+    for lineas in paginas:
+        partes = [b"BT /F1 10 Tf 40 800 Td 12 TL"]
+        fuentes = b"/F1 %d 0 R" % fuente
+        for linea in lineas:
+            tramos = linea if isinstance(linea, list) else [linea]
+            desplazamiento = 0
+            for i, tramo in enumerate(tramos):
+                if i:
+                    partes.append(b"60 0 Td")
+                    desplazamiento += 60
+                if isinstance(tramo, Codificado):
+                    if fuente_codificada is None:
+                        fuente_codificada = agregar(_FUENTE_CODIFICADA)
+                    if b"/F2" not in fuentes:
+                        fuentes += b" /F2 %d 0 R" % fuente_codificada
+                    partes.append(b"/F2 10 Tf (" + _escapar(tramo.translate(_DIGITOS_CODIFICADOS)) + b") Tj /F1 10 Tf")
+                else:
+                    partes.append(b"(" + _escapar(tramo) + b") Tj")
+            if desplazamiento:
+                partes.append(b"%d 0 Td" % -desplazamiento)
+            partes.append(b"T*")
+        partes.append(b"ET")
+        datos = b"\n".join(partes)
+        contenido = agregar(b"<< /Length %d >>\nstream\n" % len(datos) + datos + b"\nendstream")
+        hijos.append(agregar(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << %s >> >> >>" % (id_paginas, contenido, fuentes)
+        ))
+    objetos[id_paginas - 1] = (
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % h for h in hijos) + b"] /Count %d >>" % len(hijos)
+    )
+    catalogo = agregar(b"<< /Type /Catalog /Pages %d 0 R >>" % id_paginas)
+
+    salida = bytearray(b"%PDF-1.4\n")
+    posiciones = []
+    for numero, cuerpo in enumerate(objetos, start=1):
+        posiciones.append(len(salida))
+        salida += b"%d 0 obj\n" % numero + cuerpo + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    for posicion in posiciones:
+        salida += b"%010d 00000 n \n" % posicion
+    salida += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objetos) + 1, catalogo, inicio_xref
+    )
+    with open(ruta, "wb") as f:
+        f.write(salida)
+    return ruta
+
+
+def caballos(num_carrera):
+    return 8 + num_carrera % 5
+
+
+def paginas_san_isidro(carreras=10, imperfecta=None, hipodromo=None):
+    """
+    Una página por carrera: encabezado, caballos, APUESTAS y una tabla de
+    performances (texto que la extracción por regiones descarta).
+    imperfecta: {num_carrera: monto} para cambiar el mínimo de Imperfecta.
+    """
+    paginas = []
+    for num in range(1, carreras + 1):
+        lineas = [hipodromo] if hipodromo else []
+        lineas.append(f"{num}ª - Premio CARRERA {num} - 14:{num:02d} hs.")
+        for h in range(1, caballos(num) + 1):
+            # Algunos caballos con el número en un tramo aparte, como en los programas reales
+            lineas.append([f"{h:02d}", f"CABALLO NUMERO {h}"] if h % 3 == 0 else f"{h:02d} CABALLO NUMERO {h}")
+        monto = (imperfecta or {}).get(num, 1000)
+        lineas.append(
+            f"APUESTAS: Ganador, Segundo, Tercero $ 2, Exacta $ 1000, Imperfecta $ {monto}, Trifecta $ 1000"
+        )
+        lineas.append("Doble $ 1000, Cuaterna 1er.Pase $ 2000, Triplo 2do.Pase $ 500")
+        lineas.append("Tabla de performances pasadas")
+        lineas.append("Última: 12 de marzo, 1400 m, 1:24.3, 3° de 9")
+        lineas.append(["a", "1/2 cpo. del ganador"])
+        paginas.append(lineas)
+    return paginas
+
+
+def reporte_san_isidro(carreras=10, imperfecta=None, encabezado="HEADER"):
+    lineas = [encabezado, ""]
+    for num in range(1, carreras + 1):
+        lineas.append(f"{num:>2}  GAN SEG TER EXA IMP TRI " + " ".join(["1/9"] * caballos(num)))
+        lineas.append("     DOB( 1,2 ) QTN( 1-4 )")
+    lineas += [
+        "",
+        "RSM TABLE",
+        "  1  ALL                   ---  EXA  TS  1000,00  x",
+        "  2  ALL                   ---  TRI  TS  1000,00  x",
+        "  3  ALL                   ---  DOB  TS  1000,00  x",
+        "  4  ALL                   ---  QTN  TS  2000,00  x",
+    ]
+    for num in range(1, carreras + 1):
+        lineas.append(f"  {4 + num}  {num:<20}  ---  IMP  TS  {(imperfecta or {}).get(num, 1000)},00  x")
+    lineas += ["TIM BETTING", "CARD DEFAULT MINIMUMS - ARS", "GAN 2,00 SEG 2,00 EXA 1000,00"]
+    return "\n".join(lineas) + "\n"
+
+
+def paginas_palermo(fechas=("01/03/2026", "02/03/2026")):
+    """Dos páginas por fecha; el Doble de cada fecha vale 500, 600, ..."""
+    paginas = []
+    for i, fecha in enumerate(fechas):
+        paginas.append([
+            f"REUNION DEL DIA {fecha}",
+            "EXACTA: ($ 1000.-) DESDE LA 1ª HASTA LA 10ª",
+            "IMPERFECTA ($ 1000.-) 2ª4ª6ª9ª; 10ª",
+            f"DOBLE ($ {500 + 100 * i}.-) 1ª, 3ª",
+            "CUATRIFECTA ($ 500.-) 5ª",
+        ])
+        paginas.append([f"Otras condiciones {fecha}", "Texto libre sin apuestas"])
+    return paginas
+
+
+def reporte_palermo(indice_fecha=0):
+    """Reporte que coincide con la fecha número `indice_fecha` de paginas_palermo."""
+    return "\n".join([
+        "RSM TABLE",
+        "  1  ALL                   ---  EXA  TS  1000,00  x",
+        "  2  2,4,6,9,10            ---  IMP  TS  1000,00  x",
+        f"  3  1,3                   ---  DOB  TS  {500 + 100 * indice_fecha},00  x",
+        "  4  5                     ---  CUA  TS   500,00  x",
+        "TIM BETTING",
+    ]) + "\n"
+
+
+def escribir(ruta, texto):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
+    return ruta
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Archivo histórico SQLite: archivar una carpeta y consultarla."""
+
+import os
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir, escribir_pdf, paginas_palermo, paginas_san_isidro, reporte_palermo, reporte_san_isidro
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    raiz = tmp_path / "temporada"
+    os.makedirs(raiz / "palermo")
+    escribir_pdf(str(raiz / "2026-03-01_programa.pdf"), paginas_san_isidro(imperfecta={4: 700}))
+    # Revisión del mismo día: la carrera 3 pierde su último caballo
+    revision = paginas_san_isidro(imperfecta={4: 700})
+    del revision[2][11]
+    escribir_pdf(str(raiz / "2026-03-01_programa_rev.pdf"), revision)
+    escribir(str(raiz / "2026-03-01.txt"), reporte_san_isidro())
+    escribir_pdf(str(raiz / "palermo" / "programa.pdf"), paginas_palermo(("01/03/26", "02/03/26")))
+    escribir(str(raiz / "palermo" / "2026-03-02.txt"), reporte_palermo(1))
+    return str(raiz)
+
+
+def _archivar(tmp_path, carpeta):
+    return c.archivar_directorio(str(tmp_path / "archivo.db"), carpeta, max_procesos=1)
+
+
+def _documentos(tmp_path):
+    conexion = c.abrir_archivo_db(str(tmp_path / "archivo.db"))
+    try:
+        return conexion.execute(
+            "SELECT hipodromo, tipo, fecha, version, (SELECT count(*) FROM apuestas a WHERE a.documento_id = d.id) "
+            "FROM documentos d ORDER BY hipodromo, tipo, fecha, ruta"
+        ).fetchall()
+    finally:
+        conexion.close()
+
+
+def test_crea_el_esquema(tmp_path):
+    ruta = str(tmp_path / "archivo.db")
+    for _ in range(2):  # abrir de nuevo no falla ni borra nada
+        conexion = c.abrir_archivo_db(ruta)
+        tablas = {n for (n,) in conexion.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conexion.close()
+        assert {"documentos", "carreras", "apuestas"} <= tablas
+
+
+def test_archiva_y_saltea_lo_ya_archivado(tmp_path, carpeta):
+    resultado = _archivar(tmp_path, carpeta)
+    assert resultado == {"archivos": 5, "salteados": 0, "documentos": 6, "errores": {}}
+    documentos = _documentos(tmp_path)
+    assert [d[:3] for d in documentos] == [
+        ("Palermo", "programa", "2026-03-01"), ("Palermo", "programa", "2026-03-02"),
+        ("Palermo", "reporte", "2026-03-02"),
+        ("San Isidro", "programa", "2026-03-01"), ("San Isidro", "programa", "2026-03-01"),
+        ("San Isidro", "reporte", "2026-03-01"),
+    ]
+    assert all(d[4] for d in documentos)
+
+    assert _archivar(tmp_path, carpeta) == {"archivos": 5, "salteados": 5, "documentos": 0, "errores": {}}
+    escribir(os.path.join(carpeta, "2026-03-08.txt"), reporte_san_isidro(imperfecta={2: 700}))
+    assert _archivar(tmp_path, carpeta) == {"archivos": 6, "salteados": 5, "documentos": 1, "errores": {}}
+
+
+def test_otra_version_reemplaza_los_documentos(tmp_path, carpeta, monkeypatch):
+    _archivar(tmp_path, carpeta)
+    antes = _documentos(tmp_path)
+    monkeypatch.setattr(c, "__version__", c.__version__ + ".1")
+    resultado = _archivar(tmp_path, carpeta)
+    assert (resultado["salteados"], resultado["documentos"]) == (0, 6)
+    despues = _documentos(tmp_path)
+    # Los mismos documentos, sin duplicados, ahora con la versión nueva
+    assert [d[:3] + d[4:] for d in despues] == [d[:3] + d[4:] for d in antes]
+    assert {d[3] for d in despues} == {c.__version__}
+
+
+def test_consultas(tmp_path, carpeta):
+    _archivar(tmp_path, carpeta)
+    conexion = c.abrir_archivo_db(str(tmp_path / "archivo.db"))
+    try:
+        imperfecta = c.consultar_minimos_distintos(conexion, "IMP", 1000, hipodromo="San Isidro")
+        assert [(f, carrera, valor) for _, f, carrera, valor, _ in imperfecta] == [
+            ("2026-03-01", 4, 700.0), ("2026-03-01", 4, 700.0),
+        ]
+        assert c.consultar_minimos_distintos(conexion, "IMP", 1000, tipo="reporte") == []
+        doble = c.consultar_minimos_distintos(conexion, "DOB", 500, hipodromo="Palermo", desde="2026-03-02")
+        assert {(f, valor) for _, f, _, valor, _ in doble} == {("2026-03-02", 600.0)}
+        assert c.consultar_minimos_distintos(conexion, "DOB", 500, hipodromo="Palermo", hasta="2026-03-01") == []
+
+        cambios = c.consultar_cambios_caballos(conexion)
+        assert [fila[:5] for fila in cambios] == [("San Isidro", "2026-03-01", 3, 11, 10)]
+        assert cambios[0][5].endswith("_programa.pdf") and cambios[0][6].endswith("_programa_rev.pdf")
+        assert c.consultar_cambios_caballos(conexion, hipodromo="Palermo") == []
+    finally:
+        conexion.close()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Lectura de programas y reportes desde .zip y .gz, y la caché de miembros."""
+
+import gzip
+import os
+import threading
+import zipfile
+
+import carreras_desde_pdf as c
+from fabrica import escribir, escribir_pdf, paginas_san_isidro, reporte_san_isidro
+
+
+def test_comparar_desde_archivos_comprimidos(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro(imperfecta={5: 700}))
+    semana = str(tmp_path / "semana.zip")
+    with zipfile.ZipFile(semana, "w", zipfile.ZIP_DEFLATED) as z:
+        z.write(programa, "programa.pdf")
+    with open(reporte, "rb") as f, gzip.open(str(tmp_path / "reporte.txt.gz"), "wb") as g:
+        g.write(f.read())
+
+    esperado = c.comparar_pdf_y_reporte(programa, reporte)
+    assert not esperado[0]
+    assert c.comparar_pdf_y_reporte(f"{semana}::programa.pdf", str(tmp_path / "reporte.txt.gz")) == esperado
+    assert c.miembros_archivo(semana, {".pdf"}) == [f"{semana}::programa.pdf"]
+
+
+def _zip_con_miembros(tmp_path, cantidad, tamanio):
+    ruta = str(tmp_path / "reportes.zip")
+    with zipfile.ZipFile(ruta, "w", zipfile.ZIP_DEFLATED) as z:
+        for i in range(cantidad):
+            z.writestr(f"reporte_{i:02d}.txt", os.urandom(tamanio // 2).hex())
+    return [f"{ruta}::reporte_{i:02d}.txt" for i in range(cantidad)]
+
+
+def test_precarga_no_descarta_lo_que_acaba_de_precargar(tmp_path, monkeypatch):
+    monkeypatch.setattr(c, "_MAX_BYTES_MIEMBROS", 10 * 1000)
+    rutas = _zip_con_miembros(tmp_path, 8, 3000)
+    c._precargar_miembros(rutas)
+    assert len(c._MIEMBROS_EN_MEMORIA) == 3
+
+    descomprimidos = []
+    original = c._descomprimir_miembro
+    monkeypatch.setattr(c, "_descomprimir_miembro", lambda *p: descomprimidos.append(p[1]) or original(*p))
+    for ruta in rutas:
+        c._leer_bytes(ruta)
+    # Los tres primeros salen de memoria; el resto se descomprime al leerlo
+    assert descomprimidos == [f"reporte_{i:02d}.txt" for i in range(3, 8)]
+
+
+def test_lecturas_desde_varios_hilos(tmp_path, monkeypatch):
+    monkeypatch.setattr(c, "_MAX_BYTES_MIEMBROS", 5 * 1000)
+    rutas = _zip_con_miembros(tmp_path, 12, 1000)
+    esperado = {r: c._descomprimir_miembro(*c._partes_miembro(r)) for r in rutas}
+    errores = []
+
+    def _leer():
+        try:
+            for _ in range(20):
+                for ruta in rutas:
+                    assert c._leer_bytes(ruta) == esperado[ruta]
+        except Exception as e:  # se informa desde el hilo principal
+            errores.append(e)
+
+    hilos = [threading.Thread(target=_leer) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert errores == []
+    assert sum(len(d) for d in c._MIEMBROS_EN_MEMORIA.values()) <= 5 * 1000
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Backfill: códigos de salida, avisos y checkpoint."""
+
+import os
+
+import carreras_desde_pdf as c
+from fabrica import (
+    escribir, escribir_pdf, paginas_palermo, paginas_san_isidro, reporte_palermo, reporte_san_isidro,
+)
+
+
+def _cli(raiz, checkpoint):
+    return c._ejecutar_cli(["backfill", raiz, "--procesos", "1", "--checkpoint", checkpoint])
+
+
+def test_san_isidro(tmp_path):
+    raiz = tmp_path / "archivo" / "2026"
+    raiz.mkdir(parents=True)
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    escribir_pdf(str(raiz / "programa_01032026.pdf"), paginas_san_isidro())
+    reporte = escribir(str(raiz / "reporte_01032026.txt"), reporte_san_isidro())
+    assert _cli(str(tmp_path / "archivo"), checkpoint) == 0
+
+    resultado = c.ejecutar_backfill(str(tmp_path / "archivo"), ruta_checkpoint=checkpoint, max_procesos=1)
+    assert (resultado["retomados"], resultado["procesados"]) == (1, 0)
+    assert resultado["resumen"] == {("San Isidro", 2026): {"pares": 1, "con_diferencias": 0, "errores": 0, "tipos": {}}}
+
+    escribir(reporte, reporte_san_isidro(imperfecta={5: 700}))
+    os.utime(reporte, ns=(0, 10**18))  # otra fecha de modificación, aunque el tamaño sea el mismo
+    assert _cli(str(tmp_path / "archivo"), checkpoint) == 1
+
+
+def test_programa_sin_reporte(tmp_path, capsys):
+    escribir_pdf(str(tmp_path / "programa_01032026.pdf"), paginas_san_isidro())
+    assert _cli(str(tmp_path), str(tmp_path / "checkpoint.jsonl")) == 1
+    assert "sin reporte" in capsys.readouterr().err
+
+
+def test_palermo_sin_reporte_y_luego_con_reporte(tmp_path, capsys):
+    carpeta = tmp_path / "palermo"
+    carpeta.mkdir()
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    escribir_pdf(str(carpeta / "programa.pdf"), paginas_palermo(fechas=("01/03/2026",)))
+    assert _cli(str(tmp_path), checkpoint) == 1
+    assert "01/03/2026 sin reporte" in capsys.readouterr().err
+
+    # Agregar el reporte cambia la unidad: se vuelve a comparar en lugar de retomarla
+    escribir(str(carpeta / "reporte_01-03-2026.txt"), reporte_palermo())
+    resultado = c.ejecutar_backfill(str(tmp_path), ruta_checkpoint=checkpoint, max_procesos=1)
+    assert (resultado["retomados"], resultado["procesados"]) == (0, 1)
+    assert resultado["avisos"] == []
+    assert resultado["resumen"] == {("Palermo", 2026): {"pares": 1, "con_diferencias": 0, "errores": 0, "tipos": {}}}
+    assert _cli(str(tmp_path), checkpoint) == 0
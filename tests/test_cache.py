@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Huellas de página y la caché de textos que se apoya en ellas."""
+
+import glob
+import os
+
+import pypdf
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir_pdf, paginas_san_isidro
+
+
+@pytest.fixture
+def programa(tmp_path):
+    return escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+
+
+def test_huellas_de_pagina_no_dependen_del_archivo(tmp_path, programa):
+    # La misma página en otro PDF (con otra página cambiada) tiene la misma huella
+    revision = escribir_pdf(str(tmp_path / "revision.pdf"), paginas_san_isidro(imperfecta={5: 700}))
+    huellas = [c.huella_pagina_pdf(p) for p in pypdf.PdfReader(programa).pages]
+    huellas_revision = [c.huella_pagina_pdf(p) for p in pypdf.PdfReader(revision).pages]
+    distintas = [i for i, (a, b) in enumerate(zip(huellas, huellas_revision), start=1) if a != b]
+    assert distintas == [5]
+
+
+def test_archivo_ya_leido_no_se_vuelve_a_abrir(programa, monkeypatch):
+    primera = [(p["pagina"], p["texto"]) for p in c._iterar_paginas_pdf(programa)]
+
+    def _no_abrir(*args, **kwargs):
+        raise AssertionError("el PDF no debería abrirse")
+
+    monkeypatch.setattr(pypdf, "PdfReader", _no_abrir)
+    c._TEXTOS_EN_MEMORIA.clear()  # sale de la caché en disco
+    segunda = list(c._iterar_paginas_pdf(programa))
+    assert [(p["pagina"], p["texto"]) for p in segunda] == primera
+    assert all(p["reutilizada"] for p in segunda)
+
+
+def test_revision_solo_extrae_las_paginas_cambiadas(tmp_path, programa):
+    list(c._iterar_paginas_pdf(programa))
+    revision = escribir_pdf(str(tmp_path / "revision.pdf"), paginas_san_isidro(imperfecta={3: 700, 8: 900}))
+    extraidas = [p["pagina"] for p in c._iterar_paginas_pdf(revision) if not p["reutilizada"]]
+    assert extraidas == [3, 8]
+
+    resultado = c.comparar_revisiones_programa(programa, revision)
+    assert resultado["paginas_cambiadas"] == [3, 8]
+    assert sorted(resultado["carreras_cambiadas"]) == [3, 8]
+
+
+def test_cache_da_el_mismo_resultado_que_sin_cache(programa):
+    con_cache = c.obtener_apuestas_por_carrera(programa)
+    assert c.obtener_apuestas_por_carrera(programa) == con_cache
+    textos = [p["texto"] for p in c._iterar_paginas_pdf(programa, usar_cache=False)]
+    assert textos == [p["texto"] for p in c._iterar_paginas_pdf(programa)]
+
+
+def test_caches_de_textos_acotadas(tmp_path, programa, monkeypatch, cache_aislada):
+    monkeypatch.setattr(c, "_MAX_TEXTOS_EN_MEMORIA", 5)
+    monkeypatch.setattr(c, "_MAX_PAGINAS_EN_DISCO", 15)
+    revision = escribir_pdf(str(tmp_path / "otro.pdf"), paginas_san_isidro(carreras=10, hipodromo="OTRO HIPODROMO"))
+    esperado = [p["texto"] for p in c._iterar_paginas_pdf(programa, usar_cache=False)]
+
+    list(c._iterar_paginas_pdf(programa))
+    # Las páginas del primer PDF quedan como las usadas hace más tiempo
+    for ruta in glob.glob(os.path.join(cache_aislada, "paginas", "*.json")):
+        os.utime(ruta, (1, 1))
+    list(c._iterar_paginas_pdf(revision))
+
+    # Se podó hasta el 90 % del tope: quedan las 10 páginas del último PDF y 3 del primero
+    assert len(glob.glob(os.path.join(cache_aislada, "paginas", "*.json"))) == 13
+    assert len(c._TEXTOS_EN_MEMORIA) == 5
+    assert [p["texto"] for p in c._iterar_paginas_pdf(programa)] == esperado
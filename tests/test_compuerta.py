@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Códigos de salida de la compuerta go/no-go."""
+
+import os
+import subprocess
+import sys
+
+import carreras_desde_pdf as c
+from fabrica import (
+    escribir, escribir_pdf, paginas_palermo, paginas_san_isidro, reporte_palermo, reporte_san_isidro,
+)
+
+_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "carreras_desde_pdf.py")
+
+
+def test_san_isidro(tmp_path, capsys):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro())
+    assert c._ejecutar_cli(["compuerta", programa, reporte]) == c.SALIDAS_COMPUERTA["coincide"] == 0
+
+    escribir(reporte, reporte_san_isidro(imperfecta={5: 700}))
+    assert c._ejecutar_cli(["compuerta", programa, reporte]) == c.SALIDAS_COMPUERTA["difiere"] == 1
+    assert "DIFERENCIA" in capsys.readouterr().out
+
+
+def test_palermo_con_varias_fechas(tmp_path, capsys):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_palermo())
+    sin_fecha = escribir(str(tmp_path / "reporte.txt"), reporte_palermo(1))
+    assert c._ejecutar_cli(["compuerta", "--palermo", programa, sin_fecha]) == c.SALIDAS_COMPUERTA["sin_decision"] == 3
+    assert "--fecha" in capsys.readouterr().out
+
+    assert c._ejecutar_cli(["compuerta", "--palermo", "--fecha", "02/03/2026", programa, sin_fecha]) == 0
+    con_fecha = escribir(str(tmp_path / "reporte_01032026.txt"), reporte_palermo(1))
+    assert c._ejecutar_cli(["compuerta", "--palermo", programa, con_fecha]) == 1
+
+
+def test_plazo_vencido(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro())
+    resultado = c.verificar_compuerta(programa, reporte, plazo_s=1e-9)
+    assert resultado["resultado"] == "sin_decision"
+    assert "plazo" in resultado["motivo"]
+
+
+def test_plazo_vencido_desde_la_linea_de_comandos(tmp_path, cache_aislada):
+    # Si el plazo vence, la compuerta corta el proceso: se prueba en uno aparte
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro())
+    proceso = subprocess.run(
+        [sys.executable, _SCRIPT, "compuerta", "--plazo", "0.000001", programa, reporte],
+        capture_output=True, text=True, env=dict(os.environ, CARRERAS_CACHE_DIR=cache_aislada), timeout=60,
+    )
+    assert proceso.returncode == 3, proceso.stdout + proceso.stderr
+    assert "SIN DECISIÓN" in proceso.stdout
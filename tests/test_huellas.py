@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Huellas por carrera y por tarjeta."""
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir, escribir_pdf, paginas_san_isidro, reporte_san_isidro
+
+
+@pytest.fixture
+def programa(tmp_path):
+    return escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+
+
+def test_huellas_de_tarjeta(programa, tmp_path):
+    datos_pdf = c._normalizar_pdf(programa)
+    datos_reporte = c._normalizar_reporte(escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro()))
+    otro = c._normalizar_reporte(escribir(str(tmp_path / "otro.txt"), reporte_san_isidro(imperfecta={5: 700})))
+
+    huellas_pdf = c.huellas_tarjeta(datos_pdf)
+    assert huellas_pdf == c.huellas_tarjeta(datos_reporte)
+    huellas_otro = c.huellas_tarjeta(otro)
+    assert huellas_otro["tarjeta"] != huellas_pdf["tarjeta"]
+    assert [n for n in huellas_pdf["carreras"] if huellas_pdf["carreras"][n] != huellas_otro["carreras"][n]] == [5]
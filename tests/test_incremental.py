@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Comparación incremental cuando cambia el reporte."""
+
+import random
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir, escribir_pdf, paginas_san_isidro, reporte_san_isidro
+
+
+@pytest.fixture
+def programa(tmp_path):
+    return escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+
+
+def test_comparacion_incremental_solo_recompara_lo_que_cambio(programa, tmp_path):
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro())
+    coincide, diferencias, estado = c.comparar_pdf_y_reporte_incremental(programa, reporte)
+    assert coincide and diferencias == []
+
+    escribir(reporte, reporte_san_isidro(imperfecta={5: 700}))
+    coincide, diferencias, estado = c.comparar_pdf_y_reporte_incremental(programa, reporte, estado)
+    assert not coincide
+    assert estado["carreras_recomparadas"] == [5]
+    assert diferencias == c.comparar_pdf_y_reporte(programa, reporte)[1]
+
+
+def _sin_estado(modelo):
+    return {k: modelo[k] for k in ("datos", "huellas_carreras", "apariciones", "filas_rsm")}
+
+
+def test_revision_solo_reparsea_la_carrera_editada():
+    texto = reporte_san_isidro()
+    modelo = c._parsear_reporte_incremental(texto)
+    revision = texto.replace(" 7  GAN SEG TER EXA IMP TRI", " 7  GAN SEG TER EXA TRI", 1)
+    nuevo = c._parsear_reporte_incremental(revision, modelo)
+    assert nuevo["reparseado"] == {"carreras": [7], "rsm": False}
+    assert _sin_estado(nuevo) == _sin_estado(c._parsear_reporte_incremental(revision))
+    assert "IMP" not in nuevo["datos"][7]["apuestas"]
+
+
+def _editar_al_azar(azar, lineas):
+    lineas = list(lineas)
+    for _ in range(azar.randint(1, 4)):
+        i = azar.randrange(len(lineas) + 1)
+        nueva = azar.choice([
+            f"{azar.randint(1, 12):>2}  GAN SEG EXA " + " ".join(["1/9"] * azar.randint(1, 12)),
+            "     DOB( 1,2 ) QTN( 1-4 )", "     TRI", "", "texto suelto",
+            f"  {azar.randint(5, 20)}  {azar.randint(1, 12):<20}  ---  IMP  TS  {azar.choice([500, 700, 1000])},00  x",
+        ])
+        accion = azar.choice(["insertar", "borrar", "cambiar"])
+        if accion == "insertar" or not lineas:
+            lineas.insert(i, nueva)
+        elif accion == "borrar":
+            del lineas[min(i, len(lineas) - 1)]
+        else:
+            lineas[min(i, len(lineas) - 1)] = nueva
+    return lineas
+
+
+def test_revisiones_al_azar_igual_que_parsear_de_cero():
+    azar = random.Random(7)
+    for _ in range(100):
+        lineas = reporte_san_isidro(carreras=azar.randint(1, 12)).split("\n")
+        modelo = c._parsear_reporte_incremental("\n".join(lineas))
+        # Varias revisiones seguidas, cada una sobre el modelo de la anterior
+        for _ in range(5):
+            lineas = _editar_al_azar(azar, lineas)
+            texto = "\n".join(lineas)
+            modelo = c._parsear_reporte_incremental(texto, modelo)
+            assert _sin_estado(modelo) == _sin_estado(c._parsear_reporte_incremental(texto)), texto
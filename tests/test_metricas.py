@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Métricas de Prometheus de las corridas."""
+
+import carreras_desde_pdf as c
+from fabrica import escribir, escribir_pdf, paginas_san_isidro, reporte_san_isidro
+
+
+def test_archivo_de_metricas(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro(imperfecta={5: 700}))
+    metricas = str(tmp_path / "corrida.prom")
+    assert c._ejecutar_cli(["--metricas-archivo", metricas, "comparar", "--san-isidro", programa, reporte]) == 1
+    with open(metricas, encoding="utf-8") as f:
+        texto = f.read()
+    assert "# TYPE carreras_comparaciones_total counter" in texto
+    assert 'carreras_comparaciones_total{hipodromo="san_isidro"} 1' in texto
+
+
+def test_puerto_invalido_en_el_entorno_se_avisa_y_se_ignora(monkeypatch, capsys):
+    monkeypatch.setenv("CARRERAS_METRICAS_PUERTO", "abc")
+    assert c._ejecutar_cli(["planificador"]) == 0
+    assert "CARRERAS_METRICAS_PUERTO='abc'" in capsys.readouterr().err
+    assert "servidor" not in c._SERVIDOR_METRICAS
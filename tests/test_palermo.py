@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Índice de fechas de Palermo y lectura de una sola fecha."""
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import Codificado, escribir, escribir_pdf, paginas_palermo
+
+
+_REPORTE_DOBLE = "RSM TABLE\n  1  1,3                   ---  DOB  TS  {},00  x\nTIM BETTING\n"
+
+
+def _pagina_con_dos_fechas(segunda):
+    # La segunda fecha no se ve con la lectura directa de los strings del PDF
+    return [
+        "REUNION DEL DIA 01/03/2026",
+        "DOBLE ($ 500.-) 1ª, 3ª",
+        segunda,
+        "DOBLE ($ 600.-) 1ª, 3ª",
+    ]
+
+
+@pytest.mark.parametrize("segunda", [
+    Codificado("reunion del dia 02/03/2026"),
+    ["REUNION DEL DIA 02/03", "/2026"],
+], ids=["codificacion_propia", "fecha_en_tramos"])
+def test_fecha_que_la_lectura_directa_no_ve(tmp_path, segunda):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), [_pagina_con_dos_fechas(segunda)])
+    indice = c.indexar_fechas_palermo(programa)
+    assert indice["paginas_por_fecha"] == {"01/03/2026": [1], "02/03/2026": [1]}
+
+    completo = c._leer_palermo_desde_pdf(programa)
+    for fecha in ("01/03/2026", "02/03/2026"):
+        datos = c._leer_palermo_desde_pdf(programa, fecha=fecha)
+        assert datos["apuestas_por_fecha"] == {fecha: completo["apuestas_por_fecha"][fecha]}
+    assert completo["apuestas_por_fecha"]["02/03/2026"][1]["DOB"] == 600.0
+
+    reporte = escribir(str(tmp_path / "reporte_02032026.txt"), _REPORTE_DOBLE.format(600))
+    assert c.verificar_compuerta(programa, reporte, palermo=True)["resultado"] == "coincide"
+    escribir(reporte, _REPORTE_DOBLE.format(500))
+    assert c.verificar_compuerta(programa, reporte, palermo=True)["resultado"] == "difiere"
+
+
+def test_lectura_por_fecha_igual_a_la_completa(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_palermo(("01/03/2026", "02/03/2026", "03/03/2026")))
+    indice = c.indexar_fechas_palermo(programa)
+    assert indice["fechas"] == ["01/03/2026", "02/03/2026", "03/03/2026"]
+    assert indice["paginas_por_fecha"]["02/03/2026"] == [3, 4]
+
+    completo = c._leer_palermo_desde_pdf(programa)
+    for fecha in indice["fechas"]:
+        parcial = c._leer_palermo_desde_pdf(programa, fecha=fecha)
+        assert parcial["apuestas_por_fecha"] == {fecha: completo["apuestas_por_fecha"][fecha]}
+        assert parcial["fechas"] == indice["fechas"]
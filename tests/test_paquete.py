@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Paquetes .cprg: lo que se lee de un paquete es lo mismo que del PDF, y uno dañado se rechaza."""
+
+import struct
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir_pdf, paginas_palermo, paginas_san_isidro
+
+
+@pytest.fixture
+def san_isidro(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro(imperfecta={4: 700}))
+    paquete = str(tmp_path / "programa.cprg")
+    c.exportar_paquete(programa, paquete)
+    return programa, paquete
+
+
+def test_san_isidro_ida_y_vuelta(san_isidro):
+    programa, paquete = san_isidro
+    assert c.es_paquete(paquete) and not c.es_paquete(programa)
+    leido = c.leer_paquete(paquete)
+    assert leido["tipo"] == "san_isidro" and leido["version"] == c.__version__
+    assert leido["hash_pdf"] == c._hash_archivo(programa)
+    assert c._normalizar_pdf(paquete) == c._normalizar_pdf(programa)
+    assert leido["paginas"] == c.obtener_carreras_por_pagina(programa)
+    assert c._normalizar_pdf(paquete)[4]["apuestas"]["IMP"] == 700.0
+
+
+def test_palermo_ida_y_vuelta(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "palermo.pdf"), paginas_palermo())
+    paquete = str(tmp_path / "palermo.cprg")
+    c.exportar_paquete(programa, paquete, palermo=True)
+    assert c.leer_paquete(paquete)["tipo"] == "palermo"
+    assert c.indexar_fechas_palermo(paquete) == c.indexar_fechas_palermo(programa)
+    assert c._leer_palermo_desde_pdf(paquete) == c._leer_palermo_desde_pdf(programa)
+    assert c._leer_palermo_desde_pdf(paquete, fecha="02/03/2026") == c._leer_palermo_desde_pdf(
+        programa, fecha="02/03/2026"
+    )
+    with pytest.raises(ValueError, match="se esperaba san_isidro"):
+        c._normalizar_pdf(paquete)
+
+
+def _modificar(ruta, posicion, nuevo):
+    with open(ruta, "r+b") as f:
+        f.seek(posicion)
+        f.write(nuevo)
+
+
+def test_checksum_invalido(san_isidro):
+    _, paquete = san_isidro
+    with open(paquete, "rb") as f:
+        contenido = f.read()
+    _modificar(paquete, len(contenido) - 1, bytes([contenido[-1] ^ 0xFF]))
+    with pytest.raises(ValueError, match="checksum"):
+        c.leer_paquete(paquete)
+
+
+def test_paquete_truncado(san_isidro):
+    _, paquete = san_isidro
+    with open(paquete, "rb") as f:
+        contenido = f.read()
+    with open(paquete, "wb") as f:
+        f.write(contenido[:-10])
+    with pytest.raises(ValueError, match="checksum"):
+        c.leer_paquete(paquete)
+
+
+def test_version_de_formato_distinta(san_isidro):
+    _, paquete = san_isidro
+    _modificar(paquete, len(c._MAGIA_PAQUETE), struct.pack("<B", c._VERSION_FORMATO_PAQUETE + 1))
+    with pytest.raises(ValueError, match="Versión de paquete no soportada"):
+        c.leer_paquete(paquete)
+    with pytest.raises(ValueError):
+        c._normalizar_pdf(paquete)
+
+
+def test_firma_invalida(tmp_path):
+    ruta = str(tmp_path / "otro.cprg")
+    with open(ruta, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+    assert not c.es_paquete(ruta)
+    with pytest.raises(ValueError, match="no es un paquete"):
+        c.leer_paquete(ruta)
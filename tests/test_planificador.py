@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Historial del planificador: sin planes "cache", solo se agrega y se compacta bajo candado."""
+
+import json
+import multiprocessing
+import os
+
+import carreras_desde_pdf as c
+
+
+def _plan(n, estrategia="serie"):
+    return {"tarea": "paginas", "hipodromo": "palermo", "unidades": n, "estrategia": estrategia,
+            "procesos": 1, "previsto_s": 0.1}
+
+
+def _lineas():
+    with open(c._ruta_historial_planes(), encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f]
+
+
+def test_planes_cache_no_se_anotan():
+    c.registrar_plan(_plan(10), 1.0)
+    for _ in range(50):
+        c.registrar_plan(c.planificar("paginas", 0, "palermo"), 0.001)
+    assert [e["unidades"] for e in _lineas()] == [10]
+    assert [e["unidades"] for e in c.historial_planes()] == [10]
+    assert c._VALORES_METRICAS[("carreras_planes_total", ("paginas", "cache"))] == 50
+
+
+def test_se_agrega_sin_reescribir_hasta_el_doble_del_tope(monkeypatch):
+    monkeypatch.setattr(c, "_MAX_ENTRADAS_HISTORIAL", 5)
+    reemplazos = []
+    original = os.replace
+    monkeypatch.setattr(os, "replace", lambda *a: (reemplazos.append(a), original(*a)))
+    for n in range(1, 11):
+        c.registrar_plan(_plan(n), 1.0)
+    assert reemplazos == [] and len(_lineas()) == 10
+    assert [e["unidades"] for e in c.historial_planes()] == [6, 7, 8, 9, 10]
+    c.registrar_plan(_plan(11), 1.0)
+    assert len(reemplazos) == 1
+    assert [e["unidades"] for e in _lineas()] == [7, 8, 9, 10, 11]
+    assert not os.path.exists(c._ruta_historial_planes() + ".lock")
+
+
+def _anotar(trabajador, cantidad, barrera):
+    for n in range(cantidad):
+        barrera.wait()  # todos anotan su n-ésima entrada en la misma vuelta
+        c.registrar_plan(_plan(trabajador * 1000 + n), 1.0)
+
+
+def test_procesos_a_la_vez_no_pierden_las_ultimas_entradas(monkeypatch):
+    monkeypatch.setattr(c, "_MAX_ENTRADAS_HISTORIAL", 20)
+    contexto = multiprocessing.get_context("fork")
+    barrera = contexto.Barrier(4)
+    procesos = [contexto.Process(target=_anotar, args=(t, 60, barrera)) for t in range(1, 5)]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join()
+        assert p.exitcode == 0
+    unidades = [e["unidades"] for e in _lineas()]
+    assert len(unidades) >= 20
+    assert len(set(unidades)) == len(unidades)
+    for t in range(1, 5):
+        propias = [u for u in unidades if u // 1000 == t]
+        # Quedan las últimas de cada proceso, sin huecos: compactar con lo que
+        # un proceso tiene en memoria borraría lo que agregaron los otros
+        assert len(propias) >= 20 // 4
+        assert propias == list(range(t * 1000 + 60 - len(propias), t * 1000 + 60))
+    assert not os.path.exists(c._ruta_historial_planes() + ".lock")
+
+
+def test_candado_abandonado_se_recupera(monkeypatch):
+    ruta = c._ruta_historial_planes()
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    open(ruta + ".lock", "w").close()
+    os.utime(ruta + ".lock", (0, 0))
+    assert c._tomar_candado(ruta + ".lock")
+    monkeypatch.setattr(c, "_ESPERA_CANDADO_S", 0.05)
+    assert not c._tomar_candado(ruta + ".lock")  # recién tomado: no se roba
+    os.remove(ruta + ".lock")
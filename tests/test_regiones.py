@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""La extracción por regiones da a los parsers de San Isidro lo mismo que la completa."""
+
+import pypdf
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir_pdf, paginas_san_isidro
+
+
+@pytest.fixture
+def programa(tmp_path):
+    return escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro(imperfecta={4: 700}))
+
+
+def _parseado(programa, regiones):
+    c.configurar_regiones(regiones)
+    c._TEXTOS_EN_MEMORIA.clear()
+    try:
+        return {
+            "apuestas": c.obtener_apuestas_por_carrera(programa),
+            "carreras": c.obtener_carreras_por_pagina(programa),
+            "normalizado": c._normalizar_pdf(programa),
+        }
+    finally:
+        c.configurar_regiones(None)
+
+
+def test_parsers_obtienen_lo_mismo(programa):
+    completo = _parseado(programa, False)
+    assert _parseado(programa, True) == completo
+    assert completo["normalizado"][4]["apuestas"]["IMP"] == 700.0
+
+
+def test_por_pagina_el_texto_por_regiones_conserva_lo_que_se_parsea(programa):
+    for pagina in pypdf.PdfReader(programa).pages:
+        completo = pagina.extract_text()
+        regiones = c._texto_regiones(pagina)
+        assert c._parsear_para_comparar_motores([regiones], "san_isidro") == c._parsear_para_comparar_motores(
+            [completo], "san_isidro"
+        )
+        assert "Tabla de performances" not in regiones
+
+
+def test_motor_regiones_coincide_en_medir_motores(programa):
+    resultado = c.medir_motores([programa], motores=["pypdf", "pypdf-regiones"])
+    assert resultado["omitidos"] == {}
+    assert resultado["motores"]["pypdf-regiones"]["coincide"]
+    assert resultado["elegido"] == "pypdf"
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Caché de resultados de comparación: clave, aciertos, desalojo y versión."""
+
+import os
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import escribir, escribir_pdf, paginas_san_isidro, reporte_san_isidro
+
+
+@pytest.fixture
+def archivos(tmp_path):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+    reporte = escribir(str(tmp_path / "reporte.txt"), reporte_san_isidro())
+    return programa, reporte
+
+
+def _clave(archivos, **kwargs):
+    return c.clave_resultado(archivos[0], archivos[1], "San Isidro", **kwargs)
+
+
+def test_acierto_y_fallo(tmp_path, archivos):
+    clave = _clave(archivos)
+    assert c.obtener_resultado_cacheado(clave) is None
+    c.guardar_resultado(clave, {"coincide": True, "diferencias": []})
+    c._RESULTADOS_EN_MEMORIA.clear()  # sale del disco
+    assert c.obtener_resultado_cacheado(clave)["coincide"] is True
+    # El mismo contenido en otra ruta acierta; otro reporte no
+    copia = escribir(str(tmp_path / "copia.txt"), reporte_san_isidro())
+    assert c.clave_resultado(archivos[0], copia, "san isidro") == clave
+    otro = escribir(str(tmp_path / "otro.txt"), reporte_san_isidro(imperfecta={3: 700}))
+    assert c.obtener_resultado_cacheado(c.clave_resultado(archivos[0], otro, "san isidro")) is None
+    assert c._VALORES_METRICAS[("carreras_cache_total", ("resultados", "acierto"))] == 1
+    assert c._VALORES_METRICAS[("carreras_cache_total", ("resultados", "fallo"))] == 2
+
+
+def test_la_clave_depende_de_la_extraccion(archivos, monkeypatch):
+    c.configurar_regiones(False)
+    completa = _clave(archivos)
+    c.configurar_regiones(True)
+    regiones = _clave(archivos)
+    c.configurar_regiones(None)
+    assert regiones != completa
+    version = c._MOTORES_EXTRACCION["pypdf"]["version"]
+    monkeypatch.setitem(c._MOTORES_EXTRACCION["pypdf"], "version", lambda: version() + ".otra")
+    assert _clave(archivos) not in (completa, regiones)
+
+
+def test_desaloja_los_menos_usados(archivos, monkeypatch):
+    monkeypatch.setattr(c, "_MAX_RESULTADOS_EN_DISCO", 3)
+    claves = [_clave(archivos, fecha=str(n)) for n in range(4)]
+    for n, clave in enumerate(claves[:3]):
+        c.guardar_resultado(clave, {"n": n})
+        os.utime(c._ruta_cache("resultados", clave), (1000 + n, 1000 + n))
+    c._RESULTADOS_EN_MEMORIA.clear()
+    assert c.obtener_resultado_cacheado(claves[0])["n"] == 0  # el más viejo pasa a ser el más reciente
+    c.guardar_resultado(claves[3], {"n": 3})
+    en_disco = [os.path.exists(c._ruta_cache("resultados", clave)) for clave in claves]
+    assert en_disco == [True, False, True, True]
+
+
+def test_otra_version_invalida(archivos, monkeypatch):
+    clave = _clave(archivos)
+    c.guardar_resultado(clave, {"coincide": True})
+    monkeypatch.setattr(c, "__version__", c.__version__ + ".1")
+    assert _clave(archivos) != clave
+    c._RESULTADOS_EN_MEMORIA.clear()
+    # Aun con la clave vieja, lo guardado por otra versión no se usa
+    assert c.obtener_resultado_cacheado(clave) is None
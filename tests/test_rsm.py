@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""_filas_rsm (corte por columnas) contra el patrón de filas RSM original."""
+
+import random
+import re
+import time
+
+import carreras_desde_pdf as c
+
+# Patrón anterior al corte por columnas. Da los mismos resultados, pero con un
+# race_map largo vuelve atrás exponencialmente: solo sirve con filas cortas.
+_PATRON_ORIGINAL = re.compile(
+    r"^\s*\d+\s+([^\s]+(?:[-\s,][^\s]+)*)\s+---\s+([A-Z]+)\s+TS\s+([\d.,]+)", re.MULTILINE
+)
+
+
+def _filas_original(seccion):
+    return [(m.group(1).strip(), m.group(2).strip(), m.group(3).strip()) for m in _PATRON_ORIGINAL.finditer(seccion)]
+
+
+def _fila_al_azar(azar, numero):
+    return "  {}  {}{}{}{}{}{}".format(
+        azar.choice([str(numero), " " + str(numero), "²", "a"]),
+        azar.choice(["ALL", "1", "2,4,6", "1-4", "1, 3", "1,  3", "10", "2 4", "x-y", "1--2", "ñ"]).ljust(
+            azar.choice([22, 22, 22, 21, 10, 0])
+        ),
+        azar.choice(["  ---  ", "  ---  ", " --- ", "---", "  --  ", "\t---\t"]),
+        azar.choice(["EXA", "IMP", "DOB", "Tri", "WPS", "QTN", "E1", "CUA"]),
+        azar.choice(["  TS  ", "  TS  ", " TS ", "TS", "  TX  ", "  TS "]),
+        azar.choice(["1000,00", "500,00", "1.000,00", "abc", "12x", "0", "2,00"]).rjust(azar.choice([7, 8, 9])),
+        azar.choice(["  x", "", "x"]),
+    )
+
+
+def test_tabla_tipica():
+    seccion = "\n".join(
+        ["RSM TABLE", "  #  RACES                 ---  POOL TS  MINIMUM"]
+        + [f"{n:>3}  {m:<20}  ---  {t}  TS  {v:>9}  x" for n, (m, t, v) in enumerate([
+            ("ALL", "EXA", "1000,00"), ("2,4,6,9,12", "IMP", "1000,00"), ("1-4", "CUA", "2.000,00"),
+            ("1, 3", "DOB", "500,00"), ("5", "TRI", "1000,00"),
+        ] * 3, start=1)]
+    ) + "\n"
+    assert c._filas_rsm(seccion) == _filas_original(seccion)
+    assert len(c._filas_rsm(seccion)) == 15
+
+
+def test_igual_al_patron_original_en_tablas_al_azar():
+    azar = random.Random(1)
+    for _ in range(500):
+        lineas = ["RSM TABLE"] + [_fila_al_azar(azar, n) for n in range(1, azar.randint(1, 30))]
+        if azar.random() < 0.3:
+            lineas.insert(2, "")
+        seccion = "\n".join(lineas) + "\n"
+        assert c._filas_rsm(seccion) == _filas_original(seccion), seccion
+
+
+def test_race_map_largo_no_vuelve_atras():
+    # Con el patrón original, esta fila (sin "TS") no termina: ya con 12 grupos tarda segundos
+    fila = "  1  " + " ".join(["1,2,3"] * 60) + "  ---  EXA  TX  1000,00"
+    inicio = time.perf_counter()
+    assert c._filas_rsm("RSM TABLE\n" + fila + "\n") == []
+    assert time.perf_counter() - inicio < 1
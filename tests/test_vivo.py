@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Comparación contra un reporte que todavía se está escribiendo."""
+
+import io
+import os
+import threading
+
+import pytest
+
+import carreras_desde_pdf as c
+from fabrica import (
+    escribir, escribir_pdf, paginas_palermo, paginas_san_isidro, reporte_palermo, reporte_san_isidro,
+)
+
+
+@pytest.fixture
+def programa(tmp_path):
+    return escribir_pdf(str(tmp_path / "programa.pdf"), paginas_san_isidro())
+
+
+def _con_diferencias(resultados):
+    return [r.carrera for r in resultados if r.registros]
+
+
+def test_archivo_que_crece(tmp_path, programa):
+    reporte = str(tmp_path / "reporte.txt")
+    texto = reporte_san_isidro(imperfecta={5: 700})
+    corte = texto.index("TIM BETTING")
+    primer_resultado = threading.Event()
+    cerrado_a_tiempo = []
+
+    def _escribir():
+        with open(reporte, "w", encoding="utf-8") as f:
+            for linea in texto[:corte].splitlines(keepends=True):
+                f.write(linea)
+                f.flush()
+            f.write("TIM BETTING\n")
+            f.flush()
+            # Los resultados llegan apenas cierra la sección RSM, no al terminar el archivo
+            cerrado_a_tiempo.append(primer_resultado.wait(5))
+            f.write(texto[corte + len("TIM BETTING\n"):])
+
+    escritor = threading.Thread(target=_escribir)
+    escritor.start()
+    resultados = []
+    for r in c.iterar_resultados_en_vivo(programa, reporte, intervalo=0.01, inactividad=10):
+        primer_resultado.set()
+        resultados.append(r)
+    escritor.join()
+    assert cerrado_a_tiempo == [True]
+    assert [r.carrera for r in resultados] == list(range(1, 11))
+    assert all(r.reporte_completo for r in resultados)
+    assert _con_diferencias(resultados) == [5]
+
+
+def test_pipe_se_lee_hasta_el_final(programa):
+    lectura, escritura = os.pipe()
+    # Lo que sigue a la sección RSM supera el buffer del pipe: si no se vaciara, quien escribe quedaría bloqueado
+    texto = reporte_san_isidro() + "RESTO\n" * 50000
+
+    def _escribir():
+        with open(escritura, "w", encoding="utf-8") as f:
+            f.write(texto)
+
+    escritor = threading.Thread(target=_escribir)
+    escritor.start()
+    with open(lectura, "r", encoding="utf-8") as pipe:
+        resultados = list(c.iterar_resultados_en_vivo(programa, pipe))
+    escritor.join(5)
+    assert not escritor.is_alive()
+    assert _con_diferencias(resultados) == []
+    assert all(r.reporte_completo for r in resultados)
+
+
+def test_reporte_que_termina_sin_cerrar_la_seccion_rsm(tmp_path, programa, capsys):
+    texto = reporte_san_isidro()
+    reporte = escribir(str(tmp_path / "reporte.txt"), texto[:texto.index("TIM BETTING")])
+    resultados = list(c.iterar_resultados_en_vivo(programa, reporte, intervalo=0.01, inactividad=0.1))
+    assert resultados and not any(r.reporte_completo for r in resultados)
+    assert _con_diferencias(resultados) == []
+
+    argv = ["comparar", "--san-isidro", "--seguir", "--inactividad", "0.1", programa, reporte]
+    assert c._ejecutar_cli(argv) == 1
+    assert "antes de cerrar la sección RSM TABLE" in capsys.readouterr().err
+
+
+def test_palermo_con_varias_fechas(tmp_path, capsys):
+    programa = escribir_pdf(str(tmp_path / "programa.pdf"), paginas_palermo())
+    with pytest.raises(ValueError, match="--fecha"):
+        list(c.iterar_resultados_en_vivo(programa, io.StringIO(reporte_palermo(1)), palermo=True))
+
+    sin_fecha = escribir(str(tmp_path / "reporte.txt"), reporte_palermo(1))
+    argv = ["comparar", "--palermo", "--seguir", "--inactividad", "0.1"]
+    assert c._ejecutar_cli(argv + [programa, sin_fecha]) == 1
+    assert "indique --fecha" in capsys.readouterr().err
+    assert c._ejecutar_cli(argv + ["--fecha", "02/03/2026", programa, sin_fecha]) == 0
+
+    # La fecha del nombre del reporte elige la tarjeta: la del 01/03 tiene otro Doble
+    con_fecha = escribir(str(tmp_path / "reporte_01032026.txt"), reporte_palermo(1))
+    resultados = list(c.iterar_resultados_en_vivo(programa, con_fecha, palermo=True, intervalo=0.01, inactividad=0.1))
+    assert _con_diferencias(resultados) == [1, 3]